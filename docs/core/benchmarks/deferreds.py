@@ -65,6 +65,21 @@ def instantiateShootErrback():
     d.addErrback(lambda x: None)
 instantiateShootErrback = benchmarkFunc(200)(instantiateShootErrback)
 
+def instantiateRaiseTrapErrback():
+    """
+    Create a deferred whose callback raises an exception, which an errback
+    then traps and discards. This measures the cost of the L{Failure}
+    created for the exception.
+    """
+    d = defer.Deferred()
+    def raiser(result):
+        raise ZeroDivisionError()
+    d.addCallback(raiser)
+    d.addErrback(lambda f: f.trap(ZeroDivisionError))
+    d.callback(None)
+instantiateRaiseTrapErrback = benchmarkFunc(100000)(
+    instantiateRaiseTrapErrback)
+
 ns = [10, 1000, 10000]
 
 def instantiateAddCallbacksNoResult(n):
@@ -134,6 +149,50 @@ def pauseUnpause(n):
     d.unpause()
 pauseUnpause = benchmarkNFunc(20, ns)(pauseUnpause)
 
+def nestedChain(n):
+    """
+    Creates the given number of deferreds, each of whose callbacks returns the
+    next one, and shoots a result through them from the innermost outwards.
+    """
+    first = d = defer.Deferred()
+    deferreds = []
+    for i in range(n):
+        inner = defer.Deferred()
+        d.addCallback(lambda result, inner=inner: inner)
+        deferreds.append(inner)
+        d = inner
+    first.callback(1)
+    for d in reversed(deferreds):
+        d.callback(1)
+nestedChain = benchmarkNFunc(20, ns)(nestedChain)
+
+def inlineCallbacksFired(n):
+    """
+    Runs an inlineCallbacks generator which yields the given number of
+    deferreds which already have results.
+    """
+    @defer.inlineCallbacks
+    def loop():
+        for i in range(n):
+            yield defer.succeed(i)
+    loop()
+inlineCallbacksFired = benchmarkNFunc(20, ns)(inlineCallbacksFired)
+
+def inlineCallbacksUnfired(n):
+    """
+    Runs an inlineCallbacks generator which yields the given number of
+    deferreds, each of which is given a result after it is yielded.
+    """
+    deferreds = [defer.Deferred() for i in range(n)]
+    @defer.inlineCallbacks
+    def loop():
+        for d in deferreds:
+            yield d
+    loop()
+    for d in deferreds:
+        d.callback(None)
+inlineCallbacksUnfired = benchmarkNFunc(20, ns)(inlineCallbacksUnfired)
+
 def benchmark():
     """
     Run all of the benchmarks registered in the benchmarkFuncs list
@@ -0,0 +1,176 @@
+# Copyright (c) Twisted Matrix Laboratories.
+# See LICENSE for details.
+
+"""
+See how many DNS messages per second L{twisted.names.dns.Message} can parse
+and encode.
+
+The corpus is a set of typical responses built here, or the messages in a
+file of captured DNS over TCP streams given as the only argument: each
+message preceded by its length as two bytes in network order, as
+C{tcpflow} writes them.  Each message is parsed by L{Message.decode}, by
+L{Message.fromStr}, and by L{Message.fromStr} in lazy mode reading only the
+queries, and then encoded by L{Message.toStr}.
+"""
+
+from __future__ import print_function
+
+import struct
+import sys
+import time
+from io import BytesIO
+
+from twisted.names import dns
+
+
+
+def response(name, answers=(), authority=(), additional=()):
+    """
+    Build the bytes of an authoritative response to a query for C{name}.
+
+    @param answers: A sequence of C{(name, payload)} tuples for the answer
+        section, and likewise C{authority} and C{additional}.
+    """
+    message = dns.Message(id=1234, answer=1, auth=1, recDes=1, recAv=1)
+    message.addQuery(name, dns.A)
+    for section, records in [(message.answers, answers),
+                             (message.authority, authority),
+                             (message.additional, additional)]:
+        for owner, payload in records:
+            section.append(dns.RRHeader(
+                owner, payload.TYPE, ttl=300, payload=payload))
+    message.maxSize = 0
+    return message.toStr()
+
+
+
+def buildCorpus():
+    """
+    @return: A C{list} of the bytes of typical responses.
+    """
+    nameservers = [
+        (b'example.com', dns.Record_NS(b'ns%d.example.com' % (i,)))
+        for i in range(1, 5)]
+    glue = [
+        (b'ns%d.example.com' % (i,), dns.Record_A('192.0.2.%d' % (i,)))
+        for i in range(1, 5)]
+    return [
+        response(b'www.example.com',
+                 [(b'www.example.com', dns.Record_A('192.0.2.1'))]),
+        response(b'www.example.com',
+                 [(b'www.example.com', dns.Record_AAAA('2001:db8::1'))]),
+        response(b'cdn.example.com',
+                 [(b'cdn.example.com',
+                   dns.Record_CNAME(b'edge.cdn.example.net')),
+                  (b'edge.cdn.example.net',
+                   dns.Record_CNAME(b'a1.edge.cdn.example.net'))] +
+                 [(b'a1.edge.cdn.example.net',
+                   dns.Record_A('198.51.100.%d' % (i,)))
+                  for i in range(1, 9)]),
+        response(b'example.com',
+                 [(b'example.com',
+                   dns.Record_MX(i * 10, b'mx%d.example.com' % (i,)))
+                  for i in range(1, 4)],
+                 nameservers, glue),
+        response(b'example.com',
+                 [(b'example.com',
+                   dns.Record_TXT(b'v=spf1 ip4:192.0.2.0/24 -all')),
+                  (b'example.com',
+                   dns.Record_TXT(b'google-site-verification=' + b'x' * 43))]),
+        response(b'_sip._tcp.example.com',
+                 [(b'_sip._tcp.example.com',
+                   dns.Record_SRV(10, 60, 5060, b'sip%d.example.com' % (i,)))
+                  for i in range(1, 4)]),
+        response(b'missing.example.com', (),
+                 [(b'example.com', dns.Record_SOA(
+                     b'ns1.example.com', b'hostmaster.example.com',
+                     2017010101, 7200, 3600, 1209600, 300))]),
+        ]
+
+
+
+def readCapture(path):
+    """
+    Read the messages of a captured DNS over TCP stream.
+
+    @return: A C{list} of the bytes of each message.
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+    messages = []
+    offset = 0
+    while offset + 2 <= len(data):
+        length, = struct.unpack('!H', data[offset:offset + 2])
+        messages.append(data[offset + 2:offset + 2 + length])
+        offset += 2 + length
+    return messages
+
+
+
+def decode(data):
+    message = dns.Message()
+    message.decode(BytesIO(data))
+    return message
+
+
+
+def fromStr(data):
+    message = dns.Message()
+    message.fromStr(data)
+    return message
+
+
+
+def fromStrLazy(data):
+    message = dns.Message()
+    message.fromStr(data, lazy=True)
+    message.queries
+    return message
+
+
+
+def benchmark(corpus, parse, rounds):
+    """
+    Parse every message in C{corpus} with C{parse} C{rounds} times, and
+    report the number of messages parsed per second.
+    """
+    start = time.time()
+    for i in range(rounds):
+        for data in corpus:
+            parse(data)
+    elapsed = time.time() - start
+    print("%-12s %10d messages/sec" % (
+        parse.__name__, rounds * len(corpus) / elapsed))
+
+
+
+def benchmarkEncode(corpus, rounds):
+    """
+    Encode every message in C{corpus} C{rounds} times, and report the number
+    of messages encoded per second.
+    """
+    messages = [fromStr(data) for data in corpus]
+    start = time.time()
+    for i in range(rounds):
+        for message in messages:
+            message.toStr()
+    elapsed = time.time() - start
+    print("%-12s %10d messages/sec" % (
+        "toStr", rounds * len(messages) / elapsed))
+
+
+
+def main(args):
+    if args:
+        corpus = readCapture(args[0])
+    else:
+        corpus = buildCorpus()
+    rounds = max(1, 20000 // len(corpus))
+    for parse in [decode, fromStr, fromStrLazy]:
+        benchmark(corpus, parse, rounds)
+    benchmarkEncode(corpus, rounds)
+
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,89 @@
+# Copyright (c) Twisted Matrix Laboratories.
+# See LICENSE for details.
+
+"""
+See how many requests per second a L{twisted.web.server.Site} can parse and
+answer, with no network in the way.
+
+Pipelined keep-alive requests are written to the protocol in batches, and
+the responses are collected by an in-memory transport.  Each batch size is
+measured with access logging disabled, written directly to a file, and
+written by a L{twisted.python.logfile.BatchedLogFile}.
+"""
+
+from __future__ import print_function
+
+import os
+import tempfile
+import time
+
+from twisted.test.proto_helpers import StringTransport
+from twisted.web.resource import Resource
+from twisted.web.server import Site
+from twisted.web.static import Data
+
+REQUEST = (
+    b"GET /hello HTTP/1.1\r\n"
+    b"Host: localhost:8080\r\n"
+    b"User-Agent: Mozilla/5.0 (X11; Linux x86_64; rv:57.0) Gecko/20100101\r\n"
+    b"Accept: text/html,application/xhtml+xml,application/xml;q=0.9\r\n"
+    b"Accept-Language: en-US,en;q=0.5\r\n"
+    b"Accept-Encoding: gzip, deflate\r\n"
+    b"Cookie: session=0123456789abcdef\r\n"
+    b"Connection: keep-alive\r\n"
+    b"\r\n")
+
+
+
+def benchmark(pipelined, batches, logging=None):
+    """
+    Write C{batches} batches of C{pipelined} requests to a single connection
+    and report the number of requests answered per second.
+
+    @param logging: C{None} to disable access logging, C{"file"} to log to a
+        file directly or C{"batched"} to log to a file from a writer thread.
+    """
+    root = Resource()
+    root.putChild(b"hello", Data(b"Hello, world!", "text/plain"))
+    if logging is None:
+        site = Site(root)
+        site.logFile = None
+        site.log = lambda request: None
+    else:
+        fd, logPath = tempfile.mkstemp()
+        os.close(fd)
+        site = Site(root, logPath=logPath, batchedLog=(logging == "batched"))
+        # Log to a plain binary file, as HTTPFactory does.
+        site._openLogFile = lambda path: open(path, "ab")
+        site.startFactory()
+
+    protocol = site.buildProtocol(None)
+    transport = StringTransport()
+    protocol.makeConnection(transport)
+
+    batch = REQUEST * pipelined
+    before = time.time()
+    for i in range(batches):
+        protocol.dataReceived(batch)
+        transport.clear()
+    if logging is not None:
+        site.stopFactory()
+        os.remove(logPath)
+    after = time.time()
+    protocol.connectionLost(None)
+
+    requests = pipelined * batches
+    print('logging:', logging, end=' ')
+    print('pipelined:', pipelined, end=' ')
+    print('requests:', requests, end=' ')
+    print('requests/second: %d' % (requests / (after - before),))
+
+
+
+def main():
+    for logging in (None, "file", "batched"):
+        for pipelined in (1, 10, 100):
+            benchmark(pipelined, 20000 // pipelined, logging)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,144 @@
+# Copyright (c) Twisted Matrix Laboratories.
+# See LICENSE for details.
+
+"""
+Compare joined and vectored (scatter-gather) writes on a TCP connection.
+
+For each combination of write mode and chunk size, a client writes the same
+total amount of data to a server over the loopback interface, and the
+throughput and process CPU time per gigabyte are reported.  Many small writes
+are where vectored writes should help most, since the joined mode copies
+every chunk into a single buffer before sending it.
+
+Vectored writes need C{socket.sendmsg}, so this requires Python 3.
+"""
+
+from __future__ import print_function, division
+
+import resource
+import time
+
+from twisted.internet import reactor
+from twisted.internet.defer import Deferred
+from twisted.internet.protocol import Protocol, ServerFactory, ClientFactory
+
+
+TOTAL = 256 * 1024 * 1024
+
+SCENARIOS = [
+    # (chunk size, chunks per writeSequence call)
+    (64, 1024),
+    (1024, 256),
+    (16 * 1024, 16),
+    (1024 * 1024, 1),
+]
+
+
+
+class Sink(Protocol):
+    """
+    Count received bytes and fire C{factory.done} once C{TOTAL} have
+    arrived.
+    """
+    received = 0
+
+    def dataReceived(self, data):
+        self.received += len(data)
+        if self.received >= TOTAL:
+            self.transport.loseConnection()
+            self.factory.done.callback(None)
+
+
+
+class Source(Protocol):
+    """
+    Write C{TOTAL} bytes in chunks of C{factory.chunkSize}, using
+    C{writeSequence} in groups of C{factory.perCall}, whenever the transport
+    asks for more.
+    """
+    sent = 0
+
+    def connectionMade(self):
+        factory = self.factory
+        if factory.vectored:
+            self.transport.setVectoredWrites(True)
+        self.sequence = [b"x" * factory.chunkSize] * factory.perCall
+        self.transport.registerProducer(self, True)
+        self.resumeProducing()
+
+
+    def resumeProducing(self):
+        self.paused = False
+        step = self.factory.chunkSize * self.factory.perCall
+        while not self.paused and self.sent < TOTAL:
+            self.transport.writeSequence(self.sequence)
+            self.sent += step
+        if self.sent >= TOTAL:
+            self.transport.unregisterProducer()
+
+
+    def pauseProducing(self):
+        self.paused = True
+
+
+    def stopProducing(self):
+        self.paused = True
+
+
+
+def cpuTime():
+    """
+    @return: The user and system CPU time used by this process so far.
+    """
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+
+def run(chunkSize, perCall, vectored):
+    """
+    Transfer C{TOTAL} bytes and report the throughput.
+    """
+    serverFactory = ServerFactory()
+    serverFactory.protocol = Sink
+    serverFactory.done = Deferred()
+    port = reactor.listenTCP(0, serverFactory, interface="127.0.0.1")
+
+    clientFactory = ClientFactory()
+    clientFactory.protocol = Source
+    clientFactory.chunkSize = chunkSize
+    clientFactory.perCall = perCall
+    clientFactory.vectored = vectored
+
+    wallStart, cpuStart = time.time(), cpuTime()
+    reactor.connectTCP("127.0.0.1", port.getHost().port, clientFactory)
+
+    def report(ignored):
+        wall = time.time() - wallStart
+        cpu = cpuTime() - cpuStart
+        gigabytes = TOTAL / (1024 ** 3)
+        print("%-8s chunk=%8d  %8.1f MB/s  %6.2f CPU s/GB" % (
+            "vectored" if vectored else "joined", chunkSize,
+            TOTAL / wall / (1024 ** 2), cpu / gigabytes))
+        return port.stopListening()
+    return serverFactory.done.addCallback(report)
+
+
+
+def main():
+    scenarios = [(chunkSize, perCall, vectored)
+                 for (chunkSize, perCall) in SCENARIOS
+                 for vectored in (False, True)]
+
+    def next(ignored=None):
+        if scenarios:
+            run(*scenarios.pop(0)).addCallback(next)
+        else:
+            reactor.stop()
+
+    reactor.callWhenRunning(next)
+    reactor.run()
+
+
+if __name__ == '__main__':
+    main()
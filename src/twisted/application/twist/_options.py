@@ -40,6 +40,7 @@ class TwistOptions(Options):
         self["reactorName"] = self.defaultReactorName
         self["logLevel"] = self.defaultLogLevel
         self["logFile"] = stdout
+        self["workers"] = 0
 
 
     def getSynopsis(self):
@@ -146,6 +147,21 @@ class TwistOptions(Options):
     opt_log_format.__doc__ = dedent(opt_log_format.__doc__)
 
 
+    def opt_workers(self, count):
+        """
+        Run the plugin in this many worker processes, which are restarted if
+        they exit and share the TCP ports the plugin listens on with
+        SO_REUSEPORT. (default: run it in this process)
+        """
+        try:
+            workers = int(count)
+        except ValueError:
+            workers = 0
+        if workers < 1:
+            raise UsageError("Invalid number of workers: {}".format(count))
+        self["workers"] = workers
+
+
     def selectDefaultLogObserver(self):
         """
         Set C{fileLogObserverFactory} to the default appropriate for the
@@ -6,14 +6,94 @@
 Run a Twisted application.
 """
 
+import socket
 import sys
+from os import environ
 
+from zope.interface import implementer
+
+from twisted.internet import defer
+from twisted.internet.endpoints import TCP4ServerEndpoint, TCP6ServerEndpoint
+from twisted.internet.error import CannotListenError
+from twisted.internet.interfaces import IReactorSocket, IStreamServerEndpoint
 from twisted.python.usage import UsageError
-from ..service import Application, IService
+from ..internet import StreamServerEndpointService
+from ..service import Application, IService, IServiceCollection
 from ..runner._exit import exit, ExitStatus
 from ..runner._runner import Runner
 from ._options import TwistOptions
 
+# The environment variable identifying a worker process started with
+# --workers, set to the worker's index.
+workerEnvironmentVariable = "TWIST_WORKER"
+
+
+
+@implementer(IStreamServerEndpoint)
+class _ReusePortEndpoint(object):
+    """
+    A TCP server endpoint whose listening ports set C{SO_REUSEPORT}, so that
+    every worker started with C{--workers} can listen on the same address.
+
+    The listening socket is created with C{SO_REUSEPORT} set and adopted by
+    the reactor, so the option is only set on the ports of this endpoint.
+
+    @ivar _endpoint: The wrapped TCP server endpoint.
+    """
+
+    def __init__(self, endpoint):
+        self._endpoint = endpoint
+
+
+    def listen(self, protocolFactory):
+        """
+        Listen on the address of the wrapped endpoint, with C{SO_REUSEPORT}
+        set for the port created.
+
+        @return: A L{Deferred} firing with the L{IListeningPort}, or failing
+            with L{CannotListenError} if the reactor cannot adopt a socket,
+            the platform does not support C{SO_REUSEPORT} or listening fails.
+        """
+        return defer.execute(self._listen, protocolFactory)
+
+
+    def _listen(self, protocolFactory):
+        """
+        Create a listening socket with C{SO_REUSEPORT} set and have the
+        reactor adopt it.
+        """
+        endpoint = self._endpoint
+        reactor = endpoint._reactor
+        if isinstance(endpoint, TCP6ServerEndpoint):
+            family = socket.AF_INET6
+        else:
+            family = socket.AF_INET
+        if not IReactorSocket.providedBy(reactor):
+            raise CannotListenError(
+                endpoint._interface, endpoint._port,
+                "The reactor cannot adopt sockets.")
+        if not hasattr(socket, "SO_REUSEPORT"):
+            raise CannotListenError(
+                endpoint._interface, endpoint._port,
+                "SO_REUSEPORT is not supported on this platform.")
+
+        skt = socket.socket(family, socket.SOCK_STREAM)
+        try:
+            skt.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            skt.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+            try:
+                skt.bind((endpoint._interface, endpoint._port))
+                skt.listen(endpoint._backlog)
+            except socket.error as e:
+                raise CannotListenError(
+                    endpoint._interface, endpoint._port, e)
+            skt.setblocking(False)
+            return reactor.adoptStreamPort(
+                skt.fileno(), family, protocolFactory)
+        finally:
+            # The reactor listens with its own copy of the descriptor.
+            skt.close()
+
 
 
 class Twist(object):
@@ -83,6 +163,67 @@ class Twist(object):
         )
 
 
+    @staticmethod
+    def reusePorts(service):
+        """
+        Make the TCP server endpoints of C{service} listen with
+        C{SO_REUSEPORT}.
+
+        Only the endpoints of L{StreamServerEndpointService}s in C{service},
+        which the plugin listens on, are changed; other ports the plugin
+        opens are not.
+
+        @param service: The application service.
+        @type service: L{IService}
+        """
+        services = [service]
+        while services:
+            service = services.pop()
+            if (isinstance(service, StreamServerEndpointService) and
+                    isinstance(service.endpoint,
+                               (TCP4ServerEndpoint, TCP6ServerEndpoint))):
+                service.endpoint = _ReusePortEndpoint(service.endpoint)
+            if IServiceCollection.providedBy(service):
+                services.extend(service)
+
+
+    @staticmethod
+    def workerService(reactor, argv, workers):
+        """
+        Create a service which runs this command in worker processes.
+
+        Each worker is started with the same arguments as this process and
+        with L{workerEnvironmentVariable} set to its index, and is restarted
+        if it exits.  When the service stops, it sends the workers
+        C{SIGTERM}, and C{SIGKILL} if they do not exit in time.
+
+        @param reactor: The reactor to run the workers with.
+        @type reactor: L{twisted.internet.interfaces.IReactorProcess}
+
+        @param argv: Command line arguments of this process.
+        @type argv: L{list}
+
+        @param workers: The number of worker processes.
+        @type workers: L{int}
+
+        @return: The worker service.
+        @rtype: L{twisted.runner.procmon.ProcessMonitor}
+        """
+        # Import this only now that the reactor is installed.
+        from twisted.runner.procmon import ProcessMonitor
+
+        monitor = ProcessMonitor(reactor=reactor)
+        for index in range(workers):
+            env = dict(environ)
+            env[workerEnvironmentVariable] = str(index)
+            monitor.addProcess(
+                "worker-{}".format(index), [sys.executable] + list(argv),
+                env=env,
+            )
+
+        return monitor
+
+
     @staticmethod
     def runnerArguments(twistOptions):
         """
@@ -128,10 +269,16 @@ class Twist(object):
         options = cls.options(argv)
 
         reactor = options["reactor"]
-        service = cls.service(
-            plugin=options.plugins[options.subCommand],
-            options=options.subOptions,
-        )
+        if options["workers"] and workerEnvironmentVariable not in environ:
+            service = cls.workerService(reactor, argv, options["workers"])
+        else:
+            service = cls.service(
+                plugin=options.plugins[options.subCommand],
+                options=options.subOptions,
+            )
+            if workerEnvironmentVariable in environ:
+                # Let every worker listen on the same TCP ports.
+                cls.reusePorts(service)
 
         cls.startService(reactor, service)
         cls.run(cls.runnerArguments(options))
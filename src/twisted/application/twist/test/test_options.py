@@ -163,6 +163,28 @@ class OptionsTests(twisted.trial.unittest.TestCase):
         self.assertRaises(UsageError, options.opt_log_level, "cheese")
 
 
+    def test_workersValid(self):
+        """
+        L{TwistOptions.opt_workers} sets the number of worker processes.
+        """
+        options = TwistOptions()
+        self.assertEqual(options["workers"], 0)
+        options.opt_workers("4")
+
+        self.assertEqual(options["workers"], 4)
+
+
+    def test_workersInvalid(self):
+        """
+        L{TwistOptions.opt_workers} with anything but a positive integer
+        raises UsageError.
+        """
+        options = TwistOptions()
+
+        self.assertRaises(UsageError, options.opt_workers, "cheese")
+        self.assertRaises(UsageError, options.opt_workers, "0")
+
+
     def _testLogFile(self, name, expectedStream):
         """
         Set log file name and check the selected output stream.
@@ -5,10 +5,19 @@
 Tests for L{twisted.application.twist._twist}.
 """
 
+import socket
+import sys
 from sys import stdout
 
+from twisted.internet import reactor
+from twisted.internet.endpoints import TCP4ServerEndpoint
+from twisted.internet.error import CannotListenError
+from twisted.internet.interfaces import IReactorSocket
+from twisted.internet.protocol import Factory
 from twisted.logger import LogLevel, jsonFileLogObserver
-from twisted.test.proto_helpers import MemoryReactor
+from twisted.runner.procmon import ProcessMonitor
+from twisted.test.proto_helpers import MemoryReactor, _FakePort
+from ...internet import StreamServerEndpointService
 from ...service import IService, MultiService
 from ...runner._exit import ExitStatus
 from ...runner._runner import Runner
@@ -124,6 +133,32 @@ class TwistTests(twisted.trial.unittest.TestCase):
         )
 
 
+    def test_workerService(self):
+        """
+        L{Twist.workerService} returns a L{ProcessMonitor} which runs the
+        given number of copies of this command, each with its index in its
+        environment.
+        """
+        options = Twist.options(["twist", "--workers=2", "web"])
+        self.patch(_twist, "environ", {"HOME": "/home/twist"})
+
+        service = Twist.workerService(
+            options["reactor"], ["twist", "--workers=2", "web"], 2
+        )
+
+        self.assertIsInstance(service, ProcessMonitor)
+        self.assertIs(service._reactor, options["reactor"])
+        args = [sys.executable, "twist", "--workers=2", "web"]
+        self.assertEqual(service.processes, {
+            "worker-0": (
+                args, None, None, {"HOME": "/home/twist", "TWIST_WORKER": "0"}
+            ),
+            "worker-1": (
+                args, None, None, {"HOME": "/home/twist", "TWIST_WORKER": "1"}
+            ),
+        })
+
+
     def test_runnerArguments(self):
         """
         L{Twist.runnerArguments} translates L{TwistOptions} to runner
@@ -201,3 +236,113 @@ class TwistTests(twisted.trial.unittest.TestCase):
             )
         )
         self.assertEqual(runners[0].runs, 1)
+
+
+    def patchRunner(self):
+        """
+        Patch L{_twist.Runner} so we can capture usage and prevent actual
+        runs.
+        """
+        self.runners = []
+
+        class Runner(object):
+            def __init__(runner, **kwargs):
+                self.runners.append(runner)
+
+            def run(runner):
+                pass
+
+        self.patch(_twist, "Runner", Runner)
+
+
+    def test_mainWorkers(self):
+        """
+        L{Twist.main} given C{--workers} starts a worker service instead of
+        the plugin's service.
+        """
+        starts = []
+        self.patch(ProcessMonitor, "startService", lambda s: starts.append(s))
+        self.patchStartService()
+        self.patchRunner()
+        self.patch(_twist, "environ", {})
+
+        Twist.main(["twist", "--workers=3", "web"])
+
+        self.assertEqual(self.serviceStarts, [])
+        self.assertEqual(len(starts), 1)
+        self.assertEqual(len(starts[0].processes), 3)
+        self.assertEqual(len(self.runners), 1)
+
+
+    def test_mainInWorker(self):
+        """
+        L{Twist.main} in a worker process runs the plugin's service, with
+        the TCP endpoints it listens on set to listen with C{SO_REUSEPORT}.
+        """
+        self.patchStartService()
+        self.patchRunner()
+        self.patch(_twist, "environ", {"TWIST_WORKER": "1"})
+
+        Twist.main(["twist", "--workers=3", "web"])
+
+        self.assertEqual(len(self.serviceStarts), 1)
+        [application] = self.serviceStarts
+        [web] = application
+        [port] = [service for service in web
+                  if isinstance(service, StreamServerEndpointService)]
+        self.assertIsInstance(port.endpoint, _twist._ReusePortEndpoint)
+
+
+    def test_reusePortEndpoint(self):
+        """
+        L{_twist._ReusePortEndpoint.listen} creates a listening socket for
+        the address of the endpoint it wraps and has the reactor adopt it.
+        """
+        memoryReactor = MemoryReactor()
+        factory = Factory()
+        endpoint = _twist._ReusePortEndpoint(
+            TCP4ServerEndpoint(memoryReactor, 0, interface="127.0.0.1"))
+        port = self.successResultOf(endpoint.listen(factory))
+
+        self.assertIsInstance(port, _FakePort)
+        [(fileno, family, adopted)] = memoryReactor.adoptedPorts
+        self.assertEqual(family, socket.AF_INET)
+        self.assertIs(adopted, factory)
+    if not hasattr(socket, "SO_REUSEPORT"):
+        test_reusePortEndpoint.skip = (
+            "SO_REUSEPORT is not supported on this platform")
+
+
+    def test_reusePortEndpointShared(self):
+        """
+        Several L{_twist._ReusePortEndpoint}s can listen on the same address.
+        """
+        factory = Factory()
+        first = self.successResultOf(_twist._ReusePortEndpoint(
+            TCP4ServerEndpoint(reactor, 0, interface="127.0.0.1")
+        ).listen(factory))
+        self.addCleanup(first.stopListening)
+        second = self.successResultOf(_twist._ReusePortEndpoint(
+            TCP4ServerEndpoint(reactor, first.getHost().port,
+                               interface="127.0.0.1")
+        ).listen(factory))
+        self.addCleanup(second.stopListening)
+
+        self.assertEqual(first.getHost(), second.getHost())
+    if not hasattr(socket, "SO_REUSEPORT"):
+        test_reusePortEndpointShared.skip = (
+            "SO_REUSEPORT is not supported on this platform")
+    elif not IReactorSocket.providedBy(reactor):
+        test_reusePortEndpointShared.skip = (
+            "The reactor cannot adopt sockets")
+
+
+    def test_reusePortEndpointCannotAdopt(self):
+        """
+        L{_twist._ReusePortEndpoint.listen} fails with L{CannotListenError}
+        if the reactor cannot adopt sockets, rather than listening without
+        C{SO_REUSEPORT}.
+        """
+        endpoint = _twist._ReusePortEndpoint(
+            TCP4ServerEndpoint(object(), 8080, interface="127.0.0.1"))
+        self.failureResultOf(endpoint.listen(Factory()), CannotListenError)
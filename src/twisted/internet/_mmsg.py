@@ -0,0 +1,258 @@
+# -*- test-case-name: twisted.test.test_udp -*-
+# Copyright (c) Twisted Matrix Laboratories.
+# See LICENSE for details.
+
+"""
+Receive and send several datagrams with one system call, using the Linux
+C{recvmmsg} and C{sendmmsg} system calls through L{ctypes}.
+
+@var available: C{True} if L{ReceiveBuffers} and L{sendmmsg} can be used on
+    this platform, C{False} otherwise.
+
+@var MAX_MESSAGES: The most datagrams the kernel accepts in one call.
+"""
+
+from __future__ import division, absolute_import
+
+import os
+import socket
+import struct
+
+from twisted.python.runtime import platform
+
+try:
+    import ctypes
+except ImportError:
+    ctypes = None
+
+MAX_MESSAGES = 1024
+
+# Large enough for a struct sockaddr_in6.
+_SOCKADDR_SIZE = 128
+
+
+
+def _loadFunctions():
+    """
+    Look up C{recvmmsg} and C{sendmmsg} in the C library.
+
+    @return: A two-tuple of the C{recvmmsg} and C{sendmmsg} functions, or
+        L{None} if they are not available.
+    """
+    if ctypes is None or not platform.isLinux():
+        return None
+    try:
+        libc = ctypes.CDLL(None, use_errno=True)
+        return libc.recvmmsg, libc.sendmmsg
+    except (OSError, AttributeError):
+        return None
+
+
+
+_functions = _loadFunctions()
+available = _functions is not None
+
+if available:
+    class _iovec(ctypes.Structure):
+        _fields_ = [
+            ("iov_base", ctypes.c_void_p),
+            ("iov_len", ctypes.c_size_t),
+        ]
+
+
+    class _msghdr(ctypes.Structure):
+        _fields_ = [
+            ("msg_name", ctypes.c_void_p),
+            ("msg_namelen", ctypes.c_uint32),
+            ("msg_iov", ctypes.c_void_p),
+            ("msg_iovlen", ctypes.c_size_t),
+            ("msg_control", ctypes.c_void_p),
+            ("msg_controllen", ctypes.c_size_t),
+            ("msg_flags", ctypes.c_int),
+        ]
+
+
+    class _mmsghdr(ctypes.Structure):
+        _fields_ = [
+            ("msg_hdr", _msghdr),
+            ("msg_len", ctypes.c_uint),
+        ]
+
+
+    _recvmmsg, _sendmmsg = _functions
+    _recvmmsg.restype = ctypes.c_int
+    _recvmmsg.argtypes = [ctypes.c_int, ctypes.c_void_p, ctypes.c_uint,
+                          ctypes.c_int, ctypes.c_void_p]
+    _sendmmsg.restype = ctypes.c_int
+    _sendmmsg.argtypes = [ctypes.c_int, ctypes.c_void_p, ctypes.c_uint,
+                          ctypes.c_int]
+
+
+
+def _raiseErrno():
+    """
+    Raise a L{socket.error} for the C{errno} left by the last call through
+    L{ctypes}.
+    """
+    errno = ctypes.get_errno()
+    raise socket.error(errno, os.strerror(errno))
+
+
+
+def decodeAddress(name):
+    """
+    Convert a C{struct sockaddr} to the address tuple used by UDP ports.
+
+    @param name: The bytes of a C{struct sockaddr_in} or C{sockaddr_in6}.
+    @type name: L{bytes}
+
+    @return: A C{(host, port)} tuple, or L{None} if C{name} is not an IPv4 or
+        IPv6 address.
+    """
+    if len(name) < 2:
+        return None
+    family, = struct.unpack("=H", name[:2])
+    if family == socket.AF_INET:
+        host = socket.inet_ntop(socket.AF_INET, name[4:8])
+    elif family == socket.AF_INET6:
+        host = socket.inet_ntop(socket.AF_INET6, name[8:24])
+    else:
+        return None
+    port, = struct.unpack("!H", name[2:4])
+    return (host, port)
+
+
+
+def encodeAddress(family, addr):
+    """
+    Convert an address tuple as accepted by UDP ports to a C{struct
+    sockaddr}.
+
+    @param family: C{socket.AF_INET} or C{socket.AF_INET6}.
+
+    @param addr: A C{(host, port)} tuple, where C{host} is an IP address or
+        C{"<broadcast>"}.
+
+    @return: The bytes of a C{struct sockaddr_in} or C{sockaddr_in6}, or
+        L{None} if C{addr} cannot be converted (for example an IPv6 address
+        with a scope).
+    @rtype: L{bytes} or L{None}
+    """
+    host, port = addr[:2]
+    if host == "<broadcast>":
+        host = "255.255.255.255"
+    try:
+        packed = socket.inet_pton(family, host)
+    except (socket.error, ValueError):
+        return None
+    if family == socket.AF_INET:
+        return (struct.pack("=H", family) + struct.pack("!H", port) +
+                packed + b"\0" * 8)
+    return (struct.pack("=H", family) + struct.pack("!HI", port, 0) +
+            packed + struct.pack("=I", 0))
+
+
+
+class ReceiveBuffers(object):
+    """
+    Reusable buffers for receiving several datagrams with one call to
+    C{recvmmsg}.
+
+    @ivar count: The most datagrams received by one call to L{receive}.
+
+    @ivar size: The most bytes of each datagram which are received.  The
+        rest of a longer datagram is discarded.
+    """
+
+    def __init__(self, count, size):
+        self.count = count
+        self.size = size
+        self._data = ctypes.create_string_buffer(count * size)
+        self._names = ctypes.create_string_buffer(count * _SOCKADDR_SIZE)
+        self._iovecs = (_iovec * count)()
+        self._headers = (_mmsghdr * count)()
+        dataAddress = ctypes.addressof(self._data)
+        namesAddress = ctypes.addressof(self._names)
+        iovecsAddress = ctypes.addressof(self._iovecs)
+        for i in range(count):
+            self._iovecs[i].iov_base = dataAddress + i * size
+            self._iovecs[i].iov_len = size
+            header = self._headers[i].msg_hdr
+            header.msg_name = namesAddress + i * _SOCKADDR_SIZE
+            header.msg_iov = iovecsAddress + i * ctypes.sizeof(_iovec)
+            header.msg_iovlen = 1
+
+
+    def receive(self, fileno):
+        """
+        Receive as many datagrams as are waiting, up to C{count}.
+
+        @param fileno: The file descriptor of a non-blocking datagram socket.
+        @type fileno: L{int}
+
+        @raise socket.error: If no datagram could be received.
+
+        @return: A L{list} of C{(data, addr)} tuples, where C{addr} is as
+            returned by L{decodeAddress}.
+        """
+        headers = self._headers
+        for i in range(self.count):
+            headers[i].msg_hdr.msg_namelen = _SOCKADDR_SIZE
+        received = _recvmmsg(fileno, headers, self.count, 0, None)
+        if received < 0:
+            _raiseErrno()
+        size = self.size
+        dataAddress = ctypes.addressof(self._data)
+        namesAddress = ctypes.addressof(self._names)
+        datagrams = []
+        for i in range(received):
+            header = headers[i]
+            data = ctypes.string_at(dataAddress + i * size,
+                                    min(header.msg_len, size))
+            name = ctypes.string_at(namesAddress + i * _SOCKADDR_SIZE,
+                                    header.msg_hdr.msg_namelen)
+            datagrams.append((data, decodeAddress(name)))
+        return datagrams
+
+
+
+def sendmmsg(fileno, datagrams):
+    """
+    Send several datagrams with one call to C{sendmmsg}.
+
+    @param fileno: The file descriptor of a datagram socket.
+    @type fileno: L{int}
+
+    @param datagrams: At most L{MAX_MESSAGES} C{(data, name)} tuples, where
+        C{data} is L{bytes} and C{name} is the destination as returned by
+        L{encodeAddress}, or L{None} for a connected socket.
+    @type datagrams: L{list}
+
+    @raise socket.error: If the first datagram could not be sent.
+
+    @return: The number of datagrams sent, from the start of C{datagrams}.
+    @rtype: L{int}
+    """
+    count = len(datagrams)
+    headers = (_mmsghdr * count)()
+    iovecs = (_iovec * count)()
+    iovecsAddress = ctypes.addressof(iovecs)
+    # Keep the C pointers to the data alive until the call is done.
+    pointers = []
+    for i, (data, name) in enumerate(datagrams):
+        pointer = ctypes.c_char_p(data)
+        pointers.append(pointer)
+        iovecs[i].iov_base = ctypes.cast(pointer, ctypes.c_void_p).value
+        iovecs[i].iov_len = len(data)
+        header = headers[i].msg_hdr
+        if name is not None:
+            pointer = ctypes.c_char_p(name)
+            pointers.append(pointer)
+            header.msg_name = ctypes.cast(pointer, ctypes.c_void_p).value
+            header.msg_namelen = len(name)
+        header.msg_iov = iovecsAddress + i * ctypes.sizeof(_iovec)
+        header.msg_iovlen = 1
+    sent = _sendmmsg(fileno, headers, count, 0)
+    if sent < 0:
+        _raiseErrno()
+    return sent
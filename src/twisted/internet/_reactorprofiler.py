@@ -0,0 +1,277 @@
+# -*- test-case-name: twisted.internet.test.test_reactorprofiler -*-
+# Copyright (c) Twisted Matrix Laboratories.
+# See LICENSE for details.
+
+"""
+Instrumentation of the time a running reactor spends in each iteration.
+
+@see: L{twisted.internet.base.ReactorBase.installProfiler}
+"""
+
+from __future__ import division, absolute_import
+
+import time
+
+from twisted.logger import Logger
+from twisted.python._histogram import Histogram
+from twisted.python.reflect import fullyQualifiedName, safe_repr
+
+__metaclass__ = type
+
+# The most precise clock available for measuring durations.
+_clock = getattr(time, "perf_counter", time.time)
+
+
+
+def _describe(obj):
+    """
+    Name a function or selectable for a log message.
+
+    @param obj: A callable or an L{IReadDescriptor} provider.
+
+    @return: The fully qualified name of C{obj} if it is a function or
+        method, otherwise its L{repr}.
+    @rtype: L{str}
+    """
+    try:
+        return fullyQualifiedName(obj)
+    except Exception:
+        return safe_repr(obj)
+
+
+
+class ReactorProfiler(object):
+    """
+    Record where a reactor spends its time, by replacing some of its methods
+    with timing wrappers for as long as the profiler is installed.
+
+    Each iteration of the reactor's main loop runs its timed calls with
+    C{runUntilCurrent} and then waits for and dispatches I/O events with
+    C{doIteration}.  For every iteration, the profiler adds the total wall
+    time, the time spent blocked waiting for events (the time in
+    C{doIteration} not spent dispatching them), the number of timed calls
+    run and the number of I/O events dispatched to its histograms.
+
+    Any single timed call, function passed to C{callFromThread}, or I/O
+    handler (C{doRead} or C{doWrite}) which runs for longer than
+    C{threshold} seconds is reported with a warning log event naming it.
+    If C{reportInterval} is not L{None}, an informational log event
+    summarizing the histograms is also emitted at the end of the first
+    iteration after each interval.
+
+    @ivar threshold: The number of seconds a call may take before it is
+        reported.
+    @type threshold: L{float}
+
+    @ivar reportInterval: The number of seconds between summary log events,
+        or L{None} for none.
+
+    @ivar iterationTime: A L{Histogram} of the wall time of each iteration.
+
+    @ivar pollTime: A L{Histogram} of the time blocked waiting for events in
+        each iteration.
+
+    @ivar timedCalls: A L{Histogram} of the number of timed calls run in
+        each iteration.
+
+    @ivar ioEvents: A L{Histogram} of the number of I/O events dispatched in
+        each iteration.
+
+    @ivar slowCalls: The number of calls which have been reported as slow.
+    @type slowCalls: L{int}
+    """
+    _log = Logger()
+
+    _wrapped = ("runUntilCurrent", "doIteration", "_runTimedCall",
+                "_runThreadCall", "_doReadOrWrite", "_doWriteOrRead")
+
+    def __init__(self, reactor, threshold=0.1, reportInterval=60.0,
+                 clock=_clock):
+        """
+        @param reactor: The L{twisted.internet.base.ReactorBase} to profile.
+
+        @param threshold: See L{ReactorProfiler.threshold}.
+
+        @param reportInterval: See L{ReactorProfiler.reportInterval}.
+
+        @param clock: A callable returning the current time in seconds, used
+            to measure durations.
+        """
+        self._reactor = reactor
+        self.threshold = threshold
+        self.reportInterval = reportInterval
+        self._clock = clock
+        self.iterationTime = Histogram(1e-6)
+        self.pollTime = Histogram(1e-6)
+        self.timedCalls = Histogram(1)
+        self.ioEvents = Histogram(1)
+        self.slowCalls = 0
+        self._originals = {}
+        self._iterationStart = None
+        self._timedCallCount = 0
+        self._ioEventCount = 0
+        self._dispatchTime = 0.0
+        self._lastReport = None
+
+
+    def install(self):
+        """
+        Start profiling the reactor by replacing its methods with wrappers.
+        """
+        reactor = self._reactor
+        for name in self._wrapped:
+            if hasattr(reactor, name):
+                self._originals[name] = getattr(reactor, name)
+                setattr(reactor, name, getattr(self, "_" + name.lstrip("_")))
+        self._lastReport = self._clock()
+
+
+    def uninstall(self):
+        """
+        Stop profiling the reactor, restoring its original methods.  The
+        data collected so far is kept.
+        """
+        reactor = self._reactor
+        for name in self._originals:
+            # The wrappers are instance attributes hiding the methods.
+            delattr(reactor, name)
+        self._originals = {}
+        if getattr(reactor, "_profiler", None) is self:
+            reactor._profiler = None
+
+
+    def _slow(self, kind, obj, duration):
+        """
+        Report a call which took longer than C{threshold}.
+
+        @param kind: What sort of call it was.
+        @type kind: L{str}
+
+        @param obj: The function or selectable which was called.
+
+        @param duration: How long the call took, in seconds.
+        """
+        self.slowCalls += 1
+        self._log.warn(
+            "Slow {kind} {name} took {duration:.3f} seconds",
+            kind=kind, name=_describe(obj), duration=duration,
+            threshold=self.threshold)
+
+
+    def _runUntilCurrent(self):
+        """
+        Start timing an iteration and run the reactor's timed calls.
+        """
+        self._iterationStart = self._clock()
+        self._timedCallCount = 0
+        self._ioEventCount = 0
+        self._dispatchTime = 0.0
+        self._originals["runUntilCurrent"]()
+
+
+    def _doIteration(self, timeout):
+        """
+        Wait for and dispatch I/O events, and record the iteration.
+
+        @param timeout: See C{doIteration}.
+        """
+        start = self._clock()
+        dispatchTime = self._dispatchTime
+        try:
+            self._originals["doIteration"](timeout)
+        finally:
+            end = self._clock()
+            self.pollTime.add(
+                max(end - start - (self._dispatchTime - dispatchTime), 0))
+            if self._iterationStart is not None:
+                self.iterationTime.add(end - self._iterationStart)
+                self.timedCalls.add(self._timedCallCount)
+                self.ioEvents.add(self._ioEventCount)
+                self._iterationStart = None
+            if (self.reportInterval is not None and
+                    end - self._lastReport >= self.reportInterval):
+                self._lastReport = end
+                self._report()
+
+
+    def _runTimedCall(self, call):
+        """
+        Run and time a timed call.
+
+        @param call: The L{twisted.internet.base.DelayedCall} to run.
+        """
+        self._timedCallCount += 1
+        start = self._clock()
+        try:
+            self._originals["_runTimedCall"](call)
+        finally:
+            duration = self._clock() - start
+            if duration > self.threshold:
+                self._slow("timed call", call.func, duration)
+
+
+    def _runThreadCall(self, f, args, kwargs):
+        """
+        Run and time a function passed to C{callFromThread}.
+
+        @param f: The function.
+        @param args: Its positional arguments.
+        @param kwargs: Its keyword arguments.
+        """
+        start = self._clock()
+        try:
+            self._originals["_runThreadCall"](f, args, kwargs)
+        finally:
+            duration = self._clock() - start
+            if duration > self.threshold:
+                self._slow("thread call", f, duration)
+
+
+    def _doReadOrWrite(self, selectable, *args):
+        """
+        Dispatch and time an I/O event.
+
+        @param selectable: The selectable the event is for.
+
+        @param args: The rest of the arguments of the reactor's
+            C{_doReadOrWrite} (or C{_doWriteOrRead}) method.
+        """
+        self._ioEventCount += 1
+        start = self._clock()
+        try:
+            return self._originals[self._ioMethod](selectable, *args)
+        finally:
+            duration = self._clock() - start
+            self._dispatchTime += duration
+            if duration > self.threshold:
+                self._slow("I/O handler", selectable, duration)
+
+
+    _doWriteOrRead = _doReadOrWrite
+
+
+    @property
+    def _ioMethod(self):
+        """
+        The name of the reactor's method for dispatching I/O events.
+        """
+        if "_doReadOrWrite" in self._originals:
+            return "_doReadOrWrite"
+        return "_doWriteOrRead"
+
+
+    def _report(self):
+        """
+        Emit a log event summarizing the histograms.
+        """
+        iterations = self.iterationTime.summary()
+        self._log.info(
+            "Reactor profile: {iterations[count]} iterations, "
+            "mean {iterations[mean]:.6f} seconds, "
+            "p99 {iterations[p99]:.6f} seconds; "
+            "{slowCalls} slow calls",
+            iterations=iterations,
+            poll=self.pollTime.summary(),
+            timedCalls=self.timedCalls.summary(),
+            ioEvents=self.ioEvents.summary(),
+            slowCalls=self.slowCalls)
@@ -0,0 +1,327 @@
+# -*- test-case-name: twisted.internet.test.test_timingwheel -*-
+# Copyright (c) Twisted Matrix Laboratories.
+# See LICENSE for details.
+
+"""
+A hierarchical timing wheel for storing timed calls.
+
+The wheel is made of several levels of slots.  Each slot of the lowest level
+covers a single tick of C{resolution} seconds; each slot of a higher level
+covers a whole revolution of the level below it.  Entries are placed in the
+lowest level whose current revolution contains their expiry tick, and are
+moved ("cascaded") down a level when the wheel reaches the start of their
+slot.  Adding, removing and moving an entry are constant time operations.
+
+@see: L{twisted.internet.base.ReactorBase.installTimingWheel}
+"""
+
+from __future__ import division, absolute_import
+
+__metaclass__ = type
+
+
+
+class TimingWheel(object):
+    """
+    A hierarchical timing wheel of objects with a C{time} attribute.
+
+    Entries are any hashable objects with a C{time} attribute giving the
+    number of seconds since the epoch at which they are due.  The wheel does
+    not look at the C{time} attribute of an entry except when it is added (or
+    moved) and when it is expired, so an entry's C{time} must not be changed
+    while it is in the wheel without calling L{move} afterwards.
+
+    @ivar resolution: The length, in seconds, of one tick of the lowest level
+        of the wheel.
+
+    @ivar _bits: The base two logarithm of the number of slots per level.
+
+    @ivar _levels: The number of levels in the wheel.
+
+    @ivar _current: The tick the wheel has advanced to.  Every entry due
+        before this tick has been expired.
+
+    @ivar _wheels: A L{list} of C{_levels} levels, each a L{list} of slots.
+        A slot is a L{dict} mapping entries to their insertion sequence
+        number.
+
+    @ivar _overflow: A slot holding entries which are too far in the future
+        to fit in the highest level.
+
+    @ivar _counts: A L{list} giving the number of entries in each level, with
+        the number of entries in C{_overflow} last.
+
+    @ivar _locations: A L{dict} mapping each entry in the wheel to a two-tuple
+        of the index of its level in C{_counts} and its slot.
+
+    @ivar _sequence: The sequence number for the next added entry, used to
+        expire entries due at the same time in the order they were added.
+    """
+
+    def __init__(self, resolution=0.001, now=0.0, bits=8, levels=4):
+        """
+        @param resolution: See L{TimingWheel.resolution}.
+        @type resolution: L{float}
+
+        @param now: The current time, in seconds since the epoch.
+        @type now: L{float}
+
+        @param bits: The base two logarithm of the number of slots in each
+            level of the wheel.
+        @type bits: L{int}
+
+        @param levels: The number of levels of the wheel.  With the defaults,
+            entries due up to 2 ** 32 ticks (about 50 days) from now are held
+            in the wheel; later ones are kept aside until the wheel comes
+            round to them.
+        @type levels: L{int}
+        """
+        if resolution <= 0:
+            raise ValueError(
+                "resolution must be positive, not %r" % (resolution,))
+        self.resolution = resolution
+        self._bits = bits
+        self._levels = levels
+        self._size = 1 << bits
+        self._mask = self._size - 1
+        self._current = self._tick(now)
+        self._wheels = [[{} for i in range(self._size)]
+                        for level in range(levels)]
+        self._overflow = {}
+        self._counts = [0] * (levels + 1)
+        self._locations = {}
+        self._sequence = 0
+
+
+    def _tick(self, time):
+        """
+        Convert a time to the tick which contains it.
+
+        @param time: A time in seconds since the epoch.
+        @type time: L{float}
+
+        @rtype: L{int}
+        """
+        return int(time // self.resolution)
+
+
+    def __len__(self):
+        """
+        @return: The number of entries in the wheel.
+        """
+        return len(self._locations)
+
+
+    def __iter__(self):
+        """
+        @return: An iterator over the entries in the wheel, in no particular
+            order.
+        """
+        return iter(list(self._locations))
+
+
+    def __contains__(self, entry):
+        """
+        @return: C{True} if C{entry} is in the wheel, C{False} otherwise.
+        """
+        return entry in self._locations
+
+
+    def _place(self, entry, sequence):
+        """
+        Put an entry into the slot for its C{time}.
+
+        @param entry: The entry to place, which must not be in the wheel.
+
+        @param sequence: The insertion sequence number of C{entry}.
+        """
+        current = self._current
+        tick = self._tick(entry.time)
+        if tick < current:
+            # Already due; it will be expired along with the current tick.
+            tick = current
+        bits = self._bits
+        for level in range(self._levels):
+            shift = bits * (level + 1)
+            if (tick >> shift) == (current >> shift):
+                slot = self._wheels[level][(tick >> (shift - bits))
+                                           & self._mask]
+                break
+        else:
+            level = self._levels
+            slot = self._overflow
+        slot[entry] = sequence
+        self._locations[entry] = (level, slot)
+        self._counts[level] += 1
+
+
+    def add(self, entry):
+        """
+        Add an entry to the wheel.
+
+        @param entry: An entry which is not in the wheel.
+        """
+        self._place(entry, self._sequence)
+        self._sequence += 1
+
+
+    def remove(self, entry):
+        """
+        Remove an entry from the wheel, if it is there.
+
+        @param entry: The entry to remove.
+        """
+        location = self._locations.pop(entry, None)
+        if location is not None:
+            level, slot = location
+            del slot[entry]
+            self._counts[level] -= 1
+
+
+    def move(self, entry):
+        """
+        Move an entry to the slot for its current C{time}, adding it to the
+        wheel if it is not there.
+
+        @param entry: The entry to move.
+        """
+        self.remove(entry)
+        self.add(entry)
+
+
+    def _cascade(self):
+        """
+        Redistribute the entries of every higher level slot which starts at
+        the current tick into the lower levels.
+        """
+        current = self._current
+        bits = self._bits
+        for level in range(1, self._levels + 1):
+            shift = bits * level
+            if current & ((1 << shift) - 1):
+                return
+            if level == self._levels:
+                slot = self._overflow
+            else:
+                slot = self._wheels[level][(current >> shift) & self._mask]
+            if slot:
+                entries = list(slot.items())
+                slot.clear()
+                self._counts[level] -= len(entries)
+                for entry, sequence in entries:
+                    del self._locations[entry]
+                    self._place(entry, sequence)
+
+
+    def _drain(self, slot, level, entries):
+        """
+        Remove every entry from a slot.
+
+        @param slot: The slot to empty.
+
+        @param level: The index of the level of C{slot}.
+
+        @param entries: A L{list} to which C{(time, sequence, entry)} tuples
+            for the removed entries are appended.
+        """
+        locations = self._locations
+        for entry, sequence in slot.items():
+            del locations[entry]
+            entries.append((entry.time, sequence, entry))
+        self._counts[level] -= len(slot)
+        slot.clear()
+
+
+    def expire(self, now):
+        """
+        Advance the wheel to C{now} and remove every entry which is due.
+
+        @param now: The current time, in seconds since the epoch.
+        @type now: L{float}
+
+        @return: The removed entries, ordered by their C{time} and, for equal
+            times, by the order in which they were added.
+        @rtype: L{list}
+        """
+        target = self._tick(now)
+        counts = self._counts
+        level0 = self._wheels[0]
+        mask = self._mask
+        due = []
+        while self._current < target:
+            if counts[0]:
+                slot = level0[self._current & mask]
+                if slot:
+                    self._drain(slot, 0, due)
+                self._current += 1
+            else:
+                # Nothing is due in this revolution of the lowest level, so
+                # skip ahead to the next non-empty slot of a higher level.
+                boundary = self._nextCascade()
+                if boundary is None or boundary > target:
+                    self._current = target
+                    break
+                self._current = boundary
+            if not self._current & mask:
+                self._cascade()
+
+        slot = level0[self._current & mask]
+        if slot:
+            locations = self._locations
+            for entry, sequence in list(slot.items()):
+                if entry.time <= now:
+                    del slot[entry]
+                    del locations[entry]
+                    counts[0] -= 1
+                    due.append((entry.time, sequence, entry))
+
+        due.sort(key=lambda item: item[:2])
+        return [entry for (time, sequence, entry) in due]
+
+
+    def _nextCascade(self):
+        """
+        Find the first tick at which an entry in a level other than the lowest
+        needs to be cascaded.
+
+        @return: The tick, or L{None} if only the lowest level has entries.
+        @rtype: L{int} or L{None}
+        """
+        current = self._current
+        counts = self._counts
+        bits = self._bits
+        for level in range(1, self._levels):
+            if counts[level]:
+                shift = bits * level
+                slots = self._wheels[level]
+                base = (current >> (shift + bits)) << (shift + bits)
+                for index in range(((current >> shift) & self._mask) + 1,
+                                   self._size):
+                    if slots[index]:
+                        return base + (index << shift)
+        if counts[self._levels]:
+            shift = bits * self._levels
+            return ((current >> shift) + 1) << shift
+        return None
+
+
+    def nextTime(self):
+        """
+        Determine when the wheel next needs to be expired.
+
+        @return: C{None} if the wheel is empty.  Otherwise the C{time} of the
+            earliest entry if it is in the lowest level, or the time at which
+            the earliest non-empty higher level slot needs to be cascaded.
+        @rtype: L{float} or L{None}
+        """
+        current = self._current
+        if self._counts[0]:
+            level0 = self._wheels[0]
+            for index in range(current & self._mask, self._size):
+                slot = level0[index]
+                if slot:
+                    return min(entry.time for entry in slot)
+        boundary = self._nextCascade()
+        if boundary is not None:
+            return boundary * self.resolution
+        return None
@@ -8,6 +8,7 @@ Support for generic select()able objects.
 
 from __future__ import division, absolute_import
 
+import os
 from socket import AF_INET, AF_INET6, inet_pton, error
 
 from zope.interface import implementer
@@ -31,6 +32,54 @@ else:
         return buffer(bObj, offset) + b"".join(bArray)
 
 
+try:
+    _IOV_MAX = os.sysconf("SC_IOV_MAX")
+except (AttributeError, ValueError, OSError):
+    _IOV_MAX = -1
+if _IOV_MAX <= 0:
+    # The minimum POSIX allows.
+    _IOV_MAX = 16
+
+
+class _FileRegion(object):
+    """
+    Part of a file queued by L{FileDescriptor._queueFileRegion} to be sent
+    with L{FileDescriptor.writeSomeFile}.
+
+    @ivar fileno: The file descriptor of the file.
+    @type fileno: L{int}
+
+    @ivar offset: The offset in the file of the next byte to send.
+    @type offset: L{int}
+
+    @ivar remaining: The number of bytes left to send.
+    @type remaining: L{int}
+
+    @ivar sent: The number of bytes sent so far.
+    @type sent: L{int}
+
+    @ivar deferred: A L{Deferred <twisted.internet.defer.Deferred>} to fire
+        with C{sent} once the region has been sent, or with a failure if the
+        connection is lost first.
+
+    @ivar trailer: A L{list} of L{bytes} written to the transport after this
+        region was queued, which are sent once the region has been sent.
+
+    @ivar trailerLen: The total length of C{trailer}.
+    @type trailerLen: L{int}
+    """
+
+    def __init__(self, fileno, offset, count, deferred):
+        self.fileno = fileno
+        self.offset = offset
+        self.remaining = count
+        self.sent = 0
+        self.deferred = deferred
+        self.trailer = []
+        self.trailerLen = 0
+
+
+
 class _ConsumerMixin(object):
     """
     L{IConsumer} implementations can mix this in to get C{registerProducer} and
@@ -172,6 +221,8 @@ class FileDescriptor(_ConsumerMixin, _LogOwner):
     _writeDisconnected = False
     dataBuffer = b""
     offset = 0
+    _vectoredWrites = False
+    _fileRegions = ()
 
     SEND_LIMIT = 128*1024
 
@@ -200,6 +251,9 @@ class FileDescriptor(_ConsumerMixin, _LogOwner):
         """
         self.disconnected = 1
         self.connected = 0
+        regions, self._fileRegions = self._fileRegions, ()
+        for region in regions:
+            region.deferred.errback(reason)
         if self.producer is not None:
             self.producer.stopProducing()
             self.producer = None
@@ -221,6 +275,128 @@ class FileDescriptor(_ConsumerMixin, _LogOwner):
                                   reflect.qual(self.__class__))
 
 
+    def writeSomeVectors(self, vectors):
+        """
+        Write as much as possible of the given buffers, in order, immediately.
+
+        This is the scatter-gather counterpart of L{writeSomeData}, used
+        instead of it when vectored writes are enabled.  The result is
+        interpreted in the same way as the result of L{writeSomeData}.
+
+        @param vectors: A non-empty L{list} of L{bytes} or L{memoryview}
+            objects.
+        """
+        raise NotImplementedError("%s does not implement writeSomeVectors" %
+                                  reflect.qual(self.__class__))
+
+
+    def writeSomeFile(self, fileno, offset, count):
+        """
+        Send as much as possible of part of a file, immediately, without
+        reading it into memory first.
+
+        The result is interpreted in the same way as the result of
+        L{writeSomeData}; zero means either that nothing could be sent right
+        now or that the file ends at C{offset}.
+
+        @param fileno: The file descriptor of a regular file.
+        @type fileno: L{int}
+
+        @param offset: The offset in the file of the first byte to send.
+        @type offset: L{int}
+
+        @param count: The maximum number of bytes to send.
+        @type count: L{int}
+        """
+        raise NotImplementedError("%s does not implement writeSomeFile" %
+                                  reflect.qual(self.__class__))
+
+
+    def _queueFileRegion(self, fileno, offset, count, deferred):
+        """
+        Queue part of a file to be sent with L{writeSomeFile} after everything
+        already written and before anything written afterwards.
+
+        @param fileno: The file descriptor of a regular file, which must stay
+            open until C{deferred} fires.
+        @type fileno: L{int}
+
+        @param offset: The offset in the file of the first byte to send.
+        @type offset: L{int}
+
+        @param count: The number of bytes to send.
+        @type count: L{int}
+
+        @param deferred: A L{Deferred <twisted.internet.defer.Deferred>}
+            fired with the number of bytes sent, which is less than C{count}
+            if the file is shorter than expected, or with a failure if the
+            connection is lost first.
+        """
+        if not self._fileRegions:
+            self._fileRegions = []
+        self._fileRegions.append(_FileRegion(fileno, offset, count, deferred))
+        self._maybePauseProducer()
+        self.startWriting()
+
+
+    def _doFileWrite(self):
+        """
+        Send as much as possible of the first queued file region with
+        L{writeSomeFile}, and once it has all been sent, queue whatever was
+        written after it and fire its L{Deferred}.
+
+        @see: L{doWrite}
+        """
+        region = self._fileRegions[0]
+        if region.remaining:
+            l = self.writeSomeFile(
+                region.fileno, region.offset, region.remaining)
+            if isinstance(l, Exception) or l < 0:
+                return l
+            if l:
+                region.offset += l
+                region.remaining -= l
+                region.sent += l
+                if region.remaining:
+                    return None
+            elif os.fstat(region.fileno).st_size > region.offset:
+                # Nothing could be sent right now.
+                return None
+            # Otherwise the file is shorter than expected; give up on the
+            # rest of the region.
+
+        del self._fileRegions[0]
+        if region.trailer:
+            self._tempDataBuffer.extend(region.trailer)
+            self._tempDataLen += region.trailerLen
+        region.deferred.callback(region.sent)
+        if not self._fileRegions and not self._tempDataLen:
+            return self._doneWriting()
+        return None
+
+
+    def _setVectoredWrites(self, enabled):
+        """
+        Switch between writing a single joined buffer with L{writeSomeData}
+        and writing the queued chunks without joining them with
+        L{writeSomeVectors}.
+
+        @param enabled: C{True} to use L{writeSomeVectors}, C{False} to use
+            L{writeSomeData}.
+        @type enabled: L{bool}
+        """
+        enabled = bool(enabled)
+        if enabled and not self._vectoredWrites:
+            # Queue anything left in the joined buffer ahead of later writes.
+            if self.offset < len(self.dataBuffer):
+                remaining = memoryview(self.dataBuffer)[self.offset:]
+                self._tempDataBuffer.insert(0, remaining)
+                self._tempDataLen += len(remaining)
+            self.dataBuffer = b""
+            self.offset = 0
+        self._vectoredWrites = enabled
+
+
     def doRead(self):
         """
         Called when data is available for reading.
@@ -240,6 +416,13 @@ class FileDescriptor(_ConsumerMixin, _LogOwner):
 
         @see: L{twisted.internet.interfaces.IWriteDescriptor.doWrite}.
         """
+        if self._fileRegions and not self._tempDataLen and (
+                self.offset == len(self.dataBuffer)):
+            return self._doFileWrite()
+
+        if self._vectoredWrites:
+            return self._doVectoredWrite()
+
         if len(self.dataBuffer) - self.offset < self.SEND_LIMIT:
             # If there is currently less than SEND_LIMIT bytes left to send
             # in the string, extend it with the array data.
@@ -266,26 +449,83 @@ class FileDescriptor(_ConsumerMixin, _LogOwner):
         if self.offset == len(self.dataBuffer) and not self._tempDataLen:
             self.dataBuffer = b""
             self.offset = 0
-            # stop writing.
-            self.stopWriting()
-            # If I've got a producer who is supposed to supply me with data,
-            if self.producer is not None and ((not self.streamingProducer)
-                                              or self.producerPaused):
-                # tell them to supply some more.
-                self.producerPaused = False
-                self.producer.resumeProducing()
-            elif self.disconnecting:
-                # But if I was previously asked to let the connection die, do
-                # so.
-                return self._postLoseConnection()
-            elif self._writeDisconnecting:
-                # I was previously asked to half-close the connection.  We
-                # set _writeDisconnected before calling handler, in case the
-                # handler calls loseConnection(), which will want to check for
-                # this attribute.
-                self._writeDisconnected = True
-                result = self._closeWriteConnection()
-                return result
+            return self._doneWriting()
+        return None
+
+
+    def _doVectoredWrite(self):
+        """
+        Write as much of the queued chunks as possible with
+        L{writeSomeVectors}, without joining them.
+
+        At most C{_IOV_MAX} chunks are offered to L{writeSomeVectors} at once.
+        A partially written chunk is replaced by a L{memoryview} of its
+        unwritten part.
+
+        @see: L{doWrite}
+        """
+        chunks = self._tempDataBuffer
+        if not chunks:
+            return self._doneWriting()
+        if len(chunks) > _IOV_MAX:
+            vectors = chunks[:_IOV_MAX]
+            size = sum(map(len, vectors))
+        else:
+            vectors = chunks
+            size = self._tempDataLen
+
+        l = self.writeSomeVectors(vectors)
+        if isinstance(l, Exception) or l < 0:
+            return l
+
+        self._tempDataLen -= l
+        if l == size:
+            del chunks[:len(vectors)]
+        else:
+            index = 0
+            while l:
+                chunkLength = len(chunks[index])
+                if l < chunkLength:
+                    chunks[index] = memoryview(chunks[index])[l:]
+                    break
+                l -= chunkLength
+                index += 1
+            del chunks[:index]
+
+        if not self._tempDataLen:
+            return self._doneWriting()
+        return None
+
+
+    def _doneWriting(self):
+        """
+        Called by L{doWrite} when everything buffered has been written.
+
+        Whatever this returns is then returned by L{doWrite}.
+        """
+        if self._fileRegions:
+            # There are still file regions to send; keep writing.
+            return None
+        # stop writing.
+        self.stopWriting()
+        # If I've got a producer who is supposed to supply me with data,
+        if self.producer is not None and ((not self.streamingProducer)
+                                          or self.producerPaused):
+            # tell them to supply some more.
+            self.producerPaused = False
+            self.producer.resumeProducing()
+        elif self.disconnecting:
+            # But if I was previously asked to let the connection die, do
+            # so.
+            return self._postLoseConnection()
+        elif self._writeDisconnecting:
+            # I was previously asked to half-close the connection.  We
+            # set _writeDisconnected before calling handler, in case the
+            # handler calls loseConnection(), which will want to check for
+            # this attribute.
+            self._writeDisconnected = True
+            result = self._closeWriteConnection()
+            return result
         return None
 
     def _postLoseConnection(self):
@@ -320,7 +560,10 @@ class FileDescriptor(_ConsumerMixin, _LogOwner):
 
         @return: C{True} if it is full, C{False} otherwise.
         """
-        return len(self.dataBuffer) + self._tempDataLen > self.bufferSize
+        size = len(self.dataBuffer) + self._tempDataLen
+        for region in self._fileRegions:
+            size += region.remaining + region.trailerLen
+        return size > self.bufferSize
 
 
     def _maybePauseProducer(self):
@@ -349,8 +592,13 @@ class FileDescriptor(_ConsumerMixin, _LogOwner):
         if not self.connected or self._writeDisconnected:
             return
         if data:
-            self._tempDataBuffer.append(data)
-            self._tempDataLen += len(data)
+            if self._fileRegions:
+                region = self._fileRegions[-1]
+                region.trailer.append(data)
+                region.trailerLen += len(data)
+            else:
+                self._tempDataBuffer.append(data)
+                self._tempDataLen += len(data)
             self._maybePauseProducer()
             self.startWriting()
 
@@ -376,9 +624,15 @@ class FileDescriptor(_ConsumerMixin, _LogOwner):
                 raise TypeError("Data must not be unicode")
         if not self.connected or not iovec or self._writeDisconnected:
             return
-        self._tempDataBuffer.extend(iovec)
-        for i in iovec:
-            self._tempDataLen += len(i)
+        if self._fileRegions:
+            region = self._fileRegions[-1]
+            region.trailer.extend(iovec)
+            for i in iovec:
+                region.trailerLen += len(i)
+        else:
+            self._tempDataBuffer.extend(iovec)
+            for i in iovec:
+                self._tempDataLen += len(i)
         self._maybePauseProducer()
         self.startWriting()
 
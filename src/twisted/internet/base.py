@@ -29,6 +29,9 @@ from twisted.internet._resolver import (
     ComplexResolverSimplifier as _ComplexResolverSimplifier,
     SimpleResolverComplexifier as _SimpleResolverComplexifier,
 )
+from twisted.internet._timingwheel import TimingWheel as _TimingWheel
+from twisted.internet._reactorprofiler import (
+    ReactorProfiler as _ReactorProfiler)
 from twisted.python import log, failure, reflect
 from twisted.python.compat import unicode, iteritems
 from twisted.python.runtime import seconds as runtimeSeconds, platform
@@ -220,6 +223,48 @@ class DelayedCall:
 
 
 
+@_oldStyle
+class _WheelDelayedCall(DelayedCall):
+    """
+    A L{DelayedCall} scheduled in a L{_TimingWheel}.
+
+    Unlike L{DelayedCall}, which only records a postponement and leaves it to
+    the reactor to notice it when the original time comes, this applies every
+    change of its scheduled time immediately and calls its C{resetter} so
+    that the wheel can move it to its new slot.
+    """
+
+    def reset(self, secondsFromNow):
+        """
+        Reschedule this call for a different time.
+
+        @see: L{DelayedCall.reset}
+        """
+        if self.cancelled:
+            raise error.AlreadyCancelled
+        elif self.called:
+            raise error.AlreadyCalled
+        else:
+            self.time = self.seconds() + secondsFromNow
+            self.resetter(self)
+
+
+    def delay(self, secondsLater):
+        """
+        Reschedule this call for a later time.
+
+        @see: L{DelayedCall.delay}
+        """
+        if self.cancelled:
+            raise error.AlreadyCancelled
+        elif self.called:
+            raise error.AlreadyCalled
+        else:
+            self.time += secondsLater
+            self.resetter(self)
+
+
+
 @implementer(IResolverSimple)
 class ThreadedResolver(object):
     """
@@ -473,6 +518,14 @@ class ReactorBase(object):
     @ivar _registerAsIOThread: A flag controlling whether the reactor will
         register the thread it is running in as the I/O thread when it starts.
         If C{True}, registration will be done, otherwise it will not be.
+
+    @ivar _timingWheel: The L{_TimingWheel} holding this reactor's timed
+        calls, or L{None} if they are kept in the C{_pendingTimedCalls} heap.
+        See L{installTimingWheel}.
+
+    @ivar _profiler: The
+        L{twisted.internet._reactorprofiler.ReactorProfiler} recording where
+        this reactor spends its time, or L{None}.  See L{installProfiler}.
     """
 
     _registerAsIOThread = True
@@ -490,6 +543,8 @@ class ReactorBase(object):
         self._pendingTimedCalls = []
         self._newTimedCalls = []
         self._cancellations = 0
+        self._timingWheel = None
+        self._profiler = None
         self.running = False
         self._started = False
         self._justStopped = False
@@ -752,6 +807,13 @@ class ReactorBase(object):
         assert callable(_f), "%s is not callable" % _f
         assert _seconds >= 0, \
                "%s is not greater than or equal to 0 seconds" % (_seconds,)
+        wheel = self._timingWheel
+        if wheel is not None:
+            call = _WheelDelayedCall(self.seconds() + _seconds, _f, args, kw,
+                                     wheel.remove, wheel.move,
+                                     seconds=self.seconds)
+            wheel.add(call)
+            return call
         tple = DelayedCall(self.seconds() + _seconds, _f, args, kw,
                            self._cancelCallLater,
                            self._moveCallLaterSooner,
@@ -793,7 +855,74 @@ class ReactorBase(object):
         @return: A list of outstanding delayed calls.
         @type: L{list} of L{DelayedCall}
         """
-        return [x for x in (self._pendingTimedCalls + self._newTimedCalls) if not x.cancelled]
+        calls = self._pendingTimedCalls + self._newTimedCalls
+        if self._timingWheel is not None:
+            calls.extend(self._timingWheel)
+        return [x for x in calls if not x.cancelled]
+
+
+    def installTimingWheel(self, resolution=0.001):
+        """
+        Keep this reactor's timed calls in a hierarchical timing wheel
+        instead of a binary heap.
+
+        Scheduling, cancelling, resetting and delaying a call in a timing
+        wheel take constant time, and cancelled calls are removed from it
+        immediately, which suits applications with very many timeouts which
+        are mostly reset or cancelled rather than run.  Calls never run
+        before their scheduled time, but the reactor's timeout is only
+        computed exactly for calls due in the next C{256 * resolution}
+        seconds; it may wake up early (but never late) for later ones.
+
+        Any calls already scheduled are moved into the wheel.
+
+        @param resolution: The granularity, in seconds, of the wheel's
+            lowest level.
+        @type resolution: L{float}
+        """
+        wheel = _TimingWheel(resolution, self.seconds())
+        for call in self.getDelayedCalls():
+            # These calls may still be postponed lazily by DelayedCall.reset
+            # and DelayedCall.delay, which runUntilCurrent deals with.
+            call.canceller = wheel.remove
+            call.resetter = wheel.move
+            wheel.add(call)
+        self._pendingTimedCalls = []
+        self._newTimedCalls = []
+        self._cancellations = 0
+        self._timingWheel = wheel
+
+
+    def installProfiler(self, threshold=0.1, reportInterval=60.0):
+        """
+        Start recording where this reactor spends its time.
+
+        For each iteration of the reactor, the wall time, the time blocked
+        waiting for I/O events, the number of timed calls run and the number
+        of I/O events dispatched are added to the histograms of the returned
+        profiler.  Any single timed call, function passed to
+        C{callFromThread} or I/O handler which runs for longer than
+        C{threshold} seconds is reported with a warning L{twisted.logger}
+        event.  Nothing is measured unless a profiler is installed.
+
+        If a profiler is already installed it is replaced.
+
+        @param threshold: The number of seconds a call may take before it is
+            reported as slow.
+        @type threshold: L{float}
+
+        @param reportInterval: The number of seconds between informational
+            log events summarizing the histograms, or L{None} for none.
+
+        @return: The installed profiler, which may be uninstalled with
+            L{twisted.internet._reactorprofiler.ReactorProfiler.uninstall}.
+        @rtype: L{twisted.internet._reactorprofiler.ReactorProfiler}
+        """
+        if self._profiler is not None:
+            self._profiler.uninstall()
+        self._profiler = _ReactorProfiler(self, threshold, reportInterval)
+        self._profiler.install()
+        return self._profiler
 
 
     def _insertNewDelayedCalls(self):
@@ -815,13 +944,21 @@ class ReactorBase(object):
         @return: The maximum number of seconds the reactor may sleep.
         @rtype: L{float}
         """
-        # insert new delayed calls to make sure to include them in timeout value
-        self._insertNewDelayedCalls()
+        if self._timingWheel is not None:
+            nextTime = self._timingWheel.nextTime()
+            if nextTime is None:
+                return None
+        else:
+            # insert new delayed calls to make sure to include them in
+            # timeout value
+            self._insertNewDelayedCalls()
 
-        if not self._pendingTimedCalls:
-            return None
+            if not self._pendingTimedCalls:
+                return None
 
-        delay = self._pendingTimedCalls[0].time - self.seconds()
+            nextTime = self._pendingTimedCalls[0].time
+
+        delay = nextTime - self.seconds()
 
         # Pick a somewhat arbitrary maximum possible value for the timeout.
         # This value is 2 ** 31 / 1000, which is the number of seconds which can
@@ -847,10 +984,7 @@ class ReactorBase(object):
             count = 0
             total = len(self.threadCallQueue)
             for (f, a, kw) in self.threadCallQueue:
-                try:
-                    f(*a, **kw)
-                except:
-                    log.err()
+                self._runThreadCall(f, a, kw)
                 count += 1
                 if count == total:
                     break
@@ -858,6 +992,36 @@ class ReactorBase(object):
             if self.threadCallQueue:
                 self.wakeUp()
 
+        if self._timingWheel is not None:
+            self._runWheelCalls()
+        else:
+            self._runHeapCalls()
+
+        if self._justStopped:
+            self._justStopped = False
+            self.fireSystemEvent("shutdown")
+
+
+    def _runThreadCall(self, f, args, kwargs):
+        """
+        Run a single function passed to C{callFromThread}, logging any
+        exception it raises.
+
+        @param f: The function.
+        @param args: Its positional arguments.
+        @param kwargs: Its keyword arguments.
+        """
+        try:
+            f(*args, **kwargs)
+        except:
+            log.err()
+
+
+    def _runHeapCalls(self):
+        """
+        Run all pending timed calls in the C{_pendingTimedCalls} heap which
+        are due.
+        """
         # insert new delayed calls now
         self._insertNewDelayedCalls()
 
@@ -873,20 +1037,7 @@ class ReactorBase(object):
                 heappush(self._pendingTimedCalls, call)
                 continue
 
-            try:
-                call.called = 1
-                call.func(*call.args, **call.kw)
-            except:
-                log.deferr()
-                if hasattr(call, "creator"):
-                    e = "\n"
-                    e += " C: previous exception occurred in " + \
-                         "a DelayedCall created here:\n"
-                    e += " C:"
-                    e += "".join(call.creator).rstrip().replace("\n","\n C:")
-                    e += "\n"
-                    log.msg(e)
-
+            self._runTimedCall(call)
 
         if (self._cancellations > 50 and
              self._cancellations > len(self._pendingTimedCalls) >> 1):
@@ -895,9 +1046,45 @@ class ReactorBase(object):
                                        if not x.cancelled]
             heapify(self._pendingTimedCalls)
 
-        if self._justStopped:
-            self._justStopped = False
-            self.fireSystemEvent("shutdown")
+
+    def _runWheelCalls(self):
+        """
+        Run all pending timed calls in the C{_timingWheel} which are due.
+        """
+        wheel = self._timingWheel
+        for call in wheel.expire(self.seconds()):
+            if call.cancelled or call in wheel:
+                # Cancelled or rescheduled by a call which ran before it.
+                continue
+
+            if call.delayed_time > 0:
+                # Lazily postponed before installTimingWheel moved it here.
+                call.activate_delay()
+                wheel.add(call)
+                continue
+
+            self._runTimedCall(call)
+
+
+    def _runTimedCall(self, call):
+        """
+        Run a single timed call, logging any exception it raises.
+
+        @param call: The L{DelayedCall} to run.
+        """
+        try:
+            call.called = 1
+            call.func(*call.args, **call.kw)
+        except:
+            log.deferr()
+            if hasattr(call, "creator"):
+                e = "\n"
+                e += " C: previous exception occurred in " + \
+                     "a DelayedCall created here:\n"
+                e += " C:"
+                e += "".join(call.creator).rstrip().replace("\n","\n C:")
+                e += "\n"
+                log.msg(e)
 
     # IReactorProcess
 
@@ -623,12 +623,16 @@ class Deferred:
 
             finished = True
             current._chainedTo = None
-            while current.callbacks:
-                item = current.callbacks.pop(0)
-                callback, args, kw = item[
+            # Walk the callbacks with a cursor instead of popping each one off
+            # the front of the list, and discard the ones which have run all at
+            # once when the walk stops.  Callbacks added while the walk is in
+            # progress are appended to the same list, so they are still seen.
+            callbacks = current.callbacks
+            index = 0
+            while index < len(callbacks):
+                callback, args, kw = callbacks[index][
                     isinstance(current.result, failure.Failure)]
-                args = args or ()
-                kw = kw or {}
+                index += 1
 
                 # Avoid recursion if we can.
                 if callback is _CONTINUE:
@@ -650,7 +654,13 @@ class Deferred:
                 try:
                     current._runningCallbacks = True
                     try:
-                        current.result = callback(current.result, *args, **kw)
+                        if kw:
+                            current.result = callback(
+                                current.result, *(args or ()), **kw)
+                        elif args:
+                            current.result = callback(current.result, *args)
+                        else:
+                            current.result = callback(current.result)
                         if current.result is current:
                             warnAboutFunction(
                                 callback,
@@ -686,6 +696,7 @@ class Deferred:
                             if current.result._debugInfo is not None:
                                 current.result._debugInfo.failResult = None
                             current.result = resultResult
+            del callbacks[:index]
 
             if finished:
                 # As much of the callback chain - perhaps all of it - as can be
@@ -1349,6 +1360,18 @@ def _inlineCallbacks(result, g, deferred):
 
         if isinstance(result, Deferred):
             # a deferred was yielded, get the result.
+            if (result.called and not result.paused and
+                    not result._runningCallbacks):
+                # It already has a result and has run all of its callbacks,
+                # so take the result directly, as adding a callback would,
+                # rather than going through another callback.
+                r = result.result
+                result.result = None
+                if result._debugInfo is not None:
+                    result._debugInfo.failResult = None
+                result = r
+                continue
+
             def gotResult(r):
                 if waiting[0]:
                     waiting[0] = False
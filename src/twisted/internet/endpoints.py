@@ -21,7 +21,7 @@ from unicodedata import normalize
 
 from constantly import NamedConstant, Names
 
-from zope.interface import implementer, directlyProvides, provider
+from zope.interface import implementer, alsoProvides, provider
 
 from twisted.internet import interfaces, defer, error, fdesc, threads
 from twisted.internet.abstract import isIPv6Address, isIPAddress
@@ -89,9 +89,10 @@ class _WrappingProtocol(Protocol):
 
         for iface in [interfaces.IHalfCloseableProtocol,
                       interfaces.IFileDescriptorReceiver,
-                      interfaces.IHandshakeListener]:
+                      interfaces.IHandshakeListener,
+                      interfaces.IBufferedProtocol]:
             if iface.providedBy(self._wrappedProtocol):
-                directlyProvides(self, iface)
+                alsoProvides(self, iface)
 
 
     def logPrefix(self):
@@ -126,6 +127,21 @@ class _WrappingProtocol(Protocol):
         return self._wrappedProtocol.fileDescriptorReceived(descriptor)
 
 
+    def getBuffer(self, sizeHint):
+        """
+        Proxy L{IBufferedProtocol.getBuffer} to our C{self._wrappedProtocol}
+        """
+        return self._wrappedProtocol.getBuffer(sizeHint)
+
+
+    def bufferUpdated(self, nbytes):
+        """
+        Proxy L{IBufferedProtocol.bufferUpdated} to our
+        C{self._wrappedProtocol}
+        """
+        return self._wrappedProtocol.bufferUpdated(nbytes)
+
+
     def connectionLost(self, reason):
         """
         Proxy C{connectionLost} calls to our C{self._wrappedProtocol}
@@ -9,11 +9,15 @@ listeners or connectors are added)::
 
     from twisted.internet import epollreactor
     epollreactor.install()
+
+To register transports which support it edge-triggered, so that busy
+descriptors are not reported by every call to C{epoll_wait}, pass
+C{edgeTriggered=True} to L{install}.
 """
 
 from __future__ import division, absolute_import
 
-from select import epoll, EPOLLHUP, EPOLLERR, EPOLLIN, EPOLLOUT
+from select import epoll, EPOLLHUP, EPOLLERR, EPOLLIN, EPOLLOUT, EPOLLET
 import errno
 
 from zope.interface import implementer
@@ -51,6 +55,26 @@ class EPollReactor(posixbase.PosixReactorBase, posixbase._PollLikeMixin):
     @ivar _continuousPolling: A L{_ContinuousPolling} instance, used to handle
         file descriptors (e.g. filesystem files) that are not supported by
         C{epoll(7)}.
+
+    @ivar _edgeTriggered: Whether descriptors which are only being read from
+        and whose C{FileDescriptor} has a true C{_edgeTriggerable} attribute
+        are registered edge-triggered.  Such a C{FileDescriptor} must set its
+        C{_readBlocked} attribute to C{True} when C{doRead} finds no data to
+        read, and is then read from until it does (or, if it is still
+        reading after C{edgeReadBudget} calls, again in the next iteration)
+        rather than every time C{epoll_wait} is called while it has data.
+
+    @ivar edgeReadBudget: The number of times each edge-triggered descriptor
+        with data is read from per iteration, so that a descriptor which is
+        never drained cannot starve the others.
+    @type edgeReadBudget: L{int}
+
+    @ivar _edgeReads: A set containing the integer file descriptors
+        registered edge-triggered.
+
+    @ivar _pendingReads: A dictionary mapping integer file descriptors in
+        C{_edgeReads} which may still have data to read to the
+        corresponding C{FileDescriptor} instances.
     """
 
     # Attributes for _PollLikeMixin
@@ -58,10 +82,15 @@ class EPollReactor(posixbase.PosixReactorBase, posixbase._PollLikeMixin):
     _POLL_IN = EPOLLIN
     _POLL_OUT = EPOLLOUT
 
-    def __init__(self):
+    edgeReadBudget = 16
+
+    def __init__(self, edgeTriggered=False):
         """
         Initialize epoll object, file descriptor tracking dictionaries, and the
         base class.
+
+        @param edgeTriggered: See L{EPollReactor._edgeTriggered}.
+        @type edgeTriggered: L{bool}
         """
         # Create the poller we're going to use.  The 1024 here is just a hint
         # to the kernel, it is not a hard maximum.  After Linux 2.6.8, the size
@@ -70,6 +99,9 @@ class EPollReactor(posixbase.PosixReactorBase, posixbase._PollLikeMixin):
         self._reads = set()
         self._writes = set()
         self._selectables = {}
+        self._edgeTriggered = edgeTriggered
+        self._edgeReads = set()
+        self._pendingReads = {}
         self._continuousPolling = posixbase._ContinuousPolling(self)
         posixbase.PosixReactorBase.__init__(self)
 
@@ -93,7 +125,9 @@ class EPollReactor(posixbase.PosixReactorBase, posixbase._PollLikeMixin):
                 flags |= antievent
                 self._poller.modify(fd, flags)
             else:
+                flags = self._triggerFlags(xer, flags)
                 self._poller.register(fd, flags)
+            self._trackTrigger(fd, flags)
 
             # Update our own tracking state *only* after the epoll call has
             # succeeded.  Otherwise we may get out of sync.
@@ -101,6 +135,43 @@ class EPollReactor(posixbase.PosixReactorBase, posixbase._PollLikeMixin):
             selectables[fd] = xer
 
 
+    def _triggerFlags(self, xer, flags):
+        """
+        Add C{EPOLLET} to the flags for a descriptor if it should be
+        registered edge-triggered.
+
+        Only descriptors which are read from but not written to are, since
+        C{doWrite} may return before the descriptor stops being writable.
+
+        @param xer: The C{FileDescriptor} being registered.
+        @param flags: The events to register it for.
+
+        @return: C{flags}, possibly with C{EPOLLET} added.
+        """
+        if (self._edgeTriggered and flags == EPOLLIN and
+                getattr(xer, "_edgeTriggerable", False)):
+            return flags | EPOLLET
+        return flags
+
+
+    def _trackTrigger(self, fd, flags):
+        """
+        Record whether a descriptor is now registered edge-triggered.
+
+        A descriptor which is not can no longer be pending, since
+        C{epoll_ctl} reports it again if it still has data.
+
+        @param fd: The integer file descriptor.
+        @param flags: The flags it was registered or modified with, or
+            L{None} if it was unregistered.
+        """
+        if flags is not None and flags & EPOLLET:
+            self._edgeReads.add(fd)
+        else:
+            self._edgeReads.discard(fd)
+            self._pendingReads.pop(fd, None)
+
+
     def addReader(self, reader):
         """
         Add a FileDescriptor for notification of data available to read.
@@ -151,14 +222,16 @@ class EPollReactor(posixbase.PosixReactorBase, posixbase._PollLikeMixin):
                 return
         if fd in primary:
             if fd in other:
-                flags = antievent
+                flags = self._triggerFlags(xer, antievent)
                 # See comment above modify call in _add.
                 self._poller.modify(fd, flags)
             else:
+                flags = None
                 del selectables[fd]
                 # See comment above _control call in _add.
                 self._poller.unregister(fd)
             primary.remove(fd)
+            self._trackTrigger(fd, flags)
 
 
     def removeReader(self, reader):
@@ -207,7 +280,10 @@ class EPollReactor(posixbase.PosixReactorBase, posixbase._PollLikeMixin):
         """
         Poll the poller for new events.
         """
-        if timeout is None:
+        if self._pendingReads:
+            # Descriptors left with data by the last iteration must not wait.
+            timeout = 0
+        elif timeout is None:
             timeout = -1  # Wait indefinitely.
 
         try:
@@ -226,22 +302,59 @@ class EPollReactor(posixbase.PosixReactorBase, posixbase._PollLikeMixin):
             raise
 
         _drdw = self._doReadOrWrite
+        getSelectable = self._selectables.get
+        edgeReads = self._edgeReads
+        pendingReads = self._pendingReads
         for fd, event in l:
-            try:
-                selectable = self._selectables[fd]
-            except KeyError:
-                pass
+            selectable = getSelectable(fd)
+            if selectable is None:
+                continue
+            if event & EPOLLIN and fd in edgeReads:
+                # Any hang up or error is found by reading until there is no
+                # more data, since it will not be reported again.
+                pendingReads[fd] = selectable
             else:
                 log.callWithLogger(selectable, _drdw, selectable, fd, event)
 
+        if pendingReads:
+            self._doPendingReads()
+
     doIteration = doPoll
 
 
-def install():
+    def _doPendingReads(self):
+        """
+        Read from each edge-triggered descriptor which may have data until it
+        has none, up to C{edgeReadBudget} times.  Descriptors which still
+        may have data are left in C{_pendingReads} for the next iteration.
+        """
+        _drdw = self._doReadOrWrite
+        getSelectable = self._selectables.get
+        edgeReads = self._edgeReads
+        pendingReads = self._pendingReads
+        for fd, selectable in list(pendingReads.items()):
+            for i in range(self.edgeReadBudget):
+                if fd not in edgeReads or getSelectable(fd) is not selectable:
+                    # No longer registered edge-triggered, and so no longer
+                    # pending.
+                    pendingReads.pop(fd, None)
+                    break
+                selectable._readBlocked = False
+                log.callWithLogger(selectable, _drdw, selectable, fd, EPOLLIN)
+                if selectable._readBlocked:
+                    pendingReads.pop(fd, None)
+                    break
+
+
+def install(edgeTriggered=False):
     """
     Install the epoll() reactor.
+
+    @param edgeTriggered: Whether to register transports which support it
+        edge-triggered.  See L{EPollReactor._edgeTriggered}.
+    @type edgeTriggered: L{bool}
     """
-    p = EPollReactor()
+    p = EPollReactor(edgeTriggered)
     from twisted.internet.main import installReactor
     installReactor(p)
 
@@ -1995,6 +1995,66 @@ class IProtocol(Interface):
         """
 
 
+class IBufferedProtocol(IProtocol):
+    """
+    A protocol which provides its own receive buffer for incoming data to be
+    written into.
+
+    Transports which support this (currently the POSIX TCP and UNIX stream
+    transports) read directly into the buffer returned by L{getBuffer} and
+    then call L{bufferUpdated}, instead of allocating a new L{bytes} object
+    for every read and passing it to L{IProtocol.dataReceived}.  Other
+    transports still call L{IProtocol.dataReceived}, so providers must
+    implement that as well.
+    """
+
+    def getBuffer(sizeHint):
+        """
+        Called to get a buffer to read incoming data into.
+
+        @param sizeHint: The number of bytes the transport would like to be
+            able to read.  The buffer returned may be smaller or larger.
+        @type sizeHint: L{int}
+
+        @return: A writable buffer, such as a L{bytearray} or a writable
+            L{memoryview}, at least one byte long.  The transport writes
+            incoming data at its start.
+        """
+
+
+    def bufferUpdated(nbytes):
+        """
+        Called when data has been written into the buffer most recently
+        returned by L{getBuffer}.
+
+        @param nbytes: The number of bytes written at the start of the
+            buffer.
+        @type nbytes: L{int}
+        """
+
+
+
+class IBatchedDatagramProtocol(Interface):
+    """
+    A datagram protocol which can handle several received datagrams at once.
+
+    UDP ports deliver all the datagrams read by one system call, such as
+    C{recvmmsg}, in a single call to L{datagramsReceived} instead of calling
+    C{datagramReceived} for each of them.
+    """
+
+    def datagramsReceived(datagrams):
+        """
+        Called when some datagrams are received.
+
+        @param datagrams: The datagrams, in the order they were received.
+        @type datagrams: L{list} of C{(data, addr)} tuples, where C{data} is
+            L{bytes} and C{addr} is the sender's address as it would be
+            passed to C{datagramReceived}.
+        """
+
+
+
 class IProcessProtocol(Interface):
     """
     Interface for process-related event handlers.
@@ -2334,6 +2394,48 @@ class IUNIXTransport(ITransport):
 
 
 
+class ISendFileTransport(ITransport):
+    """
+    A transport which can send the contents of a file without reading it into
+    memory, for example with the C{sendfile} system call.
+    """
+
+    def sendFile(file, offset=0, count=None):
+        """
+        Send part of a file to the other end of this connection.
+
+        The file is sent after anything already written to the transport and
+        before anything written to it afterwards.  Until the returned
+        L{Deferred} fires, the file must not be closed, and the bytes queued
+        for it count towards the transport's buffer when deciding whether to
+        pause a registered streaming producer.
+
+        @param file: A file object with a C{fileno} method, referring to a
+            regular file.
+
+        @param offset: The offset in the file of the first byte to send.  The
+            current position of C{file} is neither used nor changed.
+        @type offset: L{int}
+
+        @param count: The number of bytes to send, or L{None} to send
+            everything from C{offset} to the end of the file.
+        @type count: L{int} or L{None}
+
+        @raise ValueError: If the file cannot be sent this way by this
+            transport at the moment, for example because it is not a regular
+            file or because TLS has been started on the transport.  The
+            caller should fall back to reading the file and writing its
+            contents.
+
+        @return: A L{Deferred} which fires with the number of bytes sent,
+            which is less than C{count} if the file ends before C{offset +
+            count}, or fails if the connection is lost before the file has
+            been sent.
+        @rtype: L{twisted.internet.defer.Deferred}
+        """
+
+
+
 class IOpenSSLServerConnectionCreator(Interface):
     """
     A provider of L{IOpenSSLServerConnectionCreator} can create
@@ -2681,6 +2783,27 @@ class IUDPTransport(Interface):
         """
 
 
+
+class IBatchedUDPTransport(IUDPTransport):
+    """
+    A UDP transport which can send several datagrams with as few system
+    calls as possible, for example with C{sendmmsg}.
+    """
+
+    def writeBatch(datagrams):
+        """
+        Write several datagrams, in order.
+
+        @param datagrams: The datagrams to write.
+        @type datagrams: An iterable of C{(packet, addr)} tuples, where
+            C{packet} and C{addr} are as for L{IUDPTransport.write}.
+
+        @raise twisted.internet.error.MessageLengthError: A packet was too
+            long.  Packets before it have been sent, but not those after it.
+        """
+
+
+
 class IUNIXDatagramTransport(Interface):
     """
     Transport for UDP PacketProtocols.
@@ -11,12 +11,14 @@ End users shouldn't use this module directly - use the reactor APIs instead.
 from __future__ import division, absolute_import
 
 # System Imports
+import os
 import socket
+import stat
 import sys
 import operator
 import struct
 
-from zope.interface import implementer
+from zope.interface import implementer, classImplements
 
 from twisted.python.compat import _PY3, lazyByteSlice
 from twisted.python.runtime import platformType
@@ -43,6 +45,14 @@ except ImportError:
         pass
 
 
+# Vectored writes use socket.sendmsg, which is available on Python 3 on POSIX
+# platforms.
+_HAS_SENDMSG = hasattr(socket.socket, "sendmsg")
+
+# Sending files without copying them through user space uses os.sendfile,
+# which is available on Python 3 on most POSIX platforms.
+_HAS_SENDFILE = hasattr(os, "sendfile")
+
 if platformType == 'win32':
     # no such thing as WSAEPERM or error code 10001 according to winsock.h or MSDN
     EPERM = object()
@@ -83,6 +93,7 @@ from errno import errorcode
 # Twisted Imports
 from twisted.internet import base, address, fdesc
 from twisted.internet.task import deferLater
+from twisted.internet.defer import Deferred
 from twisted.python import log, failure, reflect
 from twisted.python.util import untilConcludes
 from twisted.internet.error import CannotListenError
@@ -173,7 +184,25 @@ class Connection(_TLSConnectionMixin, abstract.FileDescriptor, _SocketCloser,
 
     @ivar logstr: prefix used when logging events related to this connection.
     @type logstr: C{str}
+
+    @ivar _checkedProtocol: The protocol most recently checked for
+        L{interfaces.IBufferedProtocol} by L{_getBufferedProtocol}.
+
+    @ivar _bufferedProtocol: C{_checkedProtocol} if it provides
+        L{interfaces.IBufferedProtocol}, otherwise L{None}.
+
+    @ivar _edgeTriggerable: C{True}, since L{doRead} sets C{_readBlocked}
+        when the socket has no more data, so an edge-triggered reactor can
+        call it until it does.
+        See L{twisted.internet.epollreactor.EPollReactor}.
+
+    @ivar _readBlocked: Set to C{True} by L{doRead} when reading failed
+        because there was no data available.
     """
+    _checkedProtocol = None
+    _bufferedProtocol = None
+    _edgeTriggerable = True
+    _readBlocked = False
 
 
     def __init__(self, skt, protocol, reactor=None):
@@ -196,11 +225,18 @@ class Connection(_TLSConnectionMixin, abstract.FileDescriptor, _SocketCloser,
         calls self.dataReceived(data) to process it.  If the connection is not
         lost through an error in the physical recv(), this function will return
         the result of the dataReceived call.
+
+        If the protocol provides L{interfaces.IBufferedProtocol}, the data is
+        instead read directly into the buffer it provides.
         """
+        protocol = self._getBufferedProtocol()
+        if protocol is not None:
+            return self._doReadInto(protocol)
         try:
             data = self.socket.recv(self.bufferSize)
         except socket.error as se:
             if se.args[0] == EWOULDBLOCK:
+                self._readBlocked = True
                 return
             else:
                 return main.CONNECTION_LOST
@@ -208,6 +244,49 @@ class Connection(_TLSConnectionMixin, abstract.FileDescriptor, _SocketCloser,
         return self._dataReceived(data)
 
 
+    def _getBufferedProtocol(self):
+        """
+        Determine whether incoming data can be read straight into a buffer
+        provided by the protocol.
+
+        The result is cached for as long as C{self.protocol} is the same
+        object.
+
+        @return: C{self.protocol} if it provides
+            L{interfaces.IBufferedProtocol}, otherwise L{None}.
+        """
+        protocol = self.protocol
+        if protocol is not self._checkedProtocol:
+            self._checkedProtocol = protocol
+            if interfaces.IBufferedProtocol.providedBy(protocol):
+                self._bufferedProtocol = protocol
+            else:
+                self._bufferedProtocol = None
+        return self._bufferedProtocol
+
+
+    def _doReadInto(self, protocol):
+        """
+        Read as much data as fits from the socket into the buffer provided by
+        C{protocol} and tell it how much was read.
+
+        @param protocol: The L{interfaces.IBufferedProtocol} provider to read
+            data for.
+        """
+        buf = protocol.getBuffer(self.bufferSize)
+        try:
+            count = self.socket.recv_into(buf)
+        except socket.error as se:
+            if se.args[0] == EWOULDBLOCK:
+                self._readBlocked = True
+                return
+            else:
+                return main.CONNECTION_LOST
+        if not count:
+            return main.CONNECTION_DONE
+        protocol.bufferUpdated(count)
+
+
     def _dataReceived(self, data):
         if not data:
             return main.CONNECTION_DONE
@@ -245,6 +324,23 @@ class Connection(_TLSConnectionMixin, abstract.FileDescriptor, _SocketCloser,
                 return main.CONNECTION_LOST
 
 
+    def writeSomeVectors(self, vectors):
+        """
+        Write as much as possible of the given buffers to this connection with
+        a single C{sendmsg} call, without joining them first.
+
+        If the connection is lost, an exception is returned.  Otherwise, the
+        number of bytes successfully written is returned.
+        """
+        try:
+            return untilConcludes(self.socket.sendmsg, vectors)
+        except socket.error as se:
+            if se.args[0] in (EWOULDBLOCK, ENOBUFS):
+                return 0
+            else:
+                return main.CONNECTION_LOST
+
+
     def _closeWriteConnection(self):
         try:
             self.socket.shutdown(1)
@@ -289,6 +385,7 @@ class Connection(_TLSConnectionMixin, abstract.FileDescriptor, _SocketCloser,
         del self.protocol
         del self.socket
         del self.fileno
+        self._checkedProtocol = self._bufferedProtocol = None
         protocol.connectionLost(reason)
 
 
@@ -313,6 +410,97 @@ class Connection(_TLSConnectionMixin, abstract.FileDescriptor, _SocketCloser,
         self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, enabled)
 
 
+    def getVectoredWrites(self):
+        """
+        Determine whether buffered data is written with scatter-gather
+        I/O.
+
+        @return: C{True} if vectored writes are enabled, C{False} otherwise.
+        @rtype: L{bool}
+
+        @see: L{setVectoredWrites}
+        """
+        return self._vectoredWrites
+
+
+    def setVectoredWrites(self, enabled):
+        """
+        Enable or disable scatter-gather I/O for this connection's writes.
+
+        Normally the chunks passed to C{write} and C{writeSequence} are
+        joined into a single buffer before each attempt to send them, which
+        copies every byte at least once.  With vectored writes enabled they
+        are instead handed to the socket's C{sendmsg} method as they are, in
+        the manner of C{writev(2)}, and a partially written chunk is resumed
+        through a L{memoryview} rather than being sliced.
+
+        @param enabled: C{True} to enable vectored writes, C{False} to
+            disable them.
+        @type enabled: L{bool}
+
+        @raise NotImplementedError: If C{enabled} is true and the platform's
+            sockets do not support C{sendmsg}.
+        """
+        if enabled and not _HAS_SENDMSG:
+            raise NotImplementedError(
+                "Vectored writes require socket.sendmsg, which is not "
+                "available on this platform.")
+        self._setVectoredWrites(enabled)
+
+
+    def sendFile(self, file, offset=0, count=None):
+        """
+        Send part of a file with the C{sendfile} system call, so that its
+        contents are copied to the socket by the kernel instead of being read
+        into memory first.
+
+        @see: L{interfaces.ISendFileTransport.sendFile}
+        """
+        if not _HAS_SENDFILE:
+            raise ValueError("os.sendfile is not available on this platform.")
+        if self.TLS:
+            raise ValueError("Cannot send a file over a TLS connection.")
+        try:
+            fileno = file.fileno()
+        except (AttributeError, IOError, ValueError):
+            raise ValueError("%r has no file descriptor." % (file,))
+        fileStat = os.fstat(fileno)
+        if not stat.S_ISREG(fileStat.st_mode):
+            raise ValueError("%r is not a regular file." % (file,))
+        if count is None:
+            count = max(fileStat.st_size - offset, 0)
+        d = Deferred()
+        if not self.connected or self._writeDisconnected:
+            d.errback(error.ConnectionLost())
+        else:
+            self._queueFileRegion(fileno, offset, count, d)
+        return d
+
+
+    def writeSomeFile(self, fileno, offset, count):
+        """
+        Send as much as possible of part of a file to this connection with
+        C{sendfile}.
+
+        This sends up to C{self.SEND_LIMIT} bytes of the file.  If the
+        connection is lost, an exception is returned.  Otherwise, the number
+        of bytes successfully sent is returned.
+        """
+        try:
+            return untilConcludes(
+                os.sendfile, self.socket.fileno(), fileno, offset,
+                min(count, self.SEND_LIMIT))
+        except (OSError, socket.error) as se:
+            if se.args[0] in (EWOULDBLOCK, ENOBUFS):
+                return 0
+            else:
+                return main.CONNECTION_LOST
+
+
+
+if _HAS_SENDFILE:
+    classImplements(Connection, interfaces.ISendFileTransport)
+
 
 
 class _BaseBaseClient(object):
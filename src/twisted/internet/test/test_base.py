@@ -16,7 +16,7 @@ from zope.interface import implementer
 from twisted.python.threadpool import ThreadPool
 from twisted.internet.interfaces import IReactorTime, IReactorThreads
 from twisted.internet.error import DNSLookupError
-from twisted.internet.base import ThreadedResolver, DelayedCall
+from twisted.internet.base import ThreadedResolver, DelayedCall, ReactorBase
 from twisted.internet.task import Clock
 from twisted.trial.unittest import TestCase
 
@@ -325,3 +325,152 @@ class DelayedCallDebugTests(DelayedCallMixin, TestCase):
             "traceback at creation:".format(id(dc)))
         self.assertRegex(
             str(dc), expectedRegexp)
+
+
+
+class TimeControlledReactor(ReactorBase):
+    """
+    A L{ReactorBase} which is never run, and whose time is advanced by
+    hand.
+
+    @ivar now: The current time.
+    """
+    now = 1000.0
+
+    def installWaker(self):
+        """
+        Do not install a waker; this reactor never waits for I/O.
+        """
+
+
+    def wakeUp(self):
+        """
+        There is no waker to wake up.
+        """
+
+
+    def seconds(self):
+        """
+        @return: L{TimeControlledReactor.now}
+        """
+        return self.now
+
+
+    def advance(self, amount):
+        """
+        Move time forward and run whichever timed calls are due.
+
+        @param amount: The number of seconds to move time forward by.
+        """
+        self.now += amount
+        self.runUntilCurrent()
+
+
+
+class TimingWheelTests(TestCase):
+    """
+    Tests for L{ReactorBase.installTimingWheel}.
+    """
+    def setUp(self):
+        self.reactor = TimeControlledReactor()
+        self.reactor.installTimingWheel(resolution=0.01)
+        self.calls = []
+
+
+    def test_callLater(self):
+        """
+        Calls scheduled with C{callLater} run in order once they are due, and
+        the reactor's timeout reflects the next one.
+        """
+        self.reactor.callLater(2, self.calls.append, "b")
+        self.reactor.callLater(0.5, self.calls.append, "a")
+        self.reactor.callLater(2, self.calls.append, "c")
+        self.assertEqual(self.reactor.timeout(), 0.5)
+        self.reactor.advance(0.499)
+        self.assertEqual(self.calls, [])
+        self.reactor.advance(0.001)
+        self.assertEqual(self.calls, ["a"])
+        self.reactor.advance(1.5)
+        self.assertEqual(self.calls, ["a", "b", "c"])
+        self.assertIsNone(self.reactor.timeout())
+        self.assertEqual(self.reactor.getDelayedCalls(), [])
+
+
+    def test_cancel(self):
+        """
+        A cancelled call is removed from the wheel immediately and never
+        runs.
+        """
+        call = self.reactor.callLater(1, self.calls.append, "a")
+        call.cancel()
+        self.assertEqual(len(self.reactor._timingWheel), 0)
+        self.assertEqual(self.reactor.getDelayedCalls(), [])
+        self.reactor.advance(2)
+        self.assertEqual(self.calls, [])
+
+
+    def test_reset(self):
+        """
+        Resetting or delaying a call moves it in the wheel rather than
+        leaving it in its old slot.
+        """
+        call = self.reactor.callLater(1, self.calls.append, "a")
+        call.reset(5)
+        self.assertEqual(call.getTime(), 1005.0)
+        self.assertEqual(len(self.reactor._timingWheel), 1)
+        call.delay(1)
+        self.assertEqual(call.getTime(), 1006.0)
+        self.assertEqual(call.delayed_time, 0)
+        self.reactor.advance(5.9)
+        self.assertEqual(self.calls, [])
+        call.reset(0.05)
+        self.reactor.advance(0.05)
+        self.assertEqual(self.calls, ["a"])
+        self.assertFalse(call.active())
+
+
+    def test_newCallsRunLater(self):
+        """
+        A call scheduled for no delay by a call which is running runs on the
+        next iteration, as it does with the default timed call heap.
+        """
+        def first():
+            self.calls.append("first")
+            self.reactor.callLater(0, self.calls.append, "second")
+        self.reactor.callLater(0, first)
+        self.reactor.advance(0)
+        self.assertEqual(self.calls, ["first"])
+        self.reactor.advance(0)
+        self.assertEqual(self.calls, ["first", "second"])
+
+
+    def test_cancelledByEarlierCall(self):
+        """
+        A due call cancelled by another due call which runs before it does
+        not run.
+        """
+        second = self.reactor.callLater(2, self.calls.append, "second")
+        self.reactor.callLater(1, second.cancel)
+        self.reactor.advance(3)
+        self.assertEqual(self.calls, [])
+
+
+    def test_existingCalls(self):
+        """
+        Calls scheduled before the timing wheel is installed are moved into
+        it, including their pending postponements.
+        """
+        reactor = TimeControlledReactor()
+        moved = reactor.callLater(1, self.calls.append, "moved")
+        delayed = reactor.callLater(1, self.calls.append, "delayed")
+        cancelled = reactor.callLater(1, self.calls.append, "cancelled")
+        reactor.runUntilCurrent()
+        delayed.delay(2)
+        reactor.installTimingWheel()
+        cancelled.cancel()
+        self.assertEqual(reactor._pendingTimedCalls, [])
+        self.assertEqual(set(reactor.getDelayedCalls()), set([moved, delayed]))
+        reactor.advance(1)
+        self.assertEqual(self.calls, ["moved"])
+        reactor.advance(2)
+        self.assertEqual(self.calls, ["moved", "delayed"])
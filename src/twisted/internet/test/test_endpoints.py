@@ -151,6 +151,26 @@ class TestFileDescriptorReceiverProtocol(TestProtocol):
 
 
 
+@implementer(interfaces.IBufferedProtocol)
+class TestBufferedProtocol(TestProtocol):
+    """
+    A Protocol that implements L{IBufferedProtocol} and records the data
+    written into the buffers it provides.
+
+    @ivar buffer: The buffer most recently returned by C{getBuffer}.
+    @type buffer: L{bytearray}
+    """
+
+    def getBuffer(self, sizeHint):
+        self.buffer = bytearray(sizeHint)
+        return self.buffer
+
+
+    def bufferUpdated(self, nbytes):
+        self.data.append(bytes(self.buffer[:nbytes]))
+
+
+
 @implementer(interfaces.IHandshakeListener)
 class TestHandshakeListener(TestProtocol):
     """
@@ -399,6 +419,48 @@ class WrappingFactoryTests(unittest.TestCase):
         self.assertEqual(wrappedProtocol.receivedDescriptors, [42])
 
 
+    def test_wrappingProtocolBufferedProtocol(self):
+        """
+        Our L{_WrappingProtocol} should be an L{IBufferedProtocol} if the
+        wrapped protocol is, and proxies C{getBuffer} and C{bufferUpdated} to
+        it.
+        """
+        wrappedProtocol = TestBufferedProtocol()
+        wrapper = endpoints._WrappingProtocol(
+            defer.Deferred(), wrappedProtocol)
+        self.assertTrue(verifyObject(interfaces.IBufferedProtocol, wrapper))
+        wrapper.makeConnection(StringTransport())
+        buf = wrapper.getBuffer(10)
+        self.assertIs(buf, wrappedProtocol.buffer)
+        buf[:3] = b"abc"
+        wrapper.bufferUpdated(3)
+        self.assertEqual(wrappedProtocol.data, [b"abc"])
+
+
+    def test_wrappingProtocolSeveralInterfaces(self):
+        """
+        Our L{_WrappingProtocol} provides every optional protocol interface
+        which the wrapped protocol provides.
+        """
+        @implementer(interfaces.IFileDescriptorReceiver)
+        class Both(TestBufferedProtocol):
+            def fileDescriptorReceived(self, descriptor):
+                pass
+
+        wrapper = endpoints._WrappingProtocol(None, Both())
+        self.assertTrue(interfaces.IBufferedProtocol.providedBy(wrapper))
+        self.assertTrue(interfaces.IFileDescriptorReceiver.providedBy(wrapper))
+
+
+    def test_wrappingProtocolNotBufferedProtocol(self):
+        """
+        Our L{_WrappingProtocol} does not provide L{IBufferedProtocol} if the
+        wrapped protocol doesn't.
+        """
+        p = endpoints._WrappingProtocol(None, TestProtocol())
+        self.assertFalse(interfaces.IBufferedProtocol.providedBy(p))
+
+
     def test_wrappingProtocolHalfCloseable(self):
         """
         Our L{_WrappingProtocol} should be an L{IHalfCloseableProtocol} if the
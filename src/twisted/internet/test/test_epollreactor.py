@@ -7,11 +7,18 @@ Tests for L{twisted.internet.epollreactor}.
 
 from __future__ import division, absolute_import
 
+import errno
+import socket
+
 from twisted.trial.unittest import TestCase
 try:
     from twisted.internet.epollreactor import _ContinuousPolling
 except ImportError:
     _ContinuousPolling = None
+try:
+    from twisted.internet.epollreactor import EPollReactor
+except ImportError:
+    EPollReactor = None
 from twisted.internet.task import Clock
 from twisted.internet.error import ConnectionDone
 
@@ -246,3 +253,194 @@ class ContinuousPollingTests(TestCase):
 
     if _ContinuousPolling is None:
         skip = "epoll not supported in this environment."
+
+
+
+class EdgeReader(object):
+    """
+    Reads from a socket a few bytes at a time, reporting when it has no more
+    data as C{tcp.Connection} does.
+
+    @ivar reads: The number of calls to L{doRead}.
+    @ivar received: The data read.
+    """
+    _edgeTriggerable = True
+    _readBlocked = False
+
+    def __init__(self, skt, size=1):
+        self.socket = skt
+        self.size = size
+        self.reads = 0
+        self.received = b""
+        self.lost = False
+
+
+    def fileno(self):
+        return self.socket.fileno()
+
+
+    def logPrefix(self):
+        return "EdgeReader"
+
+
+    def doRead(self):
+        self.reads += 1
+        try:
+            data = self.socket.recv(self.size)
+        except socket.error as e:
+            if e.args[0] != errno.EAGAIN:
+                raise
+            self._readBlocked = True
+        else:
+            if not data:
+                return ConnectionDone()
+            self.received += data
+
+
+    def doWrite(self):
+        pass
+
+
+    def connectionLost(self, reason):
+        reason.trap(ConnectionDone)
+        self.lost = True
+
+
+
+class EdgeTriggeredTests(TestCase):
+    """
+    Tests for L{EPollReactor} with C{edgeTriggered=True}.
+    """
+    if EPollReactor is None:
+        skip = "epoll is not supported on this platform"
+
+    def setUp(self):
+        self.reactor = EPollReactor(edgeTriggered=True)
+        self.addCleanup(self._cleanup)
+
+
+    def _cleanup(self):
+        """
+        Remove and close the reactor's waker and descriptors.
+        """
+        self.reactor._uninstallHandler()
+        for reader in self.reactor._internalReaders:
+            self.reactor.removeReader(reader)
+            reader.connectionLost(None)
+        self.reactor.removeAll()
+        self.reactor._poller.close()
+
+
+    def reader(self, size=1):
+        """
+        Create an L{EdgeReader} for one end of a new socket pair and start
+        reading from it.
+
+        @param size: The number of bytes it reads at a time.
+
+        @return: A tuple of the reader and the other end of the socket pair.
+        """
+        client, server = socket.socketpair()
+        self.addCleanup(client.close)
+        self.addCleanup(server.close)
+        server.setblocking(False)
+        reader = EdgeReader(server, size)
+        self.reactor.addReader(reader)
+        return reader, client
+
+
+    def test_registration(self):
+        """
+        A descriptor which supports it is registered edge-triggered only
+        while it is read from but not written to.  Others, such as the
+        waker, are always registered level-triggered.
+        """
+        reader, client = self.reader()
+        fd = reader.fileno()
+        self.assertEqual(self.reactor._edgeReads, set([fd]))
+        self.reactor.addWriter(reader)
+        self.assertEqual(self.reactor._edgeReads, set())
+        self.reactor.removeWriter(reader)
+        self.assertEqual(self.reactor._edgeReads, set([fd]))
+        self.reactor.removeReader(reader)
+        self.assertEqual(self.reactor._edgeReads, set())
+
+
+    def test_levelTriggeredByDefault(self):
+        """
+        Without C{edgeTriggered=True}, no descriptors are registered
+        edge-triggered.
+        """
+        self._cleanup()
+        self.reactor = EPollReactor()
+        reader, client = self.reader()
+        self.assertEqual(self.reactor._edgeReads, set())
+
+
+    def test_drain(self):
+        """
+        A descriptor with data is read from until it has none, and not
+        again until more data arrives.
+        """
+        reader, client = self.reader()
+        client.send(b"abcde")
+        self.reactor.doPoll(1)
+        self.assertEqual(reader.received, b"abcde")
+        self.assertEqual(reader.reads, 6)
+        self.assertEqual(self.reactor._pendingReads, {})
+
+        self.reactor.doPoll(0)
+        self.assertEqual(reader.reads, 6)
+        client.send(b"f")
+        self.reactor.doPoll(1)
+        self.assertEqual(reader.received, b"abcdef")
+
+
+    def test_drainBeforeHangUp(self):
+        """
+        A descriptor whose peer sent data and then hung up is read from until
+        it has no more data, and then disconnected.
+        """
+        reader, client = self.reader()
+        client.send(b"abc")
+        client.close()
+        self.reactor.doPoll(1)
+        self.assertEqual(reader.received, b"abc")
+        self.assertTrue(reader.lost)
+        self.assertEqual(self.reactor._edgeReads, set())
+
+
+    def test_budget(self):
+        """
+        Each descriptor is read from at most C{edgeReadBudget} times in an
+        iteration, and one which may still have data is read from in the
+        next iteration without waiting.
+        """
+        self.reactor.edgeReadBudget = 2
+        busy, busyClient = self.reader()
+        idle, idleClient = self.reader()
+        busyClient.send(b"abcde")
+        idleClient.send(b"z")
+        self.reactor.doPoll(1)
+        self.assertEqual(busy.received, b"ab")
+        self.assertEqual(idle.received, b"z")
+        self.assertEqual(list(self.reactor._pendingReads), [busy.fileno()])
+
+        self.reactor.doPoll(None)
+        self.assertEqual(busy.received, b"abcd")
+        self.reactor.doPoll(None)
+        self.assertEqual(busy.received, b"abcde")
+        self.assertEqual(self.reactor._pendingReads, {})
+
+
+    def test_removePending(self):
+        """
+        A descriptor which is no longer read from is no longer pending.
+        """
+        self.reactor.edgeReadBudget = 1
+        reader, client = self.reader()
+        client.send(b"abc")
+        self.reactor.doPoll(1)
+        self.assertEqual(list(self.reactor._pendingReads), [reader.fileno()])
+        self.reactor.removeReader(reader)
+        self.assertEqual(self.reactor._pendingReads, {})
@@ -14,7 +14,8 @@ from __future__ import division, absolute_import
 import sys
 
 from twisted.trial.unittest import TestCase
-from twisted.internet.defer import Deferred, returnValue, inlineCallbacks
+from twisted.internet.defer import (
+    Deferred, returnValue, inlineCallbacks, succeed, fail)
 
 
 class StopIterationReturnTests(TestCase):
@@ -124,3 +125,72 @@ class NonLocalExitTests(TestCase):
         self.assertMistakenMethodWarning(results)
 
 
+
+
+
+class FiredDeferredTests(TestCase):
+    """
+    An L{inlineCallbacks} generator which yields a L{Deferred} that already
+    has a result is resumed with that result straight away.
+    """
+
+    def test_succeeded(self):
+        """
+        The result of a succeeded L{Deferred} is sent into the generator, and
+        the L{Deferred} is left with a result of L{None}, as if a callback had
+        consumed it.
+        """
+        fired = succeed(1)
+        @inlineCallbacks
+        def inline():
+            result = yield fired
+            returnValue(result + 1)
+        self.assertEqual(self.successResultOf(inline()), 2)
+        self.assertIsNone(self.successResultOf(fired))
+
+
+    def test_failed(self):
+        """
+        The exception of a failed L{Deferred} is raised into the generator and
+        the L{Failure} is consumed, so it is not logged as unhandled.
+        """
+        fired = fail(ZeroDivisionError())
+        @inlineCallbacks
+        def inline():
+            try:
+                yield fired
+            except ZeroDivisionError:
+                returnValue("caught")
+        self.assertEqual(self.successResultOf(inline()), "caught")
+        self.assertIsNone(self.successResultOf(fired))
+
+
+    def test_paused(self):
+        """
+        A paused L{Deferred} is waited for even if it has a result.
+        """
+        fired = succeed(1)
+        fired.pause()
+        @inlineCallbacks
+        def inline():
+            result = yield fired
+            returnValue(result)
+        d = inline()
+        self.assertNoResult(d)
+        fired.unpause()
+        self.assertEqual(self.successResultOf(d), 1)
+
+
+    def test_manyFired(self):
+        """
+        Yielding many L{Deferred}s which have results does not exhaust the
+        stack.
+        """
+        @inlineCallbacks
+        def inline():
+            total = 0
+            for i in range(sys.getrecursionlimit() * 2):
+                total += yield succeed(1)
+            returnValue(total)
+        self.assertEqual(self.successResultOf(inline()),
+                         sys.getrecursionlimit() * 2)
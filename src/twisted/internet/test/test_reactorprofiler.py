@@ -0,0 +1,217 @@
+# Copyright (c) Twisted Matrix Laboratories.
+# See LICENSE for details.
+
+"""
+Tests for L{twisted.internet._reactorprofiler}.
+"""
+
+from __future__ import division, absolute_import
+
+from twisted.internet._reactorprofiler import ReactorProfiler
+from twisted.internet.test.test_base import TimeControlledReactor
+from twisted.logger import Logger, LogLevel
+from twisted.trial.unittest import SynchronousTestCase
+
+
+
+class FakeSelectable(object):
+    """
+    A selectable which takes some time to read.
+
+    @ivar clock: The L{FakeClock} to advance.
+    @ivar duration: The number of seconds each read takes.
+    """
+    def __init__(self, clock, duration):
+        self.clock = clock
+        self.duration = duration
+
+
+    def doRead(self):
+        self.clock.now += self.duration
+
+
+    def __repr__(self):
+        return "<FakeSelectable>"
+
+
+
+class FakeClock(object):
+    """
+    A clock whose time is advanced by hand.
+
+    @ivar now: The current time.
+    """
+    now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+
+class ProfiledReactor(TimeControlledReactor):
+    """
+    A L{TimeControlledReactor} whose iterations wait for and dispatch I/O
+    events by hand.
+
+    @ivar clock: The L{FakeClock} advanced while waiting.
+    @ivar pollTime: The number of seconds each iteration waits for events.
+    @ivar ready: The selectables with a pending read event.
+    """
+    pollTime = 0.0
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.ready = []
+        TimeControlledReactor.__init__(self)
+
+
+    def doIteration(self, timeout):
+        self.clock.now += self.pollTime
+        for selectable in self.ready:
+            self._doReadOrWrite(selectable)
+
+
+    def _doReadOrWrite(self, selectable):
+        selectable.doRead()
+
+
+    def iterate(self):
+        self.runUntilCurrent()
+        self.doIteration(self.timeout())
+
+
+
+class ReactorProfilerTests(SynchronousTestCase):
+    """
+    Tests for L{ReactorProfiler} and L{ReactorBase.installProfiler}.
+    """
+    def setUp(self):
+        self.clock = FakeClock()
+        self.reactor = ProfiledReactor(self.clock)
+        self.profiler = ReactorProfiler(
+            self.reactor, threshold=0.5, reportInterval=None,
+            clock=self.clock)
+        self.events = []
+        self.profiler._log = Logger(observer=self.events.append)
+        self.profiler.install()
+        self.addCleanup(self.profiler.uninstall)
+
+
+    def test_iteration(self):
+        """
+        Each iteration's wall time, time spent waiting for events, number of
+        timed calls and number of I/O events are recorded.
+        """
+        def slowCall():
+            self.clock.now += 0.25
+        self.reactor.callLater(0, slowCall)
+        self.reactor.callLater(0, slowCall)
+        self.reactor.pollTime = 1.0
+        self.reactor.ready = [FakeSelectable(self.clock, 0.125)] * 2
+        self.reactor.iterate()
+
+        self.assertEqual(self.profiler.iterationTime.summary()["maximum"],
+                         1.75)
+        self.assertEqual(self.profiler.pollTime.summary()["maximum"], 1.0)
+        self.assertEqual(self.profiler.timedCalls.summary()["maximum"], 2)
+        self.assertEqual(self.profiler.ioEvents.summary()["maximum"], 2)
+        self.assertEqual(self.profiler.iterationTime.count, 1)
+        self.assertEqual(self.events, [])
+
+
+    def test_slowTimedCall(self):
+        """
+        A timed call which takes longer than the threshold is reported with
+        a warning naming its function.
+        """
+        def slowCall():
+            self.clock.now += 1
+        self.reactor.callLater(0, slowCall)
+        self.reactor.iterate()
+
+        self.assertEqual(self.profiler.slowCalls, 1)
+        [event] = self.events
+        self.assertEqual(event["log_level"], LogLevel.warn)
+        self.assertEqual(event["kind"], "timed call")
+        self.assertIn("slowCall", event["name"])
+        self.assertEqual(event["duration"], 1)
+
+
+    def test_slowThreadCall(self):
+        """
+        A function passed to C{callFromThread} which takes longer than the
+        threshold is reported.
+        """
+        def slowCall():
+            self.clock.now += 1
+        self.reactor.callFromThread(slowCall)
+        self.reactor.iterate()
+
+        [event] = self.events
+        self.assertEqual(event["kind"], "thread call")
+        self.assertIn("slowCall", event["name"])
+
+
+    def test_slowRead(self):
+        """
+        An I/O handler which takes longer than the threshold is reported
+        with a warning naming its selectable, and its time does not count as
+        time spent waiting for events.
+        """
+        self.reactor.ready = [FakeSelectable(self.clock, 1)]
+        self.reactor.iterate()
+
+        [event] = self.events
+        self.assertEqual(event["kind"], "I/O handler")
+        self.assertEqual(event["name"], "<FakeSelectable>")
+        self.assertEqual(self.profiler.pollTime.summary()["maximum"], 0)
+
+
+    def test_report(self):
+        """
+        A summary of the histograms is logged at the end of the first
+        iteration after each C{reportInterval}.
+        """
+        self.profiler.reportInterval = 10
+        self.reactor.pollTime = 4
+        for i in range(2):
+            self.reactor.iterate()
+        self.assertEqual(self.events, [])
+        self.reactor.iterate()
+
+        [event] = self.events
+        self.assertEqual(event["log_level"], LogLevel.info)
+        self.assertEqual(event["iterations"]["count"], 3)
+        self.assertEqual(event["poll"]["maximum"], 4)
+        self.assertEqual(event["slowCalls"], 0)
+
+
+    def test_uninstall(self):
+        """
+        Once uninstalled, the profiler restores the reactor's methods and
+        records nothing more.
+        """
+        self.profiler.uninstall()
+        self.assertNotIn("runUntilCurrent", vars(self.reactor))
+        self.reactor.iterate()
+        self.assertEqual(self.profiler.iterationTime.count, 0)
+
+
+    def test_installProfiler(self):
+        """
+        L{ReactorBase.installProfiler} installs a profiler with the given
+        threshold and report interval, replacing any installed before.
+        """
+        reactor = ProfiledReactor(self.clock)
+        first = reactor.installProfiler()
+        second = reactor.installProfiler(threshold=1, reportInterval=None)
+        self.addCleanup(second.uninstall)
+
+        self.assertIs(reactor._profiler, second)
+        self.assertEqual(second.threshold, 1)
+        self.assertIsNone(second.reportInterval)
+        reactor.iterate()
+        self.assertEqual(first.iterationTime.count, 0)
+        self.assertEqual(second.iterationTime.count, 1)
+        second.uninstall()
+        self.assertIsNone(reactor._profiler)
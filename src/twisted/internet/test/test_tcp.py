@@ -11,9 +11,11 @@ from __future__ import division, absolute_import
 __metaclass__ = type
 
 import errno
+import os
 import socket
 
 from functools import wraps
+from io import BytesIO
 
 from zope.interface import implementer
 from zope.interface.verify import verifyClass
@@ -42,8 +44,10 @@ from twisted.internet.defer import (
 from twisted.internet.endpoints import TCP4ServerEndpoint, TCP4ClientEndpoint
 from twisted.internet.protocol import ServerFactory, ClientFactory, Protocol
 from twisted.internet.interfaces import (
-    IPushProducer, IPullProducer, IHalfCloseableProtocol)
-from twisted.internet.tcp import Connection, Server, _resolveIPv6
+    IPushProducer, IPullProducer, IHalfCloseableProtocol, IBufferedProtocol,
+    ISendFileTransport)
+from twisted.internet.tcp import (
+    Connection, Server, _resolveIPv6, _HAS_SENDMSG, _HAS_SENDFILE)
 from twisted.internet.test.test_core import ObjectModelIntegrationMixin
 from twisted.test.test_tcp import MyClientFactory, MyServerFactory
 from twisted.test.test_tcp import ClosingFactory, ClientStartStopFactory
@@ -1577,6 +1581,46 @@ class TCPConnectionTestsBuilder(ReactorBuilder):
             self, ListenerProtocol(), Client(), TCPCreator())
 
 
+    def test_bufferedProtocol(self):
+        """
+        A protocol providing L{IBufferedProtocol} receives all of the data
+        sent to it.  TCP transports from L{twisted.internet.tcp} read it
+        directly into the buffers returned by the protocol's C{getBuffer}
+        rather than calling its C{dataReceived}.
+        """
+        @implementer(IBufferedProtocol)
+        class Receiver(ConnectableProtocol):
+            def __init__(self):
+                self.buffers = []
+                self.received = []
+                self.dataReceivedCalls = 0
+
+            def getBuffer(self, sizeHint):
+                buf = bytearray(sizeHint)
+                self.buffers.append(buf)
+                return buf
+
+            def bufferUpdated(self, nbytes):
+                self.received.append(bytes(self.buffers[-1][:nbytes]))
+
+            def dataReceived(self, data):
+                self.dataReceivedCalls += 1
+                self.received.append(data)
+
+        class Client(ConnectableProtocol):
+            def connectionMade(self):
+                self.transport.write(expected)
+                self.transport.loseConnection()
+
+        expected = b"".join(b"%d," % (i,) for i in range(50000))
+        receiver = Receiver()
+        runProtocolsWithReactor(self, receiver, Client(), TCPCreator())
+        self.assertEqual(b"".join(receiver.received), expected)
+        if isinstance(receiver.transport, Connection):
+            self.assertEqual(receiver.dataReceivedCalls, 0)
+            self.assertTrue(receiver.buffers)
+
+
 
 class WriteSequenceTestsMixin(object):
     """
@@ -1645,6 +1689,133 @@ class WriteSequenceTestsMixin(object):
         self.runReactor(reactor)
 
 
+    def test_vectoredWrites(self):
+        """
+        With vectored writes enabled, everything passed to C{write} and
+        C{writeSequence} is sent, in order.
+        """
+        if not _HAS_SENDMSG:
+            raise SkipTest("Vectored writes require socket.sendmsg.")
+        chunks = [b"x" * 7, b"y" * 70000, b"z"] + [b"%d," % (i,)
+                                                     for i in range(2000)]
+        expected = b"".join(chunks)
+        received = []
+        unsupported = []
+
+        def connected(protocols):
+            client, server = protocols[:2]
+            if not hasattr(client.transport, "setVectoredWrites"):
+                unsupported.append(client.transport)
+                server.transport.loseConnection()
+                return
+            client.transport.setVectoredWrites(True)
+            self.assertTrue(client.transport.getVectoredWrites())
+
+            def dataReceived(data):
+                received.append(data)
+                if len(b"".join(received)) == len(expected):
+                    server.transport.loseConnection()
+            server.dataReceived = dataReceived
+
+            client.transport.write(chunks[0])
+            client.transport.writeSequence(chunks[1:])
+
+        reactor = self.buildReactor()
+        d = self.getConnectedClientAndServer(reactor, "127.0.0.1",
+                                             socket.AF_INET)
+        d.addCallback(connected)
+        d.addErrback(log.err)
+        self.runReactor(reactor)
+        if unsupported:
+            raise SkipTest("%r does not support vectored writes" % (
+                unsupported[0],))
+        self.assertEqual(b"".join(received), expected)
+
+
+    def test_sendFile(self):
+        """
+        L{ISendFileTransport.sendFile} sends the requested part of a file in
+        order with data written before and after it, and the L{Deferred} it
+        returns fires with the number of bytes sent.
+        """
+        if not _HAS_SENDFILE:
+            raise SkipTest("Sending files requires os.sendfile.")
+        contents = b"".join(b"%d," % (i,) for i in range(100000))
+        path = self.mktemp()
+        with open(path, "wb") as f:
+            f.write(contents)
+        fileObject = open(path, "rb")
+        self.addCleanup(fileObject.close)
+        expected = b"head" + contents[10:] + b"tail"
+        received = []
+        results = []
+        unsupported = []
+
+        def connected(protocols):
+            client, server = protocols[:2]
+            if not ISendFileTransport.providedBy(client.transport):
+                unsupported.append(client.transport)
+                server.transport.loseConnection()
+                return
+
+            def dataReceived(data):
+                received.append(data)
+                if len(b"".join(received)) == len(expected):
+                    server.transport.loseConnection()
+            server.dataReceived = dataReceived
+
+            client.transport.write(b"head")
+            d = client.transport.sendFile(fileObject, 10)
+            d.addCallback(results.append)
+            client.transport.write(b"tail")
+
+        reactor = self.buildReactor()
+        d = self.getConnectedClientAndServer(reactor, "127.0.0.1",
+                                             socket.AF_INET)
+        d.addCallback(connected)
+        d.addErrback(log.err)
+        self.runReactor(reactor)
+        if unsupported:
+            raise SkipTest("%r does not support sending files" % (
+                unsupported[0],))
+        self.assertEqual(results, [len(contents) - 10])
+        self.assertEqual(b"".join(received), expected)
+        self.assertEqual(fileObject.tell(), 0)
+
+
+    def test_sendFileNotRegular(self):
+        """
+        L{ISendFileTransport.sendFile} raises L{ValueError} if given a file
+        which is not a regular file, or an object which is not a file.
+        """
+        if not _HAS_SENDFILE:
+            raise SkipTest("Sending files requires os.sendfile.")
+        errors = []
+
+        def connected(protocols):
+            client, server = protocols[:2]
+            if ISendFileTransport.providedBy(client.transport):
+                errors.append(self.assertRaises(
+                    ValueError, client.transport.sendFile, BytesIO(b"x")))
+                r, w = os.pipe()
+                self.addCleanup(os.close, r)
+                self.addCleanup(os.close, w)
+                with os.fdopen(os.dup(r), "rb") as pipe:
+                    errors.append(self.assertRaises(
+                        ValueError, client.transport.sendFile, pipe))
+            server.transport.loseConnection()
+
+        reactor = self.buildReactor()
+        d = self.getConnectedClientAndServer(reactor, "127.0.0.1",
+                                             socket.AF_INET)
+        d.addCallback(connected)
+        d.addErrback(log.err)
+        self.runReactor(reactor)
+        if not errors:
+            raise SkipTest("This transport does not support sending files.")
+        self.assertEqual(len(errors), 2)
+
+
     def test_streamingProducer(self):
         """
         C{writeSequence} pauses its streaming producer if too much data is
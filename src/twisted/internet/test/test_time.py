@@ -71,6 +71,27 @@ class TimeTestsBuilder(ReactorBuilder):
         self.assertIn(delayedCall, reactor.getDelayedCalls())
 
 
+    def test_timingWheel(self):
+        """
+        A reactor with a timing wheel installed runs delayed calls in order,
+        including ones which have been reset, and not ones which have been
+        cancelled.
+        """
+        reactor = self.buildReactor()
+        if not hasattr(reactor, "installTimingWheel"):
+            raise SkipTest("%r does not support timing wheels" % (reactor,))
+        reactor.installTimingWheel()
+        calls = []
+        reactor.callLater(0.02, calls.append, "second")
+        first = reactor.callLater(0.5, calls.append, "first")
+        cancelled = reactor.callLater(0.01, calls.append, "cancelled")
+        reactor.callLater(0.03, reactor.stop)
+        first.reset(0.01)
+        cancelled.cancel()
+        reactor.run()
+        self.assertEqual(calls, ["first", "second"])
+
+
 
 class GlibTimeTestsBuilder(ReactorBuilder):
     """
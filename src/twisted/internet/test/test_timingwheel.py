@@ -0,0 +1,175 @@
+# Copyright (c) Twisted Matrix Laboratories.
+# See LICENSE for details.
+
+"""
+Tests for L{twisted.internet._timingwheel}.
+"""
+
+from __future__ import division, absolute_import
+
+from twisted.internet._timingwheel import TimingWheel
+from twisted.trial.unittest import SynchronousTestCase
+
+
+
+class Entry(object):
+    """
+    An entry to put in a L{TimingWheel}.
+
+    @ivar time: The time the entry is due.
+    """
+    def __init__(self, time):
+        self.time = time
+
+
+    def __repr__(self):
+        return "<Entry %r>" % (self.time,)
+
+
+
+class TimingWheelTests(SynchronousTestCase):
+    """
+    Tests for L{TimingWheel}.
+    """
+
+    def setUp(self):
+        """
+        Create a small wheel so that tests exercise every level and the
+        overflow slot without scheduling very distant entries.
+        """
+        self.wheel = TimingWheel(resolution=1.0, now=0.0, bits=2, levels=2)
+
+
+    def test_invalidResolution(self):
+        """
+        L{TimingWheel} raises L{ValueError} if given a resolution which is not
+        positive.
+        """
+        self.assertRaises(ValueError, TimingWheel, 0)
+        self.assertRaises(ValueError, TimingWheel, -1.0)
+
+
+    def test_addAndRemove(self):
+        """
+        L{TimingWheel.add} puts an entry in the wheel and
+        L{TimingWheel.remove} takes it out again; removing an entry which is
+        not in the wheel does nothing.
+        """
+        entry = Entry(3.5)
+        self.wheel.add(entry)
+        self.assertIn(entry, self.wheel)
+        self.assertEqual(list(self.wheel), [entry])
+        self.assertEqual(len(self.wheel), 1)
+        self.wheel.remove(entry)
+        self.assertNotIn(entry, self.wheel)
+        self.assertEqual(len(self.wheel), 0)
+        self.wheel.remove(entry)
+        self.assertEqual(self.wheel.expire(100), [])
+
+
+    def test_expireOrder(self):
+        """
+        L{TimingWheel.expire} returns every entry due at or before the given
+        time, in order of time and then of addition, across all levels of the
+        wheel, and leaves later entries in place.
+        """
+        times = [30.5, 0.5, 2.0, 5.25, 17.0, 0.5, 9.0, 100.0, 2.0, 15.999]
+        entries = [Entry(t) for t in times]
+        for entry in entries:
+            self.wheel.add(entry)
+        due = self.wheel.expire(30.0)
+        self.assertEqual(
+            due,
+            [entries[1], entries[5], entries[2], entries[8], entries[3],
+             entries[6], entries[9], entries[4]])
+        self.assertEqual(set(self.wheel), set([entries[0], entries[7]]))
+        self.assertEqual(self.wheel.expire(30.5), [entries[0]])
+        self.assertEqual(self.wheel.expire(99.99), [])
+        self.assertEqual(self.wheel.expire(1000.0), [entries[7]])
+
+
+    def test_expireWithinTick(self):
+        """
+        L{TimingWheel.expire} does not return an entry which is due later in
+        the current tick.
+        """
+        early, late = Entry(4.25), Entry(4.75)
+        self.wheel.add(early)
+        self.wheel.add(late)
+        self.assertEqual(self.wheel.expire(4.5), [early])
+        self.assertEqual(self.wheel.expire(4.75), [late])
+
+
+    def test_pastEntry(self):
+        """
+        An entry due before the time the wheel has advanced to is expired by
+        the next call to L{TimingWheel.expire}.
+        """
+        self.wheel.expire(50.0)
+        entry = Entry(10.0)
+        self.wheel.add(entry)
+        self.assertEqual(self.wheel.nextTime(), 10.0)
+        self.assertEqual(self.wheel.expire(50.0), [entry])
+
+
+    def test_move(self):
+        """
+        L{TimingWheel.move} reschedules an entry according to its new C{time}.
+        """
+        entry = Entry(40.0)
+        self.wheel.add(entry)
+        entry.time = 3.0
+        self.wheel.move(entry)
+        self.assertEqual(self.wheel.expire(3.0), [entry])
+        entry.time = 60.0
+        self.wheel.move(entry)
+        self.assertEqual(len(self.wheel), 1)
+        self.assertEqual(self.wheel.expire(59.0), [])
+        self.assertEqual(self.wheel.expire(60.0), [entry])
+
+
+    def test_nextTime(self):
+        """
+        L{TimingWheel.nextTime} gives the time of the earliest entry in the
+        lowest level, or the start of the earliest non-empty slot of a
+        higher level, or L{None} if the wheel is empty.
+        """
+        self.assertIsNone(self.wheel.nextTime())
+        entry = Entry(6.5)
+        self.wheel.add(entry)
+        # The entry is in the second level slot starting at tick 4.
+        self.assertEqual(self.wheel.nextTime(), 4.0)
+        self.assertEqual(self.wheel.expire(4.0), [])
+        self.assertEqual(self.wheel.nextTime(), 6.5)
+        self.wheel.remove(entry)
+        self.assertIsNone(self.wheel.nextTime())
+
+
+    def test_nextTimeOverflow(self):
+        """
+        L{TimingWheel.nextTime} gives the time at which the next revolution of
+        the highest level starts if the only entries are beyond it.
+        """
+        entry = Entry(1000.0)
+        self.wheel.add(entry)
+        self.assertEqual(self.wheel.nextTime(), 16.0)
+        self.assertEqual(self.wheel.expire(16.0), [])
+        self.assertEqual(self.wheel.nextTime(), 32.0)
+
+
+    def test_skipsEmptySlots(self):
+        """
+        Expiring a sparse wheel a long way ahead only visits non-empty slots.
+        """
+        wheel = TimingWheel(resolution=0.001, now=0.0)
+        entries = [Entry(10.0 ** n) for n in range(6)]
+        for entry in entries:
+            wheel.add(entry)
+        cascades = []
+        original = wheel._cascade
+        def cascade():
+            cascades.append(wheel._current)
+            original()
+        wheel._cascade = cascade
+        self.assertEqual(wheel.expire(10.0 ** 6), entries)
+        self.assertLess(len(cascades), 100)
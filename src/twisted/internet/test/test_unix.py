@@ -27,7 +27,8 @@ from twisted.internet.address import UNIXAddress
 from twisted.internet.defer import Deferred, fail
 from twisted.internet.endpoints import UNIXServerEndpoint, UNIXClientEndpoint
 from twisted.internet.error import ConnectionClosed, FileDescriptorOverrun
-from twisted.internet.interfaces import IFileDescriptorReceiver, IReactorUNIX
+from twisted.internet.interfaces import (
+    IFileDescriptorReceiver, IReactorUNIX, IBufferedProtocol)
 from twisted.internet.protocol import DatagramProtocol
 from twisted.internet.protocol import ServerFactory, ClientFactory
 from twisted.internet.task import LoopingCall
@@ -662,6 +663,97 @@ class UNIXTestsBuilder(UNIXFamilyMixin, ReactorBuilder, ConnectionTestsMixin):
 
 
 
+    def test_descriptorDeliveredWithVectoredWrites(self):
+        """
+        L{IUNIXTransport.sendFileDescriptor} sends file descriptors before
+        normal bytes when vectored writes are enabled, and the bytes are
+        all delivered.
+        """
+        @implementer(IFileDescriptorReceiver)
+        class RecordEvents(ConnectableProtocol):
+
+            def connectionMade(self):
+                ConnectableProtocol.connectionMade(self)
+                self.events = []
+                self.data = []
+
+            def fileDescriptorReceived(innerSelf, descriptor):
+                self.addCleanup(close, descriptor)
+                innerSelf.events.append(type(descriptor))
+
+            def dataReceived(self, data):
+                self.events.append(bytes)
+                self.data.append(data)
+
+        class VectoredSendFileDescriptor(SendFileDescriptor):
+            def connectionMade(self):
+                self.transport.setVectoredWrites(True)
+                self.transport.sendFileDescriptor(self.fd)
+                self.transport.writeSequence([b"ju", b"nk", b"-" * 100])
+                self.transport.loseConnection()
+
+        cargo = socket()
+        server = VectoredSendFileDescriptor(cargo.fileno(), None)
+        client = RecordEvents()
+
+        runProtocolsWithReactor(self, server, client, self.endpoints)
+
+        self.assertEqual(int, client.events[0])
+        self.assertEqual(b"junk" + b"-" * 100, b"".join(client.data))
+    if sendmsgSkip is not None:
+        test_descriptorDeliveredWithVectoredWrites.skip = sendmsgSkip
+    elif not _PY3:
+        test_descriptorDeliveredWithVectoredWrites.skip = (
+            "Vectored writes require socket.sendmsg.")
+
+
+    def test_descriptorDeliveredToBufferedProtocol(self):
+        """
+        A protocol providing both L{IFileDescriptorReceiver} and
+        L{IBufferedProtocol} receives file descriptors as usual, and normal
+        bytes through the buffers returned by its C{getBuffer}.
+        """
+        @implementer(IFileDescriptorReceiver, IBufferedProtocol)
+        class RecordEvents(ConnectableProtocol):
+
+            def connectionMade(self):
+                ConnectableProtocol.connectionMade(self)
+                self.events = []
+                self.data = []
+
+            def fileDescriptorReceived(innerSelf, descriptor):
+                self.addCleanup(close, descriptor)
+                innerSelf.events.append(type(descriptor))
+
+            def getBuffer(self, sizeHint):
+                self.buffer = bytearray(sizeHint)
+                return self.buffer
+
+            def bufferUpdated(self, nbytes):
+                self.events.append(bytearray)
+                self.data.append(bytes(self.buffer[:nbytes]))
+
+            def dataReceived(self, data):
+                self.events.append(bytes)
+                self.data.append(data)
+
+        cargo = socket()
+        server = SendFileDescriptor(cargo.fileno(), b"junk" + b"-" * 100)
+        client = RecordEvents()
+
+        runProtocolsWithReactor(self, server, client, self.endpoints)
+
+        self.assertEqual(int, client.events[0])
+        self.assertEqual(b"junk" + b"-" * 100, b"".join(client.data))
+        self.assertEqual(set([bytearray]), set(client.events[1:]))
+    if sendmsgSkip is not None:
+        test_descriptorDeliveredToBufferedProtocol.skip = sendmsgSkip
+    elif not _PY3:
+        test_descriptorDeliveredToBufferedProtocol.skip = (
+            "Receiving into a buffer requires socket.recvmsg_into.")
+
+
+
 class UNIXDatagramTestsBuilder(UNIXFamilyMixin, ReactorBuilder):
     """
     Builder defining tests relating to L{IReactorUNIXDatagram}.
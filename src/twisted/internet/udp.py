@@ -53,12 +53,12 @@ else:
 from twisted.internet import base, defer, address
 from twisted.python import log, failure
 from twisted.python._oldstyle import _oldStyle
-from twisted.internet import abstract, error, interfaces
+from twisted.internet import abstract, error, interfaces, _mmsg
 
 
 
 @implementer(
-    interfaces.IListeningPort, interfaces.IUDPTransport,
+    interfaces.IListeningPort, interfaces.IBatchedUDPTransport,
     interfaces.ISystemHandle)
 class Port(base.BasePort):
     """
@@ -67,6 +67,10 @@ class Port(base.BasePort):
     @ivar maxThroughput: Maximum number of bytes read in one event
         loop iteration.
 
+    @ivar batchSize: Maximum number of datagrams passed to the
+        C{datagramsReceived} method of a protocol providing
+        L{interfaces.IBatchedDatagramProtocol} at once.
+
     @ivar addressFamily: L{socket.AF_INET} or L{socket.AF_INET6}, depending on
         whether this port is listening on an IPv4 address or an IPv6 address.
 
@@ -77,14 +81,20 @@ class Port(base.BasePort):
         was created and initialized outside of the reactor and will be used to
         listen for connections (instead of a new socket being created by this
         L{Port}).
+
+    @ivar _receiveBuffers: The L{_mmsg.ReceiveBuffers} used to receive
+        batches of datagrams with C{recvmmsg}, or L{None} if none have been
+        needed yet.
     """
 
     addressFamily = socket.AF_INET
     socketType = socket.SOCK_DGRAM
     maxThroughput = 256 * 1024
+    batchSize = 32
 
     _realPortNumber = None
     _preexistingSocket = None
+    _receiveBuffers = None
 
     def __init__(self, port, proto, interface='', maxPacketSize=8192, reactor=None):
         """
@@ -221,7 +231,13 @@ class Port(base.BasePort):
     def doRead(self):
         """
         Called when my socket is ready for reading.
+
+        If the protocol provides L{interfaces.IBatchedDatagramProtocol}, the
+        datagrams are read in batches and passed to its C{datagramsReceived}
+        method.
         """
+        if interfaces.IBatchedDatagramProtocol.providedBy(self.protocol):
+            return self._doReadBatches()
         read = 0
         while read < self.maxThroughput:
             try:
@@ -251,6 +267,65 @@ class Port(base.BasePort):
                     log.err()
 
 
+    def _doReadBatches(self):
+        """
+        Read datagrams in batches of up to C{batchSize} and pass each batch
+        to the protocol's C{datagramsReceived} method.
+
+        @see: L{doRead}
+        """
+        read = 0
+        while read < self.maxThroughput:
+            datagrams, readError = self._receiveBatch()
+            if datagrams:
+                for data, addr in datagrams:
+                    read += len(data)
+                try:
+                    self.protocol.datagramsReceived(datagrams)
+                except:
+                    log.err()
+            if readError is not None:
+                no = readError.args[0]
+                if no in _sockErrReadIgnore:
+                    return
+                if no in _sockErrReadRefuse:
+                    if self._connectedAddr:
+                        self.protocol.connectionRefused()
+                    return
+                raise readError
+
+
+    def _receiveBatch(self):
+        """
+        Receive up to C{batchSize} datagrams, with a single C{recvmmsg} call
+        if possible or with several C{recvfrom} calls otherwise.
+
+        @return: A two-tuple of a L{list} of C{(data, addr)} tuples and the
+            L{socket.error} which stopped the batch early, or L{None} if it
+            is full.
+        """
+        if _mmsg.available:
+            if self._receiveBuffers is None:
+                self._receiveBuffers = _mmsg.ReceiveBuffers(
+                    self.batchSize, self.maxPacketSize)
+            try:
+                return self._receiveBuffers.receive(self.socket.fileno()), None
+            except socket.error as se:
+                return [], se
+
+        datagrams = []
+        while len(datagrams) < self.batchSize:
+            try:
+                data, addr = self.socket.recvfrom(self.maxPacketSize)
+            except socket.error as se:
+                return datagrams, se
+            if self.addressFamily == socket.AF_INET6:
+                # Remove the flow and scope ID, as in doRead.
+                addr = addr[:2]
+            datagrams.append((data, addr))
+        return datagrams, None
+
+
     def write(self, datagram, addr=None):
         """
         Write a datagram.
@@ -278,22 +353,7 @@ class Port(base.BasePort):
                 else:
                     raise
         else:
-            assert addr != None
-            if (not abstract.isIPAddress(addr[0])
-                    and not abstract.isIPv6Address(addr[0])
-                    and addr[0] != "<broadcast>"):
-                raise error.InvalidAddressError(
-                    addr[0],
-                    "write() only accepts IP addresses, not hostnames")
-            if ((abstract.isIPAddress(addr[0]) or addr[0] == "<broadcast>")
-                    and self.addressFamily == socket.AF_INET6):
-                raise error.InvalidAddressError(
-                    addr[0],
-                    "IPv6 port write() called with IPv4 or broadcast address")
-            if (abstract.isIPv6Address(addr[0])
-                    and self.addressFamily == socket.AF_INET):
-                raise error.InvalidAddressError(
-                    addr[0], "IPv4 port write() called with IPv6 address")
+            self._checkAddress(addr)
             try:
                 return self.socket.sendto(datagram, addr)
             except socket.error as se:
@@ -311,6 +371,104 @@ class Port(base.BasePort):
                     raise
 
 
+    def _checkAddress(self, addr):
+        """
+        Check that a datagram can be sent to an address from this port in
+        non-connected mode.
+
+        @param addr: See L{write}.
+
+        @raise error.InvalidAddressError: If C{addr} is not an IP address of
+            this port's address family.
+        """
+        assert addr != None
+        if (not abstract.isIPAddress(addr[0])
+                and not abstract.isIPv6Address(addr[0])
+                and addr[0] != "<broadcast>"):
+            raise error.InvalidAddressError(
+                addr[0],
+                "write() only accepts IP addresses, not hostnames")
+        if ((abstract.isIPAddress(addr[0]) or addr[0] == "<broadcast>")
+                and self.addressFamily == socket.AF_INET6):
+            raise error.InvalidAddressError(
+                addr[0],
+                "IPv6 port write() called with IPv4 or broadcast address")
+        if (abstract.isIPv6Address(addr[0])
+                and self.addressFamily == socket.AF_INET):
+            raise error.InvalidAddressError(
+                addr[0], "IPv4 port write() called with IPv6 address")
+
+
+    def writeBatch(self, datagrams):
+        """
+        Write several datagrams, with as few C{sendmmsg} calls as possible if
+        they are available or with L{write} otherwise.
+
+        @param datagrams: An iterable of C{(datagram, addr)} tuples, where
+            C{datagram} and C{addr} are as for L{write}.
+
+        @raise error.MessageLengthError: A datagram was too long.  Datagrams
+            before it have been sent, but not those after it.
+        """
+        datagrams = list(datagrams)
+        messages = self._encodeBatch(datagrams)
+        if messages is None:
+            for datagram, addr in datagrams:
+                self.write(datagram, addr)
+            return
+
+        sent = 0
+        while sent < len(messages):
+            try:
+                sent += _mmsg.sendmmsg(
+                    self.socket.fileno(),
+                    messages[sent:sent + _mmsg.MAX_MESSAGES])
+            except socket.error as se:
+                no = se.args[0]
+                if no == EINTR:
+                    continue
+                elif no == EMSGSIZE:
+                    raise error.MessageLengthError("message too long")
+                elif no == ECONNREFUSED:
+                    # As in write, skip the datagram which was refused.
+                    if self._connectedAddr:
+                        self.protocol.connectionRefused()
+                    sent += 1
+                else:
+                    raise
+
+
+    def _encodeBatch(self, datagrams):
+        """
+        Check the destinations of some datagrams and prepare them for
+        L{_mmsg.sendmmsg}.
+
+        @param datagrams: See L{writeBatch}.
+
+        @return: A L{list} of C{(data, name)} tuples to pass to
+            L{_mmsg.sendmmsg}, or L{None} if the datagrams have to be sent
+            with L{write} instead.
+        """
+        if not _mmsg.available:
+            return None
+        messages = []
+        names = {}
+        for datagram, addr in datagrams:
+            if self._connectedAddr:
+                assert addr in (None, self._connectedAddr)
+                name = None
+            else:
+                self._checkAddress(addr)
+                name = names.get(addr)
+                if name is None:
+                    name = names[addr] = _mmsg.encodeAddress(
+                        self.addressFamily, addr)
+                    if name is None:
+                        return None
+            messages.append((bytes(datagram), name))
+        return messages
+
+
     def writeSequence(self, seq, addr):
         """
         Write a datagram constructed from an iterable of L{bytes}.
@@ -366,6 +524,7 @@ class Port(base.BasePort):
         """
         log.msg('(UDP Port %s Closed)' % self._realPortNumber)
         self._realPortNumber = None
+        self._receiveBuffers = None
         self.maxThroughput = -1
         base.BasePort.connectionLost(self, reason)
         self.protocol.doStop()
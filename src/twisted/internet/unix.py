@@ -28,7 +28,7 @@ from twisted.internet import protocol, address
 from twisted.python import lockfile, log, reflect, failure
 from twisted.python.filepath import _coerceToFilesystemEncoding
 from twisted.python.util import untilConcludes
-from twisted.python.compat import lazyByteSlice
+from twisted.python.compat import lazyByteSlice, _PY3
 
 
 try:
@@ -152,6 +152,18 @@ class _SendmsgMixin(object):
             return result
 
 
+    def writeSomeVectors(self, vectors):
+        """
+        Send as much of C{vectors} as possible.  Also send any pending file
+        descriptors.
+        """
+        if self._sendmsgQueue:
+            # Each file descriptor goes out with a single byte of regular
+            # data, which writeSomeData knows how to do.
+            return self.writeSomeData(b"".join(vectors))
+        return self._writeSomeDataBase.writeSomeVectors(self, vectors)
+
+
     def doRead(self):
         """
         Calls {IProtocol.dataReceived} with all available data and
@@ -162,12 +174,25 @@ class _SendmsgMixin(object):
         dispatches the data to protocol callbacks to be handled.  If the
         connection is not lost through an error in the underlying recvmsg(),
         this function will return the result of the dataReceived call.
+
+        On Python 3, data for a protocol providing
+        L{interfaces.IBufferedProtocol} is read directly into the buffer it
+        provides.
         """
+        protocol = self.protocol
         try:
-            data, ancillary, flags = untilConcludes(
-                sendmsg.recvmsg, self.socket, self.bufferSize)
+            if _PY3 and interfaces.IBufferedProtocol.providedBy(protocol):
+                buf = protocol.getBuffer(self.bufferSize)
+                count, ancillary, flags = untilConcludes(
+                    self.socket.recvmsg_into, [buf],
+                    socket.CMSG_SPACE(4096))[:3]
+            else:
+                protocol = None
+                data, ancillary, flags = untilConcludes(
+                    sendmsg.recvmsg, self.socket, self.bufferSize)
         except socket.error as se:
             if se.args[0] == EWOULDBLOCK:
+                self._readBlocked = True
                 return
             else:
                 return main.CONNECTION_LOST
@@ -188,6 +213,11 @@ class _SendmsgMixin(object):
                     cmsgLevel=cmsgLevel, cmsgType=cmsgType,
                 )
 
+        if protocol is not None:
+            if not count:
+                return main.CONNECTION_DONE
+            protocol.bufferUpdated(count)
+            return
         return self._dataReceived(data)
 
 
@@ -8,6 +8,7 @@ Authoritative resolvers.
 
 from __future__ import absolute_import, division
 
+import copy
 import os
 import time
 
@@ -56,6 +57,157 @@ def getSerial(filename='/tmp/twisted-names.serial'):
 
 
 
+def _ancestors(name, apex):
+    """
+    Generate the names above C{name} in a zone, up to and including the zone's
+    own name.
+
+    @param name: A lower-cased name.
+    @type name: L{bytes}
+
+    @param apex: The lower-cased name of the zone.
+    @type apex: L{bytes}
+
+    @return: A generator of the ancestors of C{name}, nearest first, or of
+        nothing if C{name} is not below C{apex}.
+    """
+    separator = b'.' if isinstance(name, bytes) else '.'
+    if not name.endswith(separator + apex):
+        return
+    while name != apex:
+        name = name[name.index(separator) + 1:]
+        yield name
+
+
+
+class _ZoneIndex(object):
+    """
+    An index of the records of a zone, which L{FileAuthority} answers queries
+    from without scanning records or walking the zone.
+
+    @ivar records: The C{records} of the L{FileAuthority} indexed.
+    @ivar soa: The C{soa} of the L{FileAuthority} indexed.
+
+    @ivar apex: The lower-cased name of the zone.
+
+    @ivar rrsets: A L{dict} mapping owners with records of more than one type
+        to L{dict}s mapping each type to a L{tuple} of the owner's records of
+        that type.  The records of other owners are all of one type, and are
+        used from C{records}.
+
+    @ivar emptyNonTerminals: A L{set} of the names in the zone with no records
+        of their own but with names below them which have.
+
+    @ivar cuts: A L{dict} mapping the names of delegated child zones to their
+        I{NS} records.
+
+    @ivar belowCut: A L{dict} mapping names with records below a delegation,
+        such as the addresses of its nameservers, to the name of the highest
+        delegation above them.
+
+    @ivar wildcards: A L{set} of the names which have a wildcard child, such
+        as C{example.com} for C{*.example.com}.
+    """
+    def __init__(self, soa, records):
+        """
+        @param soa: See L{FileAuthority.soa}.
+
+        @param records: See L{FileAuthority.records}.
+        """
+        self.soa = soa
+        self.records = records
+        self.apex = apex = soa[0].lower()
+        self.rrsets = rrsets = {}
+        self.emptyNonTerminals = emptyNonTerminals = set()
+        self.cuts = cuts = {}
+        self.belowCut = belowCut = {}
+        self.wildcards = wildcards = set()
+
+        wildcard = b'*.' if isinstance(apex, bytes) else '*.'
+        for owner, ownerRecords in records.items():
+            if not ownerRecords:
+                continue
+            if len(ownerRecords) > 1:
+                types = set(record.TYPE for record in ownerRecords)
+                if len(types) > 1:
+                    byType = dict((type, []) for type in types)
+                    for record in ownerRecords:
+                        byType[record.TYPE].append(record)
+                    rrsets[owner] = dict(
+                        (type, tuple(typeRecords))
+                        for (type, typeRecords) in byType.items())
+            if owner != apex:
+                nameservers = self.rrset(owner, dns.NS)
+                if nameservers:
+                    cuts[owner] = tuple(nameservers)
+            for ancestor in _ancestors(owner, apex):
+                if ancestor in emptyNonTerminals:
+                    break
+                if not records.get(ancestor):
+                    emptyNonTerminals.add(ancestor)
+            if owner.startswith(wildcard):
+                wildcards.add(owner[2:])
+
+        if cuts:
+            for owner in records:
+                cut = None
+                for ancestor in _ancestors(owner, apex):
+                    if ancestor in cuts:
+                        cut = ancestor
+                if cut is not None:
+                    belowCut[owner] = cut
+
+
+    def rrset(self, owner, type):
+        """
+        Get the records of one type a name has.
+
+        @param owner: The lower-cased name.
+        @param type: The type of records.
+        @type type: L{int}
+
+        @return: A sequence of the records.
+        """
+        byType = self.rrsets.get(owner)
+        if byType is not None:
+            return byType.get(type, ())
+        ownerRecords = self.records.get(owner)
+        if ownerRecords and ownerRecords[0].TYPE == type:
+            return ownerRecords
+        return ()
+
+
+    def exists(self, name):
+        """
+        @param name: A lower-cased name.
+
+        @return: Whether C{name} has records or names below it which have.
+        """
+        return bool(self.records.get(name)) or name in self.emptyNonTerminals
+
+
+    def closest(self, name):
+        """
+        Find the delegation above a name which is not in the zone and the
+        closest existing name above it.
+
+        @param name: A lower-cased name below the apex.
+        @type name: L{bytes}
+
+        @return: A two-tuple of the name of the highest delegation above
+            C{name} or L{None}, and the nearest existing ancestor of C{name}
+            or L{None}.
+        """
+        cut = encloser = None
+        for ancestor in _ancestors(name, self.apex):
+            if ancestor in self.cuts:
+                cut = ancestor
+            if encloser is None and self.exists(ancestor):
+                encloser = ancestor
+        return cut, encloser
+
+
+
 class FileAuthority(common.ResolverBase):
     """
     An Authority that is loaded from a file.
@@ -68,6 +220,25 @@ class FileAuthority(common.ResolverBase):
 
     @ivar soa: A 2-tuple containing the SOA domain name as a L{bytes} and a
         L{dns.Record_SOA}.
+
+    @ivar responseCacheSize: The number of encoded responses kept in
+        C{_responses}.  When it is full, it is emptied.
+
+    @ivar _responses: A L{dict} mapping the keys given to L{_cacheResponse}
+        to encoded response messages, for a server to send again instead of
+        looking up and encoding the same records.  It is emptied whenever
+        C{records} is replaced, as loading the zone again or a completed zone
+        transfer does.
+
+    @ivar _responsesRecords: The C{records} the responses in C{_responses}
+        were made from.
+
+    @ivar records: A L{dict} mapping lower-cased owner names to L{list}s of
+        their records.  It is replaced, not changed, when the zone changes.
+
+    @ivar _index: The L{_ZoneIndex} of C{records}.  It is made as soon as a
+        zone is loaded, so that the first query does not wait for it, or when
+        it is first needed after C{records} or C{soa} is otherwise replaced.
     """
     # See https://twistedmatrix.com/trac/ticket/6650
     _ADDITIONAL_PROCESSING_TYPES = (dns.CNAME, dns.MX, dns.NS)
@@ -75,13 +246,59 @@ class FileAuthority(common.ResolverBase):
 
     soa = None
     records = None
+    responseCacheSize = 10000
+    _responses = None
+    _responsesRecords = None
+    _index = None
+    _filename = None
 
     def __init__(self, filename):
         common.ResolverBase.__init__(self)
+        self._filename = filename
         self.loadFile(filename)
+        self._indexLoaded()
         self._cache = {}
 
 
+    def reload(self):
+        """
+        Load the file this authority was created with again.
+
+        The file is loaded and indexed before the zone is replaced, so queries
+        are answered from the previous zone until the new one is complete,
+        and the previous zone is kept if the file cannot be loaded.
+        """
+        loaded = copy.copy(self)
+        # __setstate__ keeps the state it is given, which is our own.
+        loaded.__dict__ = dict(self.__dict__)
+        loaded.loadFile(self._filename)
+        loaded._zoneIndex()
+        self.__dict__.update(loaded.__dict__)
+
+
+    def _zoneIndex(self):
+        """
+        Get the index of this authority's records.
+
+        @rtype: L{_ZoneIndex}
+        """
+        index = self._index
+        if (index is None or index.records is not self.records or
+                index.soa is not self.soa):
+            index = self._index = _ZoneIndex(self.soa, self.records)
+        return index
+
+
+    def _indexLoaded(self):
+        """
+        Index the zone which has just been loaded, if it has an I{SOA} record,
+        rather than leaving it to the first query, which would have to wait
+        for the whole zone to be indexed.
+        """
+        if self.soa is not None and self.records is not None:
+            self._zoneIndex()
+
+
     def __setstate__(self, state):
         self.__dict__ = state
 
@@ -117,6 +334,59 @@ class FileAuthority(common.ResolverBase):
                             rec.ttl or ttl, rec, auth=True)
 
 
+    def _answersQuery(self, query):
+        """
+        Determine whether this authority answers C{query} itself from its
+        records, with records or with L{dns.AuthoritativeDomainError}, rather
+        than leaving it to the next resolver by failing with
+        L{error.DomainError}.
+
+        @param query: The query.
+        @type query: L{dns.Query}
+
+        @rtype: L{bool}
+        """
+        if (not self.soa or not self.records or query.type == dns.AXFR or
+                query.type not in self.typeToMethod):
+            return False
+        name = query.name.name
+        return (name.lower() in self.records or
+                dns._isSubdomainOf(name, self.soa[0]))
+
+
+    def _cachedResponse(self, key):
+        """
+        Find an encoded response stored by L{_cacheResponse}.
+
+        @param key: The key the response was stored with.
+
+        @return: The encoded response L{bytes}, or L{None} if none is stored
+            for C{key} or the zone has changed since.
+        """
+        if self._responsesRecords is not self.records:
+            self._responses = {}
+            self._responsesRecords = self.records
+        return self._responses.get(key)
+
+
+    def _cacheResponse(self, key, response):
+        """
+        Store an encoded response made from this authority's records, to be
+        found by L{_cachedResponse} until the zone changes.
+
+        @param key: A key which identifies the queries C{response} answers.
+
+        @param response: The encoded response.
+        @type response: L{bytes}
+        """
+        if self._responsesRecords is not self.records:
+            self._responses = {}
+            self._responsesRecords = self.records
+        elif len(self._responses) >= self.responseCacheSize:
+            self._responses.clear()
+        self._responses[key] = response
+
+
     def _lookup(self, name, cls, type, timeout=None):
         """
         Determine a response to a particular DNS query.
@@ -141,71 +411,40 @@ class FileAuthority(common.ResolverBase):
             I{additional} sections of a DNS response) or with a L{Failure} if
             there is a problem processing the query.
         """
-        cnames = []
-        results = []
-        authority = []
-        additional = []
         default_ttl = max(self.soa[1].minimum, self.soa[1].expire)
 
-        domain_records = self.records.get(name.lower())
+        owner = name.lower()
+        domain_records = self.records.get(owner)
 
         if domain_records:
-            for record in domain_records:
-                if record.ttl is not None:
-                    ttl = record.ttl
-                else:
-                    ttl = default_ttl
-
-                if (record.TYPE == dns.NS and
-                        name.lower() != self.soa[0].lower()):
-                    # NS record belong to a child zone: this is a referral.  As
-                    # NS records are authoritative in the child zone, ours here
-                    # are not.  RFC 2181, section 6.1.
-                    authority.append(
-                        dns.RRHeader(
-                            name, record.TYPE, dns.IN, ttl, record, auth=False
-                        )
-                    )
-                elif record.TYPE == type or type == dns.ALL_RECORDS:
-                    results.append(
-                        dns.RRHeader(
-                            name, record.TYPE, dns.IN, ttl, record, auth=True
-                        )
-                    )
-                if record.TYPE == dns.CNAME:
-                    cnames.append(
-                        dns.RRHeader(
-                            name, record.TYPE, dns.IN, ttl, record, auth=True
-                        )
-                    )
-            if not results:
-                results = cnames
-
-            # Sort of https://tools.ietf.org/html/rfc1034#section-4.3.2 .
-            # See https://twistedmatrix.com/trac/ticket/6732
-            additionalInformation = self._additionalRecords(
-                results, authority, default_ttl)
-            if cnames:
-                results.extend(additionalInformation)
-            else:
-                additional.extend(additionalInformation)
-
-            if not results and not authority:
-                # Empty response. Include SOA record to allow clients to cache
-                # this response. RFC 1034, sections 3.7 and 4.3.4, and RFC 2181
-                # section 7.1.
-                authority.append(
-                    dns.RRHeader(
-                        self.soa[0], dns.SOA, dns.IN, ttl, self.soa[1],
-                        auth=True
-                    )
-                )
-            return defer.succeed((results, authority, additional))
+            index = self._zoneIndex()
+            cut = index.belowCut and index.belowCut.get(owner)
+            if cut:
+                # The name is in a delegated child zone, for which the
+                # records here are only glue.
+                return defer.succeed(self._referral(cut, index, default_ttl))
+            return defer.succeed(self._answer(
+                name, owner, type, index, default_ttl))
         else:
             if dns._isSubdomainOf(name, self.soa[0]):
-                # We may be the authority and we didn't find it.
-                # XXX: The QNAME may also be in a delegated child zone. See
-                # #6581 and #6580
+                index = self._zoneIndex()
+                cut, encloser = index.closest(owner)
+                if cut is not None:
+                    return defer.succeed(
+                        self._referral(cut, index, default_ttl))
+                if owner in index.emptyNonTerminals:
+                    # An empty non-terminal: the name exists, with no
+                    # records.  RFC 8020.
+                    return defer.succeed(([], [
+                        dns.RRHeader(
+                            self.soa[0], dns.SOA, dns.IN, default_ttl,
+                            self.soa[1], auth=True)], []))
+                if encloser in index.wildcards:
+                    # RFC 4592, section 3.3.1.
+                    wildcard = b'*.' if isinstance(encloser, bytes) else '*.'
+                    return defer.succeed(self._answer(
+                        name, wildcard + encloser, type, index, default_ttl))
+                # We are the authority and the name does not exist.
                 return defer.fail(
                     failure.Failure(dns.AuthoritativeDomainError(name))
                 )
@@ -216,6 +455,124 @@ class FileAuthority(common.ResolverBase):
                 return defer.fail(failure.Failure(error.DomainError(name)))
 
 
+    def _answer(self, name, owner, type, index, default_ttl):
+        """
+        Answer a query from the records of a name in the zone.
+
+        @param name: The name queried.
+        @type name: L{bytes}
+
+        @param owner: The lower-cased name whose records answer the query:
+            C{name}, or the wildcard matching it.
+        @type owner: L{bytes}
+
+        @param type: The type of records queried.
+        @type type: L{int}
+
+        @param index: The L{_ZoneIndex} of the zone.
+
+        @param default_ttl: The TTL of records which do not specify one.
+
+        @return: A L{tuple} of the I{answer}, I{authority} and I{additional}
+            sections of the response.
+        """
+        ownerRecords = self.records[owner]
+        byType = index.rrsets.get(owner)
+        if byType is not None:
+            matched = byType.get(type, ())
+            cnames = byType.get(dns.CNAME, ())
+        else:
+            # All of the owner's records are of one type.
+            ownerType = ownerRecords[0].TYPE
+            matched = ownerRecords if ownerType == type else ()
+            cnames = ownerRecords if ownerType == dns.CNAME else ()
+        if type == dns.ALL_RECORDS:
+            matched = ownerRecords
+
+        if index.cuts and owner in index.cuts:
+            # NS record belong to a child zone: this is a referral.  As NS
+            # records are authoritative in the child zone, ours here are not.
+            # RFC 2181, section 6.1.
+            authority = [
+                dns.RRHeader(
+                    name, record.TYPE, dns.IN,
+                    self._ttl(record, default_ttl), record, auth=False)
+                for record in index.cuts[owner]]
+            matched = [
+                record for record in matched if record.TYPE != dns.NS]
+        else:
+            authority = []
+
+        results = [
+            dns.RRHeader(
+                name, record.TYPE, dns.IN,
+                default_ttl if record.ttl is None else record.ttl,
+                record, auth=True)
+            for record in matched]
+        if cnames:
+            cnames = [
+                dns.RRHeader(
+                    name, record.TYPE, dns.IN,
+                    default_ttl if record.ttl is None else record.ttl,
+                    record, auth=True)
+                for record in cnames]
+        if not results:
+            results = list(cnames)
+
+        # Sort of https://tools.ietf.org/html/rfc1034#section-4.3.2 .
+        # See https://twistedmatrix.com/trac/ticket/6732
+        additionalInformation = self._additionalRecords(
+            results, authority, default_ttl)
+        additional = []
+        if cnames:
+            results.extend(additionalInformation)
+        else:
+            additional.extend(additionalInformation)
+
+        if not results and not authority:
+            # Empty response. Include SOA record to allow clients to cache
+            # this response. RFC 1034, sections 3.7 and 4.3.4, and RFC 2181
+            # section 7.1.
+            authority.append(
+                dns.RRHeader(
+                    self.soa[0], dns.SOA, dns.IN,
+                    self._ttl(ownerRecords[-1], default_ttl), self.soa[1],
+                    auth=True
+                )
+            )
+        return results, authority, additional
+
+
+    def _referral(self, cut, index, default_ttl):
+        """
+        Refer a query for a name in a delegated child zone to the child
+        zone's nameservers.
+
+        @param cut: The name of the child zone.
+        @param index: The L{_ZoneIndex} of the zone.
+        @param default_ttl: The TTL of records which do not specify one.
+
+        @return: A L{tuple} of the I{answer}, I{authority} and I{additional}
+            sections of the response.
+        """
+        authority = [
+            dns.RRHeader(
+                cut, record.TYPE, dns.IN, self._ttl(record, default_ttl),
+                record, auth=False)
+            for record in index.cuts[cut]]
+        return [], authority, list(
+            self._additionalRecords([], authority, default_ttl))
+
+
+    def _ttl(self, record, default_ttl):
+        """
+        @return: The TTL of C{record}, or C{default_ttl} if it has none.
+        """
+        if record.ttl is not None:
+            return record.ttl
+        return default_ttl
+
+
     def lookupZone(self, name, timeout=10):
         if self.soa[0].lower() == name.lower():
             # Wee hee hee hooo yea
@@ -273,6 +630,7 @@ class PySourceAuthority(FileAuthority):
             if isinstance(rr[1], dns.Record_SOA):
                 self.soa = rr
             self.records.setdefault(rr[0].lower(), []).append(rr[1])
+        self._indexLoaded()
 
 
     def wrapRecord(self, type):
@@ -290,6 +648,19 @@ class PySourceAuthority(FileAuthority):
 
 
 
+if _PY3:
+    _QUERY_CLASSES = frozenset(
+        qc.encode("ascii") for qc in dns.QUERY_CLASSES.values())
+    _QUERY_TYPES = frozenset(
+        qt.encode("ascii") for qt in dns.QUERY_TYPES.values())
+else:
+    _QUERY_CLASSES = frozenset(dns.QUERY_CLASSES.values())
+    _QUERY_TYPES = frozenset(dns.QUERY_TYPES.values())
+
+_MARKERS = _QUERY_CLASSES | _QUERY_TYPES
+
+
+
 class BindAuthority(FileAuthority):
     """
     An Authority that loads U{BIND zone files
@@ -309,10 +680,12 @@ class BindAuthority(FileAuthority):
         # though.
         self.origin = nativeString(fp.basename() + b'.')
 
-        lines = fp.getContent().splitlines(True)
-        lines = self.stripComments(lines)
-        lines = self.collapseContinuations(lines)
-        self.parseLines(lines)
+        with fp.open() as f:
+            lines = (part for line in f for part in line.splitlines(True))
+            lines = self.stripComments(lines)
+            lines = self.collapseContinuations(lines)
+            self.parseLines(lines)
+        self._indexLoaded()
 
 
     def stripComments(self, lines):
@@ -325,9 +698,9 @@ class BindAuthority(FileAuthority):
         @return: C{lines} sans comments.
         """
         return (
-            a.find(b';') == -1 and a or a[:a.find(b';')] for a in [
+            a.find(b';') == -1 and a or a[:a.find(b';')] for a in (
                 b.strip() for b in lines
-            ]
+            )
         )
 
 
@@ -338,24 +711,32 @@ class BindAuthority(FileAuthority):
         @param lines: lines to work on
         @type lines: iterable of L{bytes}
 
-        @return: iterable of continuous lines
+        @return: A generator of the words of each statement, as it is
+            completed.
         """
-        l = []
+        statement = None
         state = 0
         for line in lines:
             if state == 0:
+                if statement:
+                    words = statement.split()
+                    if words:
+                        yield words
                 if line.find(b'(') == -1:
-                    l.append(line)
+                    statement = line
                 else:
-                    l.append(line[:line.find(b'(')])
+                    statement = line[:line.find(b'(')]
                     state = 1
             else:
                 if line.find(b')') != -1:
-                    l[-1] += b' ' + line[:line.find(b')')]
+                    statement += b' ' + line[:line.find(b')')]
                     state = 0
                 else:
-                    l[-1] += b' ' + line
-        return filter(None, (line.split() for line in l))
+                    statement += b' ' + line
+        if statement:
+            words = statement.split()
+            if words:
+                yield words
 
 
     def parseLines(self, lines):
@@ -468,18 +849,8 @@ class BindAuthority(FileAuthority):
         @param line: zone file line to parse; split by word
         @type line: L{list} of L{bytes}
         """
-        if _PY3:
-            queryClasses = set(
-                qc.encode("ascii") for qc in dns.QUERY_CLASSES.values()
-            )
-            queryTypes = set(
-                qt.encode("ascii") for qt in dns.QUERY_TYPES.values()
-            )
-        else:
-            queryClasses = set(dns.QUERY_CLASSES.values())
-            queryTypes = set(dns.QUERY_TYPES.values())
-
-        markers = queryClasses | queryTypes
+        queryClasses = _QUERY_CLASSES
+        markers = _MARKERS
 
         cls = b'IN'
         owner = origin
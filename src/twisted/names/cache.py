@@ -8,7 +8,11 @@ An in-memory caching resolver.
 
 from __future__ import division, absolute_import
 
-from twisted.names import dns, common
+import heapq
+import itertools
+from collections import OrderedDict
+
+from twisted.names import dns, common, error
 from twisted.python import failure, log
 from twisted.internet import defer
 
@@ -18,16 +22,122 @@ class CacheResolver(common.ResolverBase):
     """
     A resolver that serves records from a local, memory cache.
 
+    Entries are kept until the smallest TTL of their records runs out,
+    except that names which do not exist and empty answers are kept for the
+    negative caching TTL of the I{SOA} record which came with them (RFC
+    2308).  When more than C{maxEntries} entries are kept, the least
+    recently used is evicted.  Expired entries are all removed by a single
+    timer, set for the next entry to expire.
+
+    If a C{resolver} is given, entries are refreshed from it: a popular
+    entry is looked up again shortly before it expires, and an expired
+    entry which could not be refreshed can be served for another C{staleTTL}
+    seconds (RFC 8767).
+
+    @ivar cache: An L{OrderedDict} of the entries, least recently used
+        first.  Each value is a C{(when, payload)} L{tuple} of the time it
+        was cached and a 3-tuple of lists of L{dns.RRHeader} records.
+        Results are keyed on their L{dns.Query}; names which do not exist
+        are keyed on a C{(name, cls)} L{tuple} of the lower-cased name and
+        the class, and their payload holds the authority records which came
+        with the error.
+
+    @ivar maxEntries: The largest number of entries in C{cache}, or L{None}
+        for no limit.
+
+    @ivar resolver: An L{IResolver} provider to refresh entries from, or
+        L{None}.
+
+    @ivar staleTTL: The number of seconds after it expires for which an entry
+        is served if it cannot be refreshed from C{resolver}.
+
+    @ivar staleAnswerTTL: The TTL given to records of an expired entry when
+        they are served.
+
+    @ivar prefetchHits: The number of times an entry must be served before
+        it is refreshed from C{resolver} ahead of expiring.
+
+    @ivar prefetchFraction: The fraction of its TTL which must be left for an
+        entry to be refreshed ahead of expiring.
+
+    @ivar hits: The number of lookups answered from C{cache}.
+
+    @ivar misses: The number of lookups which found nothing to answer with.
+
+    @ivar evictions: The number of entries evicted to keep within
+        C{maxEntries}.
+
+    @ivar prefetches: The number of lookups made to refresh an entry ahead of
+        expiring.
+
     @ivar _reactor: A provider of L{interfaces.IReactorTime}.
+
+    @ivar _ttls: A L{dict} mapping each key in C{cache} to the TTL of its
+        entry.
+
+    @ivar _hitCounts: A L{dict} mapping each key in C{cache} to the number of
+        times its entry has been served.
+
+    @ivar _results: A L{dict} mapping keys in C{cache} to a C{(age,
+        result)} L{tuple} of the records with TTLs adjusted for an entry of
+        that age in whole seconds, to serve again while the age stays the
+        same.
+
+    @ivar _expiries: A heap of C{(when, counter, key)} tuples giving the
+        times at which entries may be removed from C{cache}.
+
+    @ivar _counter: An iterator of integers which keep the order of
+        C{_expiries} from depending on the keys.
+
+    @ivar _sweepCall: The L{IDelayedCall} which will remove expired entries,
+        or L{None}.
+
+    @ivar _prefetching: The set of keys being refreshed ahead of expiring.
     """
     cache = None
+    maxEntries = None
+    resolver = None
+    staleTTL = 0
+    staleAnswerTTL = 30
+    prefetchHits = 3
+    prefetchFraction = 0.1
+
+    hits = misses = evictions = prefetches = 0
+
+    _sweepCall = None
+
+    def __init__(self, cache=None, verbose=0, reactor=None, maxEntries=10000,
+                 resolver=None, staleTTL=0):
+        """
+        @param cache: Entries to start with: a L{dict} mapping L{dns.Query}
+            instances to C{(when, payload)} tuples, as they would be given to
+            L{cacheResult}.
+
+        @param verbose: Log hits if more than C{0}, and misses and additions
+            too if more than C{1}.
+
+        @param reactor: A provider of L{interfaces.IReactorTime}, or L{None}
+            to use the global reactor.
+
+        @param maxEntries: See C{maxEntries}.
+
+        @param resolver: See C{resolver}.
 
-    def __init__(self, cache=None, verbose=0, reactor=None):
+        @param staleTTL: See C{staleTTL}.
+        """
         common.ResolverBase.__init__(self)
 
-        self.cache = {}
+        self.cache = OrderedDict()
         self.verbose = verbose
-        self.cancel = {}
+        self.maxEntries = maxEntries
+        self.resolver = resolver
+        self.staleTTL = staleTTL
+        self._ttls = {}
+        self._hitCounts = {}
+        self._results = {}
+        self._expiries = []
+        self._counter = itertools.count()
+        self._prefetching = set()
         if reactor is None:
             from twisted.internet import reactor
         self._reactor = reactor
@@ -39,49 +149,162 @@ class CacheResolver(common.ResolverBase):
 
     def __setstate__(self, state):
         self.__dict__ = state
-
-        now = self._reactor.seconds()
-        for (k, (when, (ans, add, ns))) in self.cache.items():
-            diff = now - when
-            for rec in ans + add + ns:
-                if rec.ttl < diff:
-                    del self.cache[k]
-                    break
+        self._sweep()
 
 
     def __getstate__(self):
-        for c in self.cancel.values():
-            c.cancel()
-        self.cancel.clear()
+        if self._sweepCall is not None and self._sweepCall.active():
+            self._sweepCall.cancel()
+        self._sweepCall = None
+        self._prefetching.clear()
         return self.__dict__
 
 
     def _lookup(self, name, cls, type, timeout):
         now = self._reactor.seconds()
+
+        nameError = self.cache.get((name.lower(), cls))
+        if nameError is not None:
+            key = (name.lower(), cls)
+            if int(now - nameError[0]) <= self._ttls[key]:
+                self.hits += 1
+                self._used(key)
+                if self.verbose:
+                    log.msg('Cache hit for nonexistent ' + repr(name))
+                return defer.fail(failure.Failure(
+                    dns.AuthoritativeDomainError(name)))
+
         q = dns.Query(name, type, cls)
         try:
-            when, (ans, auth, add) = self.cache[q]
+            when, payload = self.cache[q]
         except KeyError:
+            self.misses += 1
             if self.verbose > 1:
                 log.msg('Cache miss for ' + repr(name))
             return defer.fail(failure.Failure(dns.DomainError(name)))
-        else:
+
+        age = int(now - when)
+        ttl = self._ttls[q]
+        if age > ttl:
+            if (self.resolver is not None and
+                    now < when + ttl + self.staleTTL):
+                return self._refresh(q, timeout, payload)
+            self.misses += 1
+            if self.verbose > 1:
+                log.msg('Cache miss for expired ' + repr(name))
+            return defer.fail(failure.Failure(dns.DomainError(name)))
+
+        self.hits += 1
+        hitCount = self._used(q)
+        if self.verbose:
+            log.msg('Cache hit for ' + repr(name))
+        if (self.resolver is not None and hitCount >= self.prefetchHits and
+                ttl - age <= ttl * self.prefetchFraction and
+                q not in self._prefetching):
+            self._prefetch(q)
+
+        memo = self._results.get(q)
+        if memo is None or memo[0] != age:
+            memo = (age, tuple(
+                [dns.RRHeader(r.name.name, r.type, r.cls, r.ttl - age,
+                              r.payload) for r in section]
+                for section in payload))
+            self._results[q] = memo
+        return defer.succeed(tuple(list(section) for section in memo[1]))
+
+
+    def _used(self, key):
+        """
+        Make C{key} the most recently used entry and count the use.
+
+        @return: The number of times the entry has been used.
+        @rtype: L{int}
+        """
+        self.cache[key] = self.cache.pop(key)
+        self._hitCounts[key] += 1
+        return self._hitCounts[key]
+
+
+    def _refresh(self, query, timeout, stale):
+        """
+        Look up an expired entry again with C{resolver}, serving its stale
+        records if that fails for any reason other than the name not
+        existing.
+
+        @param query: The key of the expired entry.
+        @type query: L{dns.Query}
+
+        @param timeout: The timeout to look it up with.
+
+        @param stale: The payload of the expired entry.
+
+        @return: A L{Deferred} which fires with the records to serve.
+        """
+        def cbRefreshed(result):
+            if any(result):
+                self.cacheResult(query, result)
+            return result
+
+        def ebRefreshed(reason):
+            if reason.check(error.DNSNameError):
+                self._cacheNameErrorFailure(query, reason)
+                return reason
+            self.hits += 1
             if self.verbose:
-                log.msg('Cache hit for ' + repr(name))
-            diff = now - when
-
-            try:
-                result = (
-                    [dns.RRHeader(r.name.name, r.type, r.cls, r.ttl - diff,
-                                  r.payload) for r in ans],
-                    [dns.RRHeader(r.name.name, r.type, r.cls, r.ttl - diff,
-                                  r.payload) for r in auth],
-                    [dns.RRHeader(r.name.name, r.type, r.cls, r.ttl - diff,
-                                  r.payload) for r in add])
-            except ValueError:
-                return defer.fail(failure.Failure(dns.DomainError(name)))
-            else:
-                return defer.succeed(result)
+                log.msg('Serving stale records for ' + repr(query.name.name))
+            return tuple(
+                [dns.RRHeader(r.name.name, r.type, r.cls,
+                              min(r.ttl, self.staleAnswerTTL), r.payload)
+                 for r in section]
+                for section in stale)
+
+        return self.resolver.query(query, timeout).addCallbacks(
+            cbRefreshed, ebRefreshed)
+
+
+    def _prefetch(self, query):
+        """
+        Look up a popular entry again with C{resolver} before it expires, and
+        replace it with the result.
+
+        @param query: The key of the entry.
+        @type query: L{dns.Query}
+        """
+        self.prefetches += 1
+        self._prefetching.add(query)
+
+        def cbPrefetched(result):
+            if any(result):
+                self.cacheResult(query, result)
+
+        def ebPrefetched(reason):
+            if reason.check(error.DNSNameError):
+                self._cacheNameErrorFailure(query, reason)
+            elif self.verbose > 1:
+                log.msg('Prefetching %r failed: %s' % (
+                    query, reason.getErrorMessage()))
+
+        def done(ignored):
+            self._prefetching.discard(query)
+
+        self.resolver.query(query).addCallbacks(
+            cbPrefetched, ebPrefetched).addBoth(done)
+
+
+    def _cacheNameErrorFailure(self, query, reason):
+        """
+        Cache the name error C{reason} if it carries the response it came
+        from.
+
+        @param query: The query which failed.
+        @type query: L{dns.Query}
+
+        @param reason: A L{failure.Failure} wrapping an
+            L{error.DNSNameError}.
+        """
+        args = reason.value.args
+        if args and isinstance(args[0], dns.Message):
+            self.cacheNameError(query, args[0].authority)
 
 
     def lookupAllRecords(self, name, timeout = None):
@@ -96,6 +319,8 @@ class CacheResolver(common.ResolverBase):
 
         @param payload: a 3-tuple of lists of L{dns.RRHeader} records, the
             matching result of the query (answers, authority and additional).
+            If there are no answers, an I{SOA} record in the authority
+            section gives the negative caching TTL.
 
         @param cacheTime: The time (seconds since epoch) at which the entry is
             considered to have been added to the cache. If L{None} is given,
@@ -104,22 +329,149 @@ class CacheResolver(common.ResolverBase):
         if self.verbose > 1:
             log.msg('Adding %r to cache' % query)
 
-        self.cache[query] = (cacheTime or self._reactor.seconds(), payload)
+        ttls = []
+        for section in payload:
+            for r in section:
+                ttls.append(r.ttl)
+        if not payload[0]:
+            ttls.extend(self._negativeTTLs(payload[1]))
+        self._addEntry(query, payload, cacheTime, min(ttls or [0]))
+
+        # A result for the name supersedes an earlier name error.
+        nameErrorKey = (query.name.name.lower(), query.cls)
+        if nameErrorKey in self.cache:
+            self._removeEntry(nameErrorKey)
+
+
+    def cacheNameError(self, query, authority, cacheTime=None):
+        """
+        Cache the fact that the name queried does not exist, as given by a
+        response with the I{NXDOMAIN} response code, for the negative
+        caching TTL of the I{SOA} record in its authority section.  Until it
+        expires, lookups of any type for the name fail with
+        L{dns.AuthoritativeDomainError}.
+
+        A response without an I{SOA} record is not cached (RFC 2308, section
+        5).
+
+        @param query: The L{dns.Query} the response was to.
+
+        @param authority: The L{list} of L{dns.RRHeader} records in the
+            authority section of the response.
+
+        @param cacheTime: The time (seconds since epoch) at which the entry is
+            considered to have been added to the cache. If L{None} is given,
+            the current time is used.
+        """
+        ttls = self._negativeTTLs(authority)
+        if not ttls:
+            return
+        if self.verbose > 1:
+            log.msg('Adding nonexistent %r to cache' % (query.name.name,))
+        self._addEntry((query.name.name.lower(), query.cls),
+                       ([], list(authority), []), cacheTime, min(ttls))
+
+
+    def _negativeTTLs(self, authority):
+        """
+        Find the negative caching TTL given by each I{SOA} record in the
+        authority section of a response: the smaller of its own TTL and its
+        I{MINIMUM} field (RFC 2308, section 5).
+
+        @param authority: A L{list} of L{dns.RRHeader} records.
+
+        @return: A L{list} of L{int} TTLs.
+        """
+        return [min(r.ttl, r.payload.minimum)
+                for r in authority if r.type == dns.SOA]
+
+
+    def _addEntry(self, key, payload, cacheTime, ttl):
+        """
+        Add an entry to C{cache} as the most recently used, evicting the
+        least recently used entries if there are then more than
+        C{maxEntries}, and arrange for it to be removed once it expires.
+
+        @param key: The key of the entry.
+
+        @param payload: The records of the entry.
+
+        @param cacheTime: The time at which the entry was cached, or L{None}
+            for now.
+
+        @param ttl: The number of seconds for which the entry is served.
+        """
+        when = cacheTime or self._reactor.seconds()
+        self.cache.pop(key, None)
+        self.cache[key] = (when, payload)
+        self._ttls[key] = ttl
+        self._hitCounts[key] = 0
+        self._results.pop(key, None)
+
+        if self.maxEntries is not None:
+            while len(self.cache) > self.maxEntries:
+                oldest = next(iter(self.cache))
+                self._removeEntry(oldest)
+                self.evictions += 1
+
+        removeAt = when + ttl
+        if self.resolver is not None and isinstance(key, dns.Query):
+            removeAt += self.staleTTL
+        heapq.heappush(self._expiries, (removeAt, next(self._counter), key))
+        self._scheduleSweep(removeAt)
+
 
-        if query in self.cancel:
-            self.cancel[query].cancel()
+    def _removeEntry(self, key):
+        """
+        Remove an entry from C{cache}.
+
+        @param key: The key of the entry.
+        """
+        del self.cache[key]
+        del self._ttls[key]
+        del self._hitCounts[key]
+        self._results.pop(key, None)
+
+
+    def _scheduleSweep(self, when):
+        """
+        Make sure L{_sweep} is called no later than C{when}.
+
+        @param when: The time at which an entry may be removed.
+        """
+        delay = max(0, when - self._reactor.seconds())
+        if self._sweepCall is None or not self._sweepCall.active():
+            self._sweepCall = self._reactor.callLater(delay, self._sweep)
+        elif when < self._sweepCall.getTime():
+            self._sweepCall.reset(delay)
 
-        s = list(payload[0]) + list(payload[1]) + list(payload[2])
-        if s:
-            m = s[0].ttl
-            for r in s:
-                m = min(m, r.ttl)
-        else:
-            m = 0
 
-        self.cancel[query] = self._reactor.callLater(m, self.clearEntry, query)
+    def _sweep(self):
+        """
+        Remove the entries whose time has come, and arrange to be called
+        again when the next one's does.
+        """
+        self._sweepCall = None
+        now = self._reactor.seconds()
+        while self._expiries and self._expiries[0][0] <= now:
+            removeAt, _, key = heapq.heappop(self._expiries)
+            entry = self.cache.get(key)
+            if entry is None:
+                continue
+            # The entry may have been cached again since.
+            ttl = self._ttls[key]
+            if self.resolver is not None and isinstance(key, dns.Query):
+                ttl += self.staleTTL
+            if entry[0] + ttl <= now:
+                self._removeEntry(key)
+        if self._expiries:
+            self._scheduleSweep(self._expiries[0][0])
 
 
     def clearEntry(self, query):
-        del self.cache[query]
-        del self.cancel[query]
+        """
+        Remove the entry for C{query} from the cache.
+
+        @param query: The key of the entry.
+        """
+        self._removeEntry(query)
@@ -48,9 +48,25 @@ class Resolver(common.ResolverBase):
         for a particular query fixed at one instead of allowing the attacker to
         raise it to an arbitrary number.
 
+    @ivar _waitingUDP: A C{dict} mapping keys made of the name/type/class of
+        each query in a L{queryUDP} call and its timeouts to Deferreds which
+        will be called back with the response to the outstanding call for
+        those queries.
+
+    @ivar _udpPorts: A C{dict} mapping interfaces to C{list}s of
+        L{dns.DNSDatagramProtocol} instances kept listening for queries when
+        C{udpPortPoolSize} is non-zero.
+
+    @ivar _rtts: A C{dict} mapping nameserver addresses to the smoothed time,
+        in seconds, they have taken to respond to queries.  Addresses which
+        time out are charged the timeout.
+
     @ivar _reactor: A provider of L{IReactorTCP}, L{IReactorUDP}, and
         L{IReactorTime} which will be used to set up network resources and
         track timeouts.
+
+    @ivar rttWeight: The weight given to each new round trip time measurement
+        in the smoothed value kept in C{_rtts}.
     """
     index = 0
     timeout = None
@@ -65,7 +81,10 @@ class Resolver(common.ResolverBase):
     _lastResolvTime = None
     _resolvReadInterval = 60
 
-    def __init__(self, resolv=None, servers=None, timeout=(1, 3, 11, 45), reactor=None):
+    rttWeight = 0.3
+
+    def __init__(self, resolv=None, servers=None, timeout=(1, 3, 11, 45),
+                 reactor=None, udpPortPoolSize=0):
         """
         Construct a resolver which will query domain name servers listed in
         the C{resolv.conf(5)}-format file given by C{resolv} as well as
@@ -93,6 +112,11 @@ class Resolver(common.ResolverBase):
             for DNS datagrams, and enforce timeouts.  If not provided, the
             global reactor will be used.
 
+        @type udpPortPoolSize: C{int}
+        @param udpPortPoolSize: If non-zero, the number of randomly numbered
+            UDP ports to keep listening and choose between at random for each
+            query, instead of listening on a new port for each query.
+
         @raise ValueError: Raised if no nameserver addresses can be found.
         """
         common.ResolverBase.__init__(self)
@@ -120,6 +144,11 @@ class Resolver(common.ResolverBase):
         self.pending = []
 
         self._waiting = {}
+        self._waitingUDP = {}
+
+        self.udpPortPoolSize = udpPortPoolSize
+        self._udpPorts = {}
+        self._rtts = {}
 
         self.maybeParseConfig()
 
@@ -128,6 +157,7 @@ class Resolver(common.ResolverBase):
         d = self.__dict__.copy()
         d['connections'] = []
         d['_parseCall'] = None
+        d['_udpPorts'] = {}
         return d
 
 
@@ -228,6 +258,74 @@ class Resolver(common.ResolverBase):
                 return proto
 
 
+    def _pooledProtocol(self, interface):
+        """
+        Return a L{DNSDatagramProtocol} from the pool kept for C{interface},
+        chosen at random once the pool holds C{udpPortPoolSize} of them.
+
+        The choice uses L{dns.randomSource}, like the port numbers and
+        message IDs, so the source port of a query cannot be predicted.
+        """
+        pool = self._udpPorts.setdefault(interface, [])
+        if len(pool) < self.udpPortPoolSize:
+            if interface:
+                protocol = self._connectedProtocol(interface=interface)
+            else:
+                protocol = self._connectedProtocol()
+            pool.append(protocol)
+            return protocol
+        return pool[dns.randomSource() % len(pool)]
+
+
+    def stopListening(self):
+        """
+        Stop listening on the UDP ports pooled by this resolver.
+
+        @return: A L{Deferred} which fires when all of them have stopped.
+        """
+        pools, self._udpPorts = self._udpPorts, {}
+        return defer.gatherResults([
+            defer.maybeDeferred(protocol.transport.stopListening)
+            for pool in pools.values() for protocol in pool])
+
+
+    def _recordRTT(self, address, rtt):
+        """
+        Fold a round trip time measurement into the smoothed value kept for a
+        nameserver.
+
+        @param address: The address of the nameserver.
+        @param rtt: The number of seconds it took to respond, or the timeout
+            if it did not respond or did not give a usable answer.
+        """
+        address = tuple(address)
+        previous = self._rtts.get(address)
+        if previous is None:
+            self._rtts[address] = rtt
+        else:
+            self._rtts[address] = (
+                previous + (rtt - previous) * self.rttWeight)
+
+
+    def _fastestLast(self, addresses):
+        """
+        Order nameserver addresses so that they are popped fastest first.
+
+        Addresses without a measured round trip time are tried before the
+        others, so that each is measured, and otherwise keep their relative
+        order.
+
+        @param addresses: A C{list} of addresses in order of preference.
+
+        @return: A new C{list} of the addresses in reverse order of
+            preference.
+        """
+        rtts = self._rtts
+        ordered = sorted(addresses, key=lambda a: rtts.get(tuple(a), 0))
+        ordered.reverse()
+        return ordered
+
+
     def connectionMade(self, protocol):
         """
         Called by associated L{dns.DNSProtocol} instances when they connect.
@@ -252,9 +350,13 @@ class Resolver(common.ResolverBase):
 
     def _query(self, *args):
         """
-        Get a new L{DNSDatagramProtocol} instance from L{_connectedProtocol},
-        issue a query to it using C{*args}, and arrange for it to be
-        disconnected from its transport after the query completes.
+        Get a L{DNSDatagramProtocol} instance, issue a query to it using
+        C{*args} and record how long the nameserver took to respond.
+
+        The protocol is a new one from L{_connectedProtocol}, which is
+        disconnected from its transport after the query completes, unless
+        C{udpPortPoolSize} is non-zero, in which case it is taken from the
+        pool of listening ports.
 
         @param *args: Positional arguments to be passed to
             L{DNSDatagramProtocol.query}.
@@ -262,13 +364,30 @@ class Resolver(common.ResolverBase):
         @return: A L{Deferred} which will be called back with the result of the
             query.
         """
-        if isIPv6Address(args[0][0]):
-            protocol = self._connectedProtocol(interface='::')
+        address = args[0]
+        if isIPv6Address(address[0]):
+            interface = '::'
+        else:
+            interface = ''
+        if self.udpPortPoolSize:
+            protocol = self._pooledProtocol(interface)
+        elif interface:
+            protocol = self._connectedProtocol(interface=interface)
         else:
             protocol = self._connectedProtocol()
+        started = self._reactor.seconds()
         d = protocol.query(*args)
         def cbQueried(result):
-            protocol.transport.stopListening()
+            # Only an answer counts as a response: a nameserver which fails
+            # quickly is charged the timeout, like one which does not respond.
+            rCode = getattr(result, 'rCode', dns.OK)
+            if (isinstance(result, failure.Failure) or
+                    rCode not in (dns.OK, dns.ENAME)):
+                self._recordRTT(address, args[2])
+            else:
+                self._recordRTT(address, self._reactor.seconds() - started)
+            if not self.udpPortPoolSize:
+                protocol.transport.stopListening()
             return result
         d.addBoth(cbQueried)
         return d
@@ -278,6 +397,14 @@ class Resolver(common.ResolverBase):
         """
         Make a number of DNS queries via UDP.
 
+        Nameservers are tried fastest first, by the round trip times measured
+        for earlier answers, and otherwise in the order they are configured.
+        A nameserver which times out or responds with an error other than
+        C{NXDOMAIN} is taken to have been as slow as the timeout.  If the same
+        queries are already outstanding with the same timeouts, they are not
+        issued again; the response to the outstanding ones is used for these
+        as well.
+
         @type queries: A C{list} of C{dns.Query} instances
         @param queries: The queries to make.
 
@@ -296,13 +423,26 @@ class Resolver(common.ResolverBase):
         if not addresses:
             return defer.fail(IOError("No domain name servers available"))
 
-        # Make sure we go through servers in the list in the order they were
-        # specified.
-        addresses.reverse()
+        key = (tuple([
+            (query.name.name.lower(), query.type, query.cls)
+            for query in queries or ()]), tuple(timeout))
+        waiting = self._waitingUDP.get(key)
+        if waiting is not None:
+            d = defer.Deferred()
+            waiting.append(d)
+            return d
+        self._waitingUDP[key] = []
+
+        addresses = self._fastestLast(addresses)
 
         used = addresses.pop()
         d = self._query(used, queries, timeout[0])
         d.addErrback(self._reissue, addresses, [used], queries, timeout)
+        def cbResult(result):
+            for waiter in self._waitingUDP.pop(key):
+                waiter.callback(result)
+            return result
+        d.addBoth(cbResult)
         return d
 
 
@@ -311,10 +451,10 @@ class Resolver(common.ResolverBase):
 
         # If there are no servers left to be tried, adjust the timeout
         # to the next longest timeout period and move all the
-        # "used" addresses back to the list of addresses to try.
+        # "used" addresses back to the list of addresses to try, fastest
+        # first by their latest round trip times.
         if not addressesLeft:
-            addressesLeft = addressesUsed
-            addressesLeft.reverse()
+            addressesLeft = self._fastestLast(addressesUsed)
             addressesUsed = []
             timeout = timeout[1:]
 
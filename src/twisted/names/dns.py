@@ -2008,6 +2008,177 @@ class Record_SPF(Record_TXT):
 
 
 
+def _decodeName(data, octets, offset, names):
+    """
+    Decode a domain name from a message without going through a file object,
+    as L{Name.decode} would.
+
+    @param data: The message.
+    @type data: L{bytes}
+
+    @param octets: The message, as a L{bytearray}.
+
+    @param offset: The offset in C{data} at which the name starts.
+    @type offset: L{int}
+
+    @param names: A C{dict} mapping the offsets of names already decoded
+        from the message to those names and the offsets just past them, which
+        is added to.  Compressed names mostly point at these.
+
+    @return: A two-tuple of the name, as L{bytes}, and the offset just past
+        it.
+
+    @raise EOFError: Raised when the message ends before the name does.
+
+    @raise ValueError: Raised when the name contains a compression loop.
+    """
+    if offset in names:
+        return names[offset]
+    start = offset
+    labels = []
+    visited = None
+    end = None
+    while True:
+        if offset in names:
+            labels.append(names[offset][0])
+            name = b'.'.join(labels)
+            break
+        try:
+            l = octets[offset]
+        except IndexError:
+            raise EOFError()
+        offset += 1
+        if l == 0:
+            if end is None:
+                end = offset
+            name = b'.'.join(labels)
+            break
+        if (l >> 6) == 3:
+            try:
+                newOffset = (l & 63) << 8 | octets[offset]
+            except IndexError:
+                raise EOFError()
+            if visited is None:
+                visited = set()
+            if newOffset in visited:
+                raise ValueError("Compression loop in encoded name")
+            visited.add(newOffset)
+            if end is None:
+                end = offset + 1
+            offset = newOffset
+            continue
+        label = data[offset:offset + l]
+        if len(label) < l:
+            raise EOFError()
+        labels.append(label)
+        offset += l
+    if name:
+        names[start] = (name, end)
+    return name, end
+
+
+
+def _decodeAddress(recordType, size):
+    """
+    Make a record decoder for L{Record_A} or L{Record_AAAA}.
+
+    @param recordType: The record class.
+    @param size: The length of its address.
+    """
+    def decode(data, octets, names, offset, length, ttl):
+        end = offset + size
+        if end > len(data):
+            raise EOFError()
+        record = recordType(ttl=ttl)
+        record.address = data[offset:end]
+        return record, end
+    return decode
+
+
+
+def _decodeSimple(recordType):
+    """
+    Make a record decoder for a L{SimpleRecord} subclass.
+
+    @param recordType: The record class.
+    """
+    def decode(data, octets, names, offset, length, ttl):
+        name, offset = _decodeName(data, octets, offset, names)
+        return recordType(name, ttl), offset
+    return decode
+
+
+
+def _decodeMX(data, octets, names, offset, length, ttl):
+    """
+    Decode the data of a L{Record_MX}.
+    """
+    if offset + 2 > len(data):
+        raise EOFError()
+    preference = octets[offset] << 8 | octets[offset + 1]
+    name, offset = _decodeName(data, octets, offset + 2, names)
+    return Record_MX(preference, name, ttl), offset
+
+
+
+def _decodeSRV(data, octets, names, offset, length, ttl):
+    """
+    Decode the data of a L{Record_SRV}.
+    """
+    if offset + 6 > len(data):
+        raise EOFError()
+    priority, weight, port = struct.unpack_from('!HHH', data, offset)
+    target, offset = _decodeName(data, octets, offset + 6, names)
+    return Record_SRV(priority, weight, port, target, ttl), offset
+
+
+
+def _decodeTXT(data, octets, names, offset, length, ttl):
+    """
+    Decode the data of a L{Record_TXT}.
+    """
+    strings = []
+    soFar = 0
+    while soFar < length:
+        try:
+            l = octets[offset]
+        except IndexError:
+            raise EOFError()
+        string = data[offset + 1:offset + 1 + l]
+        if len(string) < l:
+            raise EOFError()
+        strings.append(string)
+        offset += l + 1
+        soFar += l + 1
+    if soFar != length:
+        log.msg(
+            "Decoded %d bytes in %s record, but rdlength is %d" % (
+                soFar, Record_TXT.fancybasename, length
+            )
+        )
+    return Record_TXT(*strings, ttl=ttl), offset
+
+
+
+# Decoders which read the data of common record types directly from the
+# message, keyed on the record class.  Each takes the message as bytes and as
+# a bytearray, the names decoded so far as for _decodeName, the offset and
+# length of the data and the TTL, and returns the record and the offset after
+# it.  They raise EOFError as the records' decode
+# methods do.
+_fastRecordDecoders = {
+    Record_A: _decodeAddress(Record_A, 4),
+    Record_AAAA: _decodeAddress(Record_AAAA, 16),
+    Record_CNAME: _decodeSimple(Record_CNAME),
+    Record_NS: _decodeSimple(Record_NS),
+    Record_PTR: _decodeSimple(Record_PTR),
+    Record_MX: _decodeMX,
+    Record_SRV: _decodeSRV,
+    Record_TXT: _decodeTXT,
+}
+
+
+
 def _responseFromMessage(responseConstructor, message, **kwargs):
     """
     Generate a L{Message} like instance suitable for use as the response to
@@ -2164,6 +2335,12 @@ class Message(tputil.FancyEqMixin):
         header fields.
     @ivar _sectionNames: The names of attributes representing the record
         sections of this message.
+
+    @ivar _lazySections: When the record sections of a message decoded by
+        L{fromStr} with C{lazy} set have not been accessed yet, a three-tuple
+        of the message, the offset of the first record and a three-tuple of
+        the number of records in each section.  Until then those sections are
+        not attributes of the instance.
     """
     compareAttributes = (
         'id', 'answer', 'opCode', 'recDes', 'recAv',
@@ -2175,8 +2352,11 @@ class Message(tputil.FancyEqMixin):
     headerFmt = "!H2B4H"
     headerSize = struct.calcsize(headerFmt)
 
-    # Question, answer, additional, and nameserver lists
-    queries = answers = add = ns = None
+    _sectionNames = ('answers', 'authority', 'additional')
+
+    # Question, additional, and nameserver lists.  The answers are not given
+    # a default so that lazily decoded sections are found by __getattr__.
+    queries = add = ns = None
 
     def __init__(self, id=0, answer=0, opCode=0, recDes=0, recAv=0,
                        auth=0, rCode=OK, trunc=0, maxSize=512,
@@ -2331,15 +2511,7 @@ class Message(tputil.FancyEqMixin):
         header = readPrecisely(strio, self.headerSize)
         r = struct.unpack(self.headerFmt, header)
         self.id, byte3, byte4, nqueries, nans, nns, nadd = r
-        self.answer = ( byte3 >> 7 ) & 1
-        self.opCode = ( byte3 >> 3 ) & 0xf
-        self.auth = ( byte3 >> 2 ) & 1
-        self.trunc = ( byte3 >> 1 ) & 1
-        self.recDes = byte3 & 1
-        self.recAv = ( byte4 >> 7 ) & 1
-        self.authenticData = ( byte4 >> 5 ) & 1
-        self.checkingDisabled = ( byte4 >> 4 ) & 1
-        self.rCode = byte4 & 0xf
+        self._decodeFlags(byte3, byte4)
 
         self.queries = []
         for i in range(nqueries):
@@ -2359,6 +2531,22 @@ class Message(tputil.FancyEqMixin):
             self.parseRecords(l, n, strio)
 
 
+    def _decodeFlags(self, byte3, byte4):
+        """
+        Set the flags and codes given by the third and fourth bytes of a
+        message header.
+        """
+        self.answer = ( byte3 >> 7 ) & 1
+        self.opCode = ( byte3 >> 3 ) & 0xf
+        self.auth = ( byte3 >> 2 ) & 1
+        self.trunc = ( byte3 >> 1 ) & 1
+        self.recDes = byte3 & 1
+        self.recAv = ( byte4 >> 7 ) & 1
+        self.authenticData = ( byte4 >> 5 ) & 1
+        self.checkingDisabled = ( byte4 >> 4 ) & 1
+        self.rCode = byte4 & 0xf
+
+
     def parseRecords(self, list, num, strio):
         for i in range(num):
             header = RRHeader(auth=self.auth)
@@ -2377,6 +2565,93 @@ class Message(tputil.FancyEqMixin):
             list.append(header)
 
 
+    def _parseSections(self, data, octets, names, offset, counts, sections):
+        """
+        Decode the records of the answer, authority and additional sections
+        directly from a message, with the same results as L{parseRecords}.
+
+        Records of the types in L{_fastRecordDecoders} are decoded without
+        going through a file object.  If the message ends part way through a
+        record, the rest of the message is left to L{parseRecords}.
+
+        @param data: The message.
+        @type data: L{bytes}
+
+        @param octets: The message, as a L{bytearray}.
+
+        @param names: The names decoded from the message so far, as for
+            L{_decodeName}.
+
+        @param offset: The offset of the first record.
+        @type offset: L{int}
+
+        @param counts: The number of records in each section.
+
+        @param sections: The three C{list}s to append the records to.
+        """
+        fmt = RRHeader.fmt
+        fixedSize = struct.calcsize(fmt)
+        size = len(data)
+        auth = self.auth
+        unpack = struct.unpack_from
+        lookupRecordType = self.lookupRecordType
+        fastRecordDecoders = _fastRecordDecoders
+        strio = None
+        for i, (records, count) in enumerate(zip(sections, counts)):
+            for j in range(count):
+                start = offset
+                try:
+                    name, offset = _decodeName(data, octets, offset, names)
+                    if offset + fixedSize > size:
+                        raise EOFError()
+                    type, cls, ttl, rdlength = unpack(fmt, data, offset)
+                    offset += fixedSize
+                    t = lookupRecordType(type)
+                    if not t:
+                        continue
+                    decoder = fastRecordDecoders.get(t)
+                    if decoder is not None:
+                        payload, offset = decoder(
+                            data, octets, names, offset, rdlength, ttl)
+                    else:
+                        if strio is None:
+                            strio = BytesIO(data)
+                        strio.seek(offset)
+                        payload = t(ttl=ttl)
+                        payload.decode(strio, rdlength)
+                        offset = strio.tell()
+                except EOFError:
+                    strio = BytesIO(data)
+                    strio.seek(start)
+                    self.parseRecords(records, count - j, strio)
+                    for records, count in zip(sections[i + 1:],
+                                              counts[i + 1:]):
+                        self.parseRecords(records, count, strio)
+                    return
+                header = RRHeader(name, type, cls, ttl, auth=auth)
+                header.rdlength = rdlength
+                header.payload = payload
+                records.append(header)
+
+
+    def __getattr__(self, name):
+        """
+        Decode the record sections of a message decoded by L{fromStr} with
+        C{lazy} set when one of them is first accessed.
+        """
+        lazySections = self.__dict__.get('_lazySections')
+        if lazySections is None or name not in self._sectionNames:
+            raise AttributeError(name)
+        del self._lazySections
+        data, offset, counts = lazySections
+        sections = ([], [], [])
+        self._parseSections(
+            data, bytearray(data), {}, offset, counts, sections)
+        for sectionName, records in zip(self._sectionNames, sections):
+            self.__dict__.setdefault(sectionName, records)
+        return self.__dict__[name]
+
+
     # Create a mapping from record types to their corresponding Record_*
     # classes.  This relies on the global state which has been created so
     # far in initializing this module (so don't define Record classes after
@@ -2417,15 +2692,58 @@ class Message(tputil.FancyEqMixin):
         return strio.getvalue()
 
 
-    def fromStr(self, str):
+    def fromStr(self, str, lazy=False):
         """
         Decode a byte string in the format described by RFC 1035 into this
         L{Message}.
 
+        This gives the same result as L{decode}, reading the header, queries
+        and records of common types directly from the byte string.
+
         @param str: L{bytes}
+
+        @param lazy: If C{True}, only decode the header and the queries now,
+            and decode the answer, authority and additional sections when one
+            of them is first accessed.  Errors in those sections are then
+            raised by that access.
+        @type lazy: L{bool}
         """
-        strio = BytesIO(str)
-        self.decode(strio)
+        if self.__dict__.pop('_lazySections', None) is not None:
+            for name in self._sectionNames:
+                self.__dict__.setdefault(name, [])
+
+        self.maxSize = 0
+        size = len(str)
+        if size < self.headerSize:
+            raise EOFError()
+        r = struct.unpack_from(self.headerFmt, str)
+        self.id, byte3, byte4, nqueries, nans, nns, nadd = r
+        self._decodeFlags(byte3, byte4)
+
+        octets = bytearray(str)
+        names = {}
+        offset = self.headerSize
+        self.queries = []
+        for i in range(nqueries):
+            try:
+                name, offset = _decodeName(str, octets, offset, names)
+            except EOFError:
+                return
+            if offset + 4 > size:
+                return
+            type, cls = struct.unpack_from('!HH', str, offset)
+            offset += 4
+            self.queries.append(Query(name, type, cls))
+
+        counts = (nans, nns, nadd)
+        if lazy:
+            for name in self._sectionNames:
+                del self.__dict__[name]
+            self._lazySections = (str, offset, counts)
+        else:
+            self._parseSections(
+                str, octets, names, offset, counts,
+                (self.answers, self.authority, self.additional))
 
 
 
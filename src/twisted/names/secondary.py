@@ -169,6 +169,7 @@ class SecondaryAuthority(FileAuthority):
                 self.soa = (str(rec.name).lower(), rec.payload)
             else:
                 r.setdefault(str(rec.name).lower(), []).append(rec.payload)
+        self._indexLoaded()
 
 
     def _ebZone(self, failure):
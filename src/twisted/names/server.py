@@ -18,13 +18,35 @@ for resolvers to deal with.  Fix it.
 """
 from __future__ import division, absolute_import
 
+import struct
 import time
 
-from twisted.internet import protocol
-from twisted.names import dns, resolve
+from twisted.internet import defer, protocol
+from twisted.names import dns, error, resolve
 from twisted.python import log
 
 
+
+class _EncodedResponse(object):
+    """
+    A response message which has already been encoded, to be passed to
+    C{writeMessage} in place of a L{dns.Message}.
+
+    @ivar _bytes: The encoded message.
+    """
+    def __init__(self, bytes):
+        self._bytes = bytes
+
+
+    def toStr(self):
+        """
+        @return: The encoded message.
+        @rtype: L{bytes}
+        """
+        return self._bytes
+
+
+
 class DNSServerFactory(protocol.ServerFactory):
     """
     Server factory and tracker for L{DNSProtocol} connections.  This class also
@@ -32,8 +54,10 @@ class DNSServerFactory(protocol.ServerFactory):
 
     @ivar cache: A L{Cache<twisted.names.cache.CacheResolver>} instance whose
         C{cacheResult} method is called when a response is received from one of
-        C{clients}. Defaults to L{None} if no caches are specified. See
-        C{caches} of L{__init__} for more details.
+        C{clients}, and whose C{cacheNameError} method, if it has one, is
+        called when one of them finds that a name does not exist. Defaults to
+        L{None} if no caches are specified. See C{caches} of L{__init__} for
+        more details.
     @type cache: L{Cache<twisted.names.cache.CacheResolver>} or L{None}
 
     @ivar canRecurse: A flag indicating whether this server is capable of
@@ -60,6 +84,10 @@ class DNSServerFactory(protocol.ServerFactory):
     @ivar _messageFactory: A response message constructor with an initializer
          signature matching L{dns.Message.__init__}.
     @type _messageFactory: C{callable}
+
+    @ivar _authorities: The C{authorities}, which L{handleQuery} asks for
+        responses they have stored to send again.
+    @type _authorities: L{list}
     """
 
     protocol = dns.DNSProtocol
@@ -88,8 +116,10 @@ class DNSServerFactory(protocol.ServerFactory):
         @type verbose: L{int}
         """
         resolvers = []
+        self._authorities = []
         if authorities is not None:
             resolvers.extend(authorities)
+            self._authorities.extend(authorities)
         if caches is not None:
             resolvers.extend(caches)
         if clients is not None:
@@ -337,12 +367,97 @@ class DNSServerFactory(protocol.ServerFactory):
             rCode = dns.ESERVER
             log.err(failure)
 
+        cacheNameError = getattr(self.cache, 'cacheNameError', None)
+        if cacheNameError is not None and failure.check(error.DNSNameError):
+            # A name error from one of the clients carries the response it
+            # came from, whose SOA record says how long it may be cached.
+            args = failure.value.args
+            if args and isinstance(args[0], dns.Message):
+                cacheNameError(message.queries[0], args[0].authority)
+
         response = self._responseFromMessage(message=message, rCode=rCode)
 
         self.sendReply(protocol, response, address)
         self._verboseLog("Lookup failed")
 
 
+    def _answeringAuthority(self, query):
+        """
+        Find the authority which will answer C{query}, if it is one which can
+        store its encoded responses.
+
+        @param query: The query.
+        @type query: L{dns.Query}
+
+        @return: The first of C{authorities} which answers C{query}, or
+            L{None} if there is none or if an authority before it cannot say
+            whether it does.
+        """
+        for authority in self._authorities:
+            answersQuery = getattr(authority, '_answersQuery', None)
+            if answersQuery is None:
+                return None
+            if answersQuery(query):
+                return authority
+        return None
+
+
+    def _responseKey(self, message):
+        """
+        Make the key under which the response to C{message} is stored by an
+        authority.
+
+        The key is made of everything in C{message} which the response
+        depends on, apart from its ID: the name exactly as given, since the
+        response repeats it, the type and class of the first query, the
+        largest response size, and whether an EDNS I{OPT} record is present
+        with its I{DO} bit.
+
+        @param message: The query message.
+        @type message: L{dns.Message}
+
+        @rtype: L{tuple}
+        """
+        query = message.queries[0]
+        edns = None
+        for record in message.additional:
+            if record.type == dns.OPT:
+                edns = bool(record.ttl & 0x8000)
+                break
+        return (query.name.name, query.type, query.cls, message.maxSize, edns)
+
+
+    def _cacheResolverResponse(self, result, authority, key, message):
+        """
+        Store the encoded response to C{message} with the authority which
+        answered it, with an ID of zero.
+
+        @param result: The result of C{self.resolver.query}: response records
+            or a L{Failure<twisted.python.failure.Failure>}.
+
+        @param authority: The authority which answered the query.
+
+        @param key: The key from L{_responseKey}.
+
+        @param message: The query message.
+        @type message: L{dns.Message}
+
+        @return: C{result}
+        """
+        if isinstance(result, tuple):
+            ans, auth, add = result
+            response = self._responseFromMessage(
+                message=message, rCode=dns.OK,
+                answers=ans, authority=auth, additional=add)
+        elif result.check(dns.AuthoritativeDomainError):
+            response = self._responseFromMessage(
+                message=message, rCode=dns.ENAME)
+        else:
+            return result
+        authority._cacheResponse(key, b'\x00\x00' + response.toStr()[2:])
+        return result
+
+
     def handleQuery(self, message, protocol, address):
         """
         Called by L{DNSServerFactory.messageReceived} when a query message is
@@ -354,6 +469,15 @@ class DNSServerFactory(protocol.ServerFactory):
         Adds callbacks L{DNSServerFactory.gotResolverResponse} and
         L{DNSServerFactory.gotResolverError} to the resulting deferred.
 
+        If the query is answered by one of C{authorities} which stores its
+        responses, such as a L{FileAuthority
+        <twisted.names.authority.FileAuthority>}, the encoded response is
+        stored with it.  The same query is then answered by sending that
+        response again with the new message ID, without looking up or
+        encoding any records, until the authority's zone changes.  Responses
+        are neither stored nor sent again if C{verbose} is more than C{1},
+        so that they are logged in full.
+
         Note: Multiple queries in a single message are not supported because
         there is no standard way to respond with multiple rCodes, auth,
         etc. This is consistent with other DNS server implementations. See
@@ -378,7 +502,27 @@ class DNSServerFactory(protocol.ServerFactory):
         """
         query = message.queries[0]
 
-        return self.resolver.query(query).addCallback(
+        d = None
+        if self.verbose <= 1:
+            authority = self._answeringAuthority(query)
+            if authority is not None:
+                key = self._responseKey(message)
+                response = authority._cachedResponse(key)
+                if response is not None:
+                    response = struct.pack('!H', message.id) + response[2:]
+                    if address is None:
+                        protocol.writeMessage(_EncodedResponse(response))
+                    else:
+                        protocol.writeMessage(
+                            _EncodedResponse(response), address)
+                    self._verboseLog("Answered from stored response")
+                    return defer.succeed(None)
+                d = self.resolver.query(query).addBoth(
+                    self._cacheResolverResponse, authority, key, message)
+        if d is None:
+            d = self.resolver.query(query)
+
+        return d.addCallback(
             self.gotResolverResponse, protocol, message, address
         ).addErrback(
             self.gotResolverError, protocol, message, address
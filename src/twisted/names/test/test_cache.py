@@ -14,7 +14,7 @@ from zope.interface.verify import verifyClass
 from twisted.trial import unittest
 
 from twisted.names import dns, cache
-from twisted.internet import task, interfaces
+from twisted.internet import defer, task, interfaces
 
 
 class CachingTests(unittest.TestCase):
@@ -142,3 +142,220 @@ class CachingTests(unittest.TestCase):
 
         return self.assertFailure(
             c.lookupAddress(b"example.com"), dns.DomainError)
+
+
+
+class FakeResolver(object):
+    """
+    A partial fake L{interfaces.IResolver} whose C{query} method returns
+    L{defer.Deferred}s to be fired by the test.
+
+    @ivar queries: The C{(query, deferred)} pairs of the queries made.
+    """
+    def __init__(self):
+        self.queries = []
+
+
+    def query(self, query, timeout=None):
+        d = defer.Deferred()
+        self.queries.append((query, d))
+        return d
+
+
+
+def answer(name, ttl, address="127.0.0.1"):
+    """
+    Make a payload with a single I{A} record answer.
+    """
+    return ([dns.RRHeader(name, dns.A, dns.IN, ttl,
+                          dns.Record_A(address, ttl))], [], [])
+
+
+
+def soaHeader(ttl, minimum):
+    """
+    Make an I{SOA} record for C{example.com}.
+    """
+    return dns.RRHeader(
+        b"example.com", dns.SOA, dns.IN, ttl,
+        dns.Record_SOA(b"ns.example.com", b"root.example.com",
+                       minimum=minimum, ttl=ttl))
+
+
+
+class BoundedCachingTests(unittest.TestCase):
+    """
+    Tests for the size limit, negative caching, expiry and refreshing of
+    L{cache.CacheResolver} entries.
+    """
+    def setUp(self):
+        self.clock = task.Clock()
+        self.resolver = FakeResolver()
+        self.cache = cache.CacheResolver(reactor=self.clock, maxEntries=2)
+
+
+    def query(self, name, type=dns.A):
+        return dns.Query(name=name, type=type, cls=dns.IN)
+
+
+    def test_leastRecentlyUsedEvicted(self):
+        """
+        When more than C{maxEntries} entries are cached, the least recently
+        used is evicted.
+        """
+        for name in [b"a.example.com", b"b.example.com"]:
+            self.cache.cacheResult(self.query(name), answer(name, 60))
+        self.successResultOf(self.cache.lookupAddress(b"a.example.com"))
+        self.cache.cacheResult(
+            self.query(b"c.example.com"), answer(b"c.example.com", 60))
+
+        self.assertEqual(list(self.cache.cache), [
+            self.query(b"a.example.com"), self.query(b"c.example.com")])
+        self.assertEqual(self.cache.evictions, 1)
+
+
+    def test_counters(self):
+        """
+        Lookups answered from the cache are counted as hits, and others as
+        misses.
+        """
+        name = b"example.com"
+        self.cache.cacheResult(self.query(name), answer(name, 60))
+        self.successResultOf(self.cache.lookupAddress(name))
+        self.successResultOf(self.cache.lookupAddress(name))
+        self.failureResultOf(self.cache.lookupAddress(b"other.example.com"),
+                             dns.DomainError)
+        self.assertEqual((self.cache.hits, self.cache.misses), (2, 1))
+
+
+    def test_nameError(self):
+        """
+        A name error is cached for the negative caching TTL of its I{SOA}
+        record, and lookups of any type for the name fail with
+        L{dns.AuthoritativeDomainError} until it expires.
+        """
+        name = b"missing.example.com"
+        self.cache.cacheNameError(self.query(name), [soaHeader(300, 60)])
+
+        self.failureResultOf(self.cache.lookupAddress(name),
+                             dns.AuthoritativeDomainError)
+        self.failureResultOf(self.cache.lookupMailExchange(name.upper()),
+                             dns.AuthoritativeDomainError)
+        self.clock.advance(60)
+        self.assertEqual(len(self.cache.cache), 0)
+        self.failureResultOf(self.cache.lookupAddress(name), dns.DomainError)
+
+
+    def test_nameErrorWithoutSOA(self):
+        """
+        A name error without an I{SOA} record is not cached.
+        """
+        self.cache.cacheNameError(self.query(b"missing.example.com"), [])
+        self.assertEqual(len(self.cache.cache), 0)
+
+
+    def test_nameErrorSuperseded(self):
+        """
+        A result cached for a name replaces a name error cached for it.
+        """
+        name = b"example.com"
+        self.cache.cacheNameError(self.query(name), [soaHeader(300, 60)])
+        self.cache.cacheResult(self.query(name), answer(name, 60))
+        self.successResultOf(self.cache.lookupAddress(name))
+
+
+    def test_noData(self):
+        """
+        An empty answer is cached for the negative caching TTL of the I{SOA}
+        record in its authority section.
+        """
+        query = self.query(b"example.com", dns.MX)
+        self.cache.cacheResult(query, ([], [soaHeader(30, 300)], []))
+        self.clock.advance(29)
+        ans, auth, add = self.successResultOf(
+            self.cache.lookupMailExchange(b"example.com"))
+        self.assertEqual((ans, auth[0].ttl), ([], 1))
+        self.clock.advance(1)
+        self.assertNotIn(query, self.cache.cache)
+
+
+    def test_singleTimer(self):
+        """
+        Entries are removed as they expire by a single timer.
+        """
+        self.cache.maxEntries = None
+        for name, ttl in [(b"a", 30), (b"b", 10), (b"c", 20)]:
+            self.cache.cacheResult(self.query(name), answer(name, ttl))
+        self.assertEqual(len(self.clock.getDelayedCalls()), 1)
+
+        self.clock.advance(10)
+        self.assertEqual(list(self.cache.cache),
+                         [self.query(b"a"), self.query(b"c")])
+        self.assertEqual(len(self.clock.getDelayedCalls()), 1)
+        self.clock.advance(20)
+        self.assertEqual(len(self.cache.cache), 0)
+        self.assertEqual(self.clock.getDelayedCalls(), [])
+
+
+    def test_prefetch(self):
+        """
+        An entry which has been served C{prefetchHits} times is looked up
+        again once less than C{prefetchFraction} of its TTL is left, and
+        replaced with the result.
+        """
+        self.cache.resolver = self.resolver
+        name = b"example.com"
+        self.cache.cacheResult(self.query(name), answer(name, 100))
+        self.successResultOf(self.cache.lookupAddress(name))
+        self.successResultOf(self.cache.lookupAddress(name))
+        self.clock.advance(95)
+        self.successResultOf(self.cache.lookupAddress(name))
+        self.successResultOf(self.cache.lookupAddress(name))
+
+        [(query, d)] = self.resolver.queries
+        self.assertEqual(query, self.query(name))
+        self.assertEqual(self.cache.prefetches, 1)
+        d.callback(answer(name, 100, "10.0.0.1"))
+        self.clock.advance(10)
+        ans, auth, add = self.successResultOf(self.cache.lookupAddress(name))
+        self.assertEqual((ans[0].payload.dottedQuad(), ans[0].ttl),
+                         ("10.0.0.1", 90))
+
+
+    def test_serveStale(self):
+        """
+        An expired entry is looked up again, and served for up to
+        C{staleTTL} seconds with a TTL of C{staleAnswerTTL} if that fails.
+        """
+        self.cache = cache.CacheResolver(
+            reactor=self.clock, resolver=self.resolver, staleTTL=100)
+        name = b"example.com"
+        self.cache.cacheResult(self.query(name), answer(name, 60))
+        self.clock.advance(61)
+
+        d = self.cache.lookupAddress(name)
+        self.resolver.queries[0][1].errback(defer.TimeoutError())
+        ans, auth, add = self.successResultOf(d)
+        self.assertEqual(ans[0].ttl, 30)
+
+        self.clock.advance(100)
+        self.assertEqual(len(self.cache.cache), 0)
+
+
+    def test_staleRefreshed(self):
+        """
+        An expired entry which is looked up again successfully is replaced
+        with the result.
+        """
+        self.cache = cache.CacheResolver(
+            reactor=self.clock, resolver=self.resolver, staleTTL=100)
+        name = b"example.com"
+        self.cache.cacheResult(self.query(name), answer(name, 60))
+        self.clock.advance(61)
+
+        d = self.cache.lookupAddress(name)
+        self.resolver.queries[0][1].callback(answer(name, 60, "10.0.0.1"))
+        ans, auth, add = self.successResultOf(d)
+        self.assertEqual(ans[0].payload.dottedQuad(), "10.0.0.1")
+        self.successResultOf(self.cache.lookupAddress(name))
+        self.assertEqual(len(self.resolver.queries), 1)
@@ -811,6 +811,185 @@ class ResolverTests(unittest.TestCase):
         self.assertEqual(len(prePending), 0)
 
 
+class UDPQueryTests(unittest.TestCase):
+    """
+    Tests for the coalescing, port pooling and nameserver ordering of
+    L{client.Resolver.queryUDP}.
+    """
+    def setUp(self):
+        self.clock = Clock()
+        self.servers = [("10.0.0.1", 53), ("10.0.0.2", 53)]
+        self.resolver = client.Resolver(
+            servers=self.servers, reactor=self.clock)
+        self.protocols = []
+        def connectedProtocol(interface=''):
+            protocol = StubDNSDatagramProtocol()
+            self.protocols.append(protocol)
+            return protocol
+        self.resolver._connectedProtocol = connectedProtocol
+
+
+    def queries(self):
+        """
+        @return: A C{list} of the arguments of all the queries issued to the
+            protocols created so far.
+        """
+        return [query for protocol in self.protocols
+                for query in protocol.queries]
+
+
+    def test_concurrentQueriesShared(self):
+        """
+        Concurrent calls to L{client.Resolver.queryUDP} with the same queries
+        issue one query, and are given its response.
+        """
+        query = [dns.Query(b"example.com", dns.MX)]
+        first = self.resolver.queryUDP(query)
+        second = self.resolver.queryUDP([dns.Query(b"EXAMPLE.com", dns.MX)])
+        other = self.resolver.queryUDP([dns.Query(b"example.com")])
+        self.assertEqual(len(self.queries()), 2)
+
+        response = dns.Message()
+        self.queries()[0][-1].callback(response)
+        self.assertIs(self.successResultOf(first), response)
+        self.assertIs(self.successResultOf(second), response)
+        self.assertNoResult(other)
+
+        self.resolver.queryUDP(query)
+        self.assertEqual(len(self.queries()), 3)
+
+
+    def test_concurrentQueriesTimeouts(self):
+        """
+        Concurrent calls to L{client.Resolver.queryUDP} with the same queries
+        but different timeouts issue a query each.
+        """
+        query = [dns.Query(b"example.com")]
+        self.resolver.queryUDP(query, timeout=(1,))
+        self.resolver.queryUDP(query, timeout=(1, 5))
+        self.assertEqual([args[2] for args in self.queries()], [1, 1])
+
+
+    def test_concurrentQueriesFailure(self):
+        """
+        If the query shared by concurrent calls to
+        L{client.Resolver.queryUDP} fails, all of them fail.
+        """
+        query = [dns.Query(b"example.com")]
+        first = self.resolver.queryUDP(query, timeout=(1,))
+        second = self.resolver.queryUDP(query, timeout=(1,))
+        self.queries()[0][-1].errback(DNSQueryTimeoutError(0))
+        self.queries()[1][-1].errback(DNSQueryTimeoutError(0))
+        self.failureResultOf(first, defer.TimeoutError)
+        self.failureResultOf(second, defer.TimeoutError)
+
+
+    def test_portPool(self):
+        """
+        If C{udpPortPoolSize} is given, queries are issued from that many
+        protocols, chosen at random, which are kept listening until
+        L{client.Resolver.stopListening} is called.
+        """
+        self.resolver.udpPortPoolSize = 3
+        for i in range(30):
+            name = b"host" + str(i).encode("ascii") + b".example.com"
+            self.resolver.queryUDP([dns.Query(name)])
+        self.assertEqual(len(self.protocols), 3)
+        self.assertEqual(
+            sorted(len(protocol.queries) > 1 for protocol in self.protocols),
+            [True, True, True])
+
+        self.queries()[0][-1].callback(dns.Message())
+        self.assertEqual(
+            [protocol.transport.disconnected for protocol in self.protocols],
+            [False, False, False])
+
+        self.successResultOf(self.resolver.stopListening())
+        self.assertEqual(
+            [protocol.transport.disconnected for protocol in self.protocols],
+            [True, True, True])
+
+
+    def test_portPoolRandomSource(self):
+        """
+        Protocols are chosen from the pool with L{dns.randomSource}, which is
+        not predictable.
+        """
+        self.resolver.udpPortPoolSize = 3
+        for i in range(3):
+            name = b"host" + str(i).encode("ascii") + b".example.com"
+            self.resolver.queryUDP([dns.Query(name)])
+        self.patch(dns, "randomSource", lambda: 7)
+        self.resolver.queryUDP([dns.Query(b"chosen.example.com")])
+        self.assertEqual(
+            [len(protocol.queries) for protocol in self.protocols],
+            [1, 2, 1])
+
+
+    def test_fastestServerFirst(self):
+        """
+        Once the round trip time to each nameserver has been measured, queries
+        are issued to the fastest first.
+        """
+        self.resolver.queryUDP([dns.Query(b"a.example.com")])
+        self.clock.advance(0.5)
+        self.queries()[0][-1].callback(dns.Message())
+
+        self.resolver.queryUDP([dns.Query(b"b.example.com")])
+        self.assertEqual(self.queries()[1][0], self.servers[1])
+        self.clock.advance(0.1)
+        self.queries()[1][-1].callback(dns.Message())
+
+        self.resolver.queryUDP([dns.Query(b"c.example.com")])
+        self.assertEqual(self.queries()[2][0], self.servers[1])
+        self.assertAlmostEqual(self.resolver._rtts[self.servers[0]], 0.5)
+        self.assertAlmostEqual(self.resolver._rtts[self.servers[1]], 0.1)
+
+
+    def test_errorsCharged(self):
+        """
+        A nameserver which quickly responds with an error other than
+        C{NXDOMAIN} is charged the timeout, like one which does not respond,
+        while one responding with C{NXDOMAIN} is charged its round trip time.
+        """
+        self.resolver.queryUDP([dns.Query(b"a.example.com")], timeout=(5,))
+        self.clock.advance(0.1)
+        self.queries()[0][-1].callback(dns.Message(rCode=dns.EREFUSED))
+
+        self.resolver.queryUDP([dns.Query(b"b.example.com")], timeout=(5,))
+        self.assertEqual(self.queries()[1][0], self.servers[1])
+        self.clock.advance(0.2)
+        self.queries()[1][-1].callback(dns.Message(rCode=dns.ENAME))
+
+        self.resolver.queryUDP([dns.Query(b"c.example.com")], timeout=(5,))
+        self.assertEqual(self.queries()[2][0], self.servers[1])
+        self.assertEqual(self.resolver._rtts[self.servers[0]], 5)
+        self.assertAlmostEqual(self.resolver._rtts[self.servers[1]], 0.2)
+
+
+    def test_reissueToFastest(self):
+        """
+        A nameserver which times out is charged the timeout, so queries are
+        reissued to, and later issued to, the others first.
+        """
+        self.resolver.dynServers = [("10.0.0.3", 53)]
+        self.resolver._rtts[self.servers[0]] = 0.2
+        self.resolver._rtts[self.servers[1]] = 0.1
+        self.resolver.queryUDP([dns.Query(b"example.com")], timeout=(5, 10))
+        self.assertEqual(self.queries()[0][0], ("10.0.0.3", 53))
+        self.queries()[0][-1].errback(DNSQueryTimeoutError(0))
+        self.assertEqual(self.queries()[1][0], self.servers[1])
+        self.queries()[1][-1].errback(DNSQueryTimeoutError(0))
+        self.assertEqual(self.queries()[2][0], self.servers[0])
+        self.queries()[2][-1].errback(DNSQueryTimeoutError(0))
+
+        # The next round is issued fastest first again.
+        self.assertEqual(self.queries()[3][0], self.servers[1])
+        self.assertAlmostEqual(self.resolver._rtts[self.servers[0]], 1.64)
+        self.assertAlmostEqual(self.resolver._rtts[self.servers[1]], 1.57)
+        self.assertEqual(self.resolver._rtts[("10.0.0.3", 53)], 5)
+
+
 
 class ClientTests(unittest.TestCase):
 
@@ -890,6 +890,153 @@ class MessageTests(unittest.SynchronousTestCase):
 
 
 
+class MessageFromStrTests(unittest.SynchronousTestCase):
+    """
+    Tests for the direct and lazy decoding of L{dns.Message.fromStr}.
+    """
+    def makeMessage(self):
+        """
+        @return: The bytes of a response with records of each type
+            L{dns.Message.fromStr} decodes directly and some it does not.
+        """
+        message = dns.Message(id=10, answer=1, auth=1)
+        message.addQuery(b'example.com', dns.A)
+        message.answers = [
+            dns.RRHeader(b'example.com', dns.CNAME, ttl=5,
+                         payload=dns.Record_CNAME(b'www.example.com', 5)),
+            dns.RRHeader(b'www.example.com', dns.A, ttl=5,
+                         payload=dns.Record_A('10.0.0.1', 5)),
+            dns.RRHeader(b'www.example.com', dns.AAAA, ttl=5,
+                         payload=dns.Record_AAAA('::1', 5)),
+            dns.RRHeader(b'www.example.com', dns.HINFO, ttl=5,
+                         payload=dns.Record_HINFO(b'cpu', b'os', 5)),
+            ]
+        message.authority = [
+            dns.RRHeader(b'example.com', dns.NS, ttl=5,
+                         payload=dns.Record_NS(b'ns.example.com', 5)),
+            dns.RRHeader(b'example.com', dns.MX, ttl=5,
+                         payload=dns.Record_MX(10, b'mail.example.com', 5)),
+            dns.RRHeader(b'_sip._tcp.example.com', dns.SRV, ttl=5,
+                         payload=dns.Record_SRV(1, 2, 5060, b'sip.com', 5)),
+            ]
+        message.additional = [
+            dns.RRHeader(b'example.com', dns.TXT, ttl=5,
+                         payload=dns.Record_TXT(b'a', b'bc', ttl=5)),
+            dns.RRHeader(b'example.com', 65280, ttl=5,
+                         payload=dns.UnknownRecord(b'data', 5)),
+            ]
+        return message.toStr()
+
+
+    def decode(self, data):
+        """
+        @return: The L{dns.Message} decoded from C{data} by
+            L{dns.Message.decode}.
+        """
+        message = dns.Message()
+        message.decode(BytesIO(data))
+        return message
+
+
+    def test_sameAsDecode(self):
+        """
+        L{dns.Message.fromStr} decodes the same message as
+        L{dns.Message.decode}.
+        """
+        data = self.makeMessage()
+        message = dns.Message()
+        message.fromStr(data)
+        self.assertEqual(message, self.decode(data))
+        self.assertEqual(
+            [type(header.payload) for header in message.answers],
+            [dns.Record_CNAME, dns.Record_A, dns.Record_AAAA,
+             dns.Record_HINFO])
+        self.assertEqual(message.answers[1].payload.dottedQuad(), '10.0.0.1')
+        self.assertEqual(message.authority[2].payload.target,
+                         dns.Name(b'sip.com'))
+        self.assertEqual(message.additional[0].payload.data, [b'a', b'bc'])
+        self.assertTrue(message.additional[1].auth)
+
+
+    def test_truncated(self):
+        """
+        L{dns.Message.fromStr} keeps the records before one the message ends
+        in, as L{dns.Message.decode} does.
+        """
+        data = self.makeMessage()
+        for length in range(dns.Message.headerSize, len(data)):
+            message = dns.Message()
+            message.fromStr(data[:length])
+            self.assertEqual(message, self.decode(data[:length]))
+        self.assertRaises(EOFError, dns.Message().fromStr, data[:5])
+
+
+    def test_compressionLoop(self):
+        """
+        L{dns.Message.fromStr} raises L{ValueError} for a name which contains
+        a compression loop.
+        """
+        data = (b'\x00\x01\x80\x00\x00\x00\x00\x01\x00\x00\x00\x00'
+                b'\xc0\x0c\x00\x01\x00\x01\x00\x00\x00\x00\x00\x00')
+        self.assertRaises(ValueError, dns.Message().fromStr, data)
+
+
+    def test_lazy(self):
+        """
+        L{dns.Message.fromStr} with C{lazy} set decodes the header and the
+        queries, and the record sections when one of them is accessed.
+        """
+        data = self.makeMessage()
+        message = dns.Message()
+        message.fromStr(data, lazy=True)
+        self.assertEqual((message.id, message.auth), (10, 1))
+        self.assertEqual(message.queries, [dns.Query(b'example.com')])
+        self.assertNotIn('answers', message.__dict__)
+
+        self.assertEqual(len(message.authority), 3)
+        self.assertIn('answers', message.__dict__)
+        self.assertEqual(message, self.decode(data))
+
+
+    def test_lazyAssigned(self):
+        """
+        A section assigned before the lazily decoded sections are accessed is
+        kept.
+        """
+        message = dns.Message()
+        message.fromStr(self.makeMessage(), lazy=True)
+        message.answers = []
+        self.assertEqual(len(message.additional), 2)
+        self.assertEqual(message.answers, [])
+
+
+    def test_lazyError(self):
+        """
+        An error decoding lazily decoded sections is raised when they are
+        accessed.
+        """
+        data = (b'\x00\x01\x80\x00\x00\x00\x00\x01\x00\x00\x00\x00'
+                b'\xc0\x0c\x00\x01\x00\x01\x00\x00\x00\x00\x00\x00')
+        message = dns.Message()
+        message.fromStr(data, lazy=True)
+        self.assertRaises(ValueError, getattr, message, 'answers')
+
+
+    def test_reused(self):
+        """
+        Decoding into a message whose lazily decoded sections have not been
+        accessed replaces them.
+        """
+        message = dns.Message()
+        message.fromStr(self.makeMessage(), lazy=True)
+        message.fromStr(dns.Message(id=3).toStr())
+        self.assertEqual(
+            (message.id, message.answers, message.authority,
+             message.additional),
+            (3, [], [], []))
+
+
+
 class MessageComparisonTests(ComparisonTestsMixin,
                              unittest.SynchronousTestCase):
     """
@@ -626,6 +626,251 @@ class AuthorityTests(unittest.TestCase):
         self._referralTest('lookupAllRecords')
 
 
+    def zoneAuthority(self):
+        """
+        @return: An authority for C{example.com} with a delegation, a
+            wildcard and an empty non-terminal.
+        """
+        ns = dns.Record_NS(b'ns.child.example.com', ttl=60)
+        return NoFileAuthority(
+            soa=(b'example.com', soa_record),
+            records={
+                b'example.com': [soa_record],
+                b'child.example.com': [ns],
+                b'ns.child.example.com': [dns.Record_A(b'10.0.0.2', ttl=60)],
+                b'*.example.com': [
+                    dns.Record_A(b'10.0.0.3', ttl=60),
+                    dns.Record_MX(10, b'mail.example.com', ttl=60)],
+                b'host.empty.example.com': [
+                    dns.Record_A(b'10.0.0.4', ttl=60)],
+                })
+
+
+    def assertReferral(self, result):
+        """
+        Assert that C{result} refers the query to the nameserver of
+        C{child.example.com}, with its address.
+        """
+        answer, authority, additional = result
+        self.assertEqual(answer, [])
+        self.assertEqual(authority, [
+            dns.RRHeader(b'child.example.com', dns.NS, ttl=60, auth=False,
+                         payload=dns.Record_NS(b'ns.child.example.com', 60))])
+        self.assertEqual(additional, [
+            dns.RRHeader(b'ns.child.example.com', dns.A, ttl=60, auth=True,
+                         payload=dns.Record_A(b'10.0.0.2', 60))])
+
+
+    def test_referralBelowDelegation(self):
+        """
+        Queries for names below a delegation, whether or not there are
+        records for them in the zone, are answered with a referral.
+        """
+        testAuthority = self.zoneAuthority()
+        self.assertReferral(self.successResultOf(
+            testAuthority.lookupAddress(b'host.child.example.com')))
+        self.assertReferral(self.successResultOf(
+            testAuthority.lookupAddress(b'ns.child.example.com')))
+        self.assertReferral(self.successResultOf(
+            testAuthority.lookupMailExchange(b'a.b.child.example.com')))
+
+
+    def test_emptyNonTerminal(self):
+        """
+        A query for a name with no records but with names below it is
+        answered with no records and the I{SOA} record, rather than with a
+        name error.
+        """
+        answer, authority, additional = self.successResultOf(
+            self.zoneAuthority().lookupAddress(b'empty.example.com'))
+        self.assertEqual(answer, [])
+        self.assertEqual(authority, [
+            dns.RRHeader(b'example.com', dns.SOA, ttl=soa_record.expire,
+                         payload=soa_record, auth=True)])
+
+
+    def test_wildcard(self):
+        """
+        A query for a name which does not exist is answered from the records
+        of the wildcard name of its closest existing ancestor, for the name
+        queried.
+        """
+        testAuthority = self.zoneAuthority()
+        answer, authority, additional = self.successResultOf(
+            testAuthority.lookupAddress(b'a.b.example.com'))
+        self.assertEqual(answer, [
+            dns.RRHeader(b'a.b.example.com', dns.A, ttl=60, auth=True,
+                         payload=dns.Record_A(b'10.0.0.3', 60))])
+
+        answer, authority, additional = self.successResultOf(
+            testAuthority.lookupIPV6Address(b'other.example.com'))
+        self.assertEqual(answer, [])
+        self.assertEqual(authority[0].type, dns.SOA)
+
+        # The closest existing ancestor of this name has no wildcard.
+        failure = self.failureResultOf(
+            testAuthority.lookupAddress(b'missing.empty.example.com'))
+        self.assertIsInstance(failure.value, dns.AuthoritativeDomainError)
+
+
+    def test_indexReplaced(self):
+        """
+        The index of the records is made again when the records are
+        replaced.
+        """
+        testAuthority = self.zoneAuthority()
+        self.successResultOf(testAuthority.lookupAddress(b'example.com'))
+        index = testAuthority._zoneIndex()
+        self.assertIs(testAuthority._zoneIndex(), index)
+
+        testAuthority.records = {
+            b'example.com': [soa_record],
+            b'new.example.com': [dns.Record_A(b'10.0.0.5')]}
+        answer, authority, additional = self.successResultOf(
+            testAuthority.lookupAddress(b'new.example.com'))
+        self.assertEqual(answer[0].payload, dns.Record_A(b'10.0.0.5'))
+        self.assertIsNot(testAuthority._zoneIndex(), index)
+        self.failureResultOf(
+            testAuthority.lookupAddress(b'a.b.example.com'),
+            dns.AuthoritativeDomainError)
+
+
+
+class RecordingProtocol(object):
+    """
+    A partial fake L{dns.DNSDatagramProtocol} which records the messages it
+    is asked to write.
+
+    @ivar written: The encoded messages written, with their addresses.
+    """
+    def __init__(self):
+        self.written = []
+
+
+    def writeMessage(self, message, address):
+        self.written.append((message.toStr(), address))
+
+
+
+class StoredResponseTests(unittest.TestCase):
+    """
+    Tests for the encoded responses a L{server.DNSServerFactory} stores with a
+    L{FileAuthority} and sends again.
+    """
+    def setUp(self):
+        self.authority = NoFileAuthority(
+            soa=(b'example.com', soa_record),
+            records={
+                b'example.com': [soa_record],
+                b'www.example.com': [dns.Record_A(b'10.0.0.1', ttl=60)]})
+        self.factory = server.DNSServerFactory(authorities=[self.authority])
+        self.protocol = RecordingProtocol()
+        self.lookups = []
+        lookup = self.authority._lookup
+        def recordingLookup(*args):
+            self.lookups.append(args)
+            return lookup(*args)
+        self.authority._lookup = recordingLookup
+
+
+    def query(self, name, id, type=dns.A):
+        """
+        Have the factory answer a query.
+
+        @return: The decoded response.
+        """
+        message = dns.Message(id=id)
+        message.addQuery(name, type)
+        self.factory.messageReceived(message, self.protocol, ('::1', 53))
+        response = dns.Message()
+        response.fromStr(self.protocol.written[-1][0])
+        return response
+
+
+    def test_sentAgain(self):
+        """
+        A second identical query is answered with the encoded response to the
+        first, with its own ID, without looking up the records again.
+        """
+        first = self.query(b'www.example.com', 1)
+        second = self.query(b'www.example.com', 2)
+        self.assertEqual(len(self.lookups), 1)
+        self.assertEqual((first.id, second.id), (1, 2))
+        self.assertEqual(self.protocol.written[0][0][2:],
+                         self.protocol.written[1][0][2:])
+        self.assertEqual(self.protocol.written[1][1], ('::1', 53))
+        self.assertEqual(second.answers[0].payload.dottedQuad(), '10.0.0.1')
+        self.assertTrue(second.auth)
+
+
+    def test_nameError(self):
+        """
+        The I{NXDOMAIN} response to a query for a name in the zone which does
+        not exist is sent again.
+        """
+        self.query(b'missing.example.com', 1)
+        response = self.query(b'missing.example.com', 2)
+        self.assertEqual(len(self.lookups), 1)
+        self.assertEqual((response.id, response.rCode), (2, dns.ENAME))
+
+
+    def test_separateQueries(self):
+        """
+        Responses are stored separately for each name, as it was written, and
+        each type.
+        """
+        self.query(b'www.example.com', 1)
+        upper = self.query(b'WWW.example.com', 2)
+        self.query(b'www.example.com', 3, dns.AAAA)
+        self.assertEqual(len(self.lookups), 3)
+        self.assertEqual(upper.queries[0].name.name, b'WWW.example.com')
+
+
+    def test_zoneChanged(self):
+        """
+        Stored responses are discarded when the authority's records are
+        replaced, as when its zone is loaded again or transferred.
+        """
+        self.query(b'www.example.com', 1)
+        self.authority.records = {
+            b'www.example.com': [dns.Record_A(b'10.0.0.2', ttl=60)]}
+        response = self.query(b'www.example.com', 2)
+        self.assertEqual(len(self.lookups), 2)
+        self.assertEqual(response.answers[0].payload.dottedQuad(), '10.0.0.2')
+
+
+    def test_notAuthoritative(self):
+        """
+        Responses to queries which the authority leaves to other resolvers
+        are not stored.
+        """
+        self.query(b'www.example.org', 1)
+        self.query(b'www.example.org', 2)
+        self.assertEqual(len(self.lookups), 2)
+        self.assertIsNone(self.authority._responses)
+
+
+    def test_verbose(self):
+        """
+        Responses are not stored if C{verbose} is more than C{1}, so that each
+        is logged in full.
+        """
+        self.factory.verbose = 2
+        self.query(b'www.example.com', 1)
+        self.query(b'www.example.com', 2)
+        self.assertEqual(len(self.lookups), 2)
+
+
+    def test_responseCacheSize(self):
+        """
+        When C{responseCacheSize} responses are stored, they are discarded to
+        make room for another.
+        """
+        self.authority.responseCacheSize = 2
+        for name in [b'a.example.com', b'b.example.com', b'c.example.com']:
+            self.query(name, 1)
+        self.assertEqual(len(self.authority._responses), 1)
+
 
 class AdditionalProcessingTests(unittest.TestCase):
     """
@@ -1198,3 +1443,52 @@ class BindAuthorityTests(unittest.TestCase):
                 nativeString(directive + b" directive not implemented"),
                 e.exception.args[0]
             )
+
+
+    def test_reload(self):
+        """
+        L{BindAuthority.reload} loads the zone file again, and keeps the
+        zone it was serving if the file cannot be loaded.
+        """
+        fp = FilePath(self.mktemp().encode("ascii"))
+        fp.setContent(sampleBindZone)
+        auth = authority.BindAuthority(fp.path)
+        records = auth.records
+
+        fp.setContent(sampleBindZone + b"\nnew IN A 10.0.0.9\nbad IN LOL x")
+        self.assertRaises(NotImplementedError, auth.reload)
+        self.assertIs(auth.records, records)
+
+        fp.setContent(sampleBindZone + b"\nnew IN A 10.0.0.9\n")
+        auth.reload()
+        self.assertIsNot(auth.records, records)
+        rr = self.successResultOf(
+            auth.lookupAddress(b"new.example.com"))[0][0]
+        self.assertEqual(dns.Record_A(u"10.0.0.9", 604800), rr.payload)
+
+
+    def test_indexedOnLoad(self):
+        """
+        The zone is indexed as soon as it is loaded, so the first query does
+        not have to wait for it to be.
+        """
+        fp = FilePath(self.mktemp().encode("ascii"))
+        fp.setContent(sampleBindZone)
+        auth = authority.BindAuthority(fp.path)
+        self.assertIs(auth._index.records, auth.records)
+
+        fp.setContent(sampleBindZone + b"\nnew IN A 10.0.0.9\n")
+        auth.loadFile(fp.path)
+        self.assertIs(auth._index.records, auth.records)
+
+
+    def test_continuations(self):
+        """
+        Statements continued over several lines between parentheses are
+        parsed as one.
+        """
+        self.assertEqual(
+            list(self.auth.collapseContinuations([
+                b"a IN SOA b (", b"1", b"", b"2 )", b"", b"c IN A 10.0.0.1"])),
+            [[b"a", b"IN", b"SOA", b"b", b"1", b"2"],
+             [b"c", b"IN", b"A", b"10.0.0.1"]])
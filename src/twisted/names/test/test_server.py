@@ -947,6 +947,51 @@ class DNSServerFactoryTests(unittest.TestCase):
         )
 
 
+    def test_gotResolverErrorCachesNameError(self):
+        """
+        L{server.DNSServerFactory.gotResolverError} passes the query and the
+        authority records of the response carried by a
+        L{error.DNSNameError} to the C{cacheNameError} method of its
+        C{cache}.
+        """
+        calls = []
+        class FakeCache(object):
+            def cacheNameError(self, *args):
+                calls.append(args)
+
+        factory = NoResponseDNSServerFactory(caches=[FakeCache()])
+        request = dns.Message()
+        request.addQuery(b'missing.example.com')
+        response = dns.Message(rCode=dns.ENAME)
+        response.authority = [dns.RRHeader(b'example.com', dns.SOA)]
+        factory.gotResolverError(
+            failure.Failure(error.DNSNameError(response)),
+            protocol=None, message=request, address=None)
+        self.assertEqual(
+            calls, [(request.queries[0], response.authority)])
+
+
+    def test_gotResolverErrorCacheWithoutNameError(self):
+        """
+        L{server.DNSServerFactory.gotResolverError} still replies if its
+        C{cache} has no C{cacheNameError} method.
+        """
+        class FakeCache(object):
+            def cacheResult(self, *args):
+                pass
+
+        factory = NoResponseDNSServerFactory(caches=[FakeCache()])
+        replies = []
+        factory.sendReply = lambda *args: replies.append(args)
+        request = dns.Message()
+        request.addQuery(b'missing.example.com')
+        factory.gotResolverError(
+            failure.Failure(error.DNSNameError(dns.Message(rCode=dns.ENAME))),
+            protocol=None, message=request, address=None)
+        [(protocol, response, address)] = replies
+        self.assertEqual(response.rCode, dns.ENAME)
+
+
     def _assertMessageRcodeForError(self, responseError, expectedMessageCode):
         """
         L{server.DNSServerFactory.gotResolver} accepts a L{failure.Failure} and
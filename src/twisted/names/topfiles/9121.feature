@@ -0,0 +1 @@
+twisted.names.server.DNSServerFactory now sends stored encoded responses to repeated queries answered by a twisted.names.authority.FileAuthority.
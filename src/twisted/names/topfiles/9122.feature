@@ -0,0 +1 @@
+twisted.names.cache.CacheResolver now accepts a maximum number of entries, caches name errors, refreshes popular entries before they expire and counts hits and misses.
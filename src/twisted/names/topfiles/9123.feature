@@ -0,0 +1 @@
+twisted.names.client.Resolver now sends identical concurrent UDP queries once, can use a pool of UDP ports and prefers the nameservers which respond fastest.
@@ -0,0 +1 @@
+twisted.names.dns.Message.fromStr now accepts lazy=True to decode the record sections of a message only when they are first accessed.
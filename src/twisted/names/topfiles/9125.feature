@@ -0,0 +1 @@
+twisted.names.authority.FileAuthority now indexes its records, answers with referrals for delegated names, supports wildcard records and empty non-terminals, and can be reloaded with reload().
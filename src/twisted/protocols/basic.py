@@ -11,7 +11,7 @@ from __future__ import absolute_import, division
 
 # System imports
 import re
-from struct import pack, unpack, calcsize
+from struct import pack, unpack, unpack_from, calcsize
 from io import BytesIO
 import math
 
@@ -841,6 +841,304 @@ class Int8StringReceiver(IntNStringReceiver):
 
 
 
+class _BufferedReceiverMixin:
+    """
+    Keep received data in a reusable L{bytearray} which transports providing
+    the L{interfaces.IBufferedProtocol} support read into directly, and parse
+    messages out of it in place.
+
+    Subclasses implement C{_parseReceived} to deliver every complete message
+    between C{_parseOffset} and C{_fillOffset}, advancing C{_parseOffset}
+    past each one before handing it to application code.  Since application
+    code may call L{dataReceived} again (for example, through
+    C{setLineMode}), C{_parseReceived} must re-read these attributes after
+    every callback rather than keeping them in local variables.
+
+    @ivar minimumBufferSize: The smallest receive buffer to allocate.
+    @type minimumBufferSize: C{int}
+
+    @ivar _receiveBuffer: Data received but not yet parsed lives in this
+        buffer between C{_parseOffset} and C{_fillOffset}.
+    @type _receiveBuffer: C{bytearray}
+
+    @ivar _receiveView: A L{memoryview} of C{_receiveBuffer}, used to slice it
+        without copying.
+
+    @ivar _parseOffset: The offset of the first byte not yet parsed.
+    @type _parseOffset: C{int}
+
+    @ivar _fillOffset: The offset of the first byte not yet received into.
+    @type _fillOffset: C{int}
+
+    @ivar _parsing: C{True} while C{_parseReceived} is running.  The buffer is
+        not compacted then, so that the offsets stay valid.
+    @type _parsing: C{bool}
+    """
+    minimumBufferSize = 4096
+    _receiveBuffer = bytearray()
+    _receiveView = memoryview(_receiveBuffer)
+    _parseOffset = 0
+    _fillOffset = 0
+    _parsing = False
+
+    def getBuffer(self, sizeHint):
+        """
+        Make room for at least C{sizeHint} more bytes at the end of the
+        receive buffer, and return that free space.
+
+        Room is made by moving unparsed data to the start of the buffer if it
+        is large enough, and by allocating a larger one otherwise; the buffer
+        is never resized in place, since the transport may still hold a view
+        of it.
+
+        @see: L{interfaces.IBufferedProtocol.getBuffer}
+        """
+        sizeHint = max(sizeHint, 1)
+        buf = self._receiveBuffer
+        start, end = self._parseOffset, self._fillOffset
+        if len(buf) - end < sizeHint:
+            if self._parsing:
+                # Offsets must not change, so keep everything.
+                start = 0
+            needed = end - start + sizeHint
+            if start and len(buf) >= needed:
+                buf[:end - start] = buf[start:end]
+            else:
+                buf = bytearray(max(needed, len(buf) * 2,
+                                    self.minimumBufferSize))
+                buf[:end - start] = self._receiveView[start:end]
+                self._receiveBuffer = buf
+                self._receiveView = memoryview(buf)
+            self._parseOffset, self._fillOffset = 0, end - start
+        return self._receiveView[self._fillOffset:]
+
+
+    def bufferUpdated(self, nbytes):
+        """
+        Parse the data just received into the receive buffer.
+
+        @see: L{interfaces.IBufferedProtocol.bufferUpdated}
+        """
+        self._fillOffset += nbytes
+        if self._parsing:
+            return
+        self._parsing = True
+        try:
+            return self._parseReceived()
+        finally:
+            self._parsing = False
+            if self._parseOffset == self._fillOffset:
+                self._parseOffset = self._fillOffset = 0
+
+
+    def dataReceived(self, data):
+        """
+        Copy data delivered the usual way into the receive buffer and parse
+        it, for transports which do not support
+        L{interfaces.IBufferedProtocol}.
+        """
+        size = len(data)
+        if size:
+            self.getBuffer(size)[:size] = data
+        return self.bufferUpdated(size)
+
+
+    def _takeReceived(self, end):
+        """
+        Copy part of the unparsed data out of the receive buffer.
+
+        @param end: The offset at which the data to copy ends.
+        @type end: C{int}
+
+        @return: The data between C{_parseOffset} and C{end}.
+        @rtype: C{bytes}
+        """
+        return self._receiveView[self._parseOffset:end].tobytes()
+
+
+    def _clearReceived(self):
+        """
+        Discard all unparsed data.
+
+        @return: The discarded data.
+        @rtype: C{bytes}
+        """
+        data = self._takeReceived(self._fillOffset)
+        self._parseOffset = self._fillOffset = 0
+        return data
+
+
+
+@implementer(interfaces.IBufferedProtocol)
+class BufferedLineReceiver(_BufferedReceiverMixin, LineReceiver):
+    """
+    A L{LineReceiver} which receives data into a reusable buffer.
+
+    On transports which support L{interfaces.IBufferedProtocol} each read
+    goes directly into the receive buffer, and each line or chunk of raw data
+    is copied out of it exactly once, so fewer and smaller temporary objects
+    are allocated than with L{LineReceiver}.  The API for subclasses is the
+    same as L{LineReceiver}'s.
+    """
+
+    def clearLineBuffer(self):
+        """
+        Clear buffered data.
+
+        @return: All of the cleared buffered data.
+        @rtype: C{bytes}
+        """
+        return self._clearReceived()
+
+
+    def _parseReceived(self):
+        """
+        Deliver all complete lines, or all raw data, in the receive buffer.
+        """
+        while self._parseOffset < self._fillOffset and not self.paused:
+            if self.line_mode:
+                start = self._parseOffset
+                end = self._receiveBuffer.find(
+                    self.delimiter, start, self._fillOffset)
+                if end == -1:
+                    if self._fillOffset - start > self.MAX_LENGTH:
+                        return self.lineLengthExceeded(self._clearReceived())
+                    return
+                if end - start > self.MAX_LENGTH:
+                    return self.lineLengthExceeded(self._clearReceived())
+                line = self._takeReceived(end)
+                self._parseOffset = end + len(self.delimiter)
+                why = self.lineReceived(line)
+                if (why or self.transport and
+                    self.transport.disconnecting):
+                    return why
+            else:
+                data = self._clearReceived()
+                why = self.rawDataReceived(data)
+                if why:
+                    return why
+
+
+
+@implementer(interfaces.IBufferedProtocol)
+class BufferedIntNStringReceiver(_BufferedReceiverMixin, IntNStringReceiver):
+    """
+    An L{IntNStringReceiver} which receives data into a reusable buffer.
+
+    Each length prefix is decoded in place and each string is copied out of
+    the receive buffer exactly once.  The C{recvd} attribute of
+    L{IntNStringReceiver} is not supported.
+    """
+    recvd = None
+
+    def _parseReceived(self):
+        """
+        Deliver all complete strings in the receive buffer.
+        """
+        prefixLength = self.prefixLength
+        fmt = self.structFormat
+        maxLength = self.MAX_LENGTH
+        while not self.paused:
+            buf, start = self._receiveBuffer, self._parseOffset
+            if self._fillOffset - start < prefixLength:
+                return
+            length, = unpack_from(fmt, buf, start)
+            if length > maxLength:
+                self.lengthLimitExceeded(length)
+                return
+            messageStart = start + prefixLength
+            messageEnd = messageStart + length
+            if self._fillOffset < messageEnd:
+                return
+            packet = self._receiveView[messageStart:messageEnd].tobytes()
+            self._parseOffset = messageEnd
+            self.stringReceived(packet)
+
+
+
+@implementer(interfaces.IBufferedProtocol)
+class BufferedInt32StringReceiver(BufferedIntNStringReceiver):
+    """
+    A L{BufferedIntNStringReceiver} for int32-prefixed strings.
+
+    @see: L{Int32StringReceiver}
+    """
+    structFormat = Int32StringReceiver.structFormat
+    prefixLength = Int32StringReceiver.prefixLength
+
+
+
+@implementer(interfaces.IBufferedProtocol)
+class BufferedInt16StringReceiver(BufferedIntNStringReceiver):
+    """
+    A L{BufferedIntNStringReceiver} for int16-prefixed strings.
+
+    @see: L{Int16StringReceiver}
+    """
+    structFormat = Int16StringReceiver.structFormat
+    prefixLength = Int16StringReceiver.prefixLength
+
+
+
+@implementer(interfaces.IBufferedProtocol)
+class BufferedInt8StringReceiver(BufferedIntNStringReceiver):
+    """
+    A L{BufferedIntNStringReceiver} for int8-prefixed strings.
+
+    @see: L{Int8StringReceiver}
+    """
+    structFormat = Int8StringReceiver.structFormat
+    prefixLength = Int8StringReceiver.prefixLength
+
+
+
+@implementer(interfaces.IBufferedProtocol)
+class BufferedNetstringReceiver(_BufferedReceiverMixin, NetstringReceiver):
+    """
+    A L{NetstringReceiver} which receives data into a reusable buffer.
+
+    Length specifications are matched in place and each payload is copied out
+    of the receive buffer exactly once.
+    """
+
+    def _parseReceived(self):
+        """
+        Deliver all complete netstrings in the receive buffer.
+        """
+        while self._parseOffset < self._fillOffset:
+            start = self._parseOffset
+            try:
+                if self._state == self._PARSING_LENGTH:
+                    lengthMatch = self._LENGTH.match(
+                        self._receiveBuffer, start, self._fillOffset)
+                    if not lengthMatch:
+                        partialLengthMatch = self._LENGTH_PREFIX.match(
+                            self._receiveBuffer, start, self._fillOffset)
+                        if not partialLengthMatch:
+                            raise NetstringParseError(self._MISSING_LENGTH)
+                        self._extractLength(
+                            bytes(partialLengthMatch.group(1)))
+                        return
+                    # Expect payload plus trailing comma:
+                    self._expectedPayloadSize = self._extractLength(
+                        bytes(lengthMatch.group(1))) + 1
+                    self._parseOffset = start = lengthMatch.end(2)
+                    self._state = self._PARSING_PAYLOAD
+                end = start + self._expectedPayloadSize
+                if self._fillOffset < end:
+                    return
+                if self._receiveBuffer[end - 1:end] != b",":
+                    raise NetstringParseError(self._MISSING_COMMA)
+            except NetstringParseError:
+                self._handleParseError()
+                return
+            payload = self._takeReceived(end - 1)
+            self._parseOffset = end
+            self._state = self._PARSING_LENGTH
+            self.stringReceived(payload)
+
+
+
 class StatefulStringProtocol:
     """
     A stateful string protocol.
@@ -888,6 +1186,10 @@ class FileSender:
     This is a helper for protocols that, at some point, will take a
     file-like object, read its contents, and write them out to the network,
     optionally performing some transformation on the bytes in between.
+
+    If there is no transformation and the consumer provides
+    L{interfaces.ISendFileTransport}, the rest of the file is sent with
+    L{interfaces.ISendFileTransport.sendFile} instead of being read.
     """
 
     CHUNK_SIZE = 2 ** 14
@@ -919,10 +1221,64 @@ class FileSender:
         self.transform = transform
 
         self.deferred = deferred = defer.Deferred()
+        if transform is None and (
+                interfaces.ISendFileTransport.providedBy(consumer)):
+            if self._sendFile():
+                return deferred
         self.consumer.registerProducer(self, False)
         return deferred
 
 
+    def _sendFile(self):
+        """
+        Send the rest of the file with
+        L{interfaces.ISendFileTransport.sendFile}.
+
+        @return: C{True} if the file is being sent this way, C{False} if it
+            has to be read and written instead.
+        """
+        try:
+            offset = self.file.tell()
+            sending = self.consumer.sendFile(self.file, offset)
+        except (AttributeError, IOError, ValueError):
+            return False
+        sending.addCallbacks(self._fileSent, self._fileNotSent,
+                             callbackArgs=(offset,))
+        return True
+
+
+    def _fileSent(self, sent, offset):
+        """
+        Leave the file positioned at its end and fire C{self.deferred} once
+        L{_sendFile} has sent it.
+
+        @param sent: The number of bytes sent.
+        @param offset: The offset at which sending started.
+        """
+        if sent:
+            self.file.seek(offset + sent - 1)
+            self.lastSent = self.file.read(1)
+        else:
+            self.file.seek(offset)
+        self.file = None
+        if self.deferred:
+            self.deferred.callback(self.lastSent)
+            self.deferred = None
+
+
+    def _fileNotSent(self, reason):
+        """
+        Fail C{self.deferred} if the connection is lost before L{_sendFile}
+        has sent the file.
+
+        @param reason: The reason the file could not be sent.
+        """
+        self.file = None
+        if self.deferred:
+            self.deferred.errback(reason)
+            self.deferred = None
+
+
     def resumeProducing(self):
         chunk = ''
         if self.file:
@@ -18,7 +18,7 @@ from zope.interface import directlyProvides, providedBy
 # twisted imports
 from twisted.internet.protocol import ServerFactory, Protocol, ClientFactory
 from twisted.internet import error
-from twisted.internet.interfaces import ILoggingContext
+from twisted.internet.interfaces import ILoggingContext, ISendFileTransport
 from twisted.python import log
 
 
@@ -40,6 +40,10 @@ class ProtocolWrapper(Protocol):
     """
     Wraps protocol instances and acts as their transport as well.
 
+    The wrapper provides the interfaces of the transport it wraps, except
+    L{ISendFileTransport}: a file sent with C{sendFile} would go straight to
+    the wrapped transport, bypassing the wrapper's own C{write}.
+
     @ivar wrappedProtocol: An L{IProtocol<twisted.internet.interfaces.IProtocol>}
         provider to which L{IProtocol<twisted.internet.interfaces.IProtocol>}
         method calls onto this L{ProtocolWrapper} will be proxied.
@@ -69,7 +73,7 @@ class ProtocolWrapper(Protocol):
         save the real transport, and connect the wrapped protocol to this
         L{ProtocolWrapper} to intercept any transport calls it makes.
         """
-        directlyProvides(self, providedBy(transport))
+        directlyProvides(self, providedBy(transport) - ISendFileTransport)
         Protocol.makeConnection(self, transport)
         self.factory.registerProtocol(self)
         self.wrappedProtocol.makeConnection(self)
@@ -111,6 +115,8 @@ class ProtocolWrapper(Protocol):
 
 
     def __getattr__(self, name):
+        if name == 'sendFile':
+            raise AttributeError(name)
         return getattr(self.transport, name)
 
 
@@ -11,6 +11,7 @@ import sys
 import struct
 from io import BytesIO
 
+from zope.interface import implementer
 from zope.interface.verify import verifyObject
 
 from twisted.python.compat import _PY3, iterbytes
@@ -18,7 +19,9 @@ from twisted.trial import unittest
 from twisted.protocols import basic
 from twisted.python import reflect
 from twisted.internet import protocol, error, task
-from twisted.internet.interfaces import IProducer
+from twisted.internet.interfaces import (
+    IProducer, IBufferedProtocol, ISendFileTransport)
+from twisted.internet.defer import Deferred
 from twisted.test import proto_helpers
 
 _PY3NEWSTYLESKIP = "All classes are new style on Python 3."
@@ -155,7 +158,16 @@ class LineReceiverTests(unittest.SynchronousTestCase):
     """
     Test L{twisted.protocols.basic.LineReceiver}, using the C{LineTester}
     wrapper.
+
+    @ivar receiverClass: The line receiver class under test.
+    @ivar lineTester: A C{LineTester} subclass of C{receiverClass}.
+    @ivar flippingLineTester: A C{FlippingLineTester} subclass of
+        C{receiverClass}.
     """
+    receiverClass = basic.LineReceiver
+    lineTester = LineTester
+    flippingLineTester = FlippingLineTester
+
     buffer = b'''\
 len 10
 
@@ -185,7 +197,7 @@ a'''
         """
         for packet_size in range(1, 10):
             t = proto_helpers.StringIOWithoutClosing()
-            a = LineTester()
+            a = self.lineTester()
             a.makeConnection(protocol.FileWrapper(t))
             for i in range(len(self.buffer) // packet_size + 1):
                 s = self.buffer[i * packet_size:(i + 1) * packet_size]
@@ -207,7 +219,7 @@ a'''
         for packet_size in range(1, 10):
             t = proto_helpers.StringIOWithoutClosing()
             clock = task.Clock()
-            a = LineTester(clock)
+            a = self.lineTester(clock)
             a.makeConnection(protocol.FileWrapper(t))
             for i in range(len(self.pauseBuf) // packet_size + 1):
                 s = self.pauseBuf[i * packet_size:(i + 1) * packet_size]
@@ -230,7 +242,7 @@ a'''
         for packet_size in range(1, 10):
             t = proto_helpers.StringIOWithoutClosing()
             clock = task.Clock()
-            a = LineTester(clock)
+            a = self.lineTester(clock)
             a.makeConnection(protocol.FileWrapper(t))
             for i in range(len(self.rawpauseBuf) // packet_size + 1):
                 s = self.rawpauseBuf[i * packet_size:(i + 1) * packet_size]
@@ -250,7 +262,7 @@ a'''
         """
         for packet_size in range(1, 10):
             t = proto_helpers.StringIOWithoutClosing()
-            a = LineTester()
+            a = self.lineTester()
             a.makeConnection(protocol.FileWrapper(t))
             for i in range(len(self.stop_buf) // packet_size + 1):
                 s = self.stop_buf[i * packet_size:(i + 1) * packet_size]
@@ -262,7 +274,7 @@ a'''
         """
         Test produce/unproduce in receiving.
         """
-        a = LineTester()
+        a = self.lineTester()
         t = proto_helpers.StringIOWithoutClosing()
         a.makeConnection(protocol.FileWrapper(t))
         a.dataReceived(b'produce\nhello world\nunproduce\ngoodbye\n')
@@ -275,7 +287,7 @@ a'''
         L{LineReceiver.clearLineBuffer} removes all buffered data and returns
         it as a C{bytes} and can be called from beneath C{dataReceived}.
         """
-        class ClearingReceiver(basic.LineReceiver):
+        class ClearingReceiver(self.receiverClass):
             def lineReceived(self, line):
                 self.line = line
                 self.rest = self.clearLineBuffer()
@@ -296,7 +308,7 @@ a'''
         """
         Test switching modes many times on the same data.
         """
-        proto = FlippingLineTester()
+        proto = self.flippingLineTester()
         transport = proto_helpers.StringIOWithoutClosing()
         proto.makeConnection(protocol.FileWrapper(transport))
         limit = sys.getrecursionlimit()
@@ -309,7 +321,7 @@ a'''
         C{LineReceiver.dataReceived} forwards errors returned by
         C{rawDataReceived}.
         """
-        proto = basic.LineReceiver()
+        proto = self.receiverClass()
         proto.rawDataReceived = lambda data: RuntimeError("oops")
         transport = proto_helpers.StringTransport()
         proto.makeConnection(transport)
@@ -323,7 +335,7 @@ a'''
         When L{LineReceiver.rawDataReceived} is not overridden in a
         subclass, calling it raises C{NotImplementedError}.
         """
-        proto = basic.LineReceiver()
+        proto = self.receiverClass()
         self.assertRaises(NotImplementedError, proto.rawDataReceived, 'foo')
 
 
@@ -332,7 +344,7 @@ a'''
         When L{LineReceiver.lineReceived} is not overridden in a subclass,
         calling it raises C{NotImplementedError}.
         """
-        proto = basic.LineReceiver()
+        proto = self.receiverClass()
         self.assertRaises(NotImplementedError, proto.lineReceived, 'foo')
 
 
@@ -365,9 +377,16 @@ class ExcessivelyLargeLineCatcher(basic.LineReceiver):
 class LineReceiverLineLengthExceededTests(unittest.SynchronousTestCase):
     """
     Tests for L{twisted.protocols.basic.LineReceiver.lineLengthExceeded}.
+
+    @ivar receiverClass: The line receiver class under test.
+    @ivar lineCatcher: An C{ExcessivelyLargeLineCatcher} subclass of
+        C{receiverClass}.
     """
+    receiverClass = basic.LineReceiver
+    lineCatcher = ExcessivelyLargeLineCatcher
+
     def setUp(self):
-        self.proto = ExcessivelyLargeLineCatcher()
+        self.proto = self.lineCatcher()
         self.proto.MAX_LENGTH = 6
         self.transport = proto_helpers.StringTransport()
         self.proto.makeConnection(self.transport)
@@ -427,7 +446,7 @@ class LineReceiverLineLengthExceededTests(unittest.SynchronousTestCase):
         C{LineReceiver} disconnects the transport if it receives a line longer
         than its C{MAX_LENGTH}.
         """
-        proto = basic.LineReceiver()
+        proto = self.receiverClass()
         transport = proto_helpers.StringTransport()
         proto.makeConnection(transport)
         proto.dataReceived(b'x' * (proto.MAX_LENGTH + 1) + b'\r\nr')
@@ -439,7 +458,7 @@ class LineReceiverLineLengthExceededTests(unittest.SynchronousTestCase):
         C{LineReceiver} disconnects the transport it if receives a non-finished
         line longer than its C{MAX_LENGTH}.
         """
-        proto = basic.LineReceiver()
+        proto = self.receiverClass()
         transport = proto_helpers.StringTransport()
         proto.makeConnection(transport)
         proto.dataReceived(b'x' * (proto.MAX_LENGTH + 1))
@@ -447,6 +466,124 @@ class LineReceiverLineLengthExceededTests(unittest.SynchronousTestCase):
 
 
 
+class BufferedLineTester(basic.BufferedLineReceiver, LineTester, object):
+    """
+    A C{LineTester} which is a L{basic.BufferedLineReceiver}.
+
+    This and the other buffered testers below are new-style so that, on
+    Python 2, methods of the tester take precedence over those of
+    L{basic.LineReceiver}.
+    """
+
+
+
+class BufferedFlippingLineTester(basic.BufferedLineReceiver,
+                                 FlippingLineTester, object):
+    """
+    A C{FlippingLineTester} which is a L{basic.BufferedLineReceiver}.
+    """
+
+
+
+class BufferedLineReceiverTests(LineReceiverTests):
+    """
+    Tests for L{twisted.protocols.basic.BufferedLineReceiver}, which behaves
+    like L{twisted.protocols.basic.LineReceiver}.
+    """
+    receiverClass = basic.BufferedLineReceiver
+    lineTester = BufferedLineTester
+    flippingLineTester = BufferedFlippingLineTester
+
+    def receiveIntoBuffer(self, proto, data):
+        """
+        Deliver C{data} to C{proto} the way a transport supporting
+        L{IBufferedProtocol} does.
+        """
+        buf = proto.getBuffer(len(data))
+        self.assertGreaterEqual(len(buf), len(data))
+        buf[:len(data)] = data
+        proto.bufferUpdated(len(data))
+
+
+    def test_interface(self):
+        """
+        L{basic.BufferedLineReceiver} provides L{IBufferedProtocol}.
+        """
+        self.assertTrue(
+            verifyObject(IBufferedProtocol, basic.BufferedLineReceiver()))
+
+
+    def test_bufferUpdated(self):
+        """
+        Lines written into the buffer returned by
+        L{basic.BufferedLineReceiver.getBuffer} are delivered when
+        L{basic.BufferedLineReceiver.bufferUpdated} is called, including a
+        line which was split between two reads.
+        """
+        proto = self.lineTester()
+        proto.makeConnection(proto_helpers.StringTransport())
+        self.receiveIntoBuffer(proto, b'foo\nbar\nba')
+        self.assertEqual(proto.received, [b'foo', b'bar'])
+        self.receiveIntoBuffer(proto, b'z\n')
+        self.assertEqual(proto.received, [b'foo', b'bar', b'baz'])
+
+
+    def test_bufferCompacted(self):
+        """
+        When there is not enough room left after the data received so far,
+        L{basic.BufferedLineReceiver.getBuffer} moves the unparsed data to the
+        start of the existing buffer if it fits.
+        """
+        proto = self.lineTester()
+        size = proto.MAX_LENGTH = proto.minimumBufferSize
+        proto.makeConnection(proto_helpers.StringTransport())
+        proto.getBuffer(1)
+        original = proto._receiveBuffer
+        lines = b'x\n' * (size // 2 - 1) + b'ab'
+        self.receiveIntoBuffer(proto, lines)
+        self.assertIs(proto._receiveBuffer, original)
+        self.receiveIntoBuffer(proto, b'c\n' + b'y' * (size // 2))
+        self.assertIs(proto._receiveBuffer, original)
+        self.assertEqual(proto.received[-1], b'abc')
+        self.assertEqual(proto.clearLineBuffer(), b'y' * (size // 2))
+
+
+    def test_bufferGrown(self):
+        """
+        L{basic.BufferedLineReceiver.getBuffer} allocates a larger buffer,
+        keeping the unparsed data, when the existing one is too small.
+        """
+        proto = self.lineTester()
+        proto.MAX_LENGTH = 100000
+        proto.makeConnection(proto_helpers.StringTransport())
+        self.receiveIntoBuffer(proto, b'a' * 10)
+        self.receiveIntoBuffer(proto, b'b' * 50000)
+        self.receiveIntoBuffer(proto, b'c\n')
+        self.assertEqual(
+            proto.received, [b'a' * 10 + b'b' * 50000 + b'c'])
+
+
+
+class BufferedExcessivelyLargeLineCatcher(basic.BufferedLineReceiver,
+                                          ExcessivelyLargeLineCatcher,
+                                          object):
+    """
+    An C{ExcessivelyLargeLineCatcher} which is a
+    L{basic.BufferedLineReceiver}.
+    """
+
+
+
+class BufferedLineReceiverLineLengthExceededTests(
+        LineReceiverLineLengthExceededTests):
+    """
+    Tests for L{twisted.protocols.basic.BufferedLineReceiver.lineLengthExceeded}.
+    """
+    receiverClass = basic.BufferedLineReceiver
+    lineCatcher = BufferedExcessivelyLargeLineCatcher
+
+
+
 class LineOnlyReceiverTests(unittest.SynchronousTestCase):
     """
     Tests for L{twisted.protocols.basic.LineOnlyReceiver}.
@@ -1093,6 +1230,196 @@ class Int8Tests(unittest.SynchronousTestCase, IntNTestCaseMixin,
 
 
 
+class TestBufferedNetstring(TestMixin, basic.BufferedNetstringReceiver):
+    """
+    A L{basic.BufferedNetstringReceiver} storing received strings in an
+    array and echoing them.
+    """
+
+    def stringReceived(self, s):
+        self.received.append(s)
+        self.transport.write(s)
+
+
+
+class BufferedNetstringReceiverTests(unittest.SynchronousTestCase,
+                                     LPTestCaseMixin):
+    """
+    Tests for L{twisted.protocols.basic.BufferedNetstringReceiver}.
+    """
+    strings = NetstringReceiverTests.strings
+    illegalStrings = NetstringReceiverTests.illegalStrings
+    protocol = TestBufferedNetstring
+
+    def test_interface(self):
+        """
+        L{basic.BufferedNetstringReceiver} provides L{IBufferedProtocol}.
+        """
+        self.assertTrue(
+            verifyObject(IBufferedProtocol,
+                         basic.BufferedNetstringReceiver()))
+
+
+    def test_buffer(self):
+        """
+        Strings can be received in chunks of different lengths.
+        """
+        for packet_size in range(1, 10):
+            t = proto_helpers.StringTransport()
+            a = self.protocol()
+            a.MAX_LENGTH = 699
+            a.makeConnection(t)
+            for s in self.strings:
+                a.sendString(s)
+            out = t.value()
+            for i in range(len(out) // packet_size + 1):
+                s = out[i * packet_size:(i + 1) * packet_size]
+                if s:
+                    a.dataReceived(s)
+            self.assertEqual(a.received, self.strings)
+
+
+    def test_bufferUpdated(self):
+        """
+        Netstrings written into the buffer returned by
+        L{basic.BufferedNetstringReceiver.getBuffer}, including empty ones
+        and ones split between reads, are delivered when
+        L{basic.BufferedNetstringReceiver.bufferUpdated} is called.
+        """
+        a = self.getProtocol()
+        for data in [b"3:abc,0:,1", b"2:", b"xyzzyxyzzy", b"xy,"]:
+            buf = a.getBuffer(len(data))
+            buf[:len(data)] = data
+            a.bufferUpdated(len(data))
+        self.assertEqual(a.received, [b"abc", b"", b"xyzzyxyzzyxy"])
+        self.assertFalse(a.transport.disconnecting)
+
+
+    def test_maxReceiveLimit(self):
+        """
+        Netstrings with a length specification exceeding the specified
+        C{MAX_LENGTH} are refused.
+        """
+        a = self.getProtocol()
+        a.dataReceived(b"%d:" % (a.MAX_LENGTH + 1,))
+        self.assertTrue(a.transport.disconnecting)
+        self.assertEqual(a.received, [])
+
+
+    def test_missingComma(self):
+        """
+        A netstring which is not terminated by a comma closes the connection.
+        """
+        a = self.getProtocol()
+        a.dataReceived(b"3:abcd")
+        self.assertTrue(a.transport.disconnecting)
+        self.assertEqual(a.received, [])
+
+
+
+class BufferedIntNTestCaseMixin(IntNTestCaseMixin):
+    """
+    TestCase mixin for buffered int-prefixed protocols.
+    """
+
+    def test_interface(self):
+        """
+        The protocol provides L{IBufferedProtocol}.
+        """
+        self.assertTrue(verifyObject(IBufferedProtocol, self.protocol()))
+
+
+    def test_bufferUpdated(self):
+        """
+        Strings written into the buffer returned by C{getBuffer} are
+        delivered when C{bufferUpdated} is called, including one split
+        between reads.
+        """
+        r = self.getProtocol()
+        data = b"".join(
+            struct.pack(r.structFormat, len(s)) + s for s in self.strings)
+        for chunk in [data[:-1], data[-1:]]:
+            buf = r.getBuffer(len(chunk))
+            buf[:len(chunk)] = chunk
+            r.bufferUpdated(len(chunk))
+        self.assertEqual(r.received, self.strings)
+
+
+    def test_pauseResume(self):
+        """
+        Strings are not delivered while the protocol is paused, and the ones
+        already received are delivered when it is resumed.
+        """
+        r = self.getProtocol()
+        r.pauseProducing()
+        r.dataReceived(b"".join(
+            struct.pack(r.structFormat, len(s)) + s for s in self.strings))
+        self.assertEqual(r.received, [])
+        r.resumeProducing()
+        self.assertEqual(r.received, self.strings)
+
+
+
+class TestBufferedInt32(TestMixin, basic.BufferedInt32StringReceiver):
+    """
+    A L{basic.BufferedInt32StringReceiver} storing received strings in an
+    array.
+    """
+
+
+
+class BufferedInt32Tests(unittest.SynchronousTestCase,
+                         BufferedIntNTestCaseMixin):
+    """
+    Tests for L{twisted.protocols.basic.BufferedInt32StringReceiver}.
+    """
+    protocol = TestBufferedInt32
+    strings = Int32Tests.strings
+    illegalStrings = Int32Tests.illegalStrings
+    partialStrings = Int32Tests.partialStrings
+
+
+
+class TestBufferedInt16(TestMixin, basic.BufferedInt16StringReceiver):
+    """
+    A L{basic.BufferedInt16StringReceiver} storing received strings in an
+    array.
+    """
+
+
+
+class BufferedInt16Tests(unittest.SynchronousTestCase,
+                         BufferedIntNTestCaseMixin):
+    """
+    Tests for L{twisted.protocols.basic.BufferedInt16StringReceiver}.
+    """
+    protocol = TestBufferedInt16
+    strings = Int16Tests.strings
+    illegalStrings = Int16Tests.illegalStrings
+    partialStrings = Int16Tests.partialStrings
+
+
+
+class TestBufferedInt8(TestMixin, basic.BufferedInt8StringReceiver):
+    """
+    A L{basic.BufferedInt8StringReceiver} storing received strings in an
+    array.
+    """
+
+
+
+class BufferedInt8Tests(unittest.SynchronousTestCase,
+                        BufferedIntNTestCaseMixin):
+    """
+    Tests for L{twisted.protocols.basic.BufferedInt8StringReceiver}.
+    """
+    protocol = TestBufferedInt8
+    strings = Int8Tests.strings
+    illegalStrings = Int8Tests.illegalStrings
+    partialStrings = Int8Tests.partialStrings
+
+
+
 class OnlyProducerTransport(object):
     """
     Transport which isn't really a transport, just looks like one to
@@ -1206,6 +1533,32 @@ class ProducerTests(unittest.SynchronousTestCase):
 
 
 
+@implementer(ISendFileTransport)
+class SendFileStringTransport(proto_helpers.StringTransport):
+    """
+    A L{proto_helpers.StringTransport} which records calls to C{sendFile}.
+
+    @ivar sends: A L{list} of C{(file, offset, count, deferred)} tuples, one
+        for each call to C{sendFile}.
+
+    @ivar refuse: If C{True}, C{sendFile} raises L{ValueError}.
+    """
+    refuse = False
+
+    def __init__(self):
+        proto_helpers.StringTransport.__init__(self)
+        self.sends = []
+
+
+    def sendFile(self, file, offset=0, count=None):
+        if self.refuse:
+            raise ValueError("Not this time.")
+        d = Deferred()
+        self.sends.append((file, offset, count, d))
+        return d
+
+
+
 class FileSenderTests(unittest.TestCase):
     """
     Tests for L{basic.FileSender}.
@@ -1315,6 +1668,69 @@ class FileSenderTests(unittest.TestCase):
                          str(failure.value))
 
 
+    def test_sendFile(self):
+        """
+        If the consumer provides L{ISendFileTransport} and there is no
+        transform, L{basic.FileSender.beginFileTransfer} sends the rest of
+        the file with C{sendFile} instead of registering as a producer.  Once
+        it has been sent, the file is left at its end and the L{Deferred}
+        fires with the last byte sent.
+        """
+        source = BytesIO(b"Test content")
+        source.seek(5)
+        consumer = SendFileStringTransport()
+        sender = basic.FileSender()
+        d = sender.beginFileTransfer(source, consumer)
+        self.assertIsNone(consumer.producer)
+        [(sentFile, offset, count, sending)] = consumer.sends
+        self.assertEqual((sentFile, offset, count), (source, 5, None))
+        self.assertNoResult(d)
+        sending.callback(7)
+        self.assertEqual(b"t", self.successResultOf(d))
+        self.assertEqual(source.tell(), 12)
+
+
+    def test_sendFileRefused(self):
+        """
+        If C{sendFile} raises L{ValueError}, L{basic.FileSender} reads the
+        file and writes it to the consumer instead.
+        """
+        consumer = SendFileStringTransport()
+        consumer.refuse = True
+        sender = basic.FileSender()
+        d = sender.beginFileTransfer(BytesIO(b"Test content"), consumer)
+        self.assertEqual(consumer.producer, sender)
+        sender.resumeProducing()
+        sender.resumeProducing()
+        self.assertEqual(b"t", self.successResultOf(d))
+        self.assertEqual(b"Test content", consumer.value())
+
+
+    def test_sendFileNotWithTransform(self):
+        """
+        L{basic.FileSender} does not use C{sendFile} if it is given a
+        transform.
+        """
+        consumer = SendFileStringTransport()
+        sender = basic.FileSender()
+        sender.beginFileTransfer(
+            BytesIO(b"Test content"), consumer, lambda chunk: chunk)
+        self.assertEqual(consumer.sends, [])
+        self.assertEqual(consumer.producer, sender)
+
+
+    def test_sendFileConnectionLost(self):
+        """
+        The C{Deferred} returned by L{basic.FileSender.beginFileTransfer}
+        fails with the reason C{sendFile} failed.
+        """
+        consumer = SendFileStringTransport()
+        sender = basic.FileSender()
+        d = sender.beginFileTransfer(BytesIO(b"Test content"), consumer)
+        consumer.sends[0][3].errback(error.ConnectionLost())
+        self.failureResultOf(d, error.ConnectionLost)
+
+
 
 class MiceDeprecationTests(unittest.TestCase):
     """
@@ -55,7 +55,7 @@ from twisted.python.failure import Failure
 from twisted.internet.interfaces import (
     ISystemHandle, INegotiated, IPushProducer, ILoggingContext,
     IOpenSSLServerConnectionCreator, IOpenSSLClientConnectionCreator,
-    IProtocolNegotiationFactory, IHandshakeListener
+    IProtocolNegotiationFactory, IHandshakeListener, ISendFileTransport
 )
 from twisted.internet.main import CONNECTION_LOST
 from twisted.internet._producer_helpers import _PullToPush
@@ -199,9 +199,9 @@ class TLSMemoryBIOProtocol(ProtocolWrapper):
         self._tlsConnection = self.factory._createConnection(self)
         self._appSendBuffer = []
 
-        # Add interfaces provided by the transport we are wrapping:
-        for interface in providedBy(transport):
-            directlyProvides(self, interface)
+        # Add interfaces provided by the transport we are wrapping, except
+        # for sending files, which would bypass encryption:
+        directlyProvides(self, providedBy(transport) - ISendFileTransport)
 
         # Intentionally skip ProtocolWrapper.makeConnection - it might call
         # wrappedProtocol.makeConnection, which we want to make conditional.
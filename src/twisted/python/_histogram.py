@@ -0,0 +1,132 @@
+# -*- test-case-name: twisted.python.test.test_histogram -*-
+# Copyright (c) Twisted Matrix Laboratories.
+# See LICENSE for details.
+
+"""
+Histograms for summarizing measurements, such as durations.
+"""
+
+from __future__ import division, absolute_import
+
+from math import frexp
+
+
+
+class Histogram(object):
+    """
+    A histogram of non-negative values in buckets of exponentially
+    increasing size.
+
+    Bucket 0 holds values up to C{resolution}, and bucket C{n} holds values
+    greater than C{resolution * 2 ** (n - 1)} and up to C{resolution * 2 **
+    n}.  Values beyond the last bucket are counted in it.
+
+    @ivar resolution: The upper bound of the first bucket.
+    @type resolution: L{float}
+
+    @ivar count: The number of values added.
+    @type count: L{int}
+
+    @ivar total: The sum of the values added.
+
+    @ivar minimum: The smallest value added, or L{None} if none have been.
+
+    @ivar maximum: The largest value added, or L{None} if none have been.
+
+    @ivar _counts: A L{list} of the number of values in each bucket.
+    """
+
+    def __init__(self, resolution, buckets=32):
+        """
+        @param resolution: See L{Histogram.resolution}.
+
+        @param buckets: The number of buckets.
+        @type buckets: L{int}
+        """
+        self.resolution = resolution
+        self.count = 0
+        self.total = 0
+        self.minimum = None
+        self.maximum = None
+        self._counts = [0] * buckets
+
+
+    def add(self, value):
+        """
+        Add a value to the histogram.
+
+        @param value: A non-negative number.
+        """
+        self.count += 1
+        self.total += value
+        if self.minimum is None or value < self.minimum:
+            self.minimum = value
+        if self.maximum is None or value > self.maximum:
+            self.maximum = value
+        if value <= self.resolution:
+            index = 0
+        else:
+            mantissa, index = frexp(value / self.resolution)
+            if mantissa == 0.5:
+                # Exact powers of two belong to the bucket below.
+                index -= 1
+            index = min(index, len(self._counts) - 1)
+        self._counts[index] += 1
+
+
+    def mean(self):
+        """
+        @return: The mean of the values added, or L{None} if none have been.
+        """
+        if not self.count:
+            return None
+        return self.total / self.count
+
+
+    def buckets(self):
+        """
+        @return: A L{list} of C{(upperBound, count)} tuples, one for each
+            bucket, in order.  The last bucket's upper bound is infinite.
+        """
+        bounds = [self.resolution * 2 ** index
+                  for index in range(len(self._counts) - 1)]
+        bounds.append(float("inf"))
+        return list(zip(bounds, self._counts))
+
+
+    def percentile(self, percent):
+        """
+        Estimate a percentile of the values added.
+
+        @param percent: The percentile, between 0 and 100.
+        @type percent: L{float}
+
+        @return: The upper bound of the bucket holding the value at the given
+            percentile (but no more than C{maximum}), or L{None} if no values
+            have been added.
+        """
+        if not self.count:
+            return None
+        rank = percent / 100 * self.count
+        seen = 0
+        for bound, count in self.buckets():
+            seen += count
+            if seen >= rank and count:
+                return min(bound, self.maximum)
+        return self.maximum
+
+
+    def summary(self):
+        """
+        @return: A L{dict} with the C{count}, C{minimum}, C{maximum}, C{mean},
+            and estimated median (C{p50}) and 99th percentile (C{p99}) of
+            the values added.
+        """
+        return {
+            "count": self.count,
+            "minimum": self.minimum,
+            "maximum": self.maximum,
+            "mean": self.mean(),
+            "p50": self.percentile(50),
+            "p99": self.percentile(99),
+        }
@@ -144,6 +144,71 @@ class _Code(object):
 
 
 
+class _Lazy(object):
+    """
+    A descriptor for an attribute which is computed by a method the first
+    time it is looked up, and then stored on the instance.
+
+    Since it does not define C{__set__}, the attribute can still be set
+    normally, and an instance which already has a value for it (for example,
+    one which has been unpickled) never calls the method.
+    """
+
+    def __init__(self, name, compute):
+        """
+        @param name: The name of the attribute.
+        @type name: C{str}
+
+        @param compute: A function which takes an instance and returns the
+            value of the attribute for it.
+        """
+        self.name = name
+        self.compute = compute
+
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        value = self.compute(instance)
+        instance.__dict__[self.name] = value
+        return value
+
+
+
+def _frameTuple(frame, lineno, captureVars):
+    """
+    Describe a frame as an element of L{Failure.frames} or L{Failure.stack}.
+
+    @param frame: The frame.
+    @param lineno: The line number being executed in it.
+    @param captureVars: Whether to copy its locals and globals.
+
+    @return: A tuple of (funcName, fileName, lineNumber, localsItems,
+        globalsItems).
+    """
+    if captureVars:
+        localz = frame.f_locals.copy()
+        if frame.f_locals is frame.f_globals:
+            globalz = {}
+        else:
+            globalz = frame.f_globals.copy()
+        for d in globalz, localz:
+            if "__builtins__" in d:
+                del d["__builtins__"]
+        localz = list(localz.items())
+        globalz = list(globalz.items())
+    else:
+        localz = globalz = ()
+    return (
+        frame.f_code.co_name,
+        frame.f_code.co_filename,
+        lineno,
+        localz,
+        globalz,
+        )
+
+
+
 @_oldStyle
 class Failure:
     """
@@ -158,14 +223,23 @@ class Failure:
     C{locals().items()}/C{globals().items()} for that frame, or an empty tuple
     if those details were not captured.
 
+    Unless C{captureVars} is set, C{frames}, C{stack} and C{parents} are only
+    computed when they are first used, from the traceback and a compact
+    summary of the stack, since most failures are trapped or handled without
+    ever being formatted.
+
     @ivar value: The exception instance responsible for this failure.
     @ivar type: The exception's class.
     @ivar stack: list of frames, innermost last, excluding C{Failure.__init__}.
     @ivar frames: list of frames, innermost first.
+    @ivar parents: The fully qualified names of the classes C{type} inherits
+        from, used by L{check}.
+
+    @ivar _stackSummary: A list of (code, lineNumber) pairs for the frames
+        of C{stack}, innermost first, from which it is computed.
     """
 
     pickled = 0
-    stack = None
 
     # The opcode of "yield" in Python bytecode. We need this in _findFailure in
     # order to identify whether an exception was thrown by a
@@ -235,9 +309,6 @@ class Failure:
                 # Python 3
                 tb = self.value.__traceback__
 
-        frames = self.frames = []
-        stack = self.stack = []
-
         # added 2003-06-23 by Chris Armstrong. Yes, I actually have a
         # use case where I need this traceback object, and I've made
         # sure that it'll be cleaned up.
@@ -264,58 +335,71 @@ class Failure:
         #   with bareword "except:"s.  This premature exception
         #   catching means tracebacks generated here don't tend to show
         #   what called upon the PB object.
+        #
+        # The line numbers of these frames change as they go on running, so
+        # they are recorded now even if the stack is computed later.
+
+        if captureVars:
+            stack = []
+            while f:
+                stack.append(_frameTuple(f, f.f_lineno, True))
+                f = f.f_back
+            stack.reverse()
+            self.stack = stack
+            self.frames = self._computeFrames()
+            self.parents = self._computeParents()
+        else:
+            summary = self._stackSummary = []
+            while f:
+                summary.append((f.f_code, f.f_lineno))
+                f = f.f_back
 
-        while f:
-            if captureVars:
-                localz = f.f_locals.copy()
-                if f.f_locals is f.f_globals:
-                    globalz = {}
-                else:
-                    globalz = f.f_globals.copy()
-                for d in globalz, localz:
-                    if "__builtins__" in d:
-                        del d["__builtins__"]
-                localz = localz.items()
-                globalz = globalz.items()
-            else:
-                localz = globalz = ()
-            stack.insert(0, (
-                f.f_code.co_name,
-                f.f_code.co_filename,
-                f.f_lineno,
-                localz,
-                globalz,
-                ))
-            f = f.f_back
 
+    def _computeFrames(self):
+        """
+        Compute C{frames} from the traceback.
+
+        @return: See L{Failure.frames}.
+        """
+        frames = []
+        tb = self.tb
         while tb is not None:
-            f = tb.tb_frame
-            if captureVars:
-                localz = f.f_locals.copy()
-                if f.f_locals is f.f_globals:
-                    globalz = {}
-                else:
-                    globalz = f.f_globals.copy()
-                for d in globalz, localz:
-                    if "__builtins__" in d:
-                        del d["__builtins__"]
-                localz = list(localz.items())
-                globalz = list(globalz.items())
-            else:
-                localz = globalz = ()
-            frames.append((
-                f.f_code.co_name,
-                f.f_code.co_filename,
-                tb.tb_lineno,
-                localz,
-                globalz,
-                ))
+            frames.append(_frameTuple(tb.tb_frame, tb.tb_lineno,
+                                      self.captureVars))
             tb = tb.tb_next
+        return frames
+
+    frames = _Lazy("frames", _computeFrames)
+
+
+    def _computeStack(self):
+        """
+        Compute C{stack} from the summary of it.
+
+        @return: See L{Failure.stack}, or L{None} if there is no summary.
+        """
+        summary = self.__dict__.get("_stackSummary")
+        if summary is None:
+            return None
+        return [(code.co_name, code.co_filename, lineno, (), ())
+                for code, lineno in reversed(summary)]
+
+    stack = _Lazy("stack", _computeStack)
+
+
+    def _computeParents(self):
+        """
+        Compute C{parents} from the exception's class.
+
+        @return: See L{Failure.parents}.
+        """
         if inspect.isclass(self.type) and issubclass(self.type, Exception):
-            parentCs = getmro(self.type)
-            self.parents = list(map(reflect.qual, parentCs))
+            return list(map(reflect.qual, getmro(self.type)))
         else:
-            self.parents = [self.type]
+            return [self.type]
+
+    parents = _Lazy("parents", _computeParents)
+
 
     def trap(self, *errorTypes):
         """Trap this failure if its type is in a predetermined list.
@@ -464,7 +548,11 @@ class Failure:
         """
         if self.pickled:
             return self.__dict__
+        # Compute any lazy attributes which have not been yet, while the
+        # traceback is still available.
+        self.frames, self.stack, self.parents
         c = self.__dict__.copy()
+        c.pop('_stackSummary', None)
 
         c['frames'] = [
             [
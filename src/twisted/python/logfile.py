@@ -10,9 +10,9 @@ A rotating, browsable log file.
 from __future__ import division, absolute_import
 
 # System Imports
-import os, glob, time, stat
+import os, glob, time, stat, threading
 
-from twisted.python import threadable
+from twisted.python import threadable, log
 from twisted.python._oldstyle import _oldStyle
 
 
@@ -316,6 +316,175 @@ class DailyLogFile(BaseLogFile):
 threadable.synchronize(DailyLogFile)
 
 
+
+class BatchedLogFile(object):
+    """
+    A wrapper around a log file which writes to it in batches from a thread
+    of its own, so that writing a line never waits for the disk.
+
+    Lines are collected in memory and handed to the wrapped log file's
+    C{write} and C{flush} methods in a single call when C{maxBatchSize}
+    bytes are waiting, when C{flushInterval} seconds have passed since the
+    last batch, or when L{flush} or L{close} is called.  If the wrapped log
+    file is a L{LogFile} or L{DailyLogFile}, it is rotated as usual by the
+    writing thread.
+
+    At most C{maxQueued} lines wait to be written.  When that many are
+    waiting, L{write} either discards the line, counting it in C{dropped},
+    or if C{block} is true waits for the writing thread to catch up.
+
+    @ivar written: The number of lines written to the wrapped log file.
+    @type written: L{int}
+
+    @ivar dropped: The number of lines discarded because too many were
+        waiting.
+    @type dropped: L{int}
+
+    @ivar batches: The number of batches written to the wrapped log file.
+    @type batches: L{int}
+
+    @ivar errors: The number of batches which could not be written because
+        the wrapped log file raised an exception.
+    @type errors: L{int}
+    """
+    written = 0
+    dropped = 0
+    batches = 0
+    errors = 0
+
+    def __init__(self, logFile, maxBatchSize=65536, flushInterval=1.0,
+                 maxQueued=10000, block=False):
+        """
+        Start the writing thread.
+
+        @param logFile: The file-like object to write to.
+
+        @param maxBatchSize: The number of waiting bytes which causes a
+            batch to be written.
+        @type maxBatchSize: L{int}
+
+        @param flushInterval: The greatest number of seconds a line waits
+            before it is written.
+        @type flushInterval: L{float}
+
+        @param maxQueued: The greatest number of lines which wait to be
+            written.
+        @type maxQueued: L{int}
+
+        @param block: Whether L{write} waits, rather than discarding the
+            line, when C{maxQueued} lines are already waiting.
+        @type block: L{bool}
+        """
+        self.logFile = logFile
+        self.maxBatchSize = maxBatchSize
+        self.flushInterval = flushInterval
+        self.maxQueued = maxQueued
+        self.block = block
+        self.closed = False
+        self._condition = threading.Condition()
+        self._pending = []
+        self._pendingSize = 0
+        self._writing = False
+        self._flushing = False
+        self._thread = threading.Thread(
+            target=self._run, name="BatchedLogFile writer")
+        self._thread.daemon = True
+        self._thread.start()
+
+
+    def write(self, data):
+        """
+        Queue some data to be written.
+
+        @raise ValueError: If the file has been closed.
+        """
+        with self._condition:
+            if self.closed:
+                raise ValueError("I/O operation on closed file")
+            while len(self._pending) >= self.maxQueued:
+                if not self.block:
+                    self.dropped += 1
+                    return
+                self._condition.notify_all()
+                self._condition.wait()
+            self._pending.append(data)
+            self._pendingSize += len(data)
+            if self._pendingSize >= self.maxBatchSize:
+                self._condition.notify_all()
+
+
+    def flush(self):
+        """
+        Write everything queued so far, and wait until it has been written.
+        """
+        with self._condition:
+            self._flushing = True
+            self._condition.notify_all()
+            while self._thread.is_alive() and (self._pending or self._writing):
+                self._condition.wait()
+            self._flushing = False
+
+
+    def close(self):
+        """
+        Write everything queued so far, stop the writing thread and close the
+        wrapped log file.
+
+        The file cannot be used once it has been closed.
+        """
+        with self._condition:
+            if self.closed:
+                return
+            self.closed = True
+            self._condition.notify_all()
+        self._thread.join()
+        self.logFile.close()
+
+
+    def _run(self):
+        """
+        Write batches to the wrapped log file until this file is closed.
+        """
+        while True:
+            with self._condition:
+                deadline = time.time() + self.flushInterval
+                while not (self.closed or self._flushing or
+                           self._pendingSize >= self.maxBatchSize or
+                           len(self._pending) >= self.maxQueued):
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+                batch, self._pending = self._pending, []
+                self._pendingSize = 0
+                self._writing = True
+                closed = self.closed
+                # Wake any writers waiting for room.
+                self._condition.notify_all()
+
+            if batch:
+                try:
+                    self.logFile.write(batch[0][:0].join(batch))
+                    self.logFile.flush()
+                except:
+                    log.err(None, "Error writing a batch of log lines")
+                    failed = True
+                else:
+                    failed = False
+
+            with self._condition:
+                self._writing = False
+                if batch:
+                    if failed:
+                        self.errors += 1
+                    else:
+                        self.written += len(batch)
+                        self.batches += 1
+                self._condition.notify_all()
+                if closed and not self._pending:
+                    return
+
+
 @_oldStyle
 class LogReader:
     """Read from a log file."""
@@ -0,0 +1,53 @@
+# Copyright (c) Twisted Matrix Laboratories.
+# See LICENSE for details.
+
+"""
+Tests for L{twisted.python._histogram}.
+"""
+
+from __future__ import division, absolute_import
+
+from twisted.python._histogram import Histogram
+from twisted.trial.unittest import SynchronousTestCase
+
+
+
+class HistogramTests(SynchronousTestCase):
+    """
+    Tests for L{Histogram}.
+    """
+    def test_empty(self):
+        """
+        An empty histogram has no mean, extremes or percentiles.
+        """
+        histogram = Histogram(1)
+        self.assertEqual(histogram.summary(), {
+            "count": 0, "minimum": None, "maximum": None, "mean": None,
+            "p50": None, "p99": None})
+
+
+    def test_buckets(self):
+        """
+        Each value is counted in the bucket whose upper bound is the smallest
+        power-of-two multiple of the resolution not less than it, and values
+        beyond the last bucket are counted in it.
+        """
+        histogram = Histogram(1, buckets=4)
+        for value in [0, 1, 1.5, 2, 3, 4, 100]:
+            histogram.add(value)
+        self.assertEqual(
+            histogram.buckets(),
+            [(1, 2), (2, 2), (4, 2), (float("inf"), 1)])
+
+
+    def test_summary(self):
+        """
+        L{Histogram.summary} reports the count, extremes and mean of the
+        values added, and percentiles estimated from their buckets.
+        """
+        histogram = Histogram(1)
+        for value in [1] * 98 + [3, 40]:
+            histogram.add(value)
+        self.assertEqual(histogram.summary(), {
+            "count": 100, "minimum": 1, "maximum": 40, "mean": 1.41,
+            "p50": 1, "p99": 4})
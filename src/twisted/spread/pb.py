@@ -455,7 +455,11 @@ class CopyableFailure(failure.Failure, Copyable):
         Collect state related to the exception which occurred, discarding
         state which cannot reasonably be serialized.
         """
+        # parents is computed lazily, and needed by check() on the remote
+        # side.
+        self.parents
         state = self.__dict__.copy()
+        state.pop('_stackSummary', None)
         state['tb'] = None
         state['frames'] = []
         state['stack'] = []
@@ -819,6 +819,26 @@ class DeferredTests(unittest.SynchronousTestCase, ImmediateFailureMixin):
              ('secondCallback', ['withers']), 'final'])
 
 
+    def test_callbacksDiscardedOnceRun(self):
+        """
+        Callbacks are removed from a L{Deferred} once they have run, leaving
+        those which are still waiting for the result of another L{Deferred}
+        as pairs of callback and errback tuples.
+        """
+        inner = defer.Deferred()
+        outer = defer.Deferred()
+        waiting = (lambda result, *args, **kwargs: result)
+        outer.addCallback(lambda result: inner)
+        outer.addCallback(waiting, 1, extra=2)
+        outer.callback(None)
+        self.assertEqual(outer.callbacks,
+                         [((waiting, (1,), {'extra': 2}),
+                           (defer.passthru, None, None))])
+        inner.callback(None)
+        self.assertEqual(outer.callbacks, [])
+        self.assertEqual(inner.callbacks, [])
+
+
     def test_reentrantRunCallbacks(self):
         """
         A callback added to a L{Deferred} by a callback on that L{Deferred}
@@ -560,6 +560,75 @@ class FailureTests(SynchronousTestCase):
             '%s: division by zero>' % (typeName,))
 
 
+    def test_lazyFrames(self):
+        """
+        Without C{captureVars}, a L{failure.Failure} computes C{frames},
+        C{stack} and C{parents} only when they are first used, and then
+        describes the same frames as one which captured them eagerly.
+        """
+        lazy = getDivisionFailure()
+        eager = getDivisionFailure(captureVars=True)
+        for name in ["frames", "stack", "parents"]:
+            self.assertNotIn(name, lazy.__dict__)
+
+        def locations(frames):
+            return [frame[:3] for frame in frames]
+        self.assertEqual(locations(lazy.frames), locations(eager.frames))
+        # The two failures were created on different lines of this method.
+        self.assertEqual(locations(lazy.stack)[:-1],
+                         locations(eager.stack)[:-1])
+        self.assertEqual(lazy.parents, eager.parents)
+        for name in ["frames", "stack", "parents"]:
+            self.assertIn(name, lazy.__dict__)
+
+
+    def test_lazyStackLineNumbers(self):
+        """
+        The line numbers of a lazily computed C{stack} are those of the
+        calling frames when the L{failure.Failure} was created, not when the
+        stack is first used.
+        """
+        f = getDivisionFailure()
+        line = sys._getframe().f_lineno - 1
+        [lastFrame] = f.stack[-1:]
+        self.assertEqual(lastFrame[0], "test_lazyStackLineNumbers")
+        self.assertEqual(lastFrame[2], line)
+
+
+    def test_lazyTrap(self):
+        """
+        C{trap} and C{check} compute C{parents} when needed.
+        """
+        f = getDivisionFailure()
+        self.assertEqual(f.check(ArithmeticError), ArithmeticError)
+        self.assertEqual(f.trap(ZeroDivisionError), ZeroDivisionError)
+
+
+    def test_getStateComputesLazyAttributes(self):
+        """
+        The state of a L{failure.Failure} includes its lazily computed
+        attributes, but not the code objects they are computed from.
+        """
+        f = getDivisionFailure()
+        state = f.__getstate__()
+        self.assertNotIn("_stackSummary", state)
+        self.assertEqual(len(state["frames"]), len(f.frames))
+        self.assertEqual(len(state["stack"]), len(f.stack))
+        self.assertIn(reflect.qual(ZeroDivisionError), state["parents"])
+
+
+    def test_cleanFailureLazy(self):
+        """
+        L{failure.Failure.cleanFailure} keeps the lazily computed attributes
+        usable after the traceback is discarded.
+        """
+        f = getDivisionFailure()
+        f.cleanFailure()
+        self.assertIsNone(f.tb)
+        self.assertEqual(f.frames[-1][0], "getDivisionFailure")
+        self.assertTrue(f.stack)
+
+
 
 class BrokenStr(Exception):
     """
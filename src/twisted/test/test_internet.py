@@ -13,7 +13,8 @@ import time
 
 from twisted.python.compat import _PY3
 from twisted.trial import unittest
-from twisted.internet import reactor, protocol, error, abstract, defer
+from twisted.python import failure
+from twisted.internet import reactor, protocol, error, abstract, defer, main
 from twisted.internet import interfaces, base
 
 try:
@@ -1364,6 +1365,322 @@ class ProducerTests(unittest.TestCase):
 
 
 
+class VectoringDescriptor(SillyDescriptor):
+    """
+    A descriptor which records the buffers passed to C{writeSomeVectors}
+    and writes no more than C{limit} bytes of them at a time.
+
+    @ivar vectors: A L{list} of the lists of buffers passed to
+        C{writeSomeVectors}, converted to L{bytes}.
+
+    @ivar limit: The most bytes C{writeSomeVectors} writes at once.
+    """
+    bufferSize = 1024
+    limit = 5
+
+    def __init__(self):
+        SillyDescriptor.__init__(self)
+        self.vectors = []
+        self.stopped = 0
+
+
+    def writeSomeVectors(self, vectors):
+        """
+        Record C{vectors} and claim to have written up to C{limit} bytes of
+        them.
+        """
+        self.vectors.append([memoryview(vector).tobytes()
+                             for vector in vectors])
+        return min(self.limit, sum(len(vector) for vector in vectors))
+
+
+    def stopWriting(self):
+        """
+        Count the times writing is stopped.
+        """
+        self.stopped += 1
+
+
+    def stopReading(self):
+        """
+        Do nothing: bypass the reactor.
+        """
+
+
+
+class VectoredWriteTests(unittest.SynchronousTestCase):
+    """
+    Tests for L{abstract.FileDescriptor}'s vectored write mode.
+    """
+    if not _PY3:
+        skip = "Vectored writes are only supported on Python 3."
+
+    def setUp(self):
+        self.descriptor = VectoringDescriptor()
+        self.descriptor._setVectoredWrites(True)
+
+
+    def test_writeVectors(self):
+        """
+        With vectored writes enabled, chunks passed to C{write} and
+        C{writeSequence} are passed to C{writeSomeVectors} without being
+        joined, and a partially written chunk is resumed where it left off.
+        """
+        descriptor = self.descriptor
+        descriptor.write(b"abc")
+        descriptor.writeSequence([b"defg", b"hi"])
+        descriptor.doWrite()
+        self.assertEqual(descriptor.vectors, [[b"abc", b"defg", b"hi"]])
+        self.assertEqual(descriptor._tempDataLen, 4)
+        self.assertIsInstance(descriptor._tempDataBuffer[0], memoryview)
+        self.assertEqual(descriptor.dataBuffer, b"")
+        self.assertEqual(descriptor.stopped, 0)
+        descriptor.doWrite()
+        self.assertEqual(descriptor.vectors[1], [b"fg", b"hi"])
+        self.assertEqual(descriptor._tempDataBuffer, [])
+        self.assertEqual(descriptor._tempDataLen, 0)
+        self.assertEqual(descriptor.stopped, 1)
+
+
+    def test_completeWrite(self):
+        """
+        Chunks which are written completely are removed from the queue.
+        """
+        descriptor = self.descriptor
+        descriptor.limit = 100
+        descriptor.writeSequence([b"ab", b"cd"])
+        descriptor.doWrite()
+        self.assertEqual(descriptor.vectors, [[b"ab", b"cd"]])
+        self.assertEqual(descriptor._tempDataBuffer, [])
+        self.assertEqual(descriptor.stopped, 1)
+
+
+    def test_iovMax(self):
+        """
+        No more than C{_IOV_MAX} chunks are passed to C{writeSomeVectors} at
+        once.
+        """
+        self.patch(abstract, "_IOV_MAX", 2)
+        descriptor = self.descriptor
+        descriptor.writeSequence([b"a", b"b", b"c"])
+        descriptor.doWrite()
+        self.assertEqual(descriptor.vectors, [[b"a", b"b"]])
+        self.assertEqual(descriptor._tempDataBuffer, [b"c"])
+
+
+    def test_enableWithBufferedData(self):
+        """
+        Data left in the joined buffer when vectored writes are enabled is
+        written before data written afterwards.
+        """
+        descriptor = VectoringDescriptor()
+        descriptor.dataBuffer = b"xyz"
+        descriptor.offset = 1
+        descriptor.write(b"abc")
+        descriptor._setVectoredWrites(True)
+        self.assertEqual(descriptor._tempDataLen, 5)
+        descriptor.doWrite()
+        self.assertEqual(descriptor.vectors, [[b"yz", b"abc"]])
+        self.assertEqual(descriptor.stopped, 1)
+
+
+    def test_disable(self):
+        """
+        Chunks queued while vectored writes were enabled are written with
+        C{writeSomeData} once they are disabled.
+        """
+        descriptor = self.descriptor
+        descriptor.write(b"abcdefg")
+        descriptor.doWrite()
+        descriptor._setVectoredWrites(False)
+        written = []
+        descriptor.writeSomeData = lambda data: written.append(data) or 2
+        descriptor.doWrite()
+        self.assertEqual(written, [b"fg"])
+
+
+    def test_disconnecting(self):
+        """
+        Once everything has been written, a disconnecting descriptor's
+        C{doWrite} returns the result of C{_postLoseConnection}, even if
+        there was nothing to write.
+        """
+        descriptor = self.descriptor
+        descriptor.loseConnection()
+        self.assertEqual(descriptor.doWrite(), main.CONNECTION_DONE)
+        self.assertEqual(descriptor.vectors, [])
+
+
+
+class FileSendingDescriptor(SillyDescriptor):
+    """
+    A descriptor which collects everything it writes and sends no more than
+    C{limit} bytes of a file at a time with C{writeSomeFile}.
+
+    @ivar written: A L{list} of the L{bytes} written, in order.
+
+    @ivar limit: The most bytes C{writeSomeFile} sends at once.
+    """
+    bufferSize = 1024
+    limit = 4
+
+    def __init__(self):
+        SillyDescriptor.__init__(self)
+        self.written = []
+        self.stopped = 0
+
+
+    def writeSomeData(self, data):
+        """
+        Record and write all of C{data}.
+        """
+        self.written.append(bytes(data))
+        return len(data)
+
+
+    def writeSomeFile(self, fileno, offset, count):
+        """
+        Read and record up to C{limit} bytes of the file.
+        """
+        os.lseek(fileno, offset, os.SEEK_SET)
+        data = os.read(fileno, min(count, self.limit))
+        if data:
+            self.written.append(data)
+        return len(data)
+
+
+    def stopWriting(self):
+        """
+        Count the times writing is stopped.
+        """
+        self.stopped += 1
+
+
+    def stopReading(self):
+        """
+        Do nothing: bypass the reactor.
+        """
+
+
+
+class FileRegionTests(unittest.SynchronousTestCase):
+    """
+    Tests for the file regions L{abstract.FileDescriptor} sends with
+    C{writeSomeFile}.
+    """
+
+    def setUp(self):
+        self.descriptor = FileSendingDescriptor()
+        path = self.mktemp()
+        with open(path, "wb") as f:
+            f.write(b"0123456789")
+        self.file = open(path, "rb")
+        self.addCleanup(self.file.close)
+
+
+    def flush(self):
+        """
+        Call C{doWrite} on the descriptor until it stops writing.
+
+        @return: The last result of C{doWrite}.
+        """
+        for i in range(100):
+            result = self.descriptor.doWrite()
+            if self.descriptor.stopped or result is not None:
+                return result
+        self.fail("The descriptor never stopped writing.")
+
+
+    def test_order(self):
+        """
+        A file region is sent after data written before it was queued and
+        before data written afterwards, and its L{Deferred} fires with the
+        number of bytes sent.
+        """
+        descriptor = self.descriptor
+        d = Deferred()
+        descriptor.write(b"head")
+        descriptor._queueFileRegion(self.file.fileno(), 2, 7, d)
+        descriptor.writeSequence([b"ta", b"il"])
+        self.assertNoResult(d)
+        self.assertIsNone(self.flush())
+        self.assertEqual(self.successResultOf(d), 7)
+        self.assertEqual(b"".join(descriptor.written), b"head2345678tail")
+        self.assertEqual(descriptor.written[1:3], [b"2345", b"678"])
+        self.assertEqual(descriptor.stopped, 1)
+
+
+    def test_vectored(self):
+        """
+        File regions are sent in order with data written in vectored mode.
+        """
+        if not _PY3:
+            raise unittest.SkipTest(
+                "Vectored writes are only supported on Python 3.")
+        descriptor = self.descriptor
+        descriptor._setVectoredWrites(True)
+        descriptor.writeSomeVectors = lambda vectors: (
+            descriptor.writeSomeData(b"".join(vectors)))
+        descriptor.write(b"head")
+        descriptor._queueFileRegion(self.file.fileno(), 0, 3, Deferred())
+        descriptor.write(b"tail")
+        self.flush()
+        self.assertEqual(b"".join(descriptor.written), b"head012tail")
+
+
+    def test_fileEndsEarly(self):
+        """
+        If the file ends before the end of a region, the region's
+        L{Deferred} fires with the number of bytes actually sent.
+        """
+        d = Deferred()
+        self.descriptor._queueFileRegion(self.file.fileno(), 8, 100, d)
+        self.flush()
+        self.assertEqual(self.successResultOf(d), 2)
+        self.assertEqual(self.descriptor.written, [b"89"])
+
+
+    def test_pausesProducer(self):
+        """
+        The unsent part of a file region counts towards the send buffer, so
+        queueing a large region pauses a streaming producer.
+        """
+        descriptor = self.descriptor
+        descriptor.bufferSize = 5
+        producer = DummyProducer()
+        descriptor.registerProducer(producer, True)
+        descriptor._queueFileRegion(self.file.fileno(), 0, 10, Deferred())
+        self.assertEqual(producer.events, ['pause'])
+        self.flush()
+        self.assertEqual(producer.events, ['pause', 'resume'])
+
+
+    def test_connectionLost(self):
+        """
+        The L{Deferred}s of regions which have not been sent when the
+        connection is lost fail with the reason it was lost.
+        """
+        d = Deferred()
+        self.descriptor._queueFileRegion(self.file.fileno(), 0, 10, d)
+        self.descriptor.connectionLost(
+            failure.Failure(error.ConnectionLost()))
+        self.failureResultOf(d, error.ConnectionLost)
+        self.assertEqual(self.descriptor._fileRegions, ())
+
+
+    def test_disconnecting(self):
+        """
+        A descriptor which is asked to lose its connection while a file
+        region is queued sends the region before disconnecting.
+        """
+        d = Deferred()
+        self.descriptor._queueFileRegion(self.file.fileno(), 0, 10, d)
+        self.descriptor.loseConnection()
+        self.assertEqual(self.flush(), main.CONNECTION_DONE)
+        self.assertEqual(self.successResultOf(d), 10)
+
+
+
 class PortStringificationTests(unittest.TestCase):
     if interfaces.IReactorTCP(reactor, None) is not None:
         def testTCP(self):
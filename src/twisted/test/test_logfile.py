@@ -8,6 +8,7 @@ import errno
 import os
 import pickle
 import stat
+import threading
 import time
 
 from twisted.trial import unittest
@@ -612,3 +613,175 @@ class DailyLogFileTests(unittest.TestCase):
         self.assertEqual(self.path, copy.path)
         self.assertEqual(defaultMode, copy.defaultMode)
         self.assertEqual(log.lastDate, copy.lastDate)
+
+
+
+class RecordingFile(object):
+    """
+    A file which records what is written to it, and can be made to wait
+    before each write.
+
+    @ivar writes: The data passed to each call of C{write}.
+    @ivar proceed: A L{threading.Event} which C{write} waits for.
+    @ivar writing: A L{threading.Event} set when C{write} is called.
+    """
+    closed = False
+
+    def __init__(self):
+        self.writes = []
+        self.flushes = 0
+        self.proceed = threading.Event()
+        self.proceed.set()
+        self.writing = threading.Event()
+
+
+    def write(self, data):
+        self.writing.set()
+        self.proceed.wait()
+        self.writes.append(data)
+
+
+    def flush(self):
+        self.flushes += 1
+
+
+    def close(self):
+        self.closed = True
+
+
+
+class BatchedLogFileTests(unittest.TestCase):
+    """
+    Tests for L{logfile.BatchedLogFile}.
+    """
+    def setUp(self):
+        self.file = RecordingFile()
+
+
+    def batched(self, **kwargs):
+        """
+        Wrap C{self.file} in a L{logfile.BatchedLogFile} which is closed when
+        the test ends.
+        """
+        kwargs.setdefault("flushInterval", 60)
+        log = logfile.BatchedLogFile(self.file, **kwargs)
+        self.addCleanup(log.close)
+        return log
+
+
+    def test_flush(self):
+        """
+        L{logfile.BatchedLogFile.flush} writes all the queued lines to the
+        wrapped file as one batch, and flushes it.
+        """
+        log = self.batched()
+        log.write(b"one\n")
+        log.write(b"two\n")
+        log.flush()
+        self.assertEqual(self.file.writes, [b"one\ntwo\n"])
+        self.assertEqual(self.file.flushes, 1)
+        self.assertEqual((log.written, log.batches), (2, 1))
+
+
+    def test_maxBatchSize(self):
+        """
+        Once C{maxBatchSize} bytes are queued, they are written without
+        waiting for C{flushInterval}.
+        """
+        log = self.batched(maxBatchSize=8)
+        log.write(b"one\n")
+        self.assertFalse(self.file.writing.wait(0.1))
+        log.write(b"two\n")
+        self.assertTrue(self.file.writing.wait(10))
+
+
+    def test_flushInterval(self):
+        """
+        Queued lines are written after C{flushInterval} seconds.
+        """
+        log = self.batched(flushInterval=0.01)
+        log.write(b"one\n")
+        self.assertTrue(self.file.writing.wait(10))
+
+
+    def test_drop(self):
+        """
+        Lines written while C{maxQueued} lines are waiting are discarded and
+        counted.
+        """
+        log = self.batched(maxBatchSize=4, maxQueued=2)
+        self.file.proceed.clear()
+        log.write(b"one\n")
+        self.assertTrue(self.file.writing.wait(10))
+        log.write(b"two\n")
+        log.write(b"three\n")
+        log.write(b"four\n")
+        self.assertEqual(log.dropped, 1)
+        self.file.proceed.set()
+        log.close()
+        self.assertEqual(self.file.writes, [b"one\n", b"two\nthree\n"])
+
+
+    def test_block(self):
+        """
+        If C{block} is true, writing while C{maxQueued} lines are waiting
+        waits for the lines to be written.
+        """
+        log = self.batched(maxQueued=1, block=True)
+        log.write(b"one\n")
+        log.write(b"two\n")
+        log.close()
+        self.assertEqual(log.dropped, 0)
+        self.assertEqual(b"".join(self.file.writes), b"one\ntwo\n")
+
+
+    def test_close(self):
+        """
+        L{logfile.BatchedLogFile.close} writes the queued lines and closes the
+        wrapped file, after which nothing more can be written.
+        """
+        log = self.batched()
+        log.write(b"one\n")
+        log.close()
+        self.assertEqual(self.file.writes, [b"one\n"])
+        self.assertTrue(self.file.closed)
+        self.assertRaises(ValueError, log.write, b"two\n")
+
+
+    def test_error(self):
+        """
+        A batch which the wrapped file fails to write is logged and counted,
+        and later batches are still written.
+        """
+        log = self.batched()
+        writes = self.file.writes
+        self.file.writes = None
+        log.write(b"one\n")
+        log.flush()
+        self.assertEqual(len(self.flushLoggedErrors(AttributeError)), 1)
+        self.assertEqual(log.errors, 1)
+        self.file.writes = writes
+        log.write(b"two\n")
+        log.flush()
+        self.assertEqual(self.file.writes, [b"two\n"])
+
+
+    def test_dailyLogFile(self):
+        """
+        Batches written to a L{logfile.DailyLogFile} rotate it as usual.
+        """
+        directory = self.mktemp()
+        os.makedirs(directory)
+        daily = RiggedDailyLogFile("batched.log", directory)
+        log = logfile.BatchedLogFile(daily, flushInterval=60)
+        self.addCleanup(log.close)
+        log.write("123")
+        log.flush()
+        daily._clock = 86400
+        log.write("456")
+        log.close()
+
+        with open(daily.path) as f:
+            self.assertEqual(f.read(), "456")
+        with open(daily.path + "." + daily.suffix(0)) as f:
+            self.assertEqual(f.read(), "123")
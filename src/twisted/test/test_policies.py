@@ -15,6 +15,7 @@ from twisted.test.proto_helpers import StringTransport
 from twisted.test.proto_helpers import StringTransportWithDisconnection
 
 from twisted.internet import protocol, reactor, address, defer, task
+from twisted.internet.interfaces import ISendFileTransport
 from twisted.protocols import policies
 
 
@@ -171,6 +172,28 @@ class WrapperTests(unittest.TestCase):
         self.assertTrue(IStubTransport.providedBy(proto.transport))
 
 
+    def test_sendFileNotProvided(self):
+        """
+        The transport wrapper neither provides L{ISendFileTransport} nor
+        relays C{sendFile}, even if the original transport does, so that
+        files are written through the wrapper.
+        """
+        @implementer(ISendFileTransport)
+        class SendFileTransport(StringTransport):
+            def sendFile(self, file, offset=0, count=None):
+                pass
+
+        implementedBy(policies.ProtocolWrapper)
+
+        proto = protocol.Protocol()
+        wrapper = policies.ProtocolWrapper(policies.WrappingFactory(None), proto)
+
+        wrapper.makeConnection(SendFileTransport())
+        self.assertFalse(ISendFileTransport.providedBy(proto.transport))
+        self.assertFalse(hasattr(proto.transport, 'sendFile'))
+        self.assertTrue(hasattr(proto.transport, 'value'))
+
+
     def test_factoryLogPrefix(self):
         """
         L{WrappingFactory.logPrefix} is customized to mention both the original
@@ -8,11 +8,16 @@ Tests for implementations of L{IReactorUDP} and L{IReactorMulticast}.
 
 from __future__ import division, absolute_import
 
+import socket
+
+from zope.interface import implementer
+
 from twisted.trial import unittest
 
 from twisted.python.compat import intToBytes
 from twisted.internet.defer import Deferred, gatherResults, maybeDeferred
 from twisted.internet import protocol, reactor, error, defer, interfaces, udp
+from twisted.internet import _mmsg
 from twisted.python import runtime
 
 
@@ -451,6 +456,146 @@ class UDPTests(unittest.TestCase):
 
 
 
+@implementer(interfaces.IBatchedDatagramProtocol)
+class BatchServer(Server):
+    """
+    A L{Server} which receives datagrams in batches.
+
+    @ivar batches: The lengths of the batches received so far.
+
+    @ivar expected: The number of datagrams to receive before firing
+        C{packetReceived}.
+    """
+    expected = 1
+
+    def __init__(self):
+        Server.__init__(self)
+        self.batches = []
+
+
+    def datagramsReceived(self, datagrams):
+        self.batches.append(len(datagrams))
+        self.packets.extend(datagrams)
+        if (len(self.packets) >= self.expected and
+                self.packetReceived is not None):
+            d, self.packetReceived = self.packetReceived, None
+            d.callback(None)
+
+
+
+class BatchedUDPTests(unittest.TestCase):
+    """
+    Tests for L{udp.Port.writeBatch} and the delivery of datagrams to
+    protocols providing L{interfaces.IBatchedDatagramProtocol}.
+    """
+
+    def listen(self, protocol):
+        """
+        Listen for datagrams on the loopback interface.
+
+        @param protocol: The protocol to connect to the port.
+
+        @return: The L{udp.Port}, which stops listening at the end of the
+            test.
+        """
+        port = reactor.listenUDP(0, protocol, interface="127.0.0.1")
+        self.addCleanup(port.stopListening)
+        return port
+
+
+    def sendAndReceive(self):
+        """
+        Send a batch of datagrams to a L{BatchServer} and check that it
+        receives them all, in order and in batches.
+        """
+        server = BatchServer()
+        server.expected = 100
+        received = server.packetReceived = Deferred()
+        serverPort = self.listen(server)
+        clientPort = self.listen(Server())
+
+        serverAddr = (serverPort.getHost().host, serverPort.getHost().port)
+        clientPort.writeBatch(
+            (intToBytes(i), serverAddr) for i in range(100))
+
+        def cbReceived(ignored):
+            clientAddr = (clientPort.getHost().host,
+                          clientPort.getHost().port)
+            self.assertEqual(
+                server.packets,
+                [(intToBytes(i), clientAddr) for i in range(100)])
+            self.assertTrue(max(server.batches) > 1)
+            self.assertTrue(max(server.batches) <= serverPort.batchSize)
+        return received.addCallback(cbReceived)
+
+
+    def test_sendAndReceive(self):
+        """
+        Datagrams written with L{udp.Port.writeBatch} are sent in order, and
+        a protocol providing L{interfaces.IBatchedDatagramProtocol} receives
+        them in batches.
+        """
+        return self.sendAndReceive()
+
+
+    def test_sendAndReceiveWithoutMmsg(self):
+        """
+        Without C{recvmmsg} and C{sendmmsg}, L{udp.Port} sends and receives
+        batches of datagrams one at a time.
+        """
+        self.patch(_mmsg, "available", False)
+        return self.sendAndReceive()
+
+
+    def test_writeBatchConnected(self):
+        """
+        A connected L{udp.Port} sends a batch of datagrams to the address it
+        is connected to.
+        """
+        server = BatchServer()
+        server.expected = 2
+        received = server.packetReceived = Deferred()
+        serverPort = self.listen(server)
+        clientPort = self.listen(Server())
+        clientPort.connect("127.0.0.1", serverPort.getHost().port)
+        clientPort.writeBatch([(b"a", None), (b"b", None)])
+
+        def cbReceived(ignored):
+            self.assertEqual([data for (data, addr) in server.packets],
+                             [b"a", b"b"])
+        return received.addCallback(cbReceived)
+
+
+    def test_writeBatchInvalidAddress(self):
+        """
+        L{udp.Port.writeBatch} raises L{error.InvalidAddressError} if one of
+        the addresses is not an IP address.
+        """
+        port = self.listen(Server())
+        self.assertRaises(
+            error.InvalidAddressError,
+            port.writeBatch,
+            [(b"a", ("127.0.0.1", 1)), (b"b", ("localhost", 1))])
+
+
+    def test_addressEncoding(self):
+        """
+        L{_mmsg.decodeAddress} turns an address encoded by
+        L{_mmsg.encodeAddress} back into a C{(host, port)} tuple.
+        """
+        for family, addr in [(socket.AF_INET, ("10.2.3.4", 53)),
+                             (socket.AF_INET6, ("2001:db8::1", 65535))]:
+            self.assertEqual(
+                _mmsg.decodeAddress(_mmsg.encodeAddress(family, addr)), addr)
+        self.assertEqual(
+            _mmsg.decodeAddress(
+                _mmsg.encodeAddress(socket.AF_INET, ("<broadcast>", 1))),
+            ("255.255.255.255", 1))
+        self.assertIsNone(
+            _mmsg.encodeAddress(socket.AF_INET, ("fe80::1%eth0", 1)))
+
+
+
 class ReactorShutdownInteractionTests(unittest.TestCase):
     """Test reactor shutdown interaction"""
 
@@ -0,0 +1 @@
+twisted.internet.base.ReactorBase.installTimingWheel keeps timed calls in a hierarchical timing wheel, making callLater and cancellation constant time.
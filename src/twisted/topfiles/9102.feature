@@ -0,0 +1 @@
+twisted.internet.tcp.Connection.setVectoredWrites lets TCP and UNIX transports write buffered data with scatter-gather I/O instead of joining it first.
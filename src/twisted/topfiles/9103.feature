@@ -0,0 +1 @@
+twisted.internet.interfaces.IBufferedProtocol lets TCP and UNIX protocols provide the buffers their transports read data into.
@@ -0,0 +1 @@
+TCP transports now provide twisted.internet.interfaces.ISendFileTransport, which twisted.web.static.File and twisted.protocols.basic.FileSender use to send files with sendfile() on connections without TLS.
@@ -0,0 +1 @@
+twisted.internet.udp.Port now receives and sends datagrams in batches with recvmmsg and sendmmsg for protocols which provide datagramsReceived.
@@ -0,0 +1 @@
+twisted.internet.base.ReactorBase.installProfiler records how long each reactor iteration and each call takes, and reports calls slower than a threshold.
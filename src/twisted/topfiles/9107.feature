@@ -0,0 +1 @@
+twisted.internet.epollreactor.install now accepts edgeTriggered=True to register descriptors which are only being read from as edge-triggered.
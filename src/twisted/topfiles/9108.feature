@@ -0,0 +1 @@
+twist --workers runs several processes which share their TCP listening ports with SO_REUSEPORT.
@@ -183,3 +183,20 @@ class Element(object):
         if loader is None:
             raise MissingTemplateLoader(self)
         return loader.load()
+
+
+    def _renderCompiled(self, request):
+        """
+        Render this element for the flattener, as L{render} does, but with
+        the static parts of the document serialized in advance if the
+        loader can provide them and L{render} is not overridden.
+
+        The loaders in L{twisted.web.template} can provide such a document,
+        which flattens to the same bytes much more quickly.
+        """
+        loader = self.loader
+        if type(self).render == Element.render and loader is not None:
+            loadCompiled = getattr(loader, "_loadCompiled", None)
+            if loadCompiled is not None:
+                return loadCompiled()
+        return self.render(request)
@@ -164,6 +164,151 @@ def _getSlotValue(name, slotData, default=None):
 
 
 
+class _Precompiled(object):
+    """
+    Part of a template whose static contents have been serialized in
+    advance by L{_compile}.
+
+    @ivar parts: A C{list} of L{bytes}, to be written as they are, and the
+        slots, renderers and other dynamic objects between them, to be
+        flattened as usual.
+
+    @ivar original: The object which was compiled, flattened instead of
+        C{parts} within an attribute, where the static contents must be
+        quoted differently.
+    """
+    def __init__(self, parts, original):
+        self.parts = parts
+        self.original = original
+
+
+    def __repr__(self):
+        return '_Precompiled(%r)' % (self.original,)
+
+
+
+def _flattenStatic(root, inAttribute=False):
+    """
+    Flatten an object which contains no slots, renderers or other dynamic
+    content.
+
+    @param root: The object to flatten.
+
+    @param inAttribute: Whether C{root} is to be flattened as the value of
+        an attribute rather than as content.
+
+    @rtype: L{bytes}
+    """
+    chunks = []
+    if inAttribute:
+        write = writeWithAttributeEscaping(chunks.append)
+        dataEscaper = attributeEscapingDoneOutside
+    else:
+        write = chunks.append
+        dataEscaper = escapeForContent
+    stack = [_flattenElement(None, root, write, [], None, dataEscaper)]
+    while stack:
+        try:
+            stack.append(next(stack[-1]))
+        except StopIteration:
+            stack.pop()
+    return b''.join(chunks)
+
+
+
+def _precompiled(items, original):
+    """
+    Collect compiled objects into one L{_Precompiled}, joining adjacent
+    static contents.
+
+    @param items: A C{list} of L{bytes}, L{_Precompiled} instances and
+        dynamic objects.
+
+    @param original: The object which C{items} were compiled from.
+
+    @rtype: L{_Precompiled}
+    """
+    parts = []
+    for item in items:
+        if isinstance(item, _Precompiled):
+            subparts = item.parts
+        else:
+            subparts = [item]
+        for part in subparts:
+            if (isinstance(part, bytes) and parts and
+                    isinstance(parts[-1], bytes)):
+                parts[-1] += part
+            else:
+                parts.append(part)
+    return _Precompiled(parts, original)
+
+
+
+def _isStatic(compiled):
+    """
+    Determine whether the result of L{_compile} has no dynamic parts.
+    """
+    return (isinstance(compiled, _Precompiled) and
+            all(isinstance(part, bytes) for part in compiled.parts))
+
+
+
+def _compile(root):
+    """
+    Serialize the static contents of a template in advance, so that it can
+    be flattened by writing a few precomputed strings instead of walking
+    and quoting the whole tree.
+
+    Slots, L{Tag}s with renderers and objects other than strings, L{Tag}s,
+    L{Comment}s, L{CDATA}, L{CharRef}s, lists and tuples are left to be
+    flattened as usual.  A L{Tag} with a renderer is left whole, children
+    and all, since its renderer is passed a clone of it and may look at or
+    change its children.  C{root} itself is not modified.
+
+    Flattening the result writes the same bytes as flattening C{root}.
+
+    @param root: A template, such as the result of
+        L{ITemplateLoader.load<twisted.web.iweb.ITemplateLoader.load>}.
+
+    @return: A L{_Precompiled}, or a dynamic object.
+    """
+    if isinstance(root, (bytes, unicode, CharRef, Comment, CDATA)):
+        return _Precompiled([_flattenStatic(root)], root)
+    if isinstance(root, (list, tuple)):
+        return _precompiled([_compile(element) for element in root], root)
+    if (not isinstance(root, Tag) or root.slotData is not None or
+            root.render is not None):
+        return root
+
+    children = _compile(root.children)
+    if not all(_isStatic(_compile(v)) for v in root.attributes.values()):
+        compiledTag = Tag(
+            root.tagName, attributes=root.attributes, children=[children],
+            filename=root.filename, lineNumber=root.lineNumber,
+            columnNumber=root.columnNumber)
+        if not root.children:
+            compiledTag.children = []
+        return compiledTag
+    if not root.tagName:
+        return _precompiled([children], root)
+    if _isStatic(children):
+        return _Precompiled([_flattenStatic(root)], root)
+
+    if isinstance(root.tagName, unicode):
+        tagName = root.tagName.encode('ascii')
+    else:
+        tagName = root.tagName
+    start = [b'<', tagName]
+    for k, v in iteritems(root.attributes):
+        if isinstance(k, unicode):
+            k = k.encode('ascii')
+        start.extend([b' ', k, b'="', _flattenStatic(v, True), b'"'])
+    start.append(b'>')
+    return _precompiled(
+        [b''.join(start), children, b'</' + tagName + b'>'], root)
+
+
+
 def _flattenElement(request, root, write, slotData, renderFactory,
                     dataEscaper):
     """
@@ -210,6 +355,15 @@ def _flattenElement(request, root, write, slotData, renderFactory,
                                renderFactory, dataEscaper)
     if isinstance(root, (bytes, unicode)):
         write(dataEscaper(root))
+    elif isinstance(root, _Precompiled):
+        if dataEscaper is escapeForContent:
+            for part in root.parts:
+                if isinstance(part, bytes):
+                    write(part)
+                else:
+                    yield keepGoing(part)
+        else:
+            yield keepGoing(root.original)
     elif isinstance(root, slot):
         slotValue = _getSlotValue(root.name, slotData, root.default)
         yield keepGoing(slotValue)
@@ -277,7 +431,11 @@ def _flattenElement(request, root, write, slotData, renderFactory,
     elif isinstance(root, Deferred):
         yield root.addCallback(lambda result: (result, keepGoing(result)))
     elif IRenderable.providedBy(root):
-        result = root.render(request)
+        renderCompiled = getattr(root, '_renderCompiled', None)
+        if renderCompiled is not None:
+            result = renderCompiled(request)
+        else:
+            result = root.render(request)
         yield keepGoing(result, renderFactory=root)
     else:
         raise UnsupportedType(root)
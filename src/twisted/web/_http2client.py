@@ -0,0 +1,670 @@
+# -*- test-case-name: twisted.web.test.test_http2client -*-
+# Copyright (c) Twisted Matrix Laboratories.
+# See LICENSE for details.
+
+"""
+HTTP2 Client Implementation
+
+This is the client-side protocol used by L{twisted.web.client.Agent} when a
+server agrees to speak HTTP/2 during the TLS handshake.  Like
+L{twisted.web._newclient.HTTP11ClientProtocol} it issues
+L{twisted.web._newclient.Request}s and delivers
+L{twisted.web._newclient.Response}s, but any number of requests may be issued
+over one connection at once, each as a separate stream.
+
+This API is currently considered private.
+"""
+
+from __future__ import absolute_import, division
+
+from collections import deque
+
+from zope.interface import implementer
+
+import h2.connection
+import h2.errors
+import h2.events
+import h2.exceptions
+import h2.settings
+
+from twisted.internet.defer import Deferred, fail, succeed
+from twisted.internet.error import ConnectionLost
+from twisted.internet.interfaces import IConsumer, IPushProducer
+from twisted.internet.protocol import Protocol
+from twisted.python.compat import intToBytes
+from twisted.python.failure import Failure
+from twisted.web.http import RESPONSES
+from twisted.web.http_headers import Headers
+from twisted.web.iweb import UNKNOWN_LENGTH
+from twisted.web._newclient import (
+    ConnectionAborted, RequestGenerationFailed, RequestNotSent,
+    RequestTransmissionFailed, Response, ResponseFailed,
+    ResponseNeverReceived)
+
+
+# This API is currently considered private.
+__all__ = []
+
+
+# Headers which are specific to an HTTP/1.1 connection and must not be sent
+# over HTTP/2 (RFC 7540, section 8.1.2.2), and the Host header, which is
+# replaced by the :authority pseudo-header.
+_CONNECTION_HEADERS = frozenset([
+    b'connection', b'keep-alive', b'proxy-connection', b'transfer-encoding',
+    b'upgrade', b'te', b'host',
+])
+
+
+
+class H2ClientProtocol(Protocol):
+    """
+    A client-side HTTP/2 connection, over which many requests may be issued at
+    once, each as a stream.
+
+    Requests are issued as soon as the server's limit on concurrent streams
+    allows, and otherwise wait their turn.  Request bodies are only sent as
+    fast as the server's flow-control windows allow; see L{_H2ClientStream}.
+
+    @ivar conn: The HTTP/2 connection state machine.
+    @type conn: L{h2.connection.H2Connection}
+
+    @ivar streams: A mapping of stream IDs to the L{_H2ClientStream} of each
+        request in progress.
+    @type streams: L{dict}
+
+    @ivar acceptingRequests: Whether new requests may be issued over this
+        connection.  This becomes L{False} when the server sends I{GOAWAY} or
+        the connection is lost.
+    @type acceptingRequests: L{bool}
+
+    @ivar closeWhenIdle: If L{True}, the connection is closed as soon as no
+        requests are in progress.
+    @type closeWhenIdle: L{bool}
+
+    @ivar _pending: A L{deque} of C{(request, deferred)} pairs for requests
+        waiting for the server to allow another concurrent stream.
+
+    @ivar _connectionLostCallback: A callable taking this protocol, called
+        when the connection is lost.
+
+    @ivar _abortDeferreds: A list of L{Deferred}s that will fire when the
+        connection is lost.
+
+    @ivar _disconnected: Whether the connection has been lost.
+    """
+    acceptingRequests = True
+    closeWhenIdle = False
+    _disconnected = False
+
+    def __init__(self, connectionLostCallback=lambda p: None):
+        self.conn = h2.connection.H2Connection(
+            client_side=True, header_encoding=None
+        )
+        self.streams = {}
+        self._pending = deque()
+        self._connectionLostCallback = connectionLostCallback
+        self._abortDeferreds = []
+
+
+    def connectionMade(self):
+        """
+        Send the connection preface and our settings.  Server push is not
+        supported, so it is disabled.
+        """
+        self.conn.initiate_connection()
+        self.conn.update_settings({h2.settings.ENABLE_PUSH: 0})
+        self._flush()
+
+
+    def request(self, request):
+        """
+        Issue C{request} as a new stream, or as soon as the server allows
+        another concurrent stream.
+
+        @param request: The object defining the parameters of the request to
+           issue.
+        @type request: L{twisted.web._newclient.Request}
+
+        @return: A L{Deferred} which fires with a
+            L{twisted.web._newclient.Response}, or fails with
+            L{RequestNotSent} if the connection no longer accepts requests, or
+            another L{twisted.web._newclient} exception if the request could
+            not be completed.
+        """
+        if not self.acceptingRequests:
+            return fail(RequestNotSent())
+
+        def cancel(d):
+            if entry in self._pending:
+                self._pending.remove(entry)
+                return
+            for stream in list(self.streams.values()):
+                if stream._deferred is d:
+                    stream._deferred = None
+                    stream.abort(ConnectionAborted())
+
+        d = Deferred(cancel)
+        entry = (request, d)
+        if self._pending or not self._streamAvailable():
+            self._pending.append(entry)
+        else:
+            self._startRequest(request, d)
+        return d
+
+
+    def abort(self):
+        """
+        Close the connection, failing every request in progress.
+
+        @return: A L{Deferred} that fires when the connection is lost.
+        """
+        if self._disconnected:
+            return succeed(None)
+        d = Deferred()
+        self._abortDeferreds.append(d)
+        self.transport.abortConnection()
+        return d
+
+
+    def _streamAvailable(self):
+        """
+        Determine whether the server allows another concurrent stream.
+        """
+        return (self.conn.open_outbound_streams <
+                self.conn.remote_settings.max_concurrent_streams)
+
+
+    def _startRequest(self, request, d):
+        """
+        Send the headers of C{request} on a new stream and start sending its
+        body.
+
+        @param d: The L{Deferred} to fire with the response.
+        """
+        streamID = self.conn.get_next_available_stream_id()
+        bodyProducer = request.bodyProducer
+        try:
+            self.conn.send_headers(
+                streamID, self._requestHeaders(request),
+                end_stream=bodyProducer is None)
+        except h2.exceptions.ProtocolError:
+            d.errback(RequestGenerationFailed([Failure()]))
+            return
+        stream = _H2ClientStream(self, streamID, request, d)
+        self.streams[streamID] = stream
+        self._flush()
+        if bodyProducer is not None:
+            stream.produceBody()
+
+
+    def _requestHeaders(self, request):
+        """
+        Build the HTTP/2 header block for C{request}.
+
+        @return: A L{list} of C{(name, value)} pairs of L{bytes}.
+        """
+        if request._parsedURI is not None:
+            scheme = request._parsedURI.scheme
+        else:
+            scheme = b'https'
+        authority = request.headers.getRawHeaders(b'host', [b''])[0]
+        headers = [
+            (b':method', request.method),
+            (b':scheme', scheme),
+            (b':authority', authority),
+            (b':path', request.uri),
+        ]
+        for name, values in request.headers.getAllRawHeaders():
+            name = name.lower()
+            if name not in _CONNECTION_HEADERS:
+                headers.extend((name, value) for value in values)
+        bodyProducer = request.bodyProducer
+        if (bodyProducer is not None and
+                bodyProducer.length is not UNKNOWN_LENGTH):
+            headers.append((b'content-length', intToBytes(bodyProducer.length)))
+        return headers
+
+
+    def dataReceived(self, data):
+        """
+        Called whenever a chunk of data is received from the transport.
+
+        @param data: The data received from the transport.
+        @type data: L{bytes}
+        """
+        try:
+            events = self.conn.receive_data(data)
+        except h2.exceptions.ProtocolError:
+            # A remote protocol error terminates the connection.
+            self._flush()
+            self.transport.loseConnection()
+            return
+
+        for event in events:
+            if isinstance(event, h2.events.ResponseReceived):
+                stream = self.streams.get(event.stream_id)
+                if stream is not None:
+                    stream.responseReceived(event.headers)
+            elif isinstance(event, h2.events.DataReceived):
+                stream = self.streams.get(event.stream_id)
+                if stream is not None:
+                    stream.dataReceived(
+                        event.data, event.flow_controlled_length)
+                else:
+                    # Data for a stream we have given up on still counts
+                    # against the connection's window.
+                    self.acknowledgeData(
+                        event.stream_id, event.flow_controlled_length)
+            elif isinstance(event, h2.events.StreamEnded):
+                stream = self.streams.get(event.stream_id)
+                if stream is not None:
+                    stream.streamEnded()
+            elif isinstance(event, h2.events.StreamReset):
+                stream = self.streams.get(event.stream_id)
+                if stream is not None:
+                    stream.streamReset(event.error_code)
+            elif isinstance(event, h2.events.WindowUpdated):
+                self._windowUpdated(event.stream_id)
+            elif isinstance(event, h2.events.RemoteSettingsChanged):
+                # The initial window size may have changed too.
+                self._windowUpdated(0)
+                self._startPending()
+            elif isinstance(event, h2.events.ConnectionTerminated):
+                self._goAway(event.last_stream_id, event.error_code)
+
+        self._flush()
+
+
+    def _windowUpdated(self, streamID):
+        """
+        Send more request body data on the stream with ID C{streamID}, or on
+        all streams if C{streamID} is C{0}.
+        """
+        if streamID:
+            stream = self.streams.get(streamID)
+            if stream is not None:
+                stream.sendBody()
+        else:
+            for stream in list(self.streams.values()):
+                stream.sendBody()
+
+
+    def _startPending(self):
+        """
+        Issue waiting requests for as long as the server allows more
+        concurrent streams.
+        """
+        while (self._pending and self.acceptingRequests and
+               self._streamAvailable()):
+            request, d = self._pending.popleft()
+            self._startRequest(request, d)
+
+
+    def _goAway(self, lastStreamID, errorCode):
+        """
+        The server will not process new streams: fail the requests it will
+        not process, and close the connection once the others are done.
+
+        @param lastStreamID: The highest stream ID the server may process.
+
+        @param errorCode: The error code the server gave.
+        """
+        self.acceptingRequests = False
+        reason = Failure(ConnectionLost(
+            u"Server sent GOAWAY with error code %d" % (errorCode,)))
+        for streamID in sorted(self.streams):
+            if streamID > lastStreamID:
+                self.streams[streamID].connectionLost(reason)
+        while self._pending:
+            request, d = self._pending.popleft()
+            d.errback(RequestNotSent())
+        if not self.streams:
+            self.transport.loseConnection()
+
+
+    def connectionLost(self, reason):
+        """
+        The underlying transport went away: fail every request in progress or
+        waiting.
+        """
+        self.acceptingRequests = False
+        self._disconnected = True
+        for stream in list(self.streams.values()):
+            stream.connectionLost(reason)
+        self.streams = {}
+        while self._pending:
+            request, d = self._pending.popleft()
+            d.errback(RequestNotSent())
+        self._connectionLostCallback(self)
+        abortDeferreds, self._abortDeferreds = self._abortDeferreds, []
+        for d in abortDeferreds:
+            d.callback(None)
+
+
+    def streamDone(self, streamID):
+        """
+        Called by L{_H2ClientStream} when the stream with ID C{streamID} will
+        not be used any more, so that another request can take its place.
+        """
+        self.streams.pop(streamID, None)
+        self._startPending()
+        if not self.streams and (self.closeWhenIdle or
+                                 not self.acceptingRequests):
+            self.transport.loseConnection()
+
+
+    def resetStream(self, streamID, errorCode=h2.errors.CANCEL):
+        """
+        Tell the server we are abandoning the stream with ID C{streamID}.
+        """
+        try:
+            self.conn.reset_stream(streamID, errorCode)
+        except h2.exceptions.StreamClosedError:
+            pass
+        self._flush()
+
+
+    def acknowledgeData(self, streamID, length):
+        """
+        Allow the server to send another C{length} bytes on the stream with ID
+        C{streamID}.
+        """
+        self.conn.acknowledge_received_data(length, streamID)
+        self._flush()
+
+
+    def _flush(self):
+        """
+        Write any frames the connection state machine has produced.
+        """
+        data = self.conn.data_to_send()
+        if data:
+            self.transport.write(data)
+
+
+
+@implementer(IConsumer, IPushProducer)
+class _H2ClientStream(object):
+    """
+    A request issued over an L{H2ClientProtocol}, and the response to it.
+
+    As the consumer of the request body, the stream sends data as fast as the
+    flow-control windows allow, and pauses the request's body producer while
+    they are exhausted.  As the producer of the response body, it only
+    acknowledges received data, allowing the server to send more, while it
+    is not paused.
+
+    @ivar streamID: The ID of the stream.
+
+    @ivar _protocol: The L{H2ClientProtocol} of the connection.
+
+    @ivar _request: The L{twisted.web._newclient.Request} being issued.
+
+    @ivar _deferred: The L{Deferred} to fire with the response, or L{None}
+        once it has fired.
+
+    @ivar _response: The L{twisted.web._newclient.Response}, once its headers
+        have been received.
+
+    @ivar _outbound: A L{deque} of request body data not sent yet.
+
+    @ivar _bodyDone: Whether the request body producer has finished.
+
+    @ivar _sent: Whether the whole request has been sent, ending our side of
+        the stream.
+
+    @ivar _producerPaused: Whether the request body producer has been paused.
+
+    @ivar _paused: Whether the consumer of the response body has paused the
+        stream.
+
+    @ivar _unacknowledged: The number of flow-controlled bytes received while
+        paused, to acknowledge when resumed.
+
+    @ivar _finished: Whether the stream is over, successfully or not.
+    """
+    _response = None
+    _bodyDone = False
+    _producerPaused = False
+    _paused = False
+    _unacknowledged = 0
+    _finished = False
+
+    def __init__(self, protocol, streamID, request, deferred):
+        self._protocol = protocol
+        self.streamID = streamID
+        self._request = request
+        self._deferred = deferred
+        self._outbound = deque()
+        self._sent = request.bodyProducer is None
+
+
+    def produceBody(self):
+        """
+        Start producing the request body.
+        """
+        d = self._request.bodyProducer.startProducing(self)
+        d.addCallbacks(self._bodyProduced, self._bodyFailed)
+
+
+    def _bodyProduced(self, ignored):
+        """
+        The request body producer has finished: end the stream once all of
+        the body is sent.
+        """
+        self._bodyDone = True
+        self.sendBody()
+
+
+    def _bodyFailed(self, reason):
+        """
+        The request body producer has failed: abandon the stream.
+        """
+        self._bodyDone = True
+        if self._finished:
+            return
+        if self._deferred is not None:
+            d, self._deferred = self._deferred, None
+            d.errback(RequestGenerationFailed([reason]))
+        self.abort(reason.value)
+
+
+    def write(self, data):
+        """
+        Queue request body data to send as soon as the flow-control windows
+        allow.
+        """
+        if self._finished:
+            return
+        self._outbound.append(data)
+        self.sendBody()
+
+
+    def registerProducer(self, producer, streaming):
+        """
+        Not used: the request body producer is controlled directly.
+        """
+
+
+    def unregisterProducer(self):
+        """
+        Not used: the request body producer is controlled directly.
+        """
+
+
+    def sendBody(self):
+        """
+        Send as much queued request body data as the flow-control windows
+        allow, end the stream if the body is complete, and pause or resume
+        the request body producer.
+        """
+        if self._finished or self._sent:
+            return
+        conn = self._protocol.conn
+        while self._outbound:
+            size = min(conn.local_flow_control_window(self.streamID),
+                       conn.max_outbound_frame_size)
+            if size <= 0:
+                break
+            data = self._outbound.popleft()
+            if len(data) > size:
+                self._outbound.appendleft(data[size:])
+                data = data[:size]
+            conn.send_data(self.streamID, data)
+
+        if self._outbound:
+            if not self._producerPaused:
+                self._producerPaused = True
+                self._request.bodyProducer.pauseProducing()
+        elif self._bodyDone:
+            conn.end_stream(self.streamID)
+            self._sent = True
+        elif self._producerPaused:
+            self._producerPaused = False
+            self._request.bodyProducer.resumeProducing()
+        self._protocol._flush()
+
+
+    def responseReceived(self, headers):
+        """
+        The response headers have been received: fire the request's
+        L{Deferred} with a L{Response}.
+
+        @param headers: The header block, as a L{list} of C{(name, value)}
+            pairs.
+        """
+        code = None
+        responseHeaders = Headers()
+        for name, value in headers:
+            if name == b':status':
+                code = int(value)
+            elif not name.startswith(b':'):
+                responseHeaders.addRawHeader(name, value)
+        self._response = Response._construct(
+            (b'HTTP', 2, 0), code, RESPONSES.get(code, b''),
+            responseHeaders, self, self._request)
+        contentLength = responseHeaders.getRawHeaders(b'content-length')
+        if contentLength is not None and contentLength[0].isdigit():
+            self._response.length = int(contentLength[0])
+        # Nothing consumes the body until a protocol is delivered to the
+        # response, which resumes the stream.
+        self._paused = True
+        if self._deferred is not None:
+            d, self._deferred = self._deferred, None
+            d.callback(self._response)
+
+
+    def dataReceived(self, data, flowControlledLength):
+        """
+        Deliver response body data, and acknowledge it unless paused.
+        """
+        self._response._bodyDataReceived(data)
+        if self._paused:
+            self._unacknowledged += flowControlledLength
+        else:
+            self._protocol.acknowledgeData(self.streamID, flowControlledLength)
+
+
+    def streamEnded(self):
+        """
+        The server has sent the whole response.
+        """
+        if self._response is None:
+            self.connectionLost(Failure(ConnectionLost(
+                u"Stream ended without a response")))
+            return
+        if not self._sent:
+            # The server responded before the request body was sent.
+            if not self._bodyDone:
+                self._request.bodyProducer.stopProducing()
+            self._protocol.resetStream(self.streamID, h2.errors.NO_ERROR)
+        self._finish()
+        self._response._bodyDataFinished()
+
+
+    def streamReset(self, errorCode):
+        """
+        The server has reset the stream.
+        """
+        self.connectionLost(Failure(ConnectionLost(
+            u"Stream reset by server with error code %d" % (errorCode,))))
+
+
+    def connectionLost(self, reason):
+        """
+        The stream can not complete: fail the request or the response body
+        with C{reason}.
+        """
+        if self._finished:
+            return
+        self._finish()
+        if not self._sent and not self._bodyDone:
+            self._request.bodyProducer.stopProducing()
+        if self._deferred is not None:
+            d, self._deferred = self._deferred, None
+            if not self._sent:
+                d.errback(RequestTransmissionFailed([reason]))
+            else:
+                d.errback(ResponseNeverReceived([reason]))
+        elif self._response is not None:
+            self._response._bodyDataFinished(
+                Failure(ResponseFailed([reason], self._response)))
+
+
+    def abort(self, exception):
+        """
+        Reset the stream and fail it with C{exception}.
+        """
+        if self._finished:
+            return
+        self._protocol.resetStream(self.streamID)
+        self.connectionLost(Failure(exception))
+
+
+    def _finish(self):
+        """
+        Mark the stream as over and tell the connection.
+        """
+        self._finished = True
+        self._protocol.streamDone(self.streamID)
+
+
+    def pauseProducing(self):
+        """
+        Stop acknowledging response body data, so the server stops sending it
+        once the stream's window is exhausted.
+        """
+        self._paused = True
+
+
+    def resumeProducing(self):
+        """
+        Acknowledge response body data again, including any received while
+        paused.
+        """
+        self._paused = False
+        if self._unacknowledged and not self._finished:
+            length, self._unacknowledged = self._unacknowledged, 0
+            self._protocol.acknowledgeData(self.streamID, length)
+
+
+    def stopProducing(self):
+        """
+        The response body is not wanted any more: abandon the stream.
+        """
+        self.abort(ConnectionAborted())
+
+
+    def abortConnection(self):
+        """
+        Abandon the stream, leaving the connection open for other requests.
+        """
+        self.abort(ConnectionAborted())
+
+
+    def loseConnection(self):
+        """
+        Abandon the stream, leaving the connection open for other requests.
+        """
+        self.abort(ConnectionAborted())
+
@@ -1408,8 +1408,14 @@ class HTTP11ClientProtocol(Protocol):
 
     @ivar _abortDeferreds: A list of C{Deferred} instances that will fire when
         the connection is lost.
+
+    @ivar _connectionLostCallback: If not L{None}, a callable taking this
+        protocol, called when the connection is lost.  L{HTTPConnectionPool
+        <twisted.web.client.HTTPConnectionPool>} sets it to count its open
+        connections.
     """
     _state = 'QUIESCENT'
+    _connectionLostCallback = None
     _parser = None
     _finishedRequest = None
     _currentRequest = None
@@ -1600,7 +1606,18 @@ class HTTP11ClientProtocol(Protocol):
         The underlying transport went away.  If appropriate, notify the parser
         object.
         """
-    connectionLost = makeStatefulDispatcher('connectionLost', connectionLost)
+        if self._connectionLostCallback is not None:
+            self._connectionLostCallback(self)
+        self._connectionLostDispatch(reason)
+
+
+    def _connectionLostDispatch(self, reason):
+        """
+        Handle the loss of the connection as appropriate to the current
+        state.
+        """
+    _connectionLostDispatch = makeStatefulDispatcher(
+        'connectionLost', _connectionLostDispatch)
 
 
     def _connectionLost_QUIESCENT(self, reason):
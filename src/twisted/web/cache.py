@@ -0,0 +1,479 @@
+# -*- test-case-name: twisted.web.test.test_cache -*-
+# Copyright (c) Twisted Matrix Laboratories.
+# See LICENSE for details.
+
+"""
+A resource wrapper which stores rendered responses and answers later requests
+for them, including conditional ones, without rendering them again.
+"""
+
+from __future__ import division, absolute_import
+
+__all__ = ['CachingResource']
+
+from collections import OrderedDict
+
+from twisted.python.compat import intToBytes
+from twisted.python.components import proxyForInterface
+from twisted.python.failure import Failure
+from twisted.web import http
+from twisted.web.resource import IResource
+from twisted.web.server import NOT_DONE_YET
+
+
+
+def _parseCacheControl(headers):
+    """
+    Parse the C{Cache-Control} directives in some headers.
+
+    @param headers: The L{Headers<twisted.web.http_headers.Headers>} to parse.
+
+    @return: A C{dict} mapping each lower-cased directive to its argument,
+        or to L{None} if it has none.
+    @rtype: C{dict}
+    """
+    directives = {}
+    for value in headers.getRawHeaders(b'cache-control', []):
+        for directive in value.split(b','):
+            name, _, argument = directive.partition(b'=')
+            name = name.strip().lower()
+            if name:
+                directives[name] = argument.strip().strip(b'"') or None
+    return directives
+
+
+
+def _deltaSeconds(directives, name):
+    """
+    Get the number of seconds given as the argument of a C{Cache-Control}
+    directive.
+
+    @return: The number of seconds, or L{None} if the directive is missing
+        or its argument is not a number.
+    """
+    try:
+        return int(directives[name])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+
+class _CachedResponse(object):
+    """
+    A response stored by a L{CachingResource}.
+
+    @ivar code: The response code.
+    @ivar message: The response message.
+    @ivar headers: A C{list} of header names and C{list}s of their values.
+    @ivar body: The response body.
+    @ivar etag: The entity tag of the response, or L{None}.
+    @ivar lastModified: The time the response was last modified in seconds
+        since the epoch, or L{None}.
+    @ivar created: The time the response was stored.
+    @ivar expires: The time after which the response is no longer used.
+    @ivar size: The approximate number of bytes the response occupies.
+    """
+    def __init__(self, code, message, headers, body, etag, lastModified,
+                 created, expires):
+        self.code = code
+        self.message = message
+        self.headers = headers
+        self.body = body
+        self.etag = etag
+        self.lastModified = lastModified
+        self.created = created
+        self.expires = expires
+        self.size = len(body) + sum(
+            len(name) + sum(len(value) for value in values)
+            for name, values in headers)
+
+
+
+class _Recorder(object):
+    """
+    A resource-like object which renders a request with the resource
+    wrapped by a L{CachingResource} and records the response, without
+    collapsing it with other requests.
+
+    It is passed to C{Request.render} for requests which were waiting for
+    a response which turned out not to be cacheable.
+    """
+    def __init__(self, cache):
+        self.cache = cache
+
+
+    def render(self, request):
+        return self.cache._record(request)
+
+
+
+class CachingResource(proxyForInterface(IResource)):
+    """
+    Wrap a L{IResource}, storing the responses it renders to C{GET} requests
+    and answering later C{GET} and C{HEAD} requests for the same response
+    from memory.
+
+    Responses are keyed on the request's C{Host} header and URI, the values
+    of C{keyHeaders} in the request, and the values of the request headers
+    named by the C{Vary} header of the response.  A response is stored if
+    its code is one of C{cacheableCodes}, it sets no cookies, its
+    C{Cache-Control} header permits it and its whole body was written with
+    C{request.write}: files sent with C{sendfile} by L{twisted.web.static}
+    and bodies encoded by L{twisted.web.server.GzipEncoderFactory} are not
+    stored.  It is used until the number of seconds given by its
+    C{s-maxage} or C{max-age} directive, or else C{ttl}, has passed.
+
+    Requests with an C{Authorization} header, or whose C{Cache-Control}
+    header contains C{no-cache}, C{no-store} or C{max-age=0}, are rendered
+    without consulting the cache.
+
+    Stored responses with an entity tag or modification time answer
+    C{If-None-Match} and C{If-Modified-Since} requests with
+    L{NOT_MODIFIED<twisted.web.http.NOT_MODIFIED>}.
+
+    While a response is being rendered, other requests for the same key wait
+    for it instead of rendering it again.
+
+    Note that the returned children resources won't be wrapped, so you have
+    to explicitly wrap them if you want their responses to be cached.
+
+    @ivar maxEntries: The maximum number of responses stored.  The least
+        recently used are discarded first.
+    @type maxEntries: C{int}
+
+    @ivar maxSize: The maximum number of bytes of headers and bodies stored.
+        Larger responses are not stored at all.
+    @type maxSize: C{int}
+
+    @ivar ttl: The number of seconds a response is used for if its
+        C{Cache-Control} header does not say.
+    @type ttl: C{int}
+
+    @ivar keyHeaders: The names of request headers, besides those in the
+        C{Vary} header of each response, whose values distinguish responses.
+    @type keyHeaders: C{tuple} of C{bytes}
+
+    @ivar cacheableCodes: The response codes which may be stored.
+    @type cacheableCodes: C{frozenset}
+
+    @ivar hits: The number of requests answered from the cache.
+    @ivar misses: The number of requests rendered by the wrapped resource.
+    @ivar collapsed: The number of requests which waited for a response
+        another request was rendering.
+
+    @ivar _entries: An L{OrderedDict} mapping keys to L{_CachedResponse}s,
+        least recently used first.
+    @ivar _vary: A C{dict} mapping the URI and C{keyHeaders} part of keys to
+        the C{Vary} header names of the responses stored for it and the
+        number of those responses.
+    @ivar _rendering: A C{dict} mapping the URI and C{keyHeaders} part of
+        keys being rendered to the C{list} of requests waiting for them.
+    @ivar _size: The number of bytes stored.
+    """
+    cacheableCodes = frozenset([
+        http.OK, http.NON_AUTHORITATIVE_INFORMATION, http.MULTIPLE_CHOICE,
+        http.MOVED_PERMANENTLY, http.NOT_FOUND, http.GONE])
+
+    # Headers which describe a single response rather than the stored one.
+    _unstoredHeaders = frozenset([
+        b'age', b'connection', b'content-length', b'date', b'etag',
+        b'last-modified', b'server', b'transfer-encoding'])
+
+    def __init__(self, original, maxEntries=1000, maxSize=2 ** 24, ttl=60,
+                 keyHeaders=(), reactor=None):
+        super(CachingResource, self).__init__(original)
+        if reactor is None:
+            from twisted.internet import reactor
+        self._reactor = reactor
+        self.maxEntries = maxEntries
+        self.maxSize = maxSize
+        self.ttl = ttl
+        self.keyHeaders = tuple(name.lower() for name in keyHeaders)
+        self.hits = 0
+        self.misses = 0
+        self.collapsed = 0
+        self._entries = OrderedDict()
+        self._vary = {}
+        self._rendering = {}
+        self._size = 0
+
+
+    def render(self, request):
+        """
+        Answer C{request} from the cache if possible, or wait for another
+        request rendering the same response, or render it with the wrapped
+        resource and store the response.
+        """
+        if (request.method not in (b'GET', b'HEAD') or
+                request.requestHeaders.hasHeader(b'authorization')):
+            return self.original.render(request)
+
+        directives = _parseCacheControl(request.requestHeaders)
+        if (b'no-cache' in directives or b'no-store' in directives or
+                _deltaSeconds(directives, b'max-age') == 0):
+            self.misses += 1
+            if request.method == b'HEAD' or b'no-store' in directives:
+                return self.original.render(request)
+            return self._record(request)
+
+        entry = self._lookup(request)
+        if entry is not None:
+            self.hits += 1
+            return self._serve(entry, request)
+
+        primaryKey = self._primaryKey(request)
+        if primaryKey in self._rendering:
+            self.collapsed += 1
+            self._wait(primaryKey, request)
+            return NOT_DONE_YET
+
+        self.misses += 1
+        if request.method == b'HEAD':
+            return self.original.render(request)
+        self._rendering[primaryKey] = []
+        request.notifyFinish().addBoth(
+            lambda ignored: self._release(primaryKey))
+        return self._record(request)
+
+
+    def statistics(self):
+        """
+        Describe the contents and use of the cache.
+
+        @return: A C{dict} with the number of C{entries} and the C{size} in
+            bytes stored, and the numbers of C{hits}, C{misses} and
+            C{collapsed} requests.
+        @rtype: C{dict}
+        """
+        return {
+            "entries": len(self._entries),
+            "size": self._size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "collapsed": self.collapsed,
+        }
+
+
+    def _primaryKey(self, request):
+        """
+        Get the part of the key of the response to C{request} which does not
+        depend on the C{Vary} header of the response.
+        """
+        return (request.getHeader(b'host'), request.uri) + tuple(
+            request.getHeader(name) for name in self.keyHeaders)
+
+
+    def _variantKey(self, request, names):
+        """
+        Get the part of the key of the response to C{request} given by the
+        request headers named by its C{Vary} header.
+        """
+        return tuple(request.getHeader(name) for name in names)
+
+
+    def _lookup(self, request):
+        """
+        Find the fresh response stored for C{request}, if any.
+
+        @return: The L{_CachedResponse} or L{None}.
+        """
+        primaryKey = self._primaryKey(request)
+        vary = self._vary.get(primaryKey)
+        if vary is None:
+            return None
+        key = (primaryKey, self._variantKey(request, vary[0]))
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires <= self._reactor.seconds():
+            self._remove(key)
+            return None
+        del self._entries[key]
+        self._entries[key] = entry
+        return entry
+
+
+    def _serve(self, entry, request):
+        """
+        Set the code and headers of C{request} from a stored response.
+
+        @return: The body to write, which is empty if C{request} is a
+            conditional request the response satisfies.
+        """
+        request.setResponseCode(entry.code, entry.message)
+        for name, values in entry.headers:
+            request.responseHeaders.setRawHeaders(name, values)
+        request.setHeader(
+            b'age', intToBytes(int(self._reactor.seconds() - entry.created)))
+        if (entry.lastModified is not None and
+                request.setLastModified(entry.lastModified) is http.CACHED):
+            return b''
+        if (entry.etag is not None and
+                request.setETag(entry.etag) is http.CACHED):
+            return b''
+        return entry.body
+
+
+    def _wait(self, primaryKey, request):
+        """
+        Make C{request} wait for the response being rendered for
+        C{primaryKey}, unless its connection is lost first.
+        """
+        waiting = self._rendering[primaryKey]
+        waiting.append(request)
+
+        def lost(reason):
+            if request in waiting:
+                waiting.remove(request)
+        request.notifyFinish().addErrback(lost)
+
+
+    def _release(self, primaryKey):
+        """
+        Answer the requests waiting for the response rendered for
+        C{primaryKey} from the cache, or render them if it was not stored.
+        """
+        for request in self._rendering.pop(primaryKey):
+            entry = self._lookup(request)
+            if entry is None:
+                self.misses += 1
+                try:
+                    request.render(_Recorder(self))
+                except:
+                    request.processingFailed(Failure())
+                continue
+            self.hits += 1
+            body = self._serve(entry, request)
+            request.setHeader(b'content-length', intToBytes(len(body)))
+            request.write(body)
+            request.finish()
+
+
+    def _record(self, request):
+        """
+        Render C{request} with the wrapped resource, storing the response
+        when it is finished if it is cacheable.
+        """
+        body = []
+        size = [0]
+
+        def write(data):
+            if size[0] is not None and data:
+                size[0] += len(data)
+                if size[0] > self.maxSize:
+                    del body[:]
+                    size[0] = None
+                else:
+                    body.append(data)
+            originalWrite(data)
+
+        def finish():
+            for name, hook in [("write", write), ("finish", finish)]:
+                if vars(request).get(name) is hook:
+                    delattr(request, name)
+            # Anything which sent part of the body without write, or
+            # changed it after write, makes the recorded body incomplete.
+            if (size[0] is not None and not request._disconnected and
+                    request.sentLength - sentBefore == size[0]):
+                self._store(request, b''.join(body), snapshot)
+            return originalFinish()
+
+        snapshot = dict(
+            (name, list(values))
+            for name, values in request.responseHeaders.getAllRawHeaders())
+        sentBefore = request.sentLength
+        originalWrite = request.write
+        originalFinish = request.finish
+        request.write = write
+        request.finish = finish
+        return self.original.render(request)
+
+
+    def _store(self, request, body, snapshot):
+        """
+        Store the response to C{request} if it is cacheable.
+
+        @param snapshot: A C{dict} mapping the names of the response headers
+            set before the wrapped resource rendered C{request} to their
+            values, which are not stored unless it changed them.
+        """
+        if (request.method != b'GET' or
+                request.code not in self.cacheableCodes or
+                request.cookies or
+                request.responseHeaders.hasHeader(b'set-cookie')):
+            return
+
+        directives = _parseCacheControl(request.responseHeaders)
+        if (b'no-store' in directives or b'no-cache' in directives or
+                b'private' in directives):
+            return
+        ttl = _deltaSeconds(directives, b's-maxage')
+        if ttl is None:
+            ttl = _deltaSeconds(directives, b'max-age')
+        if ttl is None:
+            ttl = self.ttl
+        if ttl <= 0:
+            return
+
+        vary = []
+        for value in request.responseHeaders.getRawHeaders(b'vary', []):
+            vary.extend(name.strip().lower() for name in value.split(b','))
+        if b'*' in vary:
+            return
+        vary = tuple(sorted(set(name for name in vary if name)))
+
+        etag = request.etag
+        if etag is None:
+            etag = request.responseHeaders.getRawHeaders(b'etag', [None])[0]
+        lastModified = request.lastModified
+        if lastModified is None:
+            value = request.responseHeaders.getRawHeaders(
+                b'last-modified', [None])[0]
+            if value is not None:
+                try:
+                    lastModified = http.stringToDatetime(value)
+                except ValueError:
+                    pass
+
+        headers = [
+            (name, values)
+            for name, values in request.responseHeaders.getAllRawHeaders()
+            if name.lower() not in self._unstoredHeaders and
+            snapshot.get(name) != values]
+        now = self._reactor.seconds()
+        entry = _CachedResponse(
+            request.code, request.code_message, headers, body, etag,
+            lastModified, now, now + ttl)
+        if entry.size > self.maxSize:
+            return
+
+        primaryKey = self._primaryKey(request)
+        if self._vary.get(primaryKey, (vary,))[0] != vary:
+            for key in [key for key in self._entries
+                        if key[0] == primaryKey]:
+                self._remove(key)
+        key = (primaryKey, self._variantKey(request, vary))
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = entry
+        self._size += entry.size
+        self._vary[primaryKey] = (
+            vary, self._vary.get(primaryKey, (vary, 0))[1] + 1)
+
+        while (len(self._entries) > self.maxEntries or
+               self._size > self.maxSize):
+            self._remove(next(iter(self._entries)))
+
+
+    def _remove(self, key):
+        """
+        Discard the response stored for C{key}.
+        """
+        entry = self._entries.pop(key)
+        self._size -= entry.size
+        primaryKey = key[0]
+        vary, count = self._vary[primaryKey]
+        if count == 1:
+            del self._vary[primaryKey]
+        else:
+            self._vary[primaryKey] = (vary, count - 1)
@@ -22,6 +22,7 @@ except ImportError:
         return result.encode("charmap")
 
 import zlib
+from collections import deque
 from functools import wraps
 
 from zope.interface import implementer
@@ -31,6 +32,7 @@ from twisted.python.compat import _PY3, networkString
 from twisted.python.compat import nativeString, intToBytes, unicode, itervalues
 from twisted.python.deprecate import deprecatedModuleAttribute, deprecated
 from twisted.python.failure import Failure
+from twisted.python._histogram import Histogram
 from incremental import Version
 
 from twisted.web.iweb import IPolicyForHTTPS, IAgentEndpointFactory
@@ -39,6 +41,7 @@ from twisted.web import http
 from twisted.internet import defer, protocol, task, reactor
 from twisted.internet.abstract import isIPv6Address
 from twisted.internet.interfaces import IProtocol, IOpenSSLContextFactory
+from twisted.internet.interfaces import IHandshakeListener, INegotiated
 from twisted.internet.endpoints import HostnameEndpoint, wrapClientTLS
 from twisted.python.util import InsensitiveDict
 from twisted.python.components import proxyForInterface
@@ -810,6 +813,11 @@ from twisted.web._newclient import RequestNotSent, RequestTransmissionFailed
 from twisted.web._newclient import (
     ResponseNeverReceived, PotentialDataLoss, _WrapperException)
 
+try:
+    from twisted.web._http2client import H2ClientProtocol
+except ImportError:
+    H2ClientProtocol = None
+
 
 
 try:
@@ -899,9 +907,23 @@ class WebClientContextFactory(object):
 class BrowserLikePolicyForHTTPS(object):
     """
     SSL connection creator for web clients.
+
+    @ivar _acceptableProtocols: The protocols to offer with ALPN and NPN, or
+        L{None} to offer none.
     """
-    def __init__(self, trustRoot=None):
+    def __init__(self, trustRoot=None, acceptableProtocols=None):
+        """
+        @param trustRoot: See
+            L{twisted.internet.ssl.optionsForClientTLS}.
+
+        @param acceptableProtocols: The protocols to offer to the server
+            during the TLS handshake, most preferred first, such as
+            C{[b"h2", b"http/1.1"]} for an L{HTTPConnectionPool} which speaks
+            HTTP/2.  See L{twisted.internet.ssl.optionsForClientTLS}.
+        @type acceptableProtocols: L{list} of L{bytes}
+        """
         self._trustRoot = trustRoot
+        self._acceptableProtocols = acceptableProtocols
 
 
     @_requireSSL
@@ -925,8 +947,12 @@ class BrowserLikePolicyForHTTPS(object):
         @rtype: L{client connection creator
             <twisted.internet.interfaces.IOpenSSLClientConnectionCreator>}
         """
-        return optionsForClientTLS(hostname.decode("ascii"),
-                                   trustRoot=self._trustRoot)
+        if self._acceptableProtocols is None:
+            return optionsForClientTLS(hostname.decode("ascii"),
+                                       trustRoot=self._trustRoot)
+        return optionsForClientTLS(
+            hostname.decode("ascii"), trustRoot=self._trustRoot,
+            acceptableProtocols=self._acceptableProtocols)
 
 
 
@@ -1122,6 +1148,149 @@ class FileBodyProducer(object):
 
 
 
+@implementer(IHandshakeListener)
+class _HTTPClientProtocolNegotiator(protocol.Protocol):
+    """
+    A protocol which speaks HTTP/2 if the server agrees to during the TLS
+    handshake, using ALPN or NPN, and HTTP/1.1 otherwise.
+
+    Requests issued before the handshake completes wait for it.
+
+    @ivar _http11Protocol: The L{HTTP11ClientProtocol} to use for HTTP/1.1.
+
+    @ivar _http2Callback: A callable taking the L{H2ClientProtocol}, called
+        when HTTP/2 is negotiated.
+
+    @ivar _connectionLostCallback: A callable taking this protocol, called if
+        the connection is lost before a protocol is chosen.
+
+    @ivar _protocol: The chosen protocol, or L{None}.
+
+    @ivar _waiting: A list of C{[request, deferred, issued]} lists for the
+        requests issued before a protocol was chosen, where C{issued} is the
+        L{Deferred} returned by the chosen protocol, or L{None} until then.
+
+    @ivar _chosenDeferreds: The L{Deferred}s returned by L{chosen} which have
+        not fired yet.
+    """
+    _protocol = None
+
+    def __init__(self, http11Protocol, http2Callback,
+                 connectionLostCallback):
+        self._http11Protocol = http11Protocol
+        self._http2Callback = http2Callback
+        self._connectionLostCallback = connectionLostCallback
+        self._waiting = []
+        self._chosenDeferreds = []
+
+
+    def chosen(self):
+        """
+        @return: A L{Deferred} which fires with the chosen protocol once it is
+            chosen, or fails if the connection is lost before then.
+        """
+        if self._protocol is not None:
+            return defer.succeed(self._protocol)
+        d = defer.Deferred()
+        self._chosenDeferreds.append(d)
+        return d
+
+
+    def connectionMade(self):
+        """
+        Speak HTTP/1.1 right away if the connection does not use TLS.
+        """
+        if not INegotiated.providedBy(self.transport):
+            self._choose(self._http11Protocol)
+
+
+    def handshakeCompleted(self):
+        """
+        Choose a protocol according to the result of the TLS handshake.
+        """
+        if self._protocol is not None:
+            # The session was renegotiated.
+            return
+        if getattr(self.transport, "negotiatedProtocol", None) == b"h2":
+            protocol = H2ClientProtocol(self._connectionLostCallback)
+            self._choose(protocol)
+            self._http2Callback(protocol)
+        else:
+            self._choose(self._http11Protocol)
+
+
+    def _choose(self, protocol):
+        """
+        Connect C{protocol} to the transport and issue the waiting requests
+        with it.
+        """
+        self._protocol = protocol
+        protocol.makeConnection(self.transport)
+        waiting, self._waiting = self._waiting, []
+        for entry in waiting:
+            request, d, _ = entry
+            entry[2] = protocol.request(request)
+            entry[2].chainDeferred(d)
+        chosen, self._chosenDeferreds = self._chosenDeferreds, []
+        for d in chosen:
+            d.callback(protocol)
+
+
+    def request(self, request):
+        """
+        Issue C{request} with the chosen protocol, once it is chosen.
+
+        @see: L{HTTP11ClientProtocol.request}
+        """
+        if self._protocol is not None:
+            return self._protocol.request(request)
+
+        def cancel(d):
+            if entry[2] is not None:
+                entry[2].cancel()
+            else:
+                self._waiting.remove(entry)
+
+        d = defer.Deferred(cancel)
+        entry = [request, d, None]
+        self._waiting.append(entry)
+        return d
+
+
+    def dataReceived(self, data):
+        self._protocol.dataReceived(data)
+
+
+    def connectionLost(self, reason):
+        """
+        Pass the loss of the connection on to the chosen protocol, or fail
+        the waiting requests.
+        """
+        if self._protocol is not None:
+            self._protocol.connectionLost(reason)
+            return
+        self._connectionLostCallback(self)
+        waiting, self._waiting = self._waiting, []
+        for request, d, _ in waiting:
+            d.errback(RequestTransmissionFailed([reason]))
+        chosen, self._chosenDeferreds = self._chosenDeferreds, []
+        for d in chosen:
+            d.errback(reason)
+
+
+    def abort(self):
+        """
+        Close the connection.
+
+        @see: L{HTTP11ClientProtocol.abort}
+        """
+        if self._protocol is not None:
+            return self._protocol.abort()
+        self.transport.abortConnection()
+        return defer.succeed(None)
+
+
+
 class _HTTP11ClientFactory(protocol.Factory):
     """
     A factory for L{HTTP11ClientProtocol}, used by L{HTTPConnectionPool}.
@@ -1129,14 +1298,29 @@ class _HTTP11ClientFactory(protocol.Factory):
     @ivar _quiescentCallback: The quiescent callback to be passed to protocol
         instances, used to return them to the connection pool.
 
+    @ivar _connectionLostCallback: If not L{None}, a callable taking a
+        protocol instance, called when its connection is lost.
+
+    @ivar _http2Callback: If not L{None}, and HTTP/2 support is available,
+        protocols which speak HTTP/2 if the server agrees are built, and this
+        is called with the L{H2ClientProtocol} when one does.
+
     @since: 11.1
     """
-    def __init__(self, quiescentCallback):
+    def __init__(self, quiescentCallback, connectionLostCallback=None,
+                 http2Callback=None):
         self._quiescentCallback = quiescentCallback
+        self._connectionLostCallback = connectionLostCallback
+        self._http2Callback = http2Callback
 
 
     def buildProtocol(self, addr):
-        return HTTP11ClientProtocol(self._quiescentCallback)
+        http11Protocol = HTTP11ClientProtocol(self._quiescentCallback)
+        http11Protocol._connectionLostCallback = self._connectionLostCallback
+        if self._http2Callback is None or H2ClientProtocol is None:
+            return http11Protocol
+        return _HTTPClientProtocolNegotiator(
+            http11Protocol, self._http2Callback, self._connectionLostCallback)
 
 
 
@@ -1212,6 +1396,11 @@ class HTTPConnectionPool(object):
     Features:
      - Cached connections will eventually time out.
      - Limits on maximum number of persistent connections.
+     - Optional limits on the number of open connections, per destination and
+       overall, with requests past the limits waiting for a connection in
+       first-in, first-out order.
+     - Optional HTTP/2 support, sharing one connection between all requests
+       to a destination.
 
     Connections are stored using keys, which should be chosen such that any
     connections stored under a given key can be used interchangeably.
@@ -1227,12 +1416,34 @@ class HTTPConnectionPool(object):
         connections for a C{host:port} destination.
     @type maxPersistentPerHost: C{int}
 
+    @ivar maxConnectionsPerHost: The maximum number of open connections,
+        whether connecting, in use or cached, for a C{host:port} destination,
+        or L{None} for no limit.  L{getConnection} waits for one of them to
+        become free rather than opening another.
+    @type maxConnectionsPerHost: C{int} or L{None}
+
+    @ivar maxConnections: The maximum number of open connections to all
+        destinations, or L{None} for no limit.  Cached connections to other
+        destinations are closed to make room for waiting requests.
+    @type maxConnections: C{int} or L{None}
+
     @ivar cachedConnectionTimeout: Number of seconds a cached persistent
         connection will stay open before disconnecting.
 
     @ivar retryAutomatically: C{boolean} indicating whether idempotent
         requests should be retried once if no response was received.
 
+    @ivar http2: C{boolean} indicating whether to speak HTTP/2 to servers
+        which agree to during the TLS handshake.  This needs the optional
+        HTTP/2 dependencies, and an agent whose TLS policy offers C{b"h2"},
+        such as C{BrowserLikePolicyForHTTPS(acceptableProtocols=[b"h2",
+        b"http/1.1"])}.  Once a connection to a destination speaks HTTP/2, all
+        requests to that destination share it, regardless of the limits on
+        connections.
+
+    @ivar waitTime: A L{Histogram} of the number of seconds each call to
+        L{getConnection} waited for a connection to become free.
+
     @ivar _factory: The factory used to connect to the proxy.
 
     @ivar _connections: Map (scheme, host, port) to lists of
@@ -1241,19 +1452,50 @@ class HTTPConnectionPool(object):
     @ivar _timeouts: Map L{HTTP11ClientProtocol} instances to a
         C{IDelayedCall} instance of their timeout.
 
+    @ivar _http2Connections: Map keys to the L{H2ClientProtocol} shared by
+        all requests for them.
+
+    @ivar _open: Map keys to the number of open connections.
+
+    @ivar _openTotal: The number of open connections to all destinations.
+
+    @ivar _waiting: Map keys with requests waiting for a connection to a
+        L{deque} of C{(sequence, endpoint, deferred, queuedAt)} tuples, in
+        the order the requests were made.
+
+    @ivar _sequence: The sequence number of the next waiting request, used
+        to serve waiting requests for different keys in order.
+
+    @ivar _evicting: The cached connections which have been closed to make
+        room for waiting requests but have not been lost yet.
+
+    @ivar _dispatchCall: The C{IDelayedCall} which will hand free connections
+        to waiting requests, or L{None}.
+
     @since: 12.1
     """
 
     _factory = _HTTP11ClientFactory
     maxPersistentPerHost = 2
+    maxConnectionsPerHost = None
+    maxConnections = None
     cachedConnectionTimeout = 240
     retryAutomatically = True
+    http2 = False
 
     def __init__(self, reactor, persistent=True):
         self._reactor = reactor
         self.persistent = persistent
         self._connections = {}
         self._timeouts = {}
+        self._http2Connections = {}
+        self._open = {}
+        self._openTotal = 0
+        self._waiting = {}
+        self._sequence = 0
+        self._evicting = set()
+        self._dispatchCall = None
+        self.waitTime = Histogram(0.001)
 
 
     def getConnection(self, key, endpoint):
@@ -1268,6 +1510,10 @@ class HTTPConnectionPool(object):
         Afterwards, if the connection is still open, it will automatically be
         added to the pool.
 
+        If L{maxConnectionsPerHost} or L{maxConnections} would be exceeded by
+        opening a new connection, the request waits for a connection to become
+        free.  Cancelling the returned L{Deferred} stops waiting.
+
         @param key: A unique key identifying connections that can be used
             interchangeably.
 
@@ -1277,7 +1523,44 @@ class HTTPConnectionPool(object):
         @return: A C{Deferred} that will fire with a L{HTTP11ClientProtocol}
            (or a wrapper) that can be used to send a single HTTP request.
         """
-        # Try to get cached version:
+        connection = self._getCachedConnection(key, endpoint)
+        if connection is not None:
+            self.waitTime.add(0)
+            return defer.succeed(connection)
+
+        if not self._waiting and self._canConnect(key):
+            self.waitTime.add(0)
+            return self._newConnection(key, endpoint)
+
+        def cancel(d):
+            waiters = self._waiting.get(key)
+            if waiters is not None and waiter in waiters:
+                waiters.remove(waiter)
+                if not waiters:
+                    del self._waiting[key]
+
+        d = defer.Deferred(cancel)
+        waiter = (self._sequence, endpoint, d, self._reactor.seconds())
+        self._sequence += 1
+        self._waiting.setdefault(key, deque()).append(waiter)
+        self._scheduleDispatch()
+        return d
+
+
+    def _getCachedConnection(self, key, endpoint):
+        """
+        Take a quiescent connection for C{key} out of the pool, or share its
+        HTTP/2 connection.
+
+        @return: The connection (or a wrapper which retries failed requests),
+            or L{None} if there is none.
+        """
+        connection = self._http2Connections.get(key)
+        if connection is not None:
+            if connection.acceptingRequests:
+                return connection
+            del self._http2Connections[key]
+
         connections = self._connections.get(key)
         while connections:
             connection = connections.pop(0)
@@ -1289,9 +1572,22 @@ class HTTPConnectionPool(object):
                     newConnection = lambda: self._newConnection(key, endpoint)
                     connection = _RetryingHTTP11ClientProtocol(
                         connection, newConnection)
-                return defer.succeed(connection)
+                return connection
+        return None
 
-        return self._newConnection(key, endpoint)
+
+    def _canConnect(self, key):
+        """
+        Determine whether a new connection for C{key} may be opened without
+        exceeding L{maxConnectionsPerHost} or L{maxConnections}.
+        """
+        if (self.maxConnectionsPerHost is not None and
+                self._open.get(key, 0) >= self.maxConnectionsPerHost):
+            return False
+        if (self.maxConnections is not None and
+                self._openTotal >= self.maxConnections):
+            return False
+        return True
 
 
     def _newConnection(self, key, endpoint):
@@ -1302,8 +1598,136 @@ class HTTPConnectionPool(object):
         """
         def quiescentCallback(protocol):
             self._putConnection(key, protocol)
-        factory = self._factory(quiescentCallback)
-        return endpoint.connect(factory)
+        def connectionLostCallback(protocol):
+            self._connectionLost(key, protocol)
+        def connected(protocol):
+            protocol._connectionLostCallback = connectionLostCallback
+            return protocol
+        def connectFailed(reason):
+            self._connectionLost(key, None)
+            return reason
+        self._open[key] = self._open.get(key, 0) + 1
+        self._openTotal += 1
+        if self.http2:
+            def http2Callback(protocol):
+                self._http2Negotiated(key, protocol)
+            factory = self._factory(
+                quiescentCallback, connectionLostCallback, http2Callback)
+            connecting = endpoint.connect(factory)
+        else:
+            factory = self._factory(quiescentCallback)
+            connecting = endpoint.connect(factory).addCallback(connected)
+        return connecting.addErrback(connectFailed)
+
+
+    def _connectionLost(self, key, connection):
+        """
+        Account for a connection for C{key} which has been lost, or could not
+        be made, and let a waiting request use its place.
+
+        @param connection: The lost connection, or L{None} if the connection
+            attempt failed.
+        """
+        self._open[key] -= 1
+        if not self._open[key]:
+            del self._open[key]
+        self._openTotal -= 1
+        self._evicting.discard(connection)
+        if (connection is not None and
+                self._http2Connections.get(key) is connection):
+            del self._http2Connections[key]
+        if self._waiting:
+            self._scheduleDispatch()
+
+
+    def _http2Negotiated(self, key, connection):
+        """
+        Share C{connection}, which speaks HTTP/2, between all requests for
+        C{key}.  If another connection is already shared, C{connection} is
+        closed once its own requests are done.
+        """
+        shared = self._http2Connections.get(key)
+        if shared is not None and shared.acceptingRequests:
+            connection.closeWhenIdle = True
+            if not connection.streams:
+                connection.transport.loseConnection()
+            return
+        self._http2Connections[key] = connection
+        if key in self._waiting:
+            self._scheduleDispatch()
+
+
+    def _scheduleDispatch(self):
+        """
+        Arrange for L{_dispatch} to be called, unless it already has been.
+
+        Free connections are not handed to waiting requests immediately,
+        since a connection becomes free while it is still finishing its
+        previous response.
+        """
+        if self._dispatchCall is None:
+            self._dispatchCall = self._reactor.callLater(0, self._dispatch)
+
+
+    def _dispatch(self):
+        """
+        Hand cached connections, or new connections within the limits, to
+        waiting requests in the order the requests were made, and close
+        cached connections to other destinations if only L{maxConnections}
+        keeps requests waiting.
+        """
+        self._dispatchCall = None
+        while self._waiting:
+            nextKey = nextWaiters = None
+            for key, waiters in self._waiting.items():
+                if not (key in self._http2Connections or
+                        self._connections.get(key) or
+                        self._canConnect(key)):
+                    continue
+                if nextKey is None or waiters[0][0] < nextWaiters[0][0]:
+                    nextKey, nextWaiters = key, waiters
+            if nextKey is None:
+                break
+
+            endpoint = nextWaiters[0][1]
+            connection = self._getCachedConnection(nextKey, endpoint)
+            if connection is None and not self._canConnect(nextKey):
+                # The cached connections were not usable after all.
+                continue
+            sequence, endpoint, d, queuedAt = nextWaiters.popleft()
+            if not nextWaiters:
+                del self._waiting[nextKey]
+            self.waitTime.add(self._reactor.seconds() - queuedAt)
+            if connection is not None:
+                d.callback(connection)
+            else:
+                self._newConnection(nextKey, endpoint).chainDeferred(d)
+
+        if self.maxConnections is not None:
+            self._evictCachedConnections()
+
+
+    def _evictCachedConnections(self):
+        """
+        Close cached connections to destinations nobody is waiting for, one
+        for each waiting request which is only kept waiting by
+        L{maxConnections}.
+        """
+        blocked = 0
+        for key, waiters in self._waiting.items():
+            if (self.maxConnectionsPerHost is None or
+                    self._open.get(key, 0) < self.maxConnectionsPerHost):
+                blocked += len(waiters)
+        needed = blocked - len(self._evicting)
+        for key, connections in self._connections.items():
+            if key in self._waiting:
+                continue
+            while connections and needed > 0:
+                connection = connections.pop(0)
+                self._timeouts.pop(connection).cancel()
+                self._evicting.add(connection)
+                connection.transport.loseConnection()
+                needed -= 1
 
 
     def _removeConnection(self, key, connection):
@@ -1339,6 +1763,78 @@ class HTTPConnectionPool(object):
                                       self._removeConnection,
                                       key, connection)
         self._timeouts[connection] = cid
+        if key in self._waiting:
+            self._scheduleDispatch()
+
+
+    def prewarm(self, key, endpoint, count):
+        """
+        Open new connections and add them to the pool, so that up to C{count}
+        cached connections for C{key} are ready for future requests.
+
+        No more than L{maxPersistentPerHost} connections are cached, and no
+        connection is opened which would exceed L{maxConnectionsPerHost} or
+        L{maxConnections}.
+
+        @param key: A unique key identifying connections that can be used
+            interchangeably.
+
+        @param endpoint: An endpoint that can be used to open the connections.
+
+        @param count: The number of cached connections wanted.
+        @type count: C{int}
+
+        @return: A L{Deferred} that fires with the number of connections
+            successfully opened.
+        """
+        def connected(connection):
+            if isinstance(connection, _HTTPClientProtocolNegotiator):
+                return connection.chosen().addCallback(connected)
+            if (H2ClientProtocol is None or
+                    not isinstance(connection, H2ClientProtocol)):
+                # HTTP/2 connections are shared as soon as they are chosen.
+                self._putConnection(key, connection)
+
+        results = []
+        count = min(count, self.maxPersistentPerHost)
+        for i in range(count - len(self._connections.get(key, ()))):
+            if not self._canConnect(key):
+                break
+            results.append(
+                self._newConnection(key, endpoint).addCallback(connected))
+        d = defer.DeferredList(results, consumeErrors=True)
+        d.addCallback(
+            lambda results: len([None for ok, _ in results if ok]))
+        return d
+
+
+    def statistics(self, key=None):
+        """
+        Describe the connections of the pool and the requests waiting for
+        them.
+
+        @param key: If not L{None}, only describe the connections and requests
+            for this key.
+
+        @return: A L{dict} giving the number of C{"idle"} (cached)
+            connections, C{"active"} connections (connecting or in use), and
+            C{"queued"} requests, and a summary of L{waitTime} as
+            C{"waitTime"}.
+        """
+        if key is None:
+            idle = sum(len(c) for c in itervalues(self._connections))
+            queued = sum(len(w) for w in itervalues(self._waiting))
+            opened = self._openTotal
+        else:
+            idle = len(self._connections.get(key, ()))
+            queued = len(self._waiting.get(key, ()))
+            opened = self._open.get(key, 0)
+        return {
+            "idle": idle,
+            "active": opened - idle,
+            "queued": queued,
+            "waitTime": self.waitTime.summary(),
+        }
 
 
     def closeCachedConnections(self):
@@ -1353,6 +1849,9 @@ class HTTPConnectionPool(object):
             for p in protocols:
                 results.append(p.abort())
         self._connections = {}
+        for p in itervalues(self._http2Connections):
+            results.append(p.abort())
+        self._http2Connections = {}
         for dc in itervalues(self._timeouts):
             dc.cancel()
         self._timeouts = {}
@@ -1631,6 +2130,29 @@ class Agent(_AgentBase):
                                          parsedURI.originForm)
 
 
+    def prewarm(self, uri, count=1):
+        """
+        Open connections to the server indicated by C{uri} before any
+        requests are issued to it, so that they can use cached connections.
+
+        @param uri: The URI of the server, as for L{request}.
+        @type uri: L{bytes}
+
+        @param count: The number of cached connections wanted.
+        @type count: L{int}
+
+        @return: A L{Deferred} that fires with the number of connections
+            opened, as L{HTTPConnectionPool.prewarm}.
+        """
+        parsedURI = URI.fromBytes(uri)
+        try:
+            endpoint = self._getEndpoint(parsedURI)
+        except SchemeNotSupported:
+            return defer.fail(Failure())
+        key = (parsedURI.scheme, parsedURI.host, parsedURI.port)
+        return self._pool.prewarm(key, endpoint, count)
+
+
 
 @implementer(IAgent)
 class ProxyAgent(_AgentBase):
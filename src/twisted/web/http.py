@@ -86,13 +86,14 @@ except ImportError:
         return (key, pdict)
 
 
-from zope.interface import Attribute, Interface, implementer, provider
+from zope.interface import (
+    Attribute, Interface, directlyProvides, implementer, provider, providedBy)
 
 # twisted imports
 from twisted.python.compat import (
     _PY3, unicode, intToBytes, networkString, nativeString)
 from twisted.python.deprecate import deprecated
-from twisted.python import log
+from twisted.python import log, logfile
 from incremental import Version
 from twisted.python.components import proxyForInterface
 from twisted.internet import interfaces, protocol, address
@@ -1779,6 +1780,242 @@ class _NoPushProducer(object):
 
 
 
+def _headerSequence(version, code, reason, headers):
+    """
+    Format the status line and headers of a response.
+
+    @param version: The HTTP version in use.
+    @type version: L{bytes}
+
+    @param code: The HTTP status code.
+    @type code: L{bytes}
+
+    @param reason: The HTTP reason phrase.
+    @type reason: L{bytes}
+
+    @param headers: The header names and values.
+    @type headers: An iterable of L{tuple}s of two L{bytes}
+
+    @return: The lines of the response head, ending with the empty line.
+    @rtype: L{list} of L{bytes}
+    """
+    headerSequence = [version + b" " + code + b" " + reason + b"\r\n"]
+    headerSequence.extend(
+        name + b': ' + value + b"\r\n" for name, value in headers
+    )
+    headerSequence.append(b"\r\n")
+    return headerSequence
+
+
+
+class _NoSendFileTransport(object):
+    """
+    A transport which relays everything to another transport, except that
+    it does not provide L{interfaces.ISendFileTransport}.
+
+    @ivar _transport: The transport relayed to.
+    """
+    def __init__(self, transport):
+        self._transport = transport
+        directlyProvides(
+            self, providedBy(transport) - interfaces.ISendFileTransport)
+
+
+    def __getattr__(self, name):
+        if name == 'sendFile':
+            raise AttributeError(name)
+        return getattr(self._transport, name)
+
+
+
+class _PipelinedRequestChannel(object):
+    """
+    The channel given to a L{Request} which an L{HTTPChannel} processes while
+    the responses to requests received before it are still being written.
+
+    Until those responses have been written, the response written to this
+    channel is buffered.  Once they have been, L{HTTPChannel.requestDone}
+    calls L{_startWriting}, which writes the buffer, and the rest of the
+    response passes straight through to the L{HTTPChannel}.
+
+    Any attribute not defined here is looked up on the L{HTTPChannel}.
+
+    @ivar _channel: The L{HTTPChannel} the request was received on.
+    @type _channel: L{HTTPChannel}
+
+    @ivar _buffer: The response data written so far, or L{None} once the
+        response is being written to C{_channel}.
+    @type _buffer: L{list} of L{bytes} or L{None}
+
+    @ivar _finishedRequest: The request, once it has called L{requestDone}
+        while its response is buffered.
+    @type _finishedRequest: L{Request} or L{None}
+
+    @ivar _producer: The producer registered while the response is buffered,
+        as passed to L{registerProducer}.
+
+    @ivar _streaming: Whether C{_producer} is a push producer.
+    @type _streaming: L{bool}
+
+    @ivar _pushProducer: C{_producer} if it is a push producer, otherwise the
+        L{_PullToPush} driving it.
+
+    @ivar _producerPaused: Whether C{_pushProducer} was paused because too
+        much data is buffered.
+    @type _producerPaused: L{bool}
+    """
+    _finishedRequest = None
+    _producer = None
+    _streaming = None
+    _pushProducer = None
+    _producerPaused = False
+
+    def __init__(self, channel):
+        self._channel = channel
+        self._buffer = []
+
+
+    def __getattr__(self, name):
+        return getattr(self._channel, name)
+
+
+    @property
+    def transport(self):
+        """
+        The transport of the L{HTTPChannel}, except that while the response
+        is buffered it does not provide L{interfaces.ISendFileTransport}, as
+        a file sent with it would not be buffered.
+        """
+        transport = self._channel.transport
+        if (self._buffer is not None and
+                interfaces.ISendFileTransport.providedBy(transport)):
+            return _NoSendFileTransport(transport)
+        return transport
+
+
+    def _bufferSequence(self, data):
+        """
+        Buffer some response data, and pause the producer of this response
+        and the reading of further requests if too much data is now
+        buffered by the channel.
+
+        @param data: The data to buffer.
+        @type data: L{list} of L{bytes}
+        """
+        self._buffer.extend(data)
+        for chunk in data:
+            self._channel._pipelineBufferSize += len(chunk)
+        if self._channel._pipelineBufferFull():
+            self._channel._stopReadingRequests()
+            if self._pushProducer is not None and not self._producerPaused:
+                self._producerPaused = True
+                self._pushProducer.pauseProducing()
+
+
+    def writeHeaders(self, version, code, reason, headers):
+        """
+        See L{HTTPChannel.writeHeaders}.
+        """
+        if self._buffer is None:
+            self._channel.writeHeaders(version, code, reason, headers)
+        else:
+            self._bufferSequence(
+                _headerSequence(version, code, reason, headers))
+
+
+    def write(self, data):
+        """
+        See L{HTTPChannel.write}.
+        """
+        if self._buffer is None:
+            self._channel.write(data)
+        else:
+            self._bufferSequence([data])
+
+
+    def writeSequence(self, iovec):
+        """
+        See L{HTTPChannel.writeSequence}.
+        """
+        if self._buffer is None:
+            self._channel.writeSequence(iovec)
+        else:
+            self._bufferSequence(iovec)
+
+
+    def registerProducer(self, producer, streaming):
+        """
+        See L{HTTPChannel.registerProducer}.
+        """
+        if self._buffer is None:
+            self._channel.registerProducer(producer, streaming)
+            return
+        if self._producer is not None:
+            raise RuntimeError(
+                "Cannot register producer %s, because producer %s was never "
+                "unregistered." % (producer, self._producer))
+        self._producer = producer
+        self._streaming = streaming
+        if streaming:
+            self._pushProducer = producer
+        else:
+            self._pushProducer = _PullToPush(producer, self)
+            self._pushProducer.startStreaming()
+        if self._channel._pipelineBufferFull():
+            self._producerPaused = True
+            self._pushProducer.pauseProducing()
+
+
+    def unregisterProducer(self):
+        """
+        See L{HTTPChannel.unregisterProducer}.
+        """
+        if self._buffer is None:
+            self._channel.unregisterProducer()
+            return
+        if self._producer is None:
+            return
+        if not self._streaming:
+            self._pushProducer.stopStreaming()
+        self._producer = self._streaming = self._pushProducer = None
+        self._producerPaused = False
+
+
+    def requestDone(self, request):
+        """
+        See L{HTTPChannel.requestDone}.
+        """
+        if self._buffer is None:
+            self._channel.requestDone(request)
+        else:
+            self._finishedRequest = request
+
+
+    def _startWriting(self):
+        """
+        Write the buffered response and pass the rest of it straight through
+        to the L{HTTPChannel}, including any producer registered so far.
+
+        @return: The request if it has finished, otherwise L{None}.
+        @rtype: L{Request} or L{None}
+        """
+        buffered, self._buffer = self._buffer, None
+        if buffered:
+            self._channel._pipelineBufferSize -= sum(map(len, buffered))
+            self._channel.writeSequence(buffered)
+        if self._producer is not None:
+            producer, streaming = self._producer, self._streaming
+            if not streaming:
+                self._pushProducer.stopStreaming()
+            elif self._producerPaused and not self._channel._waitingForTransport:
+                producer.resumeProducing()
+            self._producer = self._streaming = self._pushProducer = None
+            self._producerPaused = False
+            self._channel.registerProducer(producer, streaming)
+        return self._finishedRequest
+
+
+
 @implementer(interfaces.ITransport,
              interfaces.IPushProducer,
              interfaces.IConsumer)
@@ -1808,7 +2045,8 @@ class HTTPChannel(basic.LineReceiver, policies.TimeoutMixin):
     @ivar _receivedHeaderSize: Bytes received so far for the header.
     @type _receivedHeaderSize: C{int}
 
-    @ivar _handlingRequest: Whether a request is currently being processed.
+    @ivar _handlingRequest: Whether no more requests are being read, until
+        one which is being processed is done.
     @type _handlingRequest: L{bool}
 
     @ivar _dataBuffer: Any data that has been received from the connection
@@ -1856,6 +2094,28 @@ class HTTPChannel(basic.LineReceiver, policies.TimeoutMixin):
     @ivar _abortingCall: The L{twisted.internet.base.DelayedCall} that will be
         used to forcibly close the transport if it doesn't close cleanly.
     @type _abortingCall: L{twisted.internet.base.DelayedCall}
+
+    @ivar maxConcurrentRequests: The number of pipelined requests which may be
+        processed at once.  With the default of C{1}, each request is only
+        processed once the response to the one before it has been written.
+        With more, the responses to requests processed while the responses
+        to earlier ones are still being written are buffered, and written in
+        order.
+    @type maxConcurrentRequests: L{int}
+
+    @ivar maxPipelineBufferSize: The number of bytes of buffered responses
+        to pipelined requests above which no more requests are processed,
+        and the producers of the buffered responses are paused, until the
+        responses before them have been written.
+    @type maxPipelineBufferSize: L{int}
+
+    @ivar _pipeline: The channels of the requests after the first in
+        C{requests}, whose responses are buffered until it is done.
+    @type _pipeline: L{list} of L{_PipelinedRequestChannel}
+
+    @ivar _pipelineBufferSize: The number of bytes buffered by the channels
+        in C{_pipeline}.
+    @type _pipelineBufferSize: L{int}
     """
 
     maxHeaders = 500
@@ -1879,12 +2139,20 @@ class HTTPChannel(basic.LineReceiver, policies.TimeoutMixin):
     _waitingForTransport = False
     _abortingCall = None
 
+    maxConcurrentRequests = 1
+    maxPipelineBufferSize = 2 ** 20
+    _pipelineBufferSize = 0
+
+    # The names of the headers which determine how the request body is read.
+    _bodyHeaders = frozenset([b'content-length', b'transfer-encoding'])
+
     def __init__(self):
         # the request queue
         self.requests = []
         self._handlingRequest = False
         self._dataBuffer = []
         self._transferDecoder = None
+        self._pipeline = []
 
 
     def connectionMade(self):
@@ -1895,6 +2163,212 @@ class HTTPChannel(basic.LineReceiver, policies.TimeoutMixin):
         self._networkProducer.registerProducer(self, True)
 
 
+    def dataReceived(self, data):
+        """
+        Translate bytes into requests.
+
+        Whenever the head of a new request, up to the empty line ending its
+        headers, has been entirely received, it is parsed in one pass by
+        L{_headReceived}, unless L{lineReceived} or L{headerReceived} is
+        overridden.  Otherwise, as for L{basic.LineReceiver}, each line
+        is passed to L{lineReceived} until the headers end, and the body is
+        passed to L{rawDataReceived}.
+
+        @param data: Bytes received from the transport.
+        @type data: L{bytes}
+        """
+        if self._busyReceiving:
+            self._buffer += data
+            return
+        try:
+            self._busyReceiving = True
+            self._buffer += data
+            while self._buffer and not self.paused:
+                if not self.line_mode:
+                    data = self._buffer
+                    self._buffer = b''
+                    why = self.rawDataReceived(data)
+                    if why:
+                        return why
+                    continue
+
+                if self._handlingRequest:
+                    # Buffer everything until the current request is done.
+                    # We shouldn't have received it (we've paused the
+                    # transport), but let's be cautious.
+                    self._dataBuffer.append(self._buffer)
+                    self._buffer = b''
+                    return
+
+                if (self.__first_line and self.persistent and
+                        not self._buffer.startswith(b'\r\n') and
+                        self._canParseHead()):
+                    end = self._buffer.find(b'\r\n\r\n')
+                    if end != -1:
+                        head = self._buffer[:end]
+                        self._buffer = self._buffer[end + 4:]
+                        self._headReceived(head)
+                        if self.transport and self.transport.disconnecting:
+                            return
+                        continue
+
+                try:
+                    line, self._buffer = self._buffer.split(self.delimiter, 1)
+                except ValueError:
+                    if len(self._buffer) > self.MAX_LENGTH:
+                        line, self._buffer = self._buffer, b''
+                        return self.lineLengthExceeded(line)
+                    return
+                if len(line) > self.MAX_LENGTH:
+                    exceeded = line + self.delimiter + self._buffer
+                    self._buffer = b''
+                    return self.lineLengthExceeded(exceeded)
+                why = self.lineReceived(line)
+                if why or self.transport and self.transport.disconnecting:
+                    return why
+        finally:
+            self._busyReceiving = False
+
+
+    def _canParseHead(self):
+        """
+        Determine whether request heads can be parsed by L{_headReceived}.
+
+        This is only done if neither L{lineReceived} nor L{headerReceived} is
+        overridden, since it calls neither of them.
+
+        @return: C{True} if L{_headReceived} may be used.
+        @rtype: L{bool}
+        """
+        cls = type(self)
+        return (cls.lineReceived == HTTPChannel.lineReceived and
+                cls.headerReceived == HTTPChannel.headerReceived)
+
+
+    def _headReceived(self, head):
+        """
+        Parse the request line and all of the headers of a request at once,
+        doing the work of L{lineReceived} and L{headerReceived} for a request
+        whose head has been entirely received.
+
+        @param head: The request line and header lines of the request,
+            separated by C{b"\\r\\n"}, without the empty line which ends
+            them.
+        @type head: L{bytes}
+        """
+        self.resetTimeout()
+
+        lines = head.split(b'\r\n')
+        if len(head) - 2 * (len(lines) - 1) > self.totalHeadersSize:
+            self._respondToBadRequestAndDisconnect()
+            return
+        if len(head) > self.MAX_LENGTH:
+            for line in lines:
+                if len(line) > self.MAX_LENGTH:
+                    return self.lineLengthExceeded(head)
+
+        self._createRequest()
+        self.__first_line = 0
+
+        parts = lines[0].split()
+        if len(parts) != 3:
+            self._respondToBadRequestAndDisconnect()
+            return
+        command, path, version = parts
+        try:
+            command.decode("ascii")
+        except UnicodeDecodeError:
+            self._respondToBadRequestAndDisconnect()
+            return
+        self._command = command
+        self._path = path
+        self._version = version
+
+        request = self.requests[-1]
+        # Fold multi line headers into the line they continue.
+        headers = []
+        for line in lines[1:]:
+            if line[:1] in (b' ', b'\t') and headers:
+                headers[-1] = headers[-1] + b'\n' + line
+            else:
+                headers.append(line)
+        if len(headers) > self.maxHeaders:
+            self._respondToBadRequestAndDisconnect()
+            return
+
+        reqHeaders = request.requestHeaders
+        bodyHeaders = self._bodyHeaders
+        for line in headers:
+            name, colon, value = line.partition(b':')
+            if not colon:
+                self._respondToBadRequestAndDisconnect()
+                return
+            name = name.lower()
+            value = value.strip()
+            if name in bodyHeaders:
+                if not self._bodyHeaderReceived(name, value):
+                    return
+            values = reqHeaders.getRawHeaders(name)
+            if values is not None:
+                values.append(value)
+            else:
+                reqHeaders.setRawHeaders(name, [value])
+        self._receivedHeaderCount = len(headers)
+
+        self.allHeadersReceived()
+        if self.length == 0:
+            self.allContentReceived()
+        else:
+            self.setRawMode()
+
+
+    def _createRequest(self):
+        """
+        Create a L{Request} for the request being received and add it to
+        C{requests}.
+
+        If the responses to earlier requests are still being written, the
+        request is given a L{_PipelinedRequestChannel}, to buffer its
+        response until they have been.
+        """
+        channel = self
+        queued = len(self.requests)
+        if self.requests and self.maxConcurrentRequests > 1:
+            channel = _PipelinedRequestChannel(self)
+            self._pipeline.append(channel)
+            # The request must clean up as soon as it is finished, so its
+            # channel knows when its response is complete.
+            queued = 0
+        if INonQueuedRequestFactory.providedBy(self.requestFactory):
+            request = self.requestFactory(channel)
+        else:
+            request = self.requestFactory(channel, queued)
+        self.requests.append(request)
+
+
+    def _pipelineBufferFull(self):
+        """
+        Determine whether too many bytes of responses to pipelined requests
+        are buffered.
+
+        @rtype: L{bool}
+        """
+        return self._pipelineBufferSize > self.maxPipelineBufferSize
+
+
+    def _stopReadingRequests(self):
+        """
+        Stop processing requests until a request is done, pausing the
+        transport if it is not already paused.
+        """
+        if not self._handlingRequest:
+            self._handlingRequest = True
+            # Pause the producer if we can. If we can't, that's ok, we'll
+            # buffer.
+            if not self._waitingForTransport:
+                self._networkProducer.pauseProducing()
+
+
     def lineReceived(self, line):
         """
         Called for each line from request until the end of headers when
@@ -1928,11 +2402,7 @@ class HTTPChannel(basic.LineReceiver, policies.TimeoutMixin):
                 return
 
             # create a new Request object
-            if INonQueuedRequestFactory.providedBy(self.requestFactory):
-                request = self.requestFactory(self)
-            else:
-                request = self.requestFactory(self, len(self.requests))
-            self.requests.append(request)
+            self._createRequest()
 
             self.__first_line = 0
 
@@ -2001,6 +2471,38 @@ class HTTPChannel(basic.LineReceiver, policies.TimeoutMixin):
 
         header = header.lower()
         data = data.strip()
+        if header in self._bodyHeaders:
+            if not self._bodyHeaderReceived(header, data):
+                return False
+        reqHeaders = self.requests[-1].requestHeaders
+        values = reqHeaders.getRawHeaders(header)
+        if values is not None:
+            values.append(data)
+        else:
+            reqHeaders.setRawHeaders(header, [data])
+
+        self._receivedHeaderCount += 1
+        if self._receivedHeaderCount > self.maxHeaders:
+            self._respondToBadRequestAndDisconnect()
+            return False
+
+        return True
+
+
+    def _bodyHeaderReceived(self, header, data):
+        """
+        Set up the decoding of the request body from a I{Content-Length} or
+        I{Transfer-Encoding} header.
+
+        @param header: The lowercased name of the header.
+        @type header: L{bytes}
+
+        @param data: The value of the header, stripped of whitespace.
+        @type data: L{bytes}
+
+        @return: A flag indicating whether the header was valid.
+        @rtype: L{bool}
+        """
         if header == b'content-length':
             try:
                 self.length = int(data)
@@ -2010,24 +2512,12 @@ class HTTPChannel(basic.LineReceiver, policies.TimeoutMixin):
                 return False
             self._transferDecoder = _IdentityTransferDecoder(
                 self.length, self.requests[-1].handleContentChunk, self._finishRequestBody)
-        elif header == b'transfer-encoding' and data.lower() == b'chunked':
+        elif data.lower() == b'chunked':
             # XXX Rather poorly tested code block, apparently only exercised by
             # test_chunkedEncoding
             self.length = None
             self._transferDecoder = _ChunkedTransferDecoder(
                 self.requests[-1].handleContentChunk, self._finishRequestBody)
-        reqHeaders = self.requests[-1].requestHeaders
-        values = reqHeaders.getRawHeaders(header)
-        if values is not None:
-            values.append(data)
-        else:
-            reqHeaders.setRawHeaders(header, [data])
-
-        self._receivedHeaderCount += 1
-        if self._receivedHeaderCount > self.maxHeaders:
-            self._respondToBadRequestAndDisconnect()
-            return False
-
         return True
 
 
@@ -2049,11 +2539,9 @@ class HTTPChannel(basic.LineReceiver, policies.TimeoutMixin):
         if self.timeOut:
             self._savedTimeOut = self.setTimeout(None)
 
-        self._handlingRequest = True
-
-        # Pause the producer if we can. If we can't, that's ok, we'll buffer.
-        if not self._waitingForTransport:
-            self._networkProducer.pauseProducing()
+        if (len(self.requests) >= self.maxConcurrentRequests or
+                self._pipelineBufferFull()):
+            self._stopReadingRequests()
 
         req = self.requests[-1]
         req.requestReceived(command, path, version)
@@ -2138,6 +2626,16 @@ class HTTPChannel(basic.LineReceiver, policies.TimeoutMixin):
         if request != self.requests[0]: raise TypeError
         del self.requests[0]
 
+        # Write the buffered responses to the requests pipelined after this
+        # one, up to the first which is not done yet.
+        while self._pipeline:
+            if self._pipeline.pop(0)._startWriting() is None:
+                break
+            del self.requests[0]
+
+        if self._pipelineBufferFull():
+            return
+
         # We should only resume the producer if we're not waiting for the
         # transport.
         if not self._waitingForTransport:
@@ -2146,14 +2644,14 @@ class HTTPChannel(basic.LineReceiver, policies.TimeoutMixin):
         if self.persistent:
             self._handlingRequest = False
 
-            if self._savedTimeOut:
+            if self._savedTimeOut and not self.requests:
                 self.setTimeout(self._savedTimeOut)
 
             # Receive our buffered data, if any.
             data = b''.join(self._dataBuffer)
             self._dataBuffer = []
             self.setLineMode(data)
-        else:
+        elif not self.requests:
             self.loseConnection()
 
 
@@ -2182,8 +2680,12 @@ class HTTPChannel(basic.LineReceiver, policies.TimeoutMixin):
 
     def connectionLost(self, reason):
         self.setTimeout(None)
+        finished = [pipelined._finishedRequest for pipelined in self._pipeline
+                    if pipelined._finishedRequest is not None]
         for request in self.requests:
-            request.connectionLost(reason)
+            # Requests whose responses were buffered have already finished.
+            if not any(request == done for done in finished):
+                request.connectionLost(reason)
 
         # If we were going to force-close the transport, we don't have to now.
         if self._abortingCall is not None:
@@ -2223,13 +2725,8 @@ class HTTPChannel(basic.LineReceiver, policies.TimeoutMixin):
         @param headers: The headers to write to the transport.
         @type headers: L{twisted.web.http_headers.Headers}
         """
-        responseLine = version + b" " + code + b" " + reason + b"\r\n"
-        headerSequence = [responseLine]
-        headerSequence.extend(
-            name + b': ' + value + b"\r\n" for name, value in headers
-        )
-        headerSequence.append(b"\r\n")
-        self.transport.writeSequence(headerSequence)
+        self.transport.writeSequence(
+            _headerSequence(version, code, reason, headers))
 
 
     def write(self, data):
@@ -2625,6 +3122,16 @@ class _GenericHTTPChannelProtocol(proxyForInterface(IProtocol, "_channel")):
         self._channel.timeOut = value
 
 
+    @property
+    def maxConcurrentRequests(self):
+        return self._channel.maxConcurrentRequests
+
+
+    @maxConcurrentRequests.setter
+    def maxConcurrentRequests(self, value):
+        self._channel.maxConcurrentRequests = value
+
+
     def dataReceived(self, data):
         """
         An override of L{IProtocol.dataReceived} that checks what protocol we're
@@ -2696,6 +3203,14 @@ class HTTPFactory(protocol.ServerFactory):
 
     @ivar _reactor: An L{IReactorTime} provider used to compute logging
         timestamps.
+
+    @ivar maxConcurrentRequests: The number of pipelined requests each
+        protocol may process at once.  See
+        L{HTTPChannel.maxConcurrentRequests}.
+    @type maxConcurrentRequests: L{int}
+
+    @ivar _batchedLog: See the C{batchedLog} parameter to L{__init__}.
+    @type _batchedLog: L{bool}
     """
 
     protocol = _genericHTTPChannelProtocolFactory
@@ -2704,8 +3219,10 @@ class HTTPFactory(protocol.ServerFactory):
 
     timeOut = _REQUEST_TIMEOUT
 
+    maxConcurrentRequests = 1
+
     def __init__(self, logPath=None, timeout=_REQUEST_TIMEOUT,
-                 logFormatter=None, reactor=None):
+                 logFormatter=None, reactor=None, batchedLog=False):
         """
         @param logFormatter: An object to format requests into log lines for
             the access log.
@@ -2713,6 +3230,12 @@ class HTTPFactory(protocol.ServerFactory):
 
         @param reactor: A L{IReactorTime} provider used to compute logging
             timestamps.
+
+        @param batchedLog: If true, the log file opened for C{logPath} is
+            wrapped in a L{twisted.python.logfile.BatchedLogFile}, so lines
+            are written to it in batches from another thread rather than
+            one at a time by the reactor.
+        @type batchedLog: L{bool}
         """
         if not reactor:
             from twisted.internet import reactor
@@ -2725,6 +3248,7 @@ class HTTPFactory(protocol.ServerFactory):
         if logFormatter is None:
             logFormatter = combinedLogFormatter
         self._logFormatter = logFormatter
+        self._batchedLog = batchedLog
 
         # For storing the cached log datetime and the callback to update it
         self._logDateTime = None
@@ -2744,6 +3268,8 @@ class HTTPFactory(protocol.ServerFactory):
         # timeOut needs to be on the Protocol instance cause
         # TimeoutMixin expects it there
         p.timeOut = self.timeOut
+        if self.maxConcurrentRequests != 1:
+            p.maxConcurrentRequests = self.maxConcurrentRequests
         return p
 
 
@@ -2757,6 +3283,8 @@ class HTTPFactory(protocol.ServerFactory):
         if self.logPath:
             self._nativeize = False
             self.logFile = self._openLogFile(self.logPath)
+            if self._batchedLog:
+                self.logFile = logfile.BatchedLogFile(self.logFile)
         else:
             self._nativeize = True
             self.logFile = log.logfile
@@ -596,8 +596,10 @@ class _IRequestEncoder(Interface):
         @param data: The content to encode.
         @type data: C{str}
 
-        @return: The encoded data.
-        @rtype: C{str}
+        @return: The encoded data, or L{None} if the encoder is holding the
+            data back to return from a later call.  Nothing, not even the
+            response headers, is written until the encoder returns data.
+        @rtype: C{str} or L{None}
         """
 
 
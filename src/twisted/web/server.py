@@ -217,6 +217,10 @@ class Request(Copyable, http.Request, components.Componentized):
         if not self._inFakeHead:
             if self._encoder:
                 data = self._encoder.encode(data)
+                if data is None:
+                    # The encoder is holding the data back; there is nothing
+                    # to write yet, not even the headers.
+                    return
             http.Request.write(self, data)
 
 
@@ -513,11 +517,36 @@ class GzipEncoderFactory(object):
     @cvar compressLevel: The compression level used by the compressor, default
         to 9 (highest).
 
+    @ivar minimumSize: Responses whose bodies are shorter than this many bytes
+        are sent uncompressed, since compressing them would save little.
+        Written data is held back until it is this long, unless the
+        I{Content-Length} header already says how long the body will be.
+    @type minimumSize: C{int}
+
+    @ivar contentTypes: If not L{None}, only responses with one of these media
+        types are compressed.  An entry like C{b"text/*"} matches every
+        subtype.
+    @type contentTypes: C{frozenset} of C{bytes}, or L{None}
+
+    @ivar bufferSize: If not L{None}, written data is collected until at least
+        this many bytes are waiting, then compressed and flushed to the client
+        at once, rather than compressing every write as it comes.
+    @type bufferSize: C{int} or L{None}
+
     @since: 12.3
     """
 
     compressLevel = 9
 
+    def __init__(self, minimumSize=0, contentTypes=None, bufferSize=None):
+        self.minimumSize = minimumSize
+        if contentTypes is not None:
+            contentTypes = frozenset(
+                contentType.lower() for contentType in contentTypes)
+        self.contentTypes = contentTypes
+        self.bufferSize = bufferSize
+
+
     def encoderForRequest(self, request):
         """
         Check the headers if the client accepts gzip encoding, and encodes the
@@ -527,16 +556,8 @@ class GzipEncoderFactory(object):
             'accept-encoding', [])
         supported = ','.join(acceptHeaders).split(',')
         if 'gzip' in supported:
-            encoding = request.responseHeaders.getRawHeaders(
-                'content-encoding')
-            if encoding:
-                encoding = '%s,gzip' % ','.join(encoding)
-            else:
-                encoding = 'gzip'
-
-            request.responseHeaders.setRawHeaders('content-encoding',
-                                                  [encoding])
-            return _GzipEncoder(self.compressLevel, request)
+            return _GzipEncoder(self.compressLevel, request, self.minimumSize,
+                                self.contentTypes, self.bufferSize)
 
 
 
@@ -545,31 +566,139 @@ class _GzipEncoder(object):
     """
     An encoder which supports gzip.
 
+    The I{Content-Encoding} header of the response is set when the encoder is
+    created, and restored if the response turns out to be too short or of a
+    type not worth compressing.
+
     @ivar _zlibCompressor: The zlib compressor instance used to compress the
         stream.
 
     @ivar _request: A reference to the originating request.
 
+    @ivar _compressing: C{True} if the response is being compressed, C{False}
+        if it is being sent as it is, or L{None} if that is not decided yet.
+
+    @ivar _originalEncoding: The values of the I{Content-Encoding} header
+        before gzip was added, or L{None}.
+
+    @ivar _encoding: The values of the I{Content-Encoding} header after gzip
+        was added.  If the resource changes the header, it has encoded the
+        response itself, and the response is sent as it is.
+
+    @ivar _buffer: The data written but not yet compressed or returned.
+
+    @ivar _buffered: The number of bytes in C{_buffer}.
+
     @since: 12.3
     """
 
     _zlibCompressor = None
 
-    def __init__(self, compressLevel, request):
+    def __init__(self, compressLevel, request, minimumSize=0,
+                 contentTypes=None, bufferSize=None):
         self._zlibCompressor = zlib.compressobj(
             compressLevel, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
         self._request = request
+        self._minimumSize = minimumSize
+        self._contentTypes = contentTypes
+        self._bufferSize = bufferSize
+        self._compressing = None
+        self._buffer = []
+        self._buffered = 0
+
+        self._originalEncoding = request.responseHeaders.getRawHeaders(
+            'content-encoding')
+        if self._originalEncoding:
+            encoding = '%s,gzip' % ','.join(self._originalEncoding)
+        else:
+            encoding = 'gzip'
+        self._encoding = [encoding]
+        request.responseHeaders.setRawHeaders('content-encoding', [encoding])
+
+
+    def _decide(self, finished):
+        """
+        Decide whether to compress the response, if enough is known about it,
+        and adjust its headers accordingly.
+
+        @param finished: C{True} if the whole body has been written.
+        """
+        headers = self._request.responseHeaders
+        if headers.getRawHeaders('content-encoding') != self._encoding:
+            # The resource replaced the Content-Encoding header, for example
+            # to send a file which is already compressed, so compressing the
+            # body again would leave the header wrong.
+            self._compressing = False
+            return
+        if self._contentTypes is not None:
+            contentType = headers.getRawHeaders(b'content-type', [b''])[0]
+            mediaType = contentType.split(b';', 1)[0].strip().lower()
+            wildcard = mediaType.split(b'/', 1)[0] + b'/*'
+            if (mediaType not in self._contentTypes and
+                    wildcard not in self._contentTypes):
+                self._compressing = False
+        if self._compressing is None:
+            contentLength = headers.getRawHeaders(b'content-length')
+            if contentLength is not None:
+                try:
+                    self._compressing = (
+                        int(contentLength[0]) >= self._minimumSize)
+                except ValueError:
+                    pass
+        if self._compressing is None:
+            if self._buffered >= self._minimumSize:
+                self._compressing = True
+            elif finished:
+                self._compressing = False
+
+        if self._compressing:
+            if not self._request.startedWriting:
+                # Remove the content-length header, we can't honor it
+                # because we compress on the fly.
+                headers.removeHeader(b'content-length')
+        elif self._compressing is not None:
+            if self._originalEncoding:
+                headers.setRawHeaders(
+                    'content-encoding', self._originalEncoding)
+            else:
+                headers.removeHeader('content-encoding')
+
+
+    def _takeBuffer(self):
+        """
+        Empty the buffer of written data.
+
+        @return: The data that was in it.
+        """
+        data = b''.join(self._buffer)
+        self._buffer = []
+        self._buffered = 0
+        return data
 
 
     def encode(self, data):
         """
         Write to the request, automatically compressing data on the fly.
-        """
-        if not self._request.startedWriting:
-            # Remove the content-length header, we can't honor it
-            # because we compress on the fly.
-            self._request.responseHeaders.removeHeader(b'content-length')
-        return self._zlibCompressor.compress(data)
+
+        @return: The data to write, or L{None} if it is being held back.
+        """
+        if self._compressing is None:
+            self._buffer.append(data)
+            self._buffered += len(data)
+            self._decide(False)
+            if self._compressing is None:
+                return None
+            data = self._takeBuffer()
+        if not self._compressing:
+            return data
+        if self._bufferSize is None:
+            return self._zlibCompressor.compress(data)
+        self._buffer.append(data)
+        self._buffered += len(data)
+        if self._buffered < self._bufferSize:
+            return None
+        return (self._zlibCompressor.compress(self._takeBuffer()) +
+                self._zlibCompressor.flush(zlib.Z_SYNC_FLUSH))
 
 
     def finish(self):
@@ -577,7 +706,13 @@ class _GzipEncoder(object):
         Finish handling the request request, flushing any data from the zlib
         buffer.
         """
-        remain = self._zlibCompressor.flush()
+        if self._compressing is None:
+            self._decide(True)
+        data = self._takeBuffer()
+        if not self._compressing:
+            return data
+        remain = self._zlibCompressor.compress(data)
+        remain += self._zlibCompressor.flush()
         self._zlibCompressor = None
         return remain
 
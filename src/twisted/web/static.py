@@ -15,6 +15,9 @@ import time
 import errno
 import mimetypes
 
+from collections import OrderedDict
+from io import BytesIO
+
 from zope.interface import implementer
 
 from twisted.web import server
@@ -167,6 +170,152 @@ def getTypeAndEncoding(filename, types, encodings, defaultType):
 
 
 
+class FileCache(object):
+    """
+    A cache shared by L{File} resources serving a file tree, so that requests
+    for the same files can be answered without touching the filesystem.
+
+    The results of C{stat} calls and the L{File} resources found for child
+    paths, with their content types, are reused for C{ttl} seconds.  The
+    contents of files no larger than C{maxFileSize} are kept in memory, the
+    least recently used being discarded to keep the total within C{maxSize}
+    bytes, and are read again when the size or modification time of the file
+    changes.
+
+    @ivar ttl: The number of seconds metadata is reused for.
+    @type ttl: C{float}
+
+    @ivar maxSize: The maximum number of bytes of file contents kept.
+    @type maxSize: C{int}
+
+    @ivar maxFileSize: The size of the largest file whose contents are kept.
+    @type maxFileSize: C{int}
+
+    @ivar maxEntries: The number of paths and children whose metadata is
+        kept, beyond which expired entries are discarded.
+    @type maxEntries: C{int}
+
+    @ivar _stats: A C{dict} mapping paths to the time their entry expires
+        and their C{stat} result or the L{OSError} C{stat} raised.
+    @ivar _children: A C{dict} mapping directory paths and child names to the
+        time their entry expires and the child L{File}.
+    @ivar _contents: An L{OrderedDict} mapping paths to the modification time
+        and size of the file when it was read and its contents, least
+        recently used first.
+    @ivar _size: The number of bytes of file contents kept.
+    """
+    def __init__(self, ttl=1, maxSize=2 ** 24, maxFileSize=2 ** 16,
+                 maxEntries=10000, reactor=None):
+        if reactor is None:
+            from twisted.internet import reactor
+        self._reactor = reactor
+        self.ttl = ttl
+        self.maxSize = maxSize
+        self.maxFileSize = maxFileSize
+        self.maxEntries = maxEntries
+        self._stats = {}
+        self._children = {}
+        self._contents = OrderedDict()
+        self._size = 0
+
+
+    def _get(self, entries, key):
+        """
+        Look up an unexpired metadata entry.
+
+        @return: The value of the entry, or L{None}.
+        """
+        entry = entries.get(key)
+        if entry is None:
+            return None
+        expires, value = entry
+        if expires <= self._reactor.seconds():
+            del entries[key]
+            return None
+        return value
+
+
+    def _put(self, entries, key, value):
+        """
+        Add a metadata entry, first discarding expired entries if there are
+        too many.
+        """
+        now = self._reactor.seconds()
+        if len(entries) >= self.maxEntries:
+            for oldKey, (expires, oldValue) in list(entries.items()):
+                if expires <= now:
+                    del entries[oldKey]
+            if len(entries) >= self.maxEntries:
+                entries.clear()
+        entries[key] = (now + self.ttl, value)
+
+
+    def stat(self, path):
+        """
+        Get the C{stat} result for a path.
+
+        @raise OSError: If C{stat} failed.
+        """
+        result = self._get(self._stats, path)
+        if result is None:
+            try:
+                result = os.stat(path)
+            except OSError as e:
+                result = e
+            self._put(self._stats, path, result)
+        if isinstance(result, OSError):
+            raise result
+        return result
+
+
+    def getChild(self, directory, name):
+        """
+        Get the L{File} found for a child of a directory.
+
+        @return: The L{File}, or L{None} if none is known.
+        """
+        return self._get(self._children, (directory, name))
+
+
+    def cacheChild(self, directory, name, child):
+        """
+        Remember the L{File} found for a child of a directory.
+        """
+        self._put(self._children, (directory, name), child)
+
+
+    def getContents(self, file):
+        """
+        Get the contents of a file, reading them if they are not kept or
+        the file has changed since they were read.
+
+        @param file: The L{File} to read.
+
+        @return: The contents.
+        @rtype: L{bytes}
+        """
+        version = (file.getModificationTime(), file.getFileSize())
+        entry = self._contents.pop(file.path, None)
+        if entry is not None:
+            self._size -= len(entry[1])
+            if entry[0] != version:
+                entry = None
+        if entry is None:
+            fileObject = file.openForReading()
+            try:
+                entry = (version, fileObject.read())
+            finally:
+                fileObject.close()
+        if len(entry[1]) <= self.maxFileSize:
+            self._contents[file.path] = entry
+            self._size += len(entry[1])
+            while self._size > self.maxSize:
+                path, (version, data) = self._contents.popitem(last=False)
+                self._size -= len(data)
+        return entry[1]
+
+
+
 class File(resource.Resource, filepath.FilePath):
     """
     File is a resource that represents a plain non-interpreted file
@@ -186,6 +335,18 @@ class File(resource.Resource, filepath.FilePath):
 
     @cvar childNotFound: L{Resource} used to render 404 Not Found error pages.
     @cvar forbidden: L{Resource} used to render 403 Forbidden error pages.
+
+    @ivar fileCache: If not L{None}, the L{FileCache} used to answer requests
+        for this file and its children.  Responses from a L{File} with a cache
+        include an I{ETag} derived from the size and modification time of the
+        file.
+    @type fileCache: L{FileCache} or L{None}
+
+    @ivar precompressed: If true, a request from a client which accepts gzip
+        encoding is answered with the contents of the sibling file with a
+        C{.gz} extension, if there is one at least as new as this file,
+        instead of the contents of this file.
+    @type precompressed: C{bool}
     """
 
     contentTypes = loadMimeTypes()
@@ -201,6 +362,10 @@ class File(resource.Resource, filepath.FilePath):
 
     type = None
 
+    precompressed = False
+
+    fileCache = None
+
     def __init__(self, path, defaultType="text/html", ignoredExts=(), registry=None, allowExt=0):
         """
         Create a file with the given path.
@@ -268,6 +433,11 @@ class File(resource.Resource, filepath.FilePath):
 
         If C{path} is the empty string, return a L{DirectoryLister} instead.
         """
+        if self.fileCache is not None:
+            child = self.fileCache.getChild(self.path, path)
+            if child is not None:
+                return child
+
         self.restat(reraise=False)
 
         if not self.isdir():
@@ -296,7 +466,27 @@ class File(resource.Resource, filepath.FilePath):
             processor = self.processors.get(fpath.splitext()[1])
         if processor:
             return resource.IResource(processor(fpath.path, self.registry))
-        return self.createSimilarFile(fpath.path)
+        child = self.createSimilarFile(fpath.path)
+        if self.fileCache is not None:
+            self.fileCache.cacheChild(self.path, path, child)
+        return child
+
+
+    def restat(self, reraise=True):
+        """
+        Re-calculate cached effects of C{stat}, using the result kept by the
+        C{fileCache} if there is one.
+
+        @see: L{FilePath.restat<twisted.python.filepath.FilePath.restat>}
+        """
+        if self.fileCache is None:
+            return filepath.FilePath.restat(self, reraise)
+        try:
+            self._statinfo = self.fileCache.stat(self.path)
+        except OSError:
+            self._statinfo = 0
+            if reraise:
+                raise
 
 
     # methods to allow subclasses to e.g. decrypt files on the fly:
@@ -536,6 +726,9 @@ class File(resource.Resource, filepath.FilePath):
         if self.type:
             request.setHeader(b'content-type', networkString(self.type))
         if self.encoding:
+            # The contents are already encoded, so they must not be
+            # compressed again by an encoder for the request.
+            request._encoder = None
             request.setHeader(b'content-encoding', networkString(self.encoding))
 
 
@@ -594,8 +787,22 @@ class File(resource.Resource, filepath.FilePath):
         if self.isdir():
             return self.redirect(request)
 
+        if self.precompressed and not self.encoding:
+            compressed = self._getPrecompressed(request)
+            if compressed is not None:
+                return compressed.render_GET(request)
+
         request.setHeader(b'accept-ranges', b'bytes')
 
+        if self.fileCache is not None:
+            etag = networkString('"%x-%x"' % (
+                int(self.getModificationTime() * 1000000),
+                self.getFileSize()))
+            if request.setETag(etag) is http.CACHED:
+                return b''
+            if self.getFileSize() <= self.fileCache.maxFileSize:
+                return self._renderFromCache(request)
+
         try:
             fileForReading = self.openForReading()
         except IOError as e:
@@ -627,6 +834,70 @@ class File(resource.Resource, filepath.FilePath):
     render_HEAD = render_GET
 
 
+    def _renderFromCache(self, request):
+        """
+        Answer a request for this file with the contents kept by the
+        C{fileCache}.
+        """
+        try:
+            contents = self.fileCache.getContents(self)
+        except IOError as e:
+            if e.errno == errno.EACCES:
+                return self.forbidden.render(request)
+            else:
+                raise
+
+        if request.setLastModified(self.getModificationTime()) is http.CACHED:
+            return b''
+
+        if request.method == b'HEAD':
+            self._setContentHeaders(request, len(contents))
+            return b''
+
+        if request.getHeader(b'range') is not None:
+            producer = self.makeProducer(request, BytesIO(contents))
+            producer.start()
+            return server.NOT_DONE_YET
+
+        self._setContentHeaders(request, len(contents))
+        request.setResponseCode(http.OK)
+        return contents
+
+
+    def _getPrecompressed(self, request):
+        """
+        Find the gzip-compressed copy of this file to send in response to
+        C{request}, if there is a fresh one and the client accepts it.
+
+        Responses for files with a fresh compressed copy vary with the
+        I{Accept-Encoding} header of the request, so a I{Vary} header saying
+        so is set whether or not the copy is used.
+
+        @return: A L{File} for the compressed copy, which is served with the
+            content type of this file, or L{None}.
+        """
+        if isinstance(self.path, bytes):
+            compressed = self.siblingExtension(b'.gz')
+        else:
+            compressed = self.siblingExtension('.gz')
+        if (not compressed.isfile() or
+                compressed.getModificationTime() < self.getModificationTime()):
+            return None
+        request.setHeader(b'vary', b'accept-encoding')
+
+        acceptEncoding = b','.join(
+            request.requestHeaders.getRawHeaders(b'accept-encoding', []))
+        codings = [coding.split(b';', 1)[0].strip().lower()
+                   for coding in acceptEncoding.split(b',')]
+        if b'gzip' not in codings:
+            return None
+
+        compressed = self.createSimilarFile(compressed.path)
+        compressed.type = self.type
+        compressed.encoding = 'gzip'
+        return compressed
+
+
     def redirect(self, request):
         return redirectTo(_addSlash(request), request)
 
@@ -648,6 +919,8 @@ class File(resource.Resource, filepath.FilePath):
         f.processors = self.processors
         f.indexNames = self.indexNames[:]
         f.childNotFound = self.childNotFound
+        f.precompressed = self.precompressed
+        f.fileCache = self.fileCache
         return f
 
 
@@ -692,6 +965,67 @@ class StaticProducer(object):
         self.request = None
 
 
+    def _sendFile(self, offset, size):
+        """
+        Send part of the file with L{ISendFileTransport.sendFile
+        <twisted.internet.interfaces.ISendFileTransport.sendFile>}, so that it
+        is copied to the connection without being read into memory, and
+        finish the request once it has been sent.
+
+        This is only possible when the response body is written unchanged,
+        neither encoded nor chunked, to a transport which can send files.
+
+        @param offset: The offset into the file of the part to send.
+        @param size: The size of the part to send, or L{None} to send the
+            rest of the file.
+
+        @return: C{True} if the file is being sent this way, or C{False} if
+            it has to be produced by reading it instead.
+        """
+        request = self.request
+        if getattr(request, '_encoder', None) is not None:
+            return False
+        transport = getattr(getattr(request, 'channel', None), 'transport',
+                            None)
+        if not interfaces.ISendFileTransport.providedBy(transport):
+            return False
+        # Writing nothing sends the headers and decides whether the body is
+        # chunked.
+        request.write(b'')
+        if getattr(request, 'chunked', False):
+            return False
+        try:
+            d = transport.sendFile(self.fileObject, offset, size)
+        except ValueError:
+            return False
+        d.addCallbacks(self._fileSent, self._fileNotSent)
+        return True
+
+
+    def _fileSent(self, sent):
+        """
+        Finish the request once L{_sendFile} has sent the file.
+
+        @param sent: The number of bytes sent.
+        """
+        if not self.request:
+            return
+        self.request.sentLength += sent
+        self.request.finish()
+        self.stopProducing()
+
+
+    def _fileNotSent(self, reason):
+        """
+        Clean up if the connection is lost before L{_sendFile} has sent the
+        file.
+
+        @param reason: The reason the file could not be sent.
+        """
+        if self.request:
+            self.stopProducing()
+
+
 
 class NoRangeStaticProducer(StaticProducer):
     """
@@ -699,7 +1033,8 @@ class NoRangeStaticProducer(StaticProducer):
     """
 
     def start(self):
-        self.request.registerProducer(self, False)
+        if not self._sendFile(0, None):
+            self.request.registerProducer(self, False)
 
 
     def resumeProducing(self):
@@ -739,7 +1074,8 @@ class SingleRangeStaticProducer(StaticProducer):
     def start(self):
         self.fileObject.seek(self.offset)
         self.bytesWritten = 0
-        self.request.registerProducer(self, 0)
+        if not self._sendFile(self.offset, self.size):
+            self.request.registerProducer(self, 0)
 
 
     def resumeProducing(self):
@@ -12,7 +12,7 @@ import os
 
 from twisted.web import server, static, script, demo, wsgi
 from twisted.internet import interfaces, reactor
-from twisted.python import usage, reflect, threadpool
+from twisted.python import usage, reflect
 from twisted.python.compat import _PY3
 from twisted.application import internet, service, strports
 
@@ -146,10 +146,7 @@ demo webserver that has the Test class from twisted.web.demo in it."""
             application = reflect.namedAny(name)
         except (AttributeError, ValueError):
             raise usage.UsageError("No such WSGI application: %r" % (name,))
-        pool = threadpool.ThreadPool()
-        reactor.callWhenRunning(pool.start)
-        reactor.addSystemEventTrigger('after', 'shutdown', pool.stop)
-        self['root'] = wsgi.WSGIResource(reactor, pool, application)
+        self['root'] = wsgi.WSGIResource(reactor, None, application)
 
 
     def opt_mime_type(self, defaultType):
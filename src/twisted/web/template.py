@@ -386,6 +386,15 @@ class XMLString(object):
 
     @ivar _loadedTemplate: The loaded document.
     @type _loadedTemplate: a C{list} of Stan objects.
+
+    @ivar _compiledTemplate: The loaded document with its static parts
+        serialized in advance, or L{None}, if not compiled.  It is dropped
+        whenever L{load} is called, since the caller may change the document
+        in place, so it is only reused while nothing but the flattener has
+        asked for the document.  Changes made to a document obtained from
+        L{load} before it was last compiled are not seen.
+    @type _compiledTemplate: a
+        L{_Precompiled<twisted.web._flatten._Precompiled>} or L{None}.
     """
 
     def __init__(self, s):
@@ -399,6 +408,7 @@ class XMLString(object):
             s = s.decode('utf8')
 
         self._loadedTemplate = _flatsaxParse(NativeStringIO(s))
+        self._compiledTemplate = None
 
 
     def load(self):
@@ -408,9 +418,23 @@ class XMLString(object):
         @return: the loaded document.
         @rtype: a C{list} of Stan objects.
         """
+        self._compiledTemplate = None
         return self._loadedTemplate
 
 
+    def _loadCompiled(self):
+        """
+        Return the document with its static parts serialized in advance,
+        first compiling it if necessary.
+
+        @return: the compiled document.
+        @rtype: a L{_Precompiled<twisted.web._flatten._Precompiled>}
+        """
+        if self._compiledTemplate is None:
+            self._compiledTemplate = _compile(self._loadedTemplate)
+        return self._compiledTemplate
+
+
 
 @implementer(ITemplateLoader)
 class XMLFile(object):
@@ -420,6 +444,15 @@ class XMLFile(object):
     @ivar _loadedTemplate: The loaded document, or L{None}, if not loaded.
     @type _loadedTemplate: a C{list} of Stan objects, or L{None}.
 
+    @ivar _compiledTemplate: The loaded document with its static parts
+        serialized in advance, or L{None}, if not compiled.  It is dropped
+        whenever L{load} is called, since the caller may change the document
+        in place, so it is only reused while nothing but the flattener has
+        asked for the document.  Changes made to a document obtained from
+        L{load} before it was last compiled are not seen.
+    @type _compiledTemplate: a
+        L{_Precompiled<twisted.web._flatten._Precompiled>} or L{None}.
+
     @ivar _path: The L{FilePath}, file object, or filename that is being
         loaded from.
     """
@@ -437,6 +470,7 @@ class XMLFile(object):
                 "since Twisted 12.1.  Pass a FilePath instead.",
                 category=DeprecationWarning, stacklevel=2)
         self._loadedTemplate = None
+        self._compiledTemplate = None
         self._path = path
 
 
@@ -467,9 +501,25 @@ class XMLFile(object):
         """
         if self._loadedTemplate is None:
             self._loadedTemplate = self._loadDoc()
+        self._compiledTemplate = None
         return self._loadedTemplate
 
 
+    def _loadCompiled(self):
+        """
+        Return the document with its static parts serialized in advance,
+        first loading and compiling it if necessary.
+
+        @return: the compiled document.
+        @rtype: a L{_Precompiled<twisted.web._flatten._Precompiled>}
+        """
+        if self._compiledTemplate is None:
+            if self._loadedTemplate is None:
+                self._loadedTemplate = self._loadDoc()
+            self._compiledTemplate = _compile(self._loadedTemplate)
+        return self._compiledTemplate
+
+
 
 # Last updated October 2011, using W3Schools as a reference. Link:
 # http://www.w3schools.com/html5/html5_reference.asp
@@ -567,5 +617,5 @@ def renderElement(request, element,
 
 
 from twisted.web._element import Element, renderer
-from twisted.web._flatten import flatten, flattenString
+from twisted.web._flatten import flatten, flattenString, _compile
 import twisted.web.util
@@ -723,6 +723,199 @@ class HTTPConnectionPoolTests(TestCase, FakeReactorAndConnectMixin):
 
 
 
+class HTTPConnectionPoolLimitTests(TestCase):
+    """
+    Tests for the connection limits, request queueing, prewarming and
+    statistics of L{HTTPConnectionPool}.
+    """
+    def setUp(self):
+        self.clock = Clock()
+        self.pool = HTTPConnectionPool(self.clock)
+        self.pool.retryAutomatically = False
+        self.endpoint = DummyEndpoint()
+
+
+    def getConnection(self, key):
+        """
+        Get a connection for C{key} from the pool.
+
+        @return: A L{list} which will contain the connection once the pool
+            supplies it.
+        """
+        result = []
+        self.pool.getConnection(key, self.endpoint).addCallback(result.append)
+        return result
+
+
+    def loseConnection(self, connection):
+        """
+        Tell C{connection} its connection has been lost.
+        """
+        connection.connectionLost(Failure(ConnectionDone()))
+
+
+    def test_maxConnectionsPerHost(self):
+        """
+        Once C{maxConnectionsPerHost} connections for a key are open, further
+        requests for it wait until a connection is returned to the pool.
+        """
+        self.pool.maxConnectionsPerHost = 2
+        first = self.getConnection("foo")
+        second = self.getConnection("foo")
+        third = self.getConnection("foo")
+        self.assertEqual((len(first), len(second), third), (1, 1, []))
+        self.assertEqual(self.pool.statistics("foo")["queued"], 1)
+
+        self.pool._putConnection("foo", first[0])
+        self.clock.advance(0)
+        self.assertEqual(third, first)
+        self.assertEqual(self.pool.statistics("foo")["queued"], 0)
+
+
+    def test_otherHostNotLimited(self):
+        """
+        Requests for a key at its C{maxConnectionsPerHost} limit do not keep
+        requests for other keys waiting.
+        """
+        self.pool.maxConnectionsPerHost = 1
+        self.getConnection("foo")
+        waiting = self.getConnection("foo")
+        other = self.getConnection("bar")
+        self.clock.advance(0)
+        self.assertEqual((waiting, len(other)), ([], 1))
+
+
+    def test_connectionLost(self):
+        """
+        When an open connection is lost, a waiting request gets a new
+        connection.
+        """
+        self.pool.maxConnectionsPerHost = 1
+        first = self.getConnection("foo")
+        second = self.getConnection("foo")
+        self.loseConnection(first[0])
+        self.clock.advance(0)
+        self.assertEqual(len(second), 1)
+        self.assertIsNot(second[0], first[0])
+
+
+    def test_connectFailed(self):
+        """
+        A connection attempt which fails does not count towards the limits.
+        """
+        self.pool.maxConnectionsPerHost = 1
+        self.endpoint.connect = lambda factory: defer.fail(
+            ConnectionRefusedError())
+        self.failureResultOf(
+            self.pool.getConnection("foo", self.endpoint),
+            ConnectionRefusedError)
+        del self.endpoint.connect
+        self.assertEqual(len(self.getConnection("foo")), 1)
+
+
+    def test_maxConnections(self):
+        """
+        Once C{maxConnections} connections are open, requests wait for a
+        connection and are served in the order they were made, whatever their
+        key.
+        """
+        self.pool.maxConnections = 1
+        first = self.getConnection("foo")
+        bar = self.getConnection("bar")
+        foo = self.getConnection("foo")
+        self.clock.advance(0)
+        self.assertEqual((bar, foo), ([], []))
+
+        self.loseConnection(first[0])
+        self.clock.advance(0)
+        self.assertEqual((len(bar), foo), (1, []))
+        self.assertEqual(self.pool.statistics(), {
+            "idle": 0, "active": 1, "queued": 1,
+            "waitTime": self.pool.waitTime.summary()})
+
+
+    def test_maxConnectionsClosesCached(self):
+        """
+        Cached connections for other keys are closed to make room for requests
+        waiting because of C{maxConnections}.
+        """
+        self.pool.maxConnections = 1
+        [cached] = self.getConnection("foo")
+        self.pool._putConnection("foo", cached)
+        waiting = self.getConnection("bar")
+        self.clock.advance(0)
+        self.assertTrue(cached.transport.disconnecting)
+        self.assertEqual(self.pool.statistics("foo")["idle"], 0)
+        self.assertEqual(waiting, [])
+
+        self.loseConnection(cached)
+        self.clock.advance(0)
+        self.assertEqual(len(waiting), 1)
+
+
+    def test_cancelWaiting(self):
+        """
+        Cancelling the L{Deferred} of a waiting request stops it waiting.
+        """
+        self.pool.maxConnectionsPerHost = 1
+        [first] = self.getConnection("foo")
+        d = self.pool.getConnection("foo", self.endpoint)
+        d.cancel()
+        self.failureResultOf(d, CancelledError)
+        self.assertEqual(self.pool.statistics()["queued"], 0)
+
+        self.pool._putConnection("foo", first)
+        self.clock.advance(0)
+        self.assertEqual(self.pool.statistics("foo")["idle"], 1)
+
+
+    def test_waitTime(self):
+        """
+        L{HTTPConnectionPool.waitTime} records how long each request waited
+        for a connection.
+        """
+        self.pool.maxConnectionsPerHost = 1
+        [first] = self.getConnection("foo")
+        self.getConnection("foo")
+        self.clock.advance(5)
+        self.pool._putConnection("foo", first)
+        self.clock.advance(0)
+        summary = self.pool.statistics()["waitTime"]
+        self.assertEqual((summary["count"], summary["minimum"],
+                          summary["maximum"]), (2, 0, 5))
+
+
+    def test_prewarm(self):
+        """
+        L{HTTPConnectionPool.prewarm} opens connections and caches them, up to
+        C{maxPersistentPerHost}, and its L{Deferred} fires with the number
+        opened.
+        """
+        self.assertEqual(
+            self.successResultOf(self.pool.prewarm("foo", self.endpoint, 3)),
+            2)
+        self.assertEqual(self.pool.statistics("foo")["idle"], 2)
+        self.assertEqual(self.pool.statistics("foo")["active"], 0)
+
+        self.assertEqual(
+            self.successResultOf(self.pool.prewarm("foo", self.endpoint, 3)),
+            0)
+        cached = self.pool._connections["foo"][0]
+        self.assertEqual(self.getConnection("foo"), [cached])
+
+
+    def test_prewarmLimited(self):
+        """
+        L{HTTPConnectionPool.prewarm} does not open connections past
+        C{maxConnectionsPerHost}.
+        """
+        self.pool.maxConnectionsPerHost = 1
+        self.assertEqual(
+            self.successResultOf(self.pool.prewarm("foo", self.endpoint, 2)),
+            1)
+
+
+
 class AgentTestsMixin(object):
     """
     Tests for any L{IAgent} implementation.
@@ -1262,6 +1455,20 @@ class AgentTests(TestCase, FakeReactorAndConnectMixin, AgentTestsMixin,
                           (HTTPConnectionPool, False, agent._reactor))
 
 
+    def test_prewarm(self):
+        """
+        L{Agent.prewarm} opens connections to the server in the given URI and
+        caches them in the agent's pool under the key its requests use.
+        """
+        pool = HTTPConnectionPool(self.reactor)
+        agent = client.Agent(self.reactor, pool=pool)
+        agent._getEndpoint = lambda uri: DummyEndpoint()
+        self.assertEqual(
+            self.successResultOf(agent.prewarm(b"http://example.com/", 2)), 2)
+        self.assertEqual(
+            len(pool._connections[(b"http", b"example.com", 80)]), 2)
+
+
     def test_endpointFactoryPool(self):
         """
         If a pool is passed in to L{Agent.usingEndpointFactory} it is used as
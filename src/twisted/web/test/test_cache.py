@@ -0,0 +1,382 @@
+# Copyright (c) Twisted Matrix Laboratories.
+# See LICENSE for details.
+
+"""
+Tests for L{twisted.web.cache}.
+"""
+
+from __future__ import division, absolute_import
+
+from zope.interface import implementer
+
+from twisted.internet.defer import succeed
+from twisted.internet.error import ConnectionDone
+from twisted.internet.interfaces import ISendFileTransport
+from twisted.internet.task import Clock
+from twisted.python.failure import Failure
+from twisted.python.filepath import FilePath
+from twisted.test.proto_helpers import StringTransport
+from twisted.trial.unittest import SynchronousTestCase
+from twisted.web import http
+from twisted.web.cache import CachingResource
+from twisted.web.resource import Resource
+from twisted.web.server import NOT_DONE_YET, Site
+from twisted.web.static import File
+
+
+
+class CountingResource(Resource):
+    """
+    A resource which counts the requests it renders.
+
+    @ivar rendered: The requests rendered so far.
+    @ivar headers: A C{dict} of response headers to set.
+    @ivar code: The response code to set.
+    @ivar etag: The entity tag to set, or L{None}.
+    @ivar lastModified: The modification time to set, or L{None}.
+    @ivar asynchronous: Whether to leave requests unfinished.
+    """
+    isLeaf = True
+    code = http.OK
+    etag = None
+    lastModified = None
+    asynchronous = False
+
+    def __init__(self):
+        Resource.__init__(self)
+        self.rendered = []
+        self.headers = {}
+
+
+    def render_GET(self, request):
+        self.rendered.append(request)
+        request.setResponseCode(self.code)
+        for name, value in self.headers.items():
+            request.setHeader(name, value)
+        if self.lastModified is not None:
+            request.setLastModified(self.lastModified)
+        if self.etag is not None:
+            request.setETag(self.etag)
+        body = b"response " + str(len(self.rendered)).encode("ascii")
+        if self.asynchronous:
+            request.write(body)
+            return NOT_DONE_YET
+        return body
+
+
+
+class CachingResourceTests(SynchronousTestCase):
+    """
+    Tests for L{CachingResource}.
+    """
+    def setUp(self):
+        self.clock = Clock()
+        self.original = CountingResource()
+        self.cache = CachingResource(
+            self.original, maxEntries=3, maxSize=1000, ttl=10,
+            reactor=self.clock)
+        self.site = Site(self.cache)
+
+
+    def request(self, path=b"/", method=b"GET", headers=(),
+                transport=None):
+        """
+        Make a request to the site on a new connection.
+
+        @param transport: The transport of the connection, or L{None} for a
+            new L{StringTransport}.
+
+        @return: The L{StringTransport} the response is written to.
+        """
+        channel = self.site.buildProtocol(None)
+        if transport is None:
+            transport = StringTransport()
+        channel.makeConnection(transport)
+        lines = [method + b" " + path + b" HTTP/1.0"]
+        lines.extend(name + b": " + value for name, value in headers)
+        channel.dataReceived(b"\r\n".join(lines) + b"\r\n\r\n")
+        self.addCleanup(channel.connectionLost, Failure(ConnectionDone()))
+        return transport
+
+
+    def response(self, transport):
+        """
+        Parse the response written to a transport.
+
+        @return: A C{tuple} of the response code, a C{dict} mapping
+            lower-cased header names to values, and the body.
+        """
+        head, body = transport.value().split(b"\r\n\r\n", 1)
+        lines = head.split(b"\r\n")
+        headers = {}
+        for line in lines[1:]:
+            name, value = line.split(b":", 1)
+            headers[name.strip().lower()] = value.strip()
+        return int(lines[0].split()[1]), headers, body
+
+
+    def test_hit(self):
+        """
+        A second request for the same URI is answered with the stored code,
+        headers and body without rendering it again, along with its age.
+        """
+        self.original.code = http.NOT_FOUND
+        self.original.headers[b"x-custom"] = b"value"
+        first = self.response(self.request())
+        self.clock.advance(3)
+        second = self.response(self.request())
+
+        self.assertEqual(len(self.original.rendered), 1)
+        self.assertEqual(second[0], http.NOT_FOUND)
+        self.assertEqual(second[1][b"x-custom"], b"value")
+        self.assertEqual(second[1][b"age"], b"3")
+        self.assertEqual(second[1][b"content-length"], b"10")
+        self.assertEqual(second[2], first[2])
+        self.assertEqual(self.cache.statistics(), {
+            "entries": 1, "size": 44, "hits": 1, "misses": 1,
+            "collapsed": 0})
+
+
+    def test_host(self):
+        """
+        Responses are stored separately for each value of the C{Host}
+        header.
+        """
+        self.request(headers=[(b"Host", b"a")])
+        self.request(headers=[(b"Host", b"b")])
+        self.request(headers=[(b"Host", b"a")])
+        self.assertEqual(len(self.original.rendered), 2)
+
+
+    def test_head(self):
+        """
+        A C{HEAD} request is answered from the response stored for a C{GET}
+        request, without a body.
+        """
+        self.request()
+        code, headers, body = self.response(self.request(method=b"HEAD"))
+        self.assertEqual(len(self.original.rendered), 1)
+        self.assertEqual((code, body), (http.OK, b""))
+        self.assertEqual(headers[b"content-length"], b"10")
+
+
+    def test_keys(self):
+        """
+        Responses are stored separately for each URI and each value of the
+        C{keyHeaders}.
+        """
+        self.cache.keyHeaders = (b"host",)
+        self.request(b"/?a=1", headers=[(b"Host", b"a")])
+        self.request(b"/?a=2", headers=[(b"Host", b"a")])
+        self.request(b"/?a=1", headers=[(b"Host", b"b")])
+        self.request(b"/?a=1", headers=[(b"Host", b"a")])
+        self.assertEqual(len(self.original.rendered), 3)
+
+
+    def test_vary(self):
+        """
+        Responses with a C{Vary} header are stored separately for each value
+        of the request headers it names.
+        """
+        self.original.headers[b"vary"] = b"Accept-Language"
+        for language in [b"en", b"fr", b"en", b"fr"]:
+            self.request(headers=[(b"Accept-Language", language)])
+        self.assertEqual(len(self.original.rendered), 2)
+
+        self.original.headers[b"vary"] = b"*"
+        self.request(headers=[(b"Accept-Language", b"de")])
+        self.request(headers=[(b"Accept-Language", b"de")])
+        self.assertEqual(len(self.original.rendered), 4)
+
+
+    def test_ttl(self):
+        """
+        A stored response is used for C{ttl} seconds, or for the number of
+        seconds its C{max-age} or C{s-maxage} directive gives.
+        """
+        self.request()
+        self.clock.advance(10)
+        self.request()
+        self.assertEqual(len(self.original.rendered), 2)
+
+        self.original.headers[b"cache-control"] = b"public, max-age=20"
+        self.request(b"/other")
+        self.clock.advance(15)
+        self.request(b"/other")
+        self.assertEqual(len(self.original.rendered), 3)
+
+        self.original.headers[b"cache-control"] = b"max-age=20, s-maxage=5"
+        self.request(b"/shared")
+        self.clock.advance(5)
+        self.request(b"/shared")
+        self.assertEqual(len(self.original.rendered), 5)
+
+
+    def test_notStored(self):
+        """
+        Responses which forbid storing, set cookies or have a code which is
+        not cacheable are not stored.
+        """
+        for directive in [b"no-store", b"no-cache", b"private", b"max-age=0"]:
+            self.original.headers[b"cache-control"] = directive
+            self.request()
+        del self.original.headers[b"cache-control"]
+
+        self.original.headers[b"set-cookie"] = b"a=b"
+        self.request()
+        del self.original.headers[b"set-cookie"]
+
+        self.original.code = http.INTERNAL_SERVER_ERROR
+        self.request()
+        self.assertEqual(self.cache.statistics()["entries"], 0)
+
+
+    def test_requestBypass(self):
+        """
+        Requests which ask not to be answered from a cache are rendered, and
+        their responses replace those stored unless they ask for nothing to
+        be stored.  Requests with credentials are rendered without storing
+        their responses.
+        """
+        self.request()
+        self.request(headers=[(b"Cache-Control", b"no-cache")])
+        self.assertEqual(self.response(self.request())[2], b"response 2")
+
+        self.request(headers=[(b"Authorization", b"Basic eDp5")])
+        self.request(headers=[(b"Cache-Control", b"no-store")])
+        self.assertEqual(self.response(self.request())[2], b"response 2")
+        self.assertEqual(len(self.original.rendered), 4)
+
+
+    def test_entryLimit(self):
+        """
+        When more than C{maxEntries} responses are stored, the least recently
+        used is discarded.
+        """
+        for path in [b"/1", b"/2", b"/3", b"/1", b"/4"]:
+            self.request(path)
+        self.assertEqual(len(self.original.rendered), 4)
+        self.request(b"/1")
+        self.assertEqual(len(self.original.rendered), 4)
+        self.request(b"/2")
+        self.assertEqual(len(self.original.rendered), 5)
+
+
+    def test_sizeLimit(self):
+        """
+        Least recently used responses are discarded to keep the number of
+        bytes stored within C{maxSize}, and larger responses are not stored.
+        """
+        self.original.headers[b"x-padding"] = b"x" * 400
+        self.request(b"/1")
+        self.request(b"/2")
+        self.request(b"/3")
+        self.assertEqual(self.cache.statistics()["entries"], 2)
+        self.assertEqual(self.cache.statistics()["size"], 2 * 440)
+
+        self.original.headers[b"x-padding"] = b"x" * 1000
+        self.request(b"/4")
+        self.assertEqual(self.cache.statistics()["entries"], 2)
+
+
+    def test_sizeLimitWrites(self):
+        """
+        A response whose body is written in parts which together exceed
+        C{maxSize} is written in full and not stored.
+        """
+        self.original.asynchronous = True
+        transport = self.request()
+        [request] = self.original.rendered
+        for part in [b"w", b"x", b"y", b"z"]:
+            request.write(part * 400)
+        request.finish()
+        self.assertIn(b"x" * 400 + b"y" * 400 + b"z" * 400,
+                      transport.value())
+        self.assertEqual(self.cache.statistics()["entries"], 0)
+
+
+    def test_sendFile(self):
+        """
+        A static file sent with C{sendFile} is not stored, as its body was
+        not written with C{request.write}, and so is served in full again.
+        """
+        @implementer(ISendFileTransport)
+        class SendFileTransport(StringTransport):
+            def sendFile(self, file, offset=0, count=None):
+                file.seek(offset)
+                data = file.read() if count is None else file.read(count)
+                self.write(data)
+                return succeed(len(data))
+
+        path = FilePath(self.mktemp())
+        path.setContent(b"static contents")
+        self.cache = CachingResource(File(path.path), reactor=self.clock)
+        root = Resource()
+        root.putChild(b"file", self.cache)
+        self.site = Site(root)
+        for i in range(2):
+            code, headers, body = self.response(
+                self.request(b"/file", transport=SendFileTransport()))
+            self.assertEqual((code, body), (http.OK, b"static contents"))
+            self.assertEqual(headers[b"content-length"], b"15")
+        self.assertEqual(self.cache.statistics()["entries"], 0)
+
+
+    def test_conditional(self):
+        """
+        Conditional requests are answered with C{NOT_MODIFIED} if the entity
+        tag or modification time of the stored response satisfies them.
+        """
+        self.original.etag = b'"tag"'
+        self.original.lastModified = 1000
+        self.request()
+
+        code, headers, body = self.response(self.request(
+            headers=[(b"If-None-Match", b'"tag"')]))
+        self.assertEqual((code, body), (http.NOT_MODIFIED, b""))
+        self.assertEqual(headers[b"etag"], b'"tag"')
+
+        code, headers, body = self.response(self.request(
+            headers=[(b"If-Modified-Since", http.datetimeToString(1000))]))
+        self.assertEqual((code, body), (http.NOT_MODIFIED, b""))
+        self.assertEqual(headers[b"last-modified"],
+                         http.datetimeToString(1000))
+
+        code, headers, body = self.response(self.request(
+            headers=[(b"If-None-Match", b'"other"')]))
+        self.assertEqual((code, body), (http.OK, b"response 1"))
+        self.assertEqual(len(self.original.rendered), 1)
+
+
+    def test_collapsed(self):
+        """
+        Requests for a response which is being rendered wait for it and are
+        answered with it.
+        """
+        self.original.asynchronous = True
+        first = self.request()
+        second = self.request()
+        third = self.request(method=b"HEAD")
+        self.assertEqual(second.value(), b"")
+
+        [request] = self.original.rendered
+        request.finish()
+        self.assertEqual(len(self.original.rendered), 1)
+        self.assertEqual(self.response(second)[2], b"response 1")
+        self.assertEqual(self.response(third)[:3:2], (http.OK, b""))
+        self.assertIn(b"response 1", first.value())
+        self.assertEqual(self.cache.statistics()["collapsed"], 2)
+
+
+    def test_collapsedNotStored(self):
+        """
+        If the response other requests were waiting for is not stored, they
+        are rendered.
+        """
+        self.original.asynchronous = True
+        self.original.headers[b"cache-control"] = b"no-store"
+        self.request()
+        self.request()
+        self.request()
+        self.original.rendered[0].finish()
+        self.assertEqual(len(self.original.rendered), 3)
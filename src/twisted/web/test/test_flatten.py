@@ -25,8 +25,10 @@ from twisted.web.error import UnfilledSlot, UnsupportedType, FlattenerError
 
 from twisted.web.template import tags, Tag, Comment, CDATA, CharRef, slot
 from twisted.web.template import Element, renderer, TagLoader, flattenString
+from twisted.web.template import XMLString
 
 from twisted.web.test._util import FlattenTestCase
+from twisted.web._flatten import _compile, _Precompiled
 
 
 
@@ -487,3 +489,130 @@ class FlattenerErrorTests(TestCase):
             "RuntimeError: reason\n" % (
                 HERE, f.__code__.co_firstlineno + 1,
                 HERE, g.__code__.co_firstlineno + 1))
+
+
+
+class CompileTests(FlattenTestCase):
+    """
+    Tests for L{_compile}.
+    """
+    def assertCompiledFlattensTo(self, root, target):
+        """
+        Assert that C{root} flattens to C{target} both before and after it is
+        compiled, and that compiling it does not modify it.
+        """
+        before = repr(root)
+        self.assertFlattensImmediately(root, target)
+        compiled = _compile(root)
+        self.assertEqual(repr(root), before)
+        self.assertFlattensImmediately(compiled, target)
+        return compiled
+
+
+    def test_static(self):
+        """
+        A template without slots or renderers is serialized completely.
+        """
+        compiled = self.assertCompiledFlattensTo(
+            [tags.html(
+                tags.head(tags.title(u'<&>')),
+                tags.body(Comment('x--'), CDATA(']]>'), CharRef(9731),
+                          tags.br(), tags.div(), a=u'"&"')),
+             u'\N{SNOWMAN}'],
+            b'<html><head><title>&lt;&amp;&gt;</title></head>'
+            b'<body a="&quot;&amp;&quot;"><!--x- - --><![CDATA[]]]]>'
+            b'<![CDATA[>]]>&#9731;<br /><div></div></body></html>'
+            b'\xe2\x98\x83')
+        self.assertEqual(len(compiled.parts), 1)
+
+
+    def test_holes(self):
+        """
+        Slots and tags with renderers are left in place between the static
+        contents around them.
+        """
+        self.assertCompiledFlattensTo(
+            tags.transparent(
+                tags.div(tags.p(u'a', slot('x'), u'b'), tags.br(slot('y')),
+                         id=u'1'),
+            ).fillSlots(x=u'<x>', y=u'y'),
+            b'<div id="1"><p>a&lt;x&gt;b</p><br>y</br></div>')
+        compiled = _compile(tags.div(
+            tags.p(u'a', slot('x'), u'b'), tags.span(u'c', render='r')))
+        self.assertEqual(
+            [type(part) for part in compiled.parts],
+            [bytes, slot, bytes, Tag, bytes])
+        self.assertEqual(compiled.parts[3].render, 'r')
+        self.assertEqual(compiled.parts[3].children, [u'c'])
+
+
+
+    def test_slotsAndRenderers(self):
+        """
+        An element's compiled template flattens as the original does, with
+        its slots filled and its renderers called with their tags and
+        children.
+        """
+        class Renderer(Element):
+            @renderer
+            def fill(self, request, tag):
+                return tag.fillSlots(x=u'<x>', y=[tags.b(u'"y"')])
+            @renderer
+            def repeat(self, request, tag):
+                return [tag.clone()(str(i)) for i in range(2)]
+            @renderer
+            def empty(self, request, tag):
+                return tag
+
+        template = tags.div(
+            tags.p(u'a', slot('x'), u'b', render='fill'),
+            tags.p(tags.a(href=slot('y')), render='fill'),
+            tags.ul(tags.li(u'<', tags.i(u'item')), render='repeat'),
+            tags.br(render='empty'),
+            tags.br(tags.transparent(render='empty')),
+            id=u'1')
+        element = Renderer(TagLoader(template))
+        self.assertFlattensImmediately(
+            element,
+            b'<div id="1"><p>a&lt;x&gt;b</p>'
+            b'<p><a href="&lt;b&gt;&quot;y&quot;&lt;/b&gt;"></a></p>'
+            b'<ul><li>&lt;<i>item</i></li>0</ul>'
+            b'<ul><li>&lt;<i>item</i></li>1</ul><br /><br></br></div>')
+
+
+    def test_rendererChildren(self):
+        """
+        Renderers in a compiled template are passed tags with the children
+        of the original, which they can look at and change.
+        """
+        class Renderer(Element):
+            loader = XMLString(
+                '<div xmlns:t="http://twistedmatrix.com/ns/'
+                'twisted.web.template/0.1"><p t:render="r"><b>x</b>hello</p>'
+                '</div>')
+
+            @renderer
+            def r(self, request, tag):
+                children = [child for child in tag.children
+                            if isinstance(child, Tag)]
+                tag.children[1] = u'%d' % (len(children),)
+                return tag(u'!')
+
+        element = Renderer()
+        self.assertIsInstance(element._renderCompiled(None), _Precompiled)
+        for i in range(2):
+            self.assertFlattensImmediately(
+                element, b'<div><p><b>x</b>1!</p></div>')
+
+
+    def test_inAttribute(self):
+        """
+        A compiled template placed in an attribute by a slot is quoted as
+        the original would be.
+        """
+        template = [u'<', tags.b(u'&', slot('y'), a=u'"'), u'>']
+        target = (b'<a href="&lt;&lt;b a=&quot;&amp;quot;&quot;&gt;&amp;amp;y'
+                  b'&lt;/b&gt;&gt;"></a>')
+        for value in [template, _compile(template)]:
+            self.assertFlattensImmediately(
+                tags.a(href=slot('x')).fillSlots(x=value, y=u'y'), target)
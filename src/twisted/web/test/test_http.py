@@ -14,18 +14,21 @@ try:
 except ImportError:
     from urllib.parse import urlparse, urlunsplit, clear_cache
 
-from zope.interface import provider
+from zope.interface import implementer, provider
 from zope.interface.verify import verifyObject
 
 from twisted.python.compat import (_PY3, iterbytes, networkString, unicode,
                                    intToBytes, NativeStringIO)
 from twisted.python.components import proxyForInterface
 from twisted.python.failure import Failure
+from twisted.python.filepath import FilePath
 from twisted.trial import unittest
 from twisted.trial.unittest import TestCase
-from twisted.web import http, http_headers, iweb
+from twisted.web import http, http_headers, iweb, static
 from twisted.web.http import PotentialDataLoss, _DataLoss
 from twisted.web.http import _IdentityTransferDecoder
+from twisted.internet import interfaces
+from twisted.internet.defer import succeed
 from twisted.internet.task import Clock
 from twisted.internet.error import ConnectionLost
 from twisted.protocols import loopback
@@ -577,6 +580,221 @@ class PipeliningBodyTests(unittest.TestCase, ResponseTestMixin):
 
 
 
+class PipelinedConcurrencyTests(unittest.TestCase):
+    """
+    Tests for the concurrent processing of pipelined requests by
+    L{HTTPChannel} when its C{maxConcurrentRequests} is more than one.
+    """
+    def setUp(self):
+        self.processed = []
+        processed = self.processed
+
+        class PendingRequest(http.Request):
+            def process(self):
+                processed.append(self)
+
+        self.channel = http.HTTPChannel()
+        self.channel.maxConcurrentRequests = 3
+        self.channel.requestFactory = PendingRequest
+        self.transport = StringTransport()
+        self.channel.makeConnection(self.transport)
+
+
+    def respond(self, request, body):
+        """
+        Write a response with the given body to a request and finish it.
+        """
+        request.setHeader(b"content-length", intToBytes(len(body)))
+        request.write(body)
+        request.finish()
+
+
+    def assertResponses(self, bodies):
+        """
+        Assert that the transport was written responses with the given
+        bodies, in order.
+        """
+        self.assertEqual(
+            self.transport.value(),
+            b"".join(
+                b"HTTP/1.1 200 OK\r\n"
+                b"Content-Length: " + intToBytes(len(body)) + b"\r\n"
+                b"\r\n" + body
+                for body in bodies))
+
+
+    def test_concurrent(self):
+        """
+        Up to C{maxConcurrentRequests} pipelined requests are processed at
+        once, and their responses are written in the order the requests were
+        received.
+        """
+        self.channel.dataReceived(
+            b"GET /a HTTP/1.1\r\n\r\n"
+            b"GET /b HTTP/1.1\r\n\r\n"
+            b"GET /c HTTP/1.1\r\n\r\n")
+        first, second, third = self.processed
+
+        self.respond(third, b"third")
+        self.respond(second, b"second")
+        self.assertEqual(self.transport.value(), b"")
+        self.respond(first, b"first")
+
+        self.assertResponses([b"first", b"second", b"third"])
+        self.assertEqual(self.channel.requests, [])
+        self.assertEqual(self.transport.producerState, "producing")
+
+
+    def test_limit(self):
+        """
+        Once C{maxConcurrentRequests} requests are being processed, the
+        transport is paused and no more requests are processed until one is
+        done.
+        """
+        self.channel.maxConcurrentRequests = 2
+        self.channel.dataReceived(
+            b"GET /a HTTP/1.1\r\n\r\n"
+            b"GET /b HTTP/1.1\r\n\r\n"
+            b"GET /c HTTP/1.1\r\n\r\n")
+        self.assertEqual(len(self.processed), 2)
+        self.assertEqual(self.transport.producerState, "paused")
+
+        self.respond(self.processed[0], b"first")
+        self.assertEqual(len(self.processed), 3)
+        self.assertEqual(self.processed[2].uri, b"/c")
+
+
+    def test_passThrough(self):
+        """
+        Once the responses before it have been written, the rest of a
+        response is written straight to the transport.
+        """
+        self.channel.dataReceived(
+            b"GET /a HTTP/1.1\r\n\r\n"
+            b"GET /b HTTP/1.1\r\n\r\n")
+        first, second = self.processed
+        second.setHeader(b"content-length", b"6")
+        second.write(b"sec")
+        self.respond(first, b"first")
+        second.write(b"ond")
+        self.assertResponses([b"first", b"second"])
+        second.finish()
+        self.assertEqual(self.channel.requests, [])
+
+
+    def test_bufferLimit(self):
+        """
+        Once the buffered responses exceed C{maxPipelineBufferSize} bytes, no
+        more requests are processed and the producers of buffered responses
+        are paused, until the response before them is done.
+        """
+        self.channel.maxPipelineBufferSize = 10
+        self.channel.dataReceived(
+            b"GET /a HTTP/1.1\r\n\r\n"
+            b"GET /b HTTP/1.1\r\n\r\n")
+        first, second = self.processed
+        producer = DummyProducer()
+        second.registerProducer(producer, True)
+        second.write(b"x" * 20)
+        self.assertEqual(producer.events, ["pause"])
+        self.assertEqual(self.transport.producerState, "paused")
+
+        self.channel.dataReceived(b"GET /c HTTP/1.1\r\n\r\n")
+        self.assertEqual(len(self.processed), 2)
+
+        self.respond(first, b"first")
+        self.assertEqual(producer.events, ["pause", "resume"])
+        self.assertIs(self.channel._requestProducer, producer)
+        self.assertEqual(len(self.processed), 3)
+
+
+    def test_fromFactory(self):
+        """
+        L{HTTPFactory.buildProtocol} gives its protocols the factory's
+        C{maxConcurrentRequests}.
+        """
+        factory = http.HTTPFactory(reactor=Clock())
+        self.assertEqual(factory.buildProtocol(None).maxConcurrentRequests, 1)
+        factory.maxConcurrentRequests = 4
+        self.assertEqual(factory.buildProtocol(None).maxConcurrentRequests, 4)
+
+
+    def test_connectionLost(self):
+        """
+        When the connection is lost, requests whose buffered responses were
+        finished are not told.
+        """
+        self.channel.dataReceived(
+            b"GET /a HTTP/1.1\r\n\r\n"
+            b"GET /b HTTP/1.1\r\n\r\n"
+            b"GET /c HTTP/1.1\r\n\r\n")
+        first, second, third = self.processed
+        finishes = [request.notifyFinish() for request in self.processed]
+        self.respond(second, b"second")
+        self.channel.connectionLost(Failure(ConnectionLost()))
+
+        self.failureResultOf(finishes[0], ConnectionLost)
+        self.assertIsNone(self.successResultOf(finishes[1]))
+        self.failureResultOf(finishes[2], ConnectionLost)
+
+
+    def test_notPersistent(self):
+        """
+        The connection is closed once all of the responses have been written
+        if a request asked for it to be closed.
+        """
+        self.channel.dataReceived(
+            b"GET /a HTTP/1.1\r\n\r\n"
+            b"GET /b HTTP/1.1\r\nConnection: close\r\n\r\n")
+        first, second = self.processed
+        self.respond(first, b"first")
+        self.assertFalse(self.transport.disconnecting)
+        self.respond(second, b"second")
+        self.assertTrue(self.transport.disconnecting)
+
+
+    def test_bufferedStaticFile(self):
+        """
+        A static file served in response to a request whose response is
+        buffered is written after the responses before it and after its own
+        headers, even if the transport can send files.
+        """
+        @implementer(interfaces.ISendFileTransport)
+        class SendFileTransport(StringTransport):
+            def sendFile(self, file, offset=0, count=None):
+                file.seek(offset)
+                self.write(file.read() if count is None else file.read(count))
+                return succeed(count)
+
+        self.transport = SendFileTransport()
+        self.channel.makeConnection(self.transport)
+        path = FilePath(self.mktemp())
+        path.setContent(b"second")
+
+        self.channel.dataReceived(
+            b"GET /a HTTP/1.1\r\n\r\n"
+            b"GET /b HTTP/1.1\r\n\r\n")
+        first, second = self.processed
+        static.File(path.path, defaultType="text/plain").render(second)
+        self.assertEqual(self.transport.value(), b"")
+
+        finished = second.notifyFinish()
+        self.respond(first, b"first")
+        def written(ignored):
+            value = self.transport.value()
+            self.assertTrue(value.startswith(
+                b"HTTP/1.1 200 OK\r\n"
+                b"Content-Length: 5\r\n"
+                b"\r\n"
+                b"first"
+                b"HTTP/1.1 200 OK\r\n"), value)
+            self.assertTrue(value.endswith(b"\r\n\r\nsecond"), value)
+            self.assertEqual(value.count(b"second"), 1)
+        finished.addCallback(written)
+        return finished
+
+
+
 class ShutdownTests(unittest.TestCase):
     """
     Tests that connections can be shut down by L{http.Request} objects.
@@ -1845,6 +2063,169 @@ Hello,
 
 
 
+class HeadParsingTests(unittest.TestCase):
+    """
+    Tests for the parsing by L{HTTPChannel} of request heads which are
+    received whole, rather than a line at a time.
+    """
+    def setUp(self):
+        self.processed = []
+        processed = self.processed
+
+        class MyRequest(http.Request):
+            def process(self):
+                self.body = self.content.read()
+                processed.append(self)
+                self.finish()
+
+        self.channel = http.HTTPChannel()
+        self.channel.requestFactory = _makeRequestProxyFactory(MyRequest)
+        self.transport = StringTransport()
+        self.channel.makeConnection(self.transport)
+
+
+    def assertBadRequest(self):
+        """
+        Assert that the channel responded with I{400 Bad Request}, closed the
+        connection and processed no request.
+        """
+        self.assertEqual(self.processed, [])
+        self.assertEqual(
+            self.transport.value(), b"HTTP/1.1 400 Bad Request\r\n\r\n")
+        self.assertTrue(self.transport.disconnecting)
+
+
+    def test_pipelined(self):
+        """
+        Several requests received at once are each parsed and processed in
+        turn.
+        """
+        self.channel.dataReceived(
+            b"GET /first HTTP/1.1\r\n"
+            b"Foo: bar\r\n"
+            b"Foo: baz\r\n"
+            b"\r\n"
+            b"POST /second HTTP/1.1\r\n"
+            b"Content-Length: 3\r\n"
+            b"\r\n"
+            b"abc")
+        first, second = self.processed
+        self.assertEqual(first.uri, b"/first")
+        self.assertEqual(
+            first.requestHeaders.getRawHeaders(b"foo"), [b"bar", b"baz"])
+        self.assertEqual(second.method, b"POST")
+        self.assertEqual(second.body, b"abc")
+
+
+    def test_split(self):
+        """
+        A head received in several parts is parsed once it is complete.
+        """
+        self.channel.dataReceived(b"GET / HTTP/1.1\r\nFoo: b")
+        self.assertEqual(self.processed, [])
+        self.channel.dataReceived(b"ar\r\n\r\n")
+        [request] = self.processed
+        self.assertEqual(
+            request.requestHeaders.getRawHeaders(b"foo"), [b"bar"])
+
+
+    def test_multilineHeader(self):
+        """
+        A header line starting with whitespace continues the header before
+        it.
+        """
+        self.channel.dataReceived(
+            b"GET / HTTP/1.1\r\n"
+            b"Foo: bar\r\n"
+            b"\tbaz\r\n"
+            b"\r\n")
+        [request] = self.processed
+        self.assertEqual(
+            request.requestHeaders.getRawHeaders(b"foo"), [b"bar\n\tbaz"])
+
+
+    def test_tooManyHeaders(self):
+        """
+        A head with more than C{maxHeaders} headers is rejected.
+        """
+        self.channel.maxHeaders = 2
+        self.channel.dataReceived(
+            b"GET / HTTP/1.1\r\n" + b"Foo: bar\r\n" * 3 + b"\r\n")
+        self.assertBadRequest()
+
+
+    def test_headersTooBig(self):
+        """
+        A head longer than C{totalHeadersSize}, not counting line delimiters,
+        is rejected.
+        """
+        self.channel.totalHeadersSize = 30
+        self.channel.dataReceived(
+            b"GET / HTTP/1.1\r\n"
+            b"Some-Header: too-long\r\n"
+            b"\r\n")
+        self.assertBadRequest()
+
+
+    def test_invalidHeader(self):
+        """
+        A header line without a colon is rejected.
+        """
+        self.channel.dataReceived(b"GET / HTTP/1.1\r\nFoo\r\n\r\n")
+        self.assertBadRequest()
+
+
+    def test_invalidRequestLine(self):
+        """
+        A request line without exactly three parts is rejected.
+        """
+        self.channel.dataReceived(b"GET /\r\nFoo: bar\r\n\r\n")
+        self.assertBadRequest()
+
+
+    def test_headerReceivedOverridden(self):
+        """
+        If L{HTTPChannel.headerReceived} is overridden, it is called with
+        each header line of a head received whole.
+        """
+        headers = []
+        class HeaderChannel(http.HTTPChannel):
+            def headerReceived(self, line):
+                headers.append(line)
+                return http.HTTPChannel.headerReceived(self, line)
+
+        channel = HeaderChannel()
+        channel.requestFactory = self.channel.requestFactory
+        channel.makeConnection(StringTransport())
+        channel.dataReceived(
+            b"GET / HTTP/1.1\r\n"
+            b"Foo: bar\r\n"
+            b"Baz: quux\r\n"
+            b"\r\n")
+        self.assertEqual(headers, [b"Foo: bar", b"Baz: quux"])
+        self.assertEqual(len(self.processed), 1)
+
+
+    def test_lineReceivedOverridden(self):
+        """
+        If L{HTTPChannel.lineReceived} is overridden, it is called with each
+        line of a head received whole.
+        """
+        lines = []
+        class LineChannel(http.HTTPChannel):
+            def lineReceived(self, line):
+                lines.append(line)
+                return http.HTTPChannel.lineReceived(self, line)
+
+        channel = LineChannel()
+        channel.requestFactory = self.channel.requestFactory
+        channel.makeConnection(StringTransport())
+        channel.dataReceived(b"GET / HTTP/1.1\r\nFoo: bar\r\n\r\n")
+        self.assertEqual(lines, [b"GET / HTTP/1.1", b"Foo: bar", b""])
+        self.assertEqual(len(self.processed), 1)
+
+
+
 class QueryArgumentsTests(unittest.TestCase):
     def testParseqs(self):
         self.assertEqual(
@@ -0,0 +1,510 @@
+# Copyright (c) Twisted Matrix Laboratories.
+# See LICENSE for details.
+
+"""
+Tests for the HTTP/2 client, L{twisted.web._http2client}, and its use by
+L{twisted.web.client.HTTPConnectionPool}.
+"""
+
+from __future__ import absolute_import, division
+
+from zope.interface import implementer
+
+from twisted.internet.defer import CancelledError, Deferred, succeed
+from twisted.internet.error import ConnectionDone
+from twisted.internet.interfaces import INegotiated
+from twisted.internet.task import Clock
+from twisted.python.failure import Failure
+from twisted.test.proto_helpers import StringTransport
+from twisted.trial import unittest
+from twisted.web.client import HTTPConnectionPool, readBody
+from twisted.web.client import _HTTPClientProtocolNegotiator
+from twisted.web.http_headers import Headers
+from twisted.web.iweb import UNKNOWN_LENGTH
+from twisted.web._newclient import (
+    Request, RequestNotSent, ResponseNeverReceived)
+from twisted.web.test.test_agent import DummyEndpoint
+
+skipH2 = None
+
+try:
+    from twisted.web._http2client import H2ClientProtocol
+
+    # These third-party imports are guaranteed to be present if HTTP/2 support
+    # is compiled in. We do not use them in the main code: only in the tests.
+    import h2.connection
+    import h2.errors
+    import h2.events
+    import h2.settings
+    import hyperframe.frame
+except ImportError:
+    skipH2 = "HTTP/2 support not enabled"
+
+
+
+def makeRequest(method=b"GET", path=b"/", bodyProducer=None):
+    """
+    Make a L{Request} for C{https://example.com}.
+    """
+    headers = Headers({b"host": [b"example.com"],
+                       b"connection": [b"close"],
+                       b"user-agent": [b"test"]})
+    return Request._construct(method, path, headers, bodyProducer)
+
+
+
+class ServerConnection(object):
+    """
+    The server side of an HTTP/2 connection to a L{H2ClientProtocol}, which
+    records the events it receives.
+
+    @ivar conn: The server's HTTP/2 connection state machine.
+
+    @ivar client: The L{H2ClientProtocol}.
+
+    @ivar events: The events received from the client.
+    """
+    def __init__(self, client):
+        self.conn = h2.connection.H2Connection(
+            client_side=False, header_encoding=None)
+        self.conn.initiate_connection()
+        self.client = client
+        self.events = []
+
+
+    def receive(self):
+        """
+        Receive whatever the client has written.
+        """
+        data = self.client.transport.value()
+        self.client.transport.clear()
+        self.events.extend(self.conn.receive_data(data))
+
+
+    def send(self):
+        """
+        Send whatever the server has to send to the client, and receive the
+        client's reply.
+        """
+        data = self.conn.data_to_send()
+        if data:
+            self.client.dataReceived(data)
+        self.receive()
+
+
+    def requests(self):
+        """
+        @return: A L{dict} mapping stream IDs to the headers of the requests
+            received on them.
+        """
+        return dict((event.stream_id, dict(event.headers))
+                    for event in self.events
+                    if isinstance(event, h2.events.RequestReceived))
+
+
+    def body(self, streamID):
+        """
+        @return: The request body received on the stream C{streamID}.
+        """
+        return b"".join(event.data for event in self.events
+                        if isinstance(event, h2.events.DataReceived) and
+                        event.stream_id == streamID)
+
+
+    def ended(self, streamID):
+        """
+        @return: Whether the client has ended the stream C{streamID}.
+        """
+        return any(isinstance(event, h2.events.StreamEnded) and
+                   event.stream_id == streamID for event in self.events)
+
+
+    def respond(self, streamID, body=b"", code=b"200"):
+        """
+        Send a complete response on the stream C{streamID}.
+        """
+        self.conn.send_headers(
+            streamID, [(b":status", code), (b"content-type", b"text/plain")],
+            end_stream=not body)
+        if body:
+            self.conn.send_data(streamID, body, end_stream=True)
+        self.send()
+
+
+
+class BodyProducer(object):
+    """
+    A request body producer which writes its data when told to, and records
+    whether it has been paused.
+
+    @ivar consumer: The consumer, once producing has started.
+
+    @ivar paused: Whether the producer is paused.
+
+    @ivar stopped: Whether the producer has been stopped.
+
+    @ivar finished: The L{Deferred} returned by C{startProducing}.
+    """
+    length = UNKNOWN_LENGTH
+    consumer = None
+    paused = False
+    stopped = False
+
+    def __init__(self):
+        self.finished = Deferred()
+
+
+    def startProducing(self, consumer):
+        self.consumer = consumer
+        return self.finished
+
+
+    def pauseProducing(self):
+        self.paused = True
+
+
+    def resumeProducing(self):
+        self.paused = False
+
+
+    def stopProducing(self):
+        self.stopped = True
+
+
+
+class H2ClientProtocolTests(unittest.TestCase):
+    """
+    Tests for L{H2ClientProtocol}.
+    """
+    if skipH2:
+        skip = skipH2
+
+    def setUp(self):
+        self.lost = []
+        self.client = H2ClientProtocol(self.lost.append)
+        self.client.makeConnection(StringTransport())
+        self.server = ServerConnection(self.client)
+        self.server.receive()
+        self.server.send()
+
+
+    def test_request(self):
+        """
+        A request is sent with the HTTP/2 pseudo-headers and without the
+        connection-specific headers, and the response is delivered as a
+        L{twisted.web._newclient.Response}.
+        """
+        d = self.client.request(makeRequest(path=b"/foo"))
+        self.server.receive()
+        headers = self.server.requests()[1]
+        self.assertEqual(headers[b":method"], b"GET")
+        self.assertEqual(headers[b":scheme"], b"https")
+        self.assertEqual(headers[b":authority"], b"example.com")
+        self.assertEqual(headers[b":path"], b"/foo")
+        self.assertEqual(headers[b"user-agent"], b"test")
+        self.assertNotIn(b"connection", headers)
+        self.assertNotIn(b"host", headers)
+        self.assertTrue(self.server.ended(1))
+
+        self.server.respond(1, b"hello")
+        response = self.successResultOf(d)
+        self.assertEqual(response.version, (b"HTTP", 2, 0))
+        self.assertEqual(response.code, 200)
+        self.assertEqual(response.phrase, b"OK")
+        self.assertEqual(
+            response.headers.getRawHeaders(b"content-type"), [b"text/plain"])
+        self.assertEqual(self.successResultOf(readBody(response)), b"hello")
+        self.assertEqual(self.client.streams, {})
+
+
+    def test_multiplexed(self):
+        """
+        Many requests are in progress at once, each on its own stream, and
+        the responses may arrive in any order.
+        """
+        first = self.client.request(makeRequest(path=b"/first"))
+        second = self.client.request(makeRequest(path=b"/second"))
+        self.server.receive()
+        self.assertEqual(sorted(self.server.requests()), [1, 3])
+
+        self.server.respond(3, b"second")
+        self.assertNoResult(first)
+        self.server.respond(1, b"first")
+        self.assertEqual(
+            self.successResultOf(readBody(self.successResultOf(second))),
+            b"second")
+        self.assertEqual(
+            self.successResultOf(readBody(self.successResultOf(first))),
+            b"first")
+
+
+    def test_maxConcurrentStreams(self):
+        """
+        Requests past the server's limit on concurrent streams wait until a
+        stream is done.
+        """
+        self.server.conn.update_settings(
+            {h2.settings.MAX_CONCURRENT_STREAMS: 1})
+        self.server.send()
+        first = self.client.request(makeRequest())
+        second = self.client.request(makeRequest())
+        self.server.receive()
+        self.assertEqual(list(self.server.requests()), [1])
+
+        self.server.respond(1)
+        self.successResultOf(first)
+        self.assertEqual(sorted(self.server.requests()), [1, 3])
+        self.server.respond(3)
+        self.successResultOf(second)
+
+
+    def test_requestBodyFlowControl(self):
+        """
+        Request body data is only sent as far as the stream's flow-control
+        window allows, and the body producer is paused until the server opens
+        the window further.
+        """
+        self.server.conn.update_settings(
+            {h2.settings.INITIAL_WINDOW_SIZE: 4})
+        self.server.send()
+        producer = BodyProducer()
+        d = self.client.request(makeRequest(b"POST", bodyProducer=producer))
+        producer.consumer.write(b"0123456789")
+        self.server.receive()
+        self.assertEqual(self.server.body(1), b"0123")
+        self.assertTrue(producer.paused)
+
+        self.server.conn.increment_flow_control_window(10, 1)
+        self.server.send()
+        self.assertEqual(self.server.body(1), b"0123456789")
+        self.assertFalse(producer.paused)
+        self.assertFalse(self.server.ended(1))
+
+        producer.finished.callback(None)
+        self.server.receive()
+        self.assertTrue(self.server.ended(1))
+        self.server.respond(1)
+        self.assertEqual(self.successResultOf(d).code, 200)
+
+
+    def test_responseBodyFlowControl(self):
+        """
+        Response body data is not acknowledged, so the server can not send
+        more, until a protocol is delivered to the response and while the
+        response is paused.
+        """
+        d = self.client.request(makeRequest())
+        self.server.receive()
+        self.server.conn.send_headers(1, [(b":status", b"200")])
+        self.server.conn.send_data(1, b"x" * 16384)
+        self.server.conn.send_data(1, b"x" * 16384)
+        self.server.conn.send_data(1, b"x" * 16384)
+        self.server.send()
+        window = self.server.conn.local_flow_control_window(1)
+
+        response = self.successResultOf(d)
+        body = readBody(response)
+        self.server.receive()
+        self.assertGreater(self.server.conn.local_flow_control_window(1),
+                           window)
+
+        self.server.conn.end_stream(1)
+        self.server.send()
+        self.assertEqual(len(self.successResultOf(body)), 3 * 16384)
+
+
+    def test_streamReset(self):
+        """
+        If the server resets the stream before responding, the request fails
+        with L{ResponseNeverReceived}.
+        """
+        d = self.client.request(makeRequest())
+        self.server.receive()
+        self.server.conn.reset_stream(1, h2.errors.REFUSED_STREAM)
+        self.server.send()
+        self.failureResultOf(d, ResponseNeverReceived)
+        self.assertEqual(self.client.streams, {})
+
+
+    def test_goAway(self):
+        """
+        When the server sends I{GOAWAY}, requests on streams it will not
+        process fail with L{ResponseNeverReceived}, so they may be retried
+        elsewhere, while the others are left to complete, and new requests
+        fail with L{RequestNotSent}.
+        """
+        first = self.client.request(makeRequest())
+        second = self.client.request(makeRequest())
+        self.server.receive()
+        # The server's state machine can not send anything after GOAWAY, so
+        # the frame is built by hand.
+        goAway = hyperframe.frame.GoAwayFrame(0)
+        goAway.last_stream_id = 1
+        self.client.dataReceived(goAway.serialize())
+        self.failureResultOf(second, ResponseNeverReceived)
+        self.assertNoResult(first)
+        self.assertFalse(self.client.acceptingRequests)
+        self.failureResultOf(self.client.request(makeRequest()),
+                             RequestNotSent)
+
+
+    def test_connectionLost(self):
+        """
+        When the connection is lost, requests in progress fail and the
+        connection lost callback is called.
+        """
+        d = self.client.request(makeRequest())
+        self.client.connectionLost(Failure(ConnectionDone()))
+        self.failureResultOf(d, ResponseNeverReceived)
+        self.assertEqual(self.lost, [self.client])
+        self.failureResultOf(self.client.request(makeRequest()),
+                             RequestNotSent)
+
+
+    def test_cancel(self):
+        """
+        Cancelling a request resets its stream.
+        """
+        d = self.client.request(makeRequest())
+        d.cancel()
+        self.failureResultOf(d, CancelledError)
+        self.server.receive()
+        self.assertTrue(any(isinstance(event, h2.events.StreamReset)
+                            for event in self.server.events))
+        self.assertEqual(self.client.streams, {})
+
+
+
+@implementer(INegotiated)
+class NegotiatedTransport(StringTransport):
+    """
+    A transport which has negotiated a protocol during a TLS handshake.
+    """
+    negotiatedProtocol = b"h2"
+
+
+
+class NegotiatingEndpoint(object):
+    """
+    An endpoint whose connections negotiate HTTP/2 during a TLS handshake,
+    which completes when told to.
+
+    @ivar protocols: The protocols connected.
+    """
+    def __init__(self):
+        self.protocols = []
+
+
+    def connect(self, factory):
+        protocol = factory.buildProtocol(None)
+        protocol.makeConnection(NegotiatedTransport())
+        self.protocols.append(protocol)
+        return succeed(protocol)
+
+
+
+class NegotiationTests(unittest.TestCase):
+    """
+    Tests for L{_HTTPClientProtocolNegotiator} and HTTP/2 support in
+    L{HTTPConnectionPool}.
+    """
+    if skipH2:
+        skip = skipH2
+
+    def setUp(self):
+        self.pool = HTTPConnectionPool(Clock())
+        self.pool.http2 = True
+        self.endpoint = NegotiatingEndpoint()
+
+
+    def test_http2Negotiated(self):
+        """
+        Requests issued before the TLS handshake completes are issued with
+        HTTP/2 if it is negotiated, and the connection is shared by all
+        requests for its key.
+        """
+        negotiator = self.successResultOf(
+            self.pool.getConnection("foo", self.endpoint))
+        self.assertIsInstance(negotiator, _HTTPClientProtocolNegotiator)
+        d = negotiator.request(makeRequest())
+        negotiator.handshakeCompleted()
+        self.assertNoResult(d)
+
+        connection = self.successResultOf(negotiator.chosen())
+        self.assertIsInstance(connection, H2ClientProtocol)
+        self.assertEqual(list(connection.streams), [1])
+        self.assertIs(
+            self.successResultOf(self.pool.getConnection("foo", self.endpoint)),
+            connection)
+        self.assertEqual(len(self.endpoint.protocols), 1)
+
+
+    def test_http11Negotiated(self):
+        """
+        If the server does not agree to speak HTTP/2, HTTP/1.1 is spoken.
+        """
+        negotiator = self.successResultOf(
+            self.pool.getConnection("foo", self.endpoint))
+        negotiator.transport.negotiatedProtocol = None
+        negotiator.request(makeRequest())
+        negotiator.handshakeCompleted()
+        connection = self.successResultOf(negotiator.chosen())
+        self.assertEqual(connection.state, "WAITING")
+        self.assertIn(b"GET / HTTP/1.1", negotiator.transport.value())
+
+
+    def test_withoutTLS(self):
+        """
+        HTTP/1.1 is spoken right away over connections without TLS.
+        """
+        negotiator = self.successResultOf(
+            self.pool.getConnection("foo", DummyEndpoint()))
+        connection = self.successResultOf(negotiator.chosen())
+        self.assertEqual(connection.state, "QUIESCENT")
+
+
+    def test_http2ConnectionLost(self):
+        """
+        A shared HTTP/2 connection which is lost is no longer used.
+        """
+        negotiator = self.successResultOf(
+            self.pool.getConnection("foo", self.endpoint))
+        negotiator.handshakeCompleted()
+        negotiator.connectionLost(Failure(ConnectionDone()))
+        self.assertEqual(self.pool._http2Connections, {})
+        self.assertEqual(self.pool.statistics()["active"], 0)
+
+
+    def test_duplicateClosedWhenIdle(self):
+        """
+        If a second connection for the same key negotiates HTTP/2, it is
+        closed once its own requests are done.
+        """
+        first = self.successResultOf(
+            self.pool.getConnection("foo", self.endpoint))
+        second = self.successResultOf(
+            self.pool.getConnection("foo", self.endpoint))
+        second.request(makeRequest())
+        first.handshakeCompleted()
+        second.handshakeCompleted()
+
+        connection = self.successResultOf(second.chosen())
+        self.assertTrue(connection.closeWhenIdle)
+        self.assertFalse(second.transport.disconnecting)
+        self.assertIs(
+            self.pool._http2Connections["foo"],
+            self.successResultOf(first.chosen()))
+
+
+    def test_prewarm(self):
+        """
+        L{HTTPConnectionPool.prewarm} shares a connection which negotiates
+        HTTP/2 rather than caching it.
+        """
+        d = self.pool.prewarm("foo", self.endpoint, 1)
+        self.assertNoResult(d)
+        [negotiator] = self.endpoint.protocols
+        negotiator.handshakeCompleted()
+        self.assertEqual(self.successResultOf(d), 1)
+        self.assertEqual(self.pool._connections, {})
+        self.assertIn("foo", self.pool._http2Connections)
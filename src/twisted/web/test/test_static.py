@@ -13,20 +13,33 @@ import re
 
 from io import BytesIO as StringIO
 
+from zope.interface import implementer
 from zope.interface.verify import verifyObject
 
 from twisted.internet import abstract, interfaces
+from twisted.internet.defer import Deferred
+from twisted.internet.error import ConnectionLost
+from twisted.internet.task import Clock
 from twisted.python.runtime import platform
 from twisted.python.filepath import FilePath
 from twisted.python import log
 from twisted.python.compat import intToBytes, networkString, _PY3
+from twisted.python.reflect import requireModule
 from twisted.trial.unittest import TestCase
 from twisted.web import static, http, script, resource
 from twisted.web.server import UnsupportedMethod
-from twisted.web.test.requesthelper import DummyRequest
+from twisted.web.test.requesthelper import DummyRequest, DummyChannel
 from twisted.web.test._util import _render
 from twisted.web._responses import FOUND
 
+if requireModule("OpenSSL") is not None:
+    from twisted.internet.protocol import Protocol, ServerFactory
+    from twisted.protocols.tls import TLSMemoryBIOFactory
+    from twisted.test.ssl_helpers import ServerTLSContext
+    tlsSkip = None
+else:
+    tlsSkip = "pyOpenSSL is required for TLS tests."
+
 
 class StaticDataTests(TestCase):
     """
@@ -446,6 +459,239 @@ class StaticFileTests(TestCase):
         self.assertTrue(fakeFile.closed)
 
 
+    def _makePrecompressed(self):
+        """
+        Create a directory containing C{foo.js} and a gzip-compressed copy
+        of it, C{foo.js.gz}.
+
+        @return: A L{static.File} for the directory, serving compressed copies.
+        """
+        base = FilePath(self.mktemp())
+        base.makedirs()
+        base.child("foo.js").setContent(b"plain")
+        base.child("foo.js.gz").setContent(b"compressed")
+        file = static.File(base.path)
+        file.precompressed = True
+        return file
+
+
+    def test_precompressed(self):
+        """
+        If C{precompressed} is true and the client accepts gzip encoding, the
+        contents of a fresh sibling file with a C{.gz} extension are served,
+        with the content type of the requested file.
+        """
+        file = self._makePrecompressed()
+        request = DummyRequest([b'foo.js'])
+        request.requestHeaders.setRawHeaders(
+            b'accept-encoding', [b'deflate, gzip;q=1.0'])
+        child = resource.getChildForRequest(file, request)
+        self.successResultOf(_render(child, request))
+
+        self.assertEqual(b''.join(request.written), b'compressed')
+        headers = request.responseHeaders
+        self.assertEqual(headers.getRawHeaders(b'content-encoding'),
+                         [b'gzip'])
+        self.assertEqual(headers.getRawHeaders(b'content-type'),
+                         [networkString(mimetypes.types_map['.js'])])
+        self.assertEqual(headers.getRawHeaders(b'content-length'), [b'10'])
+        self.assertEqual(headers.getRawHeaders(b'vary'),
+                         [b'accept-encoding'])
+
+
+    def test_precompressedNotAccepted(self):
+        """
+        If the client does not accept gzip encoding, the requested file is
+        served, and the response varies with the I{Accept-Encoding} header.
+        """
+        file = self._makePrecompressed()
+        request = DummyRequest([b'foo.js'])
+        child = resource.getChildForRequest(file, request)
+        self.successResultOf(_render(child, request))
+
+        self.assertEqual(b''.join(request.written), b'plain')
+        headers = request.responseHeaders
+        self.assertIsNone(headers.getRawHeaders(b'content-encoding'))
+        self.assertEqual(headers.getRawHeaders(b'vary'),
+                         [b'accept-encoding'])
+
+
+    def test_precompressedStale(self):
+        """
+        A compressed copy older than the requested file is not served.
+        """
+        file = self._makePrecompressed()
+        compressed = file.child("foo.js.gz")
+        os.utime(compressed.path, (0, 0))
+        request = DummyRequest([b'foo.js'])
+        request.requestHeaders.setRawHeaders(b'accept-encoding', [b'gzip'])
+        child = resource.getChildForRequest(file, request)
+        self.successResultOf(_render(child, request))
+
+        self.assertEqual(b''.join(request.written), b'plain')
+        self.assertIsNone(request.responseHeaders.getRawHeaders(b'vary'))
+
+
+    def test_precompressedDisabled(self):
+        """
+        Compressed copies are not served unless C{precompressed} is true.
+        """
+        file = self._makePrecompressed()
+        file.precompressed = False
+        request = DummyRequest([b'foo.js'])
+        request.requestHeaders.setRawHeaders(b'accept-encoding', [b'gzip'])
+        child = resource.getChildForRequest(file, request)
+        self.successResultOf(_render(child, request))
+
+        self.assertEqual(b''.join(request.written), b'plain')
+
+
+
+class FileCacheTests(TestCase):
+    """
+    Tests for L{static.FileCache} and its use by L{static.File}.
+    """
+    def setUp(self):
+        self.clock = Clock()
+        self.base = FilePath(self.mktemp())
+        self.base.makedirs()
+        self.base.child("icon.png").setContent(b"0123456789")
+        self.cache = static.FileCache(
+            ttl=5, maxSize=25, maxFileSize=10, reactor=self.clock)
+        self.root = static.File(self.base.path)
+        self.root.fileCache = self.cache
+
+
+    def _get(self, name, headers=()):
+        """
+        Render a request for a child of the root.
+
+        @return: The request, once rendered.
+        """
+        request = DummyRequest([name])
+        for header, value in headers:
+            request.requestHeaders.setRawHeaders(header, [value])
+        child = resource.getChildForRequest(self.root, request)
+        self.successResultOf(_render(child, request))
+        return request
+
+
+    def test_children(self):
+        """
+        The L{static.File} found for a child is reused, with its content
+        type, until the cache's C{ttl} has passed.
+        """
+        first = self.root.getChild(b"icon.png", DummyRequest([]))
+        self.assertIs(first.fileCache, self.cache)
+        self._get(b"icon.png")
+        self.assertIs(self.root.getChild(b"icon.png", DummyRequest([])),
+                      first)
+        self.assertEqual(first.type, "image/png")
+        self.clock.advance(5)
+        self.assertIsNot(self.root.getChild(b"icon.png", DummyRequest([])),
+                         first)
+
+
+    def test_stat(self):
+        """
+        The results of C{stat}, including failures, are reused until the
+        cache's C{ttl} has passed.
+        """
+        path = self.base.child("icon.png").asBytesMode().path
+        icon = static.File(path)
+        icon.fileCache = self.cache
+        self.assertTrue(icon.exists())
+        os.remove(path)
+        icon.restat(False)
+        self.assertTrue(icon.exists())
+
+        self.clock.advance(5)
+        icon.restat(False)
+        self.assertFalse(icon.exists())
+        self.base.child("icon.png").setContent(b"")
+        self.assertRaises(OSError, self.cache.stat, path)
+
+
+
+    def test_contents(self):
+        """
+        Small files are answered from memory until their size or
+        modification time changes.
+        """
+        self.assertEqual(self._get(b"icon.png").written, [b"0123456789"])
+        icon = self.base.child("icon.png")
+        mtime = icon.getModificationTime()
+        icon.setContent(b"abcdefghij")
+        os.utime(icon.path, (mtime, mtime))
+        request = self._get(b"icon.png")
+        self.assertEqual(request.written, [b"0123456789"])
+        self.assertEqual(
+            request.responseHeaders.getRawHeaders(b"content-length"), [b"10"])
+
+        os.utime(icon.path, (mtime + 10, mtime + 10))
+        self.clock.advance(5)
+        self.assertEqual(self._get(b"icon.png").written, [b"abcdefghij"])
+
+
+    def test_largeFiles(self):
+        """
+        Files larger than C{maxFileSize} are read from disk every time.
+        """
+        self.base.child("large.json").setContent(b"x" * 11)
+        request = self._get(b"large.json")
+        self.assertEqual(b"".join(request.written), b"x" * 11)
+        self.assertEqual(self.cache._size, 0)
+
+
+    def test_sizeLimit(self):
+        """
+        The least recently used contents are discarded to keep the total
+        within C{maxSize}.
+        """
+        for name in [b"a", b"b", b"c"]:
+            self.base.child(name.decode("ascii")).setContent(b"x" * 10)
+        self._get(b"a")
+        self._get(b"b")
+        self._get(b"a")
+        self._get(b"c")
+        self.assertEqual(
+            list(self.cache._contents),
+            [self.base.child(name).asBytesMode().path for name in "ac"])
+        self.assertEqual(self.cache._size, 20)
+
+
+    def test_range(self):
+        """
+        Range requests for small files are answered from memory.
+        """
+        self._get(b"icon.png")
+        icon = self.base.child("icon.png")
+        mtime = icon.getModificationTime()
+        icon.setContent(b"abcdefghij")
+        os.utime(icon.path, (mtime, mtime))
+        request = self._get(b"icon.png", [(b"range", b"bytes=2-4")])
+        self.assertEqual(request.responseCode, http.PARTIAL_CONTENT)
+        self.assertEqual(b"".join(request.written), b"234")
+
+
+
+    def test_etag(self):
+        """
+        Responses include an I{ETag} derived from the size and modification
+        time of the file, and requests whose I{If-None-Match} header matches
+        it get no body.
+        """
+        request = DummyRequest([b"icon.png"])
+        tags = []
+        request.setETag = lambda tag: tags.append(tag) or http.CACHED
+        child = resource.getChildForRequest(self.root, request)
+        self.successResultOf(_render(child, request))
+        mtime = self.base.child("icon.png").getModificationTime()
+        self.assertEqual(tags, [networkString(
+            '"%x-a"' % (int(mtime * 1000000),))])
+        self.assertEqual(b"".join(request.written), b"")
+
+
 
 class StaticMakeProducerTests(TestCase):
     """
@@ -760,6 +1006,56 @@ class StaticMakeProducerTests(TestCase):
 
 
 
+@implementer(interfaces.ISendFileTransport)
+class SendFileTransport(DummyChannel.TCP):
+    """
+    A fake transport which records calls to C{sendFile}.
+
+    @ivar sends: A L{list} of C{(file, offset, count, deferred)} tuples, one
+        for each call to C{sendFile}.
+
+    @ivar refuse: If C{True}, C{sendFile} raises L{ValueError}.
+    """
+    refuse = False
+
+    def __init__(self):
+        DummyChannel.TCP.__init__(self)
+        self.sends = []
+
+
+    def sendFile(self, file, offset=0, count=None):
+        if self.refuse:
+            raise ValueError("Not this time.")
+        d = Deferred()
+        self.sends.append((file, offset, count, d))
+        return d
+
+
+
+class SendFileTestsMixin(object):
+    """
+    Helpers for testing the use of L{interfaces.ISendFileTransport} by
+    L{static.StaticProducer} subclasses.
+    """
+
+    def makeRequest(self, size):
+        """
+        Make a request whose channel's transport can send files.
+
+        @param size: The content length of the response.
+
+        @return: A L{http.Request} for a I{GET} using HTTP/1.1.
+        """
+        channel = DummyChannel()
+        channel.transport = SendFileTransport()
+        request = http.Request(channel, False)
+        request.method = b'GET'
+        request.clientproto = b'HTTP/1.1'
+        request.setHeader(b'content-length', intToBytes(size))
+        return request
+
+
+
 class StaticProducerTests(TestCase):
     """
     Tests for the abstract L{StaticProducer}.
@@ -789,7 +1085,7 @@ class StaticProducerTests(TestCase):
 
 
 
-class NoRangeStaticProducerTests(TestCase):
+class NoRangeStaticProducerTests(SendFileTestsMixin, TestCase):
     """
     Tests for L{NoRangeStaticProducer}.
     """
@@ -857,8 +1153,117 @@ class NoRangeStaticProducerTests(TestCase):
         self.assertEqual([None], callbackList)
 
 
+    def test_sendFile(self):
+        """
+        If the request's transport provides L{interfaces.ISendFileTransport},
+        L{NoRangeStaticProducer.start} writes the headers and then sends the
+        whole file with C{sendFile}, finishing the request and closing the
+        file once it has been sent.
+        """
+        request = self.makeRequest(6)
+        transport = request.channel.transport
+        fileObject = StringIO(b'abcdef')
+        producer = static.NoRangeStaticProducer(request, fileObject)
+        producer.start()
+        self.assertEqual(transport.producers, [])
+        self.assertTrue(request.startedWriting)
+        [(sentFile, offset, count, d)] = transport.sends
+        self.assertEqual((sentFile, offset, count), (fileObject, 0, None))
+        self.assertFalse(request.finished)
+        d.callback(6)
+        self.assertTrue(request.finished)
+        self.assertEqual(request.sentLength, 6)
+        self.assertTrue(fileObject.closed)
+
+
+    def test_sendFileRefused(self):
+        """
+        If C{sendFile} raises L{ValueError}, L{NoRangeStaticProducer.start}
+        registers itself as a producer to write the file instead.
+        """
+        request = self.makeRequest(6)
+        transport = request.channel.transport
+        transport.refuse = True
+        producer = static.NoRangeStaticProducer(request, StringIO(b'abcdef'))
+        producer.start()
+        self.assertEqual(transport.producers, [(producer, False)])
+
+
+    def test_sendFileNotEncoded(self):
+        """
+        L{NoRangeStaticProducer.start} does not use C{sendFile} if the
+        response body is going to be encoded.
+        """
+        request = self.makeRequest(6)
+        request._encoder = object()
+        producer = static.NoRangeStaticProducer(request, StringIO(b'abcdef'))
+        producer.start()
+        self.assertEqual(request.channel.transport.sends, [])
+        self.assertEqual(request.channel.transport.producers,
+                         [(producer, False)])
+
+
+    def test_sendFileNotChunked(self):
+        """
+        L{NoRangeStaticProducer.start} does not use C{sendFile} if the
+        response body is chunked.
+        """
+        request = self.makeRequest(6)
+        request.responseHeaders.removeHeader(b'content-length')
+        producer = static.NoRangeStaticProducer(request, StringIO(b'abcdef'))
+        producer.start()
+        self.assertTrue(request.chunked)
+        self.assertEqual(request.channel.transport.sends, [])
+
+
+    def test_sendFileConnectionLost(self):
+        """
+        If the connection is lost before the file has been sent, the file is
+        closed and the request is not finished.
+        """
+        request = self.makeRequest(6)
+        fileObject = StringIO(b'abcdef')
+        producer = static.NoRangeStaticProducer(request, fileObject)
+        producer.start()
+        [(sentFile, offset, count, d)] = request.channel.transport.sends
+        d.errback(ConnectionLost())
+        self.assertTrue(fileObject.closed)
+        self.assertFalse(request.finished)
+
+
+    def test_sendFileTLS(self):
+        """
+        A L{static.File} served over TLS is produced by reading it, so that
+        it is encrypted, even though the transport beneath the TLS layer can
+        send files.
+        """
+        transport = SendFileTransport()
+        wrapper = TLSMemoryBIOFactory(
+            ServerTLSContext(), False, ServerFactory.forProtocol(Protocol)
+            ).buildProtocol(None)
+        wrapper.makeConnection(transport)
+        self.addCleanup(wrapper.connectionLost, ConnectionLost())
+
+        channel = DummyChannel()
+        channel.transport = wrapper
+        request = http.Request(channel, False)
+        request.method = b'GET'
+        request.clientproto = b'HTTP/1.1'
+        path = FilePath(self.mktemp())
+        path.setContent(b'abcdef')
+        static.File(path.path).render(request)
+        self.addCleanup(request.unregisterProducer)
+
+        self.assertFalse(interfaces.ISendFileTransport.providedBy(wrapper))
+        self.assertEqual(transport.sends, [])
+        self.assertEqual(len(transport.producers), 1)
 
-class SingleRangeStaticProducerTests(TestCase):
+    if tlsSkip:
+        test_sendFileTLS.skip = tlsSkip
+
+
+
+class SingleRangeStaticProducerTests(SendFileTestsMixin, TestCase):
     """
     Tests for L{SingleRangeStaticProducer}.
     """
@@ -926,6 +1331,25 @@ class SingleRangeStaticProducerTests(TestCase):
         self.assertEqual([None], callbackList)
 
 
+    def test_sendFile(self):
+        """
+        If the request's transport provides L{interfaces.ISendFileTransport},
+        L{SingleRangeStaticProducer.start} sends the range with C{sendFile}
+        and finishes the request once it has been sent.
+        """
+        request = self.makeRequest(3)
+        transport = request.channel.transport
+        fileObject = StringIO(b'abcdef')
+        producer = static.SingleRangeStaticProducer(request, fileObject, 1, 3)
+        producer.start()
+        self.assertEqual(transport.producers, [])
+        [(sentFile, offset, count, d)] = transport.sends
+        self.assertEqual((sentFile, offset, count), (fileObject, 1, 3))
+        d.callback(3)
+        self.assertTrue(request.finished)
+        self.assertTrue(fileObject.closed)
+
+
 
 class MultipleRangeStaticProducerTests(TestCase):
     """
@@ -180,6 +180,14 @@ class ElementTests(TestCase):
                           "notARenderer")
 
 
+    def test_renderLoads(self):
+        """
+        L{Element.render} returns the document loaded by its C{loader}.
+        """
+        loader = XMLString('<p>Hello, world.</p>')
+        self.assertIs(Element(loader=loader).render(None), loader.load())
+
+
 
 class XMLFileReprTests(TestCase):
     """
@@ -256,6 +264,31 @@ class XMLLoaderTestsMixin(object):
     test_loadTwice.suppress = [_xmlFileSuppress]
 
 
+    def test_loadCompiledOnce(self):
+        """
+        The loader compiles the document it loads once, and returns the same
+        compiled document each time it is asked for it.
+        """
+        loader = self.loaderFactory()
+        compiled = loader._loadCompiled()
+        self.assertEqual(compiled.parts, [b'<p>Hello, world.</p>'])
+        self.assertIs(loader._loadCompiled(), compiled)
+    test_loadCompiledOnce.suppress = [_xmlFileSuppress]
+
+
+    def test_loadDropsCompiled(self):
+        """
+        The compiled document is built again after L{load} is called, so
+        changes made in place to the document it returns are seen.
+        """
+        loader = self.loaderFactory()
+        loader._loadCompiled()
+        [tag] = loader.load()
+        tag.children[:] = [u'Goodbye.']
+        self.assertEqual(loader._loadCompiled().parts, [b'<p>Goodbye.</p>'])
+    test_loadDropsCompiled.suppress = [_xmlFileSuppress]
+
+
 
 class XMLStringLoaderTests(TestCase, XMLLoaderTestsMixin):
     """
@@ -568,6 +601,22 @@ class FlattenIntegrationTests(FlattenTestCase):
         return self.assertFlattensTo(element, b"<p>Hello, world.</p>")
 
 
+    def test_renderOverridden(self):
+        """
+        If L{Element.render} is overridden, the flattener uses what it
+        returns rather than the document of the C{loader}.
+        """
+        class ChangingElement(Element):
+            loader = XMLString('<p>Hello, world.</p>')
+
+            def render(self, request):
+                [tag] = Element.render(self, request)
+                return tag.clone()(u'!')
+
+        return self.assertFlattensTo(
+            ChangingElement(), b"<p>Hello, world.!</p>")
+
+
     def test_sameLoaderTwice(self):
         """
         Rendering the output of a loader, or even the same element, should
@@ -632,6 +681,18 @@ class TagLoaderTests(FlattenTestCase):
         self.assertFlattensImmediately(e, b'<i>test</i>')
 
 
+    def test_tagChanged(self):
+        """
+        An L{Element} using a L{TagLoader} flattens the loader's tag as it is
+        when it is flattened, including changes made to it in place since it
+        was last flattened.
+        """
+        e = Element(self.loader)
+        self.assertFlattensImmediately(e, b'<i>test</i>')
+        self.loader.tag.children.append('ed')
+        self.assertFlattensImmediately(e, b'<i>tested</i>')
+
+
 
 class TestElement(Element):
     """
@@ -14,6 +14,7 @@ from zope.interface.verify import verifyObject
 from twisted.python import reflect, failure
 from twisted.python.compat import _PY3, unichr
 from twisted.python.filepath import FilePath
+from twisted.python.logfile import BatchedLogFile
 from twisted.trial import unittest
 from twisted.internet import reactor
 from twisted.internet.address import IPv4Address
@@ -22,7 +23,7 @@ from twisted.web import server, resource
 from twisted.web import iweb, http, error
 
 from twisted.web.test.requesthelper import DummyChannel, DummyRequest
-from twisted.web.static import Data
+from twisted.web.static import Data, File
 
 
 class ResourceTests(unittest.TestCase):
@@ -854,6 +855,162 @@ class GzipEncoderTests(unittest.TestCase):
                          zlib.decompress(body, 16 + zlib.MAX_WBITS))
 
 
+    def _policyRequest(self, factory, resrc):
+        """
+        Make a request accepting gzip encoding for C{resrc}, wrapped with
+        C{factory}, on a new channel.
+
+        @return: The request, which has been processed.
+        """
+        self.channel = DummyChannel()
+        self.channel.site.resource.putChild(
+            b"policy", resource.EncodingResourceWrapper(resrc, [factory]))
+        request = server.Request(self.channel, False)
+        request.gotLength(0)
+        request.requestHeaders.setRawHeaders(b"Accept-Encoding", [b"gzip"])
+        request.requestReceived(b'GET', b'/policy', b'HTTP/1.0')
+        return request
+
+
+    def test_minimumSize(self):
+        """
+        Responses shorter than the C{minimumSize} of the
+        L{server.GzipEncoderFactory} are sent uncompressed, with their
+        I{Content-Length} and without a I{Content-Encoding} header.
+        """
+        factory = server.GzipEncoderFactory(minimumSize=10)
+        self._policyRequest(factory, Data(b"Some data", "text/plain"))
+        data = self.channel.transport.written.getvalue()
+        self.assertIn(b"Content-Length: 9\r\n", data)
+        self.assertNotIn(b"Content-Encoding", data)
+        self.assertEqual(data[data.find(b"\r\n\r\n") + 4:], b"Some data")
+
+        self._policyRequest(factory, Data(b"Some more data", "text/plain"))
+        data = self.channel.transport.written.getvalue()
+        self.assertIn(b"Content-Encoding: gzip\r\n", data)
+
+
+    def test_minimumSizeStreaming(self):
+        """
+        If the length of the response is not known in advance, written data
+        is held back, without sending the headers, until C{minimumSize}
+        bytes have been written or the response is finished.
+        """
+        factory = server.GzipEncoderFactory(minimumSize=10)
+        class Streaming(resource.Resource):
+            def render_GET(self, request):
+                return server.NOT_DONE_YET
+
+        request = self._policyRequest(factory, Streaming())
+        request.write(b"short")
+        self.assertEqual(self.channel.transport.written.getvalue(), b"")
+        request.finish()
+        data = self.channel.transport.written.getvalue()
+        self.assertNotIn(b"Content-Encoding", data)
+        self.assertEqual(data[data.find(b"\r\n\r\n") + 4:], b"short")
+
+        request = self._policyRequest(factory, Streaming())
+        request.write(b"short")
+        request.write(b"enough")
+        data = self.channel.transport.written.getvalue()
+        self.assertIn(b"Content-Encoding: gzip\r\n", data)
+        request.finish()
+        data = self.channel.transport.written.getvalue()
+        body = data[data.find(b"\r\n\r\n") + 4:]
+        self.assertEqual(b"shortenough",
+                         zlib.decompress(body, 16 + zlib.MAX_WBITS))
+
+
+    def test_contentTypes(self):
+        """
+        If C{contentTypes} is given, only responses with one of those media
+        types, or matching a wildcard among them, are compressed.
+        """
+        factory = server.GzipEncoderFactory(
+            contentTypes=[b"application/json", b"TEXT/*"])
+        for contentType, compressed in [
+                ("text/plain; charset=utf-8", True),
+                ("application/json", True),
+                ("image/png", False)]:
+            self._policyRequest(factory, Data(b"Some data", contentType))
+            data = self.channel.transport.written.getvalue()
+            if compressed:
+                self.assertIn(b"Content-Encoding: gzip\r\n", data)
+            else:
+                self.assertNotIn(b"Content-Encoding", data)
+                self.assertIn(b"Content-Length: 9\r\n", data)
+
+
+    def test_bufferSize(self):
+        """
+        If C{bufferSize} is given, written data is compressed and flushed to
+        the client only once that many bytes are waiting, and at the end of
+        the response.
+        """
+        factory = server.GzipEncoderFactory(bufferSize=10)
+        class Streaming(resource.Resource):
+            def render_GET(self, request):
+                return server.NOT_DONE_YET
+
+        request = self._policyRequest(factory, Streaming())
+        request.write(b"12345")
+        self.assertEqual(self.channel.transport.written.getvalue(), b"")
+        request.write(b"67890")
+        data = self.channel.transport.written.getvalue()
+        body = data[data.find(b"\r\n\r\n") + 4:]
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        self.assertEqual(decompressor.decompress(body), b"1234567890")
+
+        request.write(b"abc")
+        request.finish()
+        data = self.channel.transport.written.getvalue()
+        body = data[data.find(b"\r\n\r\n") + 4:]
+        self.assertEqual(zlib.decompress(body, 16 + zlib.MAX_WBITS),
+                         b"1234567890abc")
+
+
+
+    def test_resourceEncoding(self):
+        """
+        If the resource replaces the I{Content-Encoding} header set by the
+        encoder, its response is sent as it is, with its own header.
+        """
+        class Encoded(resource.Resource):
+            def render_GET(self, request):
+                request.setHeader(b"content-encoding", b"br")
+                return b"Some data"
+
+        self._policyRequest(server.GzipEncoderFactory(), Encoded())
+        data = self.channel.transport.written.getvalue()
+        self.assertIn(b"Content-Encoding: br\r\n", data)
+        self.assertNotIn(b"gzip", data)
+        self.assertEqual(data[data.find(b"\r\n\r\n") + 4:], b"Some data")
+
+
+    def test_precompressedFile(self):
+        """
+        A compressed copy of a file served by a L{static.File} with
+        C{precompressed} set is not compressed again, so the response has a
+        single gzip encoding.
+        """
+        base = FilePath(self.mktemp())
+        base.makedirs()
+        plain = base.child("foo.js")
+        plain.setContent(b"Some data")
+        base.child("foo.js.gz").setContent(zlib.compress(b"Some data"))
+        file = File(plain.path)
+        file.precompressed = True
+
+        request = self._policyRequest(server.GzipEncoderFactory(), file)
+        producer, streaming = self.channel.transport.producers[-1]
+        while not request.finished:
+            producer.resumeProducing()
+        data = self.channel.transport.written.getvalue()
+        self.assertEqual(data.count(b"Content-Encoding"), 1)
+        self.assertIn(b"Content-Encoding: gzip\r\n", data)
+        self.assertEqual(data[data.find(b"\r\n\r\n") + 4:],
+                         zlib.compress(b"Some data"))
+
 
 class RootResource(resource.Resource):
     isLeaf=0
@@ -1230,6 +1387,32 @@ class AccessLogTestsMixin(object):
 
 
 
+    def test_batchedLog(self):
+        """
+        If the factory is initialized with C{batchedLog=True}, its log file
+        is wrapped in a L{BatchedLogFile}, which has written every line once
+        the factory is stopped.
+        """
+        def formatter(timestamp, request):
+            return u"line"
+
+        logPath = self.mktemp()
+        factory = self.factory(
+            logPath=logPath, logFormatter=formatter, reactor=Clock(),
+            batchedLog=True)
+        factory.startFactory()
+        try:
+            self.assertIsInstance(factory.logFile, BatchedLogFile)
+            factory.log(DummyRequestForLogTest(factory))
+            factory.log(DummyRequestForLogTest(factory))
+        finally:
+            factory.stopFactory()
+
+        self.assertEqual(
+            (b"line" + self.linesep) * 2, FilePath(logPath).getContent())
+
+
+
 class HTTPFactoryAccessLogTests(AccessLogTestsMixin, unittest.TestCase):
     """
     Tests for L{http.HTTPFactory.log}.
@@ -71,6 +71,57 @@ class SynchronousReactorThreads:
 
 
 
+class QueuedReactorThreads:
+    """
+    An implementation of part of the L{IReactorThreads} interface which
+    queues the functions it is given until L{runQueued} is called, as a
+    reactor busy with other work would.
+
+    @ivar queued: The C{(f, a, kw)} calls not yet made.
+    """
+    def __init__(self):
+        self.queued = []
+
+
+    def callFromThread(self, f, *a, **kw):
+        """
+        Queue C{f(*a, **kw)} to be called by L{runQueued}.
+        """
+        self.queued.append((f, a, kw))
+
+
+    def runQueued(self):
+        """
+        Make the queued calls, in order, including any they queue.
+        """
+        while self.queued:
+            f, a, kw = self.queued.pop(0)
+            f(*a, **kw)
+
+
+
+class StartupReactor:
+    """
+    An implementation of the parts of L{IReactorCore} which L{WSGIResource}
+    uses to start and stop its own thread pool.
+
+    @ivar whenRunning: The callables passed to C{callWhenRunning}.
+    @ivar triggers: The C{(phase, eventType, f)} system event triggers added.
+    """
+    def __init__(self):
+        self.whenRunning = []
+        self.triggers = []
+
+
+    def callWhenRunning(self, f):
+        self.whenRunning.append(f)
+
+
+    def addSystemEventTrigger(self, phase, eventType, f):
+        self.triggers.append((phase, eventType, f))
+
+
+
 class WSGIResourceTests(TestCase):
     def setUp(self):
         """
@@ -106,12 +157,42 @@ class WSGIResourceTests(TestCase):
             b"foo", Resource())
 
 
+    def test_dedicatedThreadPool(self):
+        """
+        If L{WSGIResource} is given L{None} instead of a thread pool, it
+        creates a L{ThreadPool} of C{maxThreads} threads of its own, which
+        starts and stops with the reactor.
+        """
+        reactor = StartupReactor()
+        resource = WSGIResource(reactor, None, None, maxThreads=3)
+        pool = resource._threadpool
+        self.assertIsInstance(pool, ThreadPool)
+        self.assertEqual(pool.max, 3)
+        self.assertEqual(reactor.whenRunning, [pool.start])
+        self.assertEqual(reactor.triggers, [("after", "shutdown", pool.stop)])
+
+
+    def test_nonBlockingWithoutThreadPool(self):
+        """
+        A non-blocking L{WSGIResource} given L{None} instead of a thread pool
+        does not create one.
+        """
+        reactor = StartupReactor()
+        resource = WSGIResource(reactor, None, None, nonBlocking=True)
+        self.assertIsNone(resource._threadpool)
+        self.assertEqual((reactor.whenRunning, reactor.triggers), ([], []))
+
+
 class WSGITestsMixin:
     """
     @ivar channelFactory: A no-argument callable which will be invoked to
         create a new HTTP channel to associate with request objects.
+
+    @ivar resourceKeywords: Keyword arguments to create each L{WSGIResource}
+        with.
     """
     channelFactory = DummyChannel
+    resourceKeywords = {}
 
     def setUp(self):
         self.threadpool = SynchronousThreadPool()
@@ -159,7 +240,8 @@ class WSGITestsMixin:
                 return string.encode('iso-8859-1')
 
         root = WSGIResource(
-            self.reactor, self.threadpool, applicationFactory())
+            self.reactor, self.threadpool, applicationFactory(),
+            **self.resourceKeywords)
         resourceSegments.reverse()
         for seg in resourceSegments:
             tmp = Resource()
@@ -2094,3 +2176,247 @@ class ApplicationTests(WSGITestsMixin, TestCase):
                 raise RuntimeError("This application had some error.")
 
         return self._connectionClosedTest(Application, responseContent)
+
+
+
+class RecordingRequest(Request):
+    """
+    A L{Request} which records the data written to it.
+
+    @ivar written: The C{bytes} passed to each call of C{write}.
+    """
+    def __init__(self, *a, **kw):
+        Request.__init__(self, *a, **kw)
+        self.written = []
+
+
+    def write(self, data):
+        self.written.append(data)
+        return Request.write(self, data)
+
+
+
+class WriteBufferTests(WSGITestsMixin, TestCase):
+    """
+    Tests for the batching of response writes done by a L{WSGIResource}
+    with a C{writeBufferSize}.
+    """
+    resourceKeywords = {"writeBufferSize": 1024}
+
+    def setUp(self):
+        self.threadpool = SynchronousThreadPool()
+        self.reactor = QueuedReactorThreads()
+
+
+    def render(self, application, requestClass=RecordingRequest):
+        """
+        Render a request to C{application}.
+
+        @return: A two-tuple of the request and the L{DummyChannel} it was
+            received on.
+        """
+        channel = DummyChannel()
+        requests = []
+        def requestFactory(*a, **kw):
+            requests.append(requestClass(*a, **kw))
+            return requests[-1]
+        self.lowLevelRender(
+            requestFactory, lambda: application,
+            lambda: channel, 'GET', '1.1', [], [''])
+        return requests[0], channel
+
+
+    def test_batched(self):
+        """
+        The bytes the application produces while the reactor thread is busy
+        are written to the request together, with a single call into the
+        reactor thread, followed by the response status and headers.
+        """
+        def application(environ, startResponse):
+            write = startResponse('200 OK', [('content-length', '9')])
+            write(b'foo')
+            return iter([b'bar', b'baz'])
+
+        request, channel = self.render(application)
+        self.assertEqual(len(self.reactor.queued), 2)
+        self.assertEqual(request.written, [])
+
+        self.reactor.runQueued()
+        self.assertEqual(request.written, [b'foobarbaz'])
+        self.assertTrue(request.finished)
+        response = channel.transport.written.getvalue()
+        self.assertTrue(response.startswith(b'HTTP/1.1 200 OK\r\n'))
+        self.assertEqual(self.getContentFromResponse(response), b'foobarbaz')
+
+
+    def test_onlyBytes(self):
+        """
+        The C{write} callable only accepts byte strings, even though it does
+        not wait for the reactor thread.
+        """
+        errors = []
+        def application(environ, startResponse):
+            write = startResponse('200 OK', [])
+            try:
+                write(u'bogus')
+            except TypeError as e:
+                errors.append(e)
+            return iter(())
+
+        self.render(application)
+        self.assertEqual(len(errors), 1)
+
+
+    def test_writeFailure(self):
+        """
+        An exception raised by writing a batch to the request is raised by
+        the application's next write.
+        """
+        class FailingRequest(Request):
+            def write(self, data):
+                raise RuntimeError("write failed")
+
+        raised = []
+        def application(environ, startResponse):
+            write = startResponse('200 OK', [])
+            write(b'foo')
+            self.reactor.runQueued()
+            try:
+                write(b'bar')
+            except RuntimeError as e:
+                raised.append(e)
+            return iter(())
+
+        request, channel = self.render(application, FailingRequest)
+        self.assertEqual(str(raised[0]), "write failed")
+
+
+    def test_writeFailureAfterApplication(self):
+        """
+        If writing a batch to the request fails after the application is
+        done, the exception is logged and the connection is closed.
+        """
+        class FailingRequest(Request):
+            def write(self, data):
+                raise RuntimeError("write failed")
+
+        def application(environ, startResponse):
+            startResponse('200 OK', [])
+            return iter([b'foo'])
+
+        request, channel = self.render(application, FailingRequest)
+        self.reactor.runQueued()
+        self.assertEqual(len(self.flushLoggedErrors(RuntimeError)), 1)
+        self.assertTrue(channel.transport.disconnected)
+
+
+    def test_connectionLost(self):
+        """
+        Writes queued when the request's connection is lost are discarded.
+        """
+        def application(environ, startResponse):
+            startResponse('200 OK', [])
+            return iter([b'foo'])
+
+        request, channel = self.render(application)
+        request.connectionLost(Failure(ConnectionLost("No more connection")))
+        self.reactor.runQueued()
+        self.assertEqual(request.written, [])
+
+
+    def test_threaded(self):
+        """
+        With a real thread pool, an application writing more than
+        C{writeBufferSize} bytes at a time waits for its writes and the whole
+        response is written in order.
+        """
+        self.reactor = reactor
+        self.threadpool = ThreadPool()
+        self.threadpool.start()
+        self.addCleanup(self.threadpool.stop)
+        self.resourceKeywords = {"writeBufferSize": 2}
+        channel = DummyChannel()
+        chunks = [intToBytes(i) * 3 for i in range(10)]
+
+        def application(environ, startResponse):
+            startResponse('200 OK', [('content-length', '30')])
+            return iter(chunks)
+
+        d, requestFactory = self.requestFactoryFactory()
+        def cbRendered(ignored):
+            self.assertEqual(
+                self.getContentFromResponse(
+                    channel.transport.written.getvalue()),
+                b''.join(chunks))
+        d.addCallback(cbRendered)
+
+        self.lowLevelRender(
+            requestFactory, lambda: application,
+            lambda: channel, 'GET', '1.1', [], [''])
+        return d
+
+
+
+class NonBlockingTests(WSGITestsMixin, TestCase):
+    """
+    Tests for L{WSGIResource} with C{nonBlocking} set, which runs the
+    application in the reactor thread.
+    """
+    resourceKeywords = {"nonBlocking": True}
+
+    def setUp(self):
+        # Neither is used by a non-blocking resource.
+        self.threadpool = None
+        self.reactor = None
+
+
+    def test_calledInReactorThread(self):
+        """
+        The application object is called and iterated in the reactor thread
+        before C{render} returns, and told that it is not multithreaded.
+        """
+        channel = DummyChannel()
+        invoked = []
+        environs = []
+
+        def application(environ, startResponse):
+            environs.append(environ)
+            invoked.append(getThreadID())
+            write = startResponse('200 OK', [('content-length', '6')])
+            write(b'foo')
+            yield b'bar'
+            invoked.append(getThreadID())
+
+        d, requestFactory = self.requestFactoryFactory()
+        self.lowLevelRender(
+            requestFactory, lambda: application,
+            lambda: channel, 'GET', '1.1', [], [''])
+
+        self.assertEqual(invoked, [getThreadID()] * 2)
+        self.assertFalse(environs[0]['wsgi.multithread'])
+        self.assertEqual(
+            self.getContentFromResponse(channel.transport.written.getvalue()),
+            b'foobar')
+        self.assertEqual(self.successResultOf(d), None)
+
+
+    def test_error(self):
+        """
+        If the application raises an exception before writing anything, the
+        response status is I{500} and the exception is logged.
+        """
+        channel = DummyChannel()
+
+        def application(environ, startResponse):
+            raise RuntimeError("This application had some error.")
+
+        d, requestFactory = self.requestFactoryFactory()
+        self.lowLevelRender(
+            requestFactory, lambda: application,
+            lambda: channel, 'GET', '1.1', [], [''])
+
+        self.successResultOf(d)
+        self.assertEqual(len(self.flushLoggedErrors(RuntimeError)), 1)
+        self.assertTrue(
+            channel.transport.written.getvalue().startswith(
+                b'HTTP/1.1 500 Internal Server Error'))
@@ -0,0 +1 @@
+twisted.web.http.HTTPChannel.maxConcurrentRequests allows several pipelined requests to be processed at once, with their responses written in order.
@@ -0,0 +1 @@
+twisted.web.http.HTTPFactory and twisted.web.server.Site now accept batchedLog=True to write the access log in batches from a thread.
@@ -0,0 +1 @@
+twisted.web.client.HTTPConnectionPool now limits and queues connections per host and in total, can open connections ahead of time with prewarm, and records how long requests wait for a connection.
@@ -0,0 +1 @@
+twisted.web.client.Agent now speaks HTTP/2 to HTTPS servers which select it with ALPN.
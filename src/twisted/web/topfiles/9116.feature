@@ -0,0 +1 @@
+twisted.web.cache.CachingResource stores responses of the resource it wraps and revalidates them with conditional requests.
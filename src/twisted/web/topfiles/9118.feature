@@ -0,0 +1 @@
+twisted.web.server.GzipEncoderFactory now accepts a minimum size, a list of content types to compress and a buffer size for the data it compresses at once.
@@ -0,0 +1 @@
+twisted.web.static.FileCache can be given to twisted.web.static.File to reuse file metadata and keep the contents of small files in memory.
@@ -0,0 +1 @@
+twisted.web.wsgi.WSGIResource now batches response writes and accepts nonBlocking=True to call applications in the reactor thread.
@@ -10,6 +10,7 @@ __metaclass__ = type
 
 from collections import Sequence
 from sys import exc_info
+from threading import Condition
 from warnings import warn
 
 from zope.interface import implementer
@@ -18,6 +19,7 @@ from twisted.internet.threads import blockingCallFromThread
 from twisted.python.compat import reraise
 from twisted.python.log import msg, err
 from twisted.python.failure import Failure
+from twisted.python.threadpool import ThreadPool
 from twisted.web.resource import IResource
 from twisted.web.server import NOT_DONE_YET
 from twisted.web.http import INTERNAL_SERVER_ERROR
@@ -255,20 +257,52 @@ class _WSGIResponse:
     @ivar headers: A list of HTTP response headers supplied to the WSGI
         I{start_response} callable by the application.
 
+    @ivar writeBufferSize: The number of response bytes the application may
+        write ahead of the I/O thread.  If C{0}, each write blocks until the
+        I/O thread has written it to the request.  Otherwise writes are
+        queued and handed to the I/O thread in batches, and the application
+        only blocks while more than this many bytes are waiting.
+
+    @ivar nonBlocking: If L{True}, the application object is called and
+        iterated in the I/O thread instead of in C{threadpool}.
+
     @ivar _requestFinished: A flag which indicates whether it is possible to
         generate more response data or not.  This is L{False} until
         L{http.Request.notifyFinish} tells us the request is done,
         then L{True}.
+
+    @ivar _pending: The queued writes not yet handed to the request, when
+        C{writeBufferSize} is not C{0}.
+
+    @ivar _pendingSize: The number of bytes in C{_pending}.
+
+    @ivar _pendingCondition: A L{Condition} guarding C{_pending},
+        C{_pendingSize}, C{_flushScheduled} and C{_writeFailure}, which the
+        application thread waits on while too many bytes are queued.
+
+    @ivar _flushScheduled: Whether the I/O thread has been asked to write
+        the queued writes and has not done so yet.
+
+    @ivar _writeFailure: A L{Failure} for the exception raised by writing a
+        batch of queued writes to the request, or L{None}.
     """
 
     _requestFinished = False
+    _flushScheduled = False
+    _writeFailure = None
 
-    def __init__(self, reactor, threadpool, application, request):
+    def __init__(self, reactor, threadpool, application, request,
+                 writeBufferSize=0, nonBlocking=False):
         self.started = False
         self.reactor = reactor
         self.threadpool = threadpool
         self.application = application
         self.request = request
+        self.writeBufferSize = writeBufferSize
+        self.nonBlocking = nonBlocking
+        self._pending = []
+        self._pendingSize = 0
+        self._pendingCondition = Condition()
         self.request.notifyFinish().addBoth(self._finished)
 
         if request.prepath:
@@ -319,7 +353,7 @@ class _WSGIResponse:
                 'wsgi.version': (1, 0),
                 'wsgi.url_scheme': request.isSecure() and 'https' or 'http',
                 'wsgi.run_once': False,
-                'wsgi.multithread': True,
+                'wsgi.multithread': not nonBlocking,
                 'wsgi.multiprocess': False,
                 'wsgi.errors': _ErrorStream(),
                 # Attend: request.content was owned by the I/O thread up until
@@ -342,9 +376,12 @@ class _WSGIResponse:
     def _finished(self, ignored):
         """
         Record the end of the response generation for the request being
-        serviced.
+        serviced, and wake up the application thread if it is waiting for
+        queued writes to be written.
         """
-        self._requestFinished = True
+        with self._pendingCondition:
+            self._requestFinished = True
+            self._pendingCondition.notify()
 
 
     def startResponse(self, status, headers, excInfo=None):
@@ -444,6 +481,11 @@ class _WSGIResponse:
         #
         # However, providing some back-pressure may nevertheless be a Good
         # Thing at some point in the future.
+        #
+        # Waiting for every write costs two thread switches per bytestring,
+        # so when a write buffer is configured the writes are queued instead,
+        # and only an exception raised by an earlier batch or a full buffer
+        # stops the application.
 
         def wsgiWrite(started):
             if not started:
@@ -451,12 +493,78 @@ class _WSGIResponse:
             self.request.write(data)
 
         try:
+            if self.nonBlocking:
+                return wsgiWrite(self.started)
+            elif self.writeBufferSize:
+                return self._queueWrite(data)
             return blockingCallFromThread(
                 self.reactor, wsgiWrite, self.started)
         finally:
             self.started = True
 
 
+    def _queueWrite(self, data):
+        """
+        Queue C{data} to be written to the request, waking up the I/O thread
+        only if it is not already due to write the queued writes.  Then wait
+        until no more than C{writeBufferSize} bytes are queued.
+
+        This will be called in a non-I/O thread.
+
+        @raise Exception: Whatever writing a previous batch raised.
+        """
+        if not isinstance(data, bytes):
+            raise TypeError(
+                "Can only write bytes to a transport, not %r" % (data,))
+
+        with self._pendingCondition:
+            if self._writeFailure is not None:
+                self._writeFailure.raiseException()
+            self._pending.append(data)
+            self._pendingSize += len(data)
+            schedule = not self._flushScheduled
+            self._flushScheduled = True
+
+        if schedule:
+            self.reactor.callFromThread(self._flushPending, self.started)
+
+        with self._pendingCondition:
+            while (self._pendingSize > self.writeBufferSize and
+                   self._writeFailure is None and
+                   not self._requestFinished):
+                self._pendingCondition.wait()
+            if self._writeFailure is not None:
+                self._writeFailure.raiseException()
+
+
+    def _flushPending(self, started):
+        """
+        Write the queued writes to the request as one write, first setting
+        the response status and headers if C{started} is L{False}.
+
+        This must be called in the I/O thread.
+
+        @param started: Whether the application had written anything before
+            the first of the queued writes.
+        """
+        with self._pendingCondition:
+            pending, self._pending = self._pending, []
+            self._pendingSize = 0
+            self._flushScheduled = False
+            self._pendingCondition.notify()
+
+        if self._requestFinished or self._writeFailure is not None:
+            return
+        try:
+            if not started:
+                self._sendResponseHeaders()
+            self.request.write(b''.join(pending))
+        except:
+            with self._pendingCondition:
+                self._writeFailure = Failure()
+                self._pendingCondition.notify()
+
+
     def _sendResponseHeaders(self):
         """
         Set the response code and response headers on the request object, but
@@ -479,11 +587,27 @@ class _WSGIResponse:
 
     def start(self):
         """
-        Start the WSGI application in the threadpool.
+        Start the WSGI application in the threadpool, or right away if it is
+        non-blocking.
 
         This must be called in the I/O thread.
         """
-        self.threadpool.callInThread(self.run)
+        if self.nonBlocking:
+            self.run()
+        else:
+            self.threadpool.callInThread(self.run)
+
+
+    def _callFromThread(self, f, *args):
+        """
+        Call C{f} in the I/O thread: right away if the application is
+        non-blocking, since this is then the I/O thread, or else through the
+        reactor.
+        """
+        if self.nonBlocking:
+            f(*args)
+        else:
+            self.reactor.callFromThread(f, *args)
 
 
     def run(self):
@@ -491,8 +615,16 @@ class _WSGIResponse:
         Call the WSGI application object, iterate it, and handle its output.
 
         This must be called in a non-I/O thread (ie, a WSGI application
-        thread).
+        thread), unless the application is non-blocking.
         """
+        def wsgiError(started, type, value, traceback):
+            err(Failure(value, type, traceback), "WSGI application error")
+            if started:
+                self.request.loseConnection()
+            else:
+                self.request.setResponseCode(INTERNAL_SERVER_ERROR)
+                self.request.finish()
+
         try:
             appIterator = self.application(self.environ, self.startResponse)
             for elem in appIterator:
@@ -504,21 +636,20 @@ class _WSGIResponse:
             if close is not None:
                 close()
         except:
-            def wsgiError(started, type, value, traceback):
-                err(Failure(value, type, traceback), "WSGI application error")
-                if started:
-                    self.request.loseConnection()
-                else:
-                    self.request.setResponseCode(INTERNAL_SERVER_ERROR)
-                    self.request.finish()
-            self.reactor.callFromThread(wsgiError, self.started, *exc_info())
+            self._callFromThread(wsgiError, self.started, *exc_info())
         else:
             def wsgiFinish(started):
-                if not self._requestFinished:
+                # A queued write may have failed after the application was
+                # done writing.
+                failure = self._writeFailure
+                if failure is not None:
+                    wsgiError(started, failure.type, failure.value,
+                              failure.getTracebackObject())
+                elif not self._requestFinished:
                     if not started:
                         self._sendResponseHeaders()
                     self.request.finish()
-            self.reactor.callFromThread(wsgiFinish, self.started)
+            self._callFromThread(wsgiFinish, self.started)
         self.started = True
 
 
@@ -536,16 +667,54 @@ class WSGIResource:
         L{_WSGIResponse} to run the WSGI application object.
 
     @ivar _application: The WSGI application object.
+
+    @ivar _writeBufferSize: The number of response bytes the application may
+        write ahead of the I/O thread, passed on to L{_WSGIResponse}.
+
+    @ivar _nonBlocking: Whether the application object is called in the I/O
+        thread, passed on to L{_WSGIResponse}.
     """
 
     # Further resource segments are left up to the WSGI application object to
     # handle.
     isLeaf = True
 
-    def __init__(self, reactor, threadpool, application):
+    def __init__(self, reactor, threadpool, application, writeBufferSize=0,
+                 nonBlocking=False, maxThreads=20):
+        """
+        @param reactor: An L{IReactorThreads} provider.
+
+        @param threadpool: The L{ThreadPool}, or any object with a
+            C{callInThread} method, to run the application object in.  If
+            L{None}, a L{ThreadPool} of at most C{maxThreads} threads is
+            created for this resource alone, started when C{reactor} starts
+            and stopped when it shuts down.
+
+        @param application: The WSGI application object.
+
+        @param writeBufferSize: If not C{0}, the application's writes are
+            handed to the I/O thread in batches, waking it up once per batch
+            instead of waiting for it once per write, and the application
+            only waits once this many bytes are queued.
+
+        @type nonBlocking: L{bool}
+        @param nonBlocking: Whether the application object never blocks, and
+            so can be called and iterated in the I/O thread itself.  No
+            thread pool is then used.
+
+        @param maxThreads: The size of the L{ThreadPool} created if
+            C{threadpool} is L{None}.
+        """
+        if threadpool is None and not nonBlocking:
+            threadpool = ThreadPool(minthreads=min(ThreadPool.min, maxThreads),
+                                    maxthreads=maxThreads, name="WSGIResource")
+            reactor.callWhenRunning(threadpool.start)
+            reactor.addSystemEventTrigger('after', 'shutdown', threadpool.stop)
         self._reactor = reactor
         self._threadpool = threadpool
         self._application = application
+        self._writeBufferSize = writeBufferSize
+        self._nonBlocking = nonBlocking
 
 
     def render(self, request):
@@ -559,7 +728,8 @@ class WSGIResource:
         will the status, headers, and the response body.
         """
         response = _WSGIResponse(
-            self._reactor, self._threadpool, self._application, request)
+            self._reactor, self._threadpool, self._application, request,
+            self._writeBufferSize, self._nonBlocking)
         response.start()
         return NOT_DONE_YET
 